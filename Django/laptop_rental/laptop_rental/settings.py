@@ -166,3 +166,16 @@ LOGOUT_REDIRECT_URL = '/login/'
 TEMPLATES[0]['OPTIONS']['context_processors'] += [
     'rentals.context_processors.global_year'
 ]
+
+# Reports
+# True: report_dashboard reads the precomputed snapshot tables (rentals/reporting.py)
+# False: every figure is computed with set-based aggregate queries on each request
+REPORT_DASHBOARD_USE_SNAPSHOTS = True
+
+# Background exports (rentals/export_jobs.py, `manage.py run_export_worker`)
+EXPORT_ARTIFACT_DIR = BASE_DIR / "exports"
+EXPORT_RETENTION_DAYS = 7
+EXPORT_WORKER_PROCESSES = 2
+
+# Workbook imports (rentals/workbook.py, `manage.py import_all_data --bulk`)
+IMPORT_READER_PROCESSES = 2
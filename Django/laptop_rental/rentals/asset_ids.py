@@ -0,0 +1,159 @@
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+
+from .models import AssetIdSequence, PendingProduct, ProductAsset
+
+
+# -----------------------------
+# Asset ID allocation
+# -----------------------------
+# Asset IDs look like "Pixel/2025/007" or "Pixel/2025/007 A". Numbers are
+# handed out from a per-year AssetIdSequence row locked with SELECT ... FOR
+# UPDATE, so concurrent adds/clones/approvals for the same year are
+# serialised and each allocation costs a couple of indexed lookups instead of
+# a scan of every ID of the year.
+
+def asset_id_prefix(year):
+    return f"Pixel/{year}/"
+
+
+def format_asset_id(year, number, suffix=None):
+    suffix = f" {suffix}" if suffix else ""
+    return f"{asset_id_prefix(year)}{str(number).zfill(3)}{suffix}"
+
+
+def parse_asset_id(asset_id):
+    """(year, number) for an ID in the Pixel/<year>/<number>[ suffix] format, else (None, None)."""
+    try:
+        _, year, rest = asset_id.split('/', 2)
+        return int(year), int(rest.split()[0])
+    except (AttributeError, ValueError, IndexError):
+        return None, None
+
+
+def _numbers_in_use(year):
+    """Every number of `year` held by a product or a pending product, with or without a suffix."""
+    prefix = asset_id_prefix(year)
+    numbers = set()
+    for model in (ProductAsset, PendingProduct):
+        for asset_id in model.objects.filter(asset_id__startswith=prefix).values_list('asset_id', flat=True).iterator():
+            _, number = parse_asset_id(asset_id)
+            if number:
+                numbers.add(number)
+    return numbers
+
+
+def _highest_number_in_use(year):
+    # One-off scan when a year's sequence row is first created
+    return max(_numbers_in_use(year), default=0)
+
+
+def _locked_sequence(year):
+    """The year's sequence row, locked until the surrounding transaction ends."""
+    sequence = AssetIdSequence.objects.select_for_update().filter(year=year).first()
+    if sequence is not None:
+        return sequence
+    try:
+        with transaction.atomic():
+            AssetIdSequence.objects.create(year=year, last_number=_highest_number_in_use(year))
+    except IntegrityError:
+        pass  # created concurrently
+    return AssetIdSequence.objects.select_for_update().get(year=year)
+
+
+def lock_asset_years(years):
+    """Lock several years at once (in a fixed order, so batches cannot deadlock)."""
+    for year in sorted(set(years)):
+        _locked_sequence(year)
+
+
+def asset_id_in_use(asset_id, exclude_product=None, exclude_pending=None):
+    products = ProductAsset.objects.filter(asset_id=asset_id)
+    pending = PendingProduct.objects.filter(asset_id=asset_id)
+    if exclude_product:
+        products = products.exclude(pk=exclude_product)
+    if exclude_pending:
+        pending = pending.exclude(pk=exclude_pending)
+    return products.exists() or pending.exists()
+
+
+def _number_in_use(year, number):
+    """True if `number` is taken in `year` with or without a suffix."""
+    plain = format_asset_id(year, number)
+    taken = Q(asset_id=plain) | Q(asset_id__startswith=f"{plain} ")
+    return (
+        ProductAsset.objects.filter(taken).exists() or
+        PendingProduct.objects.filter(taken).exists()
+    )
+
+
+def _first_free_after(year, last_number):
+    number = last_number + 1
+    while _number_in_use(year, number):
+        # Only explicitly entered numbers above the counter are skipped here
+        number += 1
+    return number
+
+
+def allocate_asset_id(year, number=None, suffix=None, exclude_product=None, exclude_pending=None):
+    """
+    Reserve an asset ID for `year` and return (number, asset_id).
+
+    With `number` the explicit ID (plus optional suffix) is validated;
+    without it the next free number is taken from the year's counter.
+    Must run inside transaction.atomic() together with the save that
+    stores the ID, so the lock covers the insert. Raises ValueError when
+    an explicit number is already in use.
+    """
+    sequence = _locked_sequence(year)
+
+    if number:
+        asset_id = format_asset_id(year, number, suffix)
+        if asset_id_in_use(asset_id, exclude_product, exclude_pending):
+            raise ValueError(f"Asset Number '{number}' is already in use for year {year}.")
+        return number, asset_id
+
+    number = _first_free_after(year, sequence.last_number)
+    sequence.last_number = number
+    sequence.save(update_fields=['last_number'])
+    return number, format_asset_id(year, number)
+
+
+def allocate_asset_numbers(year, count, reserved=()):
+    """
+    Reserve `count` automatic numbers for `year` at once and return them in
+    order: the numbers after the year's counter, skipping those in use or in
+    `reserved`. One lock and one scan of the year for the whole block; same
+    transaction rule as allocate_asset_id().
+    """
+    sequence = _locked_sequence(year)
+    if count <= 0:
+        return []
+    skip = _numbers_in_use(year) | set(reserved)
+    numbers = []
+    number = sequence.last_number
+    while len(numbers) < count:
+        number += 1
+        if number not in skip:
+            numbers.append(number)
+    sequence.last_number = numbers[-1]
+    sequence.save(update_fields=['last_number'])
+    return numbers
+
+
+def claim_asset_id(asset_id, year, exclude_product=None, exclude_pending=None):
+    """
+    Lock the year of an already chosen asset ID and make sure nobody else
+    holds it. Raises ValueError on a clash.
+    """
+    id_year, _ = parse_asset_id(asset_id)
+    _locked_sequence(id_year or year)
+    if asset_id_in_use(asset_id, exclude_product, exclude_pending):
+        raise ValueError(f"Asset ID '{asset_id}' already exists. Please use a unique one.")
+
+
+def peek_next_number(year):
+    """Number the next automatic allocation for `year` would use (no reservation)."""
+    sequence = AssetIdSequence.objects.filter(year=year).first()
+    last_number = sequence.last_number if sequence else _highest_number_in_use(year)
+    return _first_free_after(year, last_number)
@@ -0,0 +1,130 @@
+import csv
+from zipfile import ZIP_DEFLATED, ZipFile
+
+from .models import (
+    AssetType, CPUOption, Customer, DisplaySizeOption, GraphicsOption, HDDOption,
+    PendingCustomer, PendingProduct, PendingProductConfiguration, PendingRental,
+    PendingRepair, ProductAsset, ProductConfiguration, RAMOption, Rental, Repair, Supplier,
+)
+
+EXPORT_CHUNK_SIZE = 2000
+
+# (file name stem, Excel sheet name, section title, model)
+EXPORT_DATASETS = [
+    ('customers', 'Customers', 'Customers', Customer),
+    ('pending_customers', 'PendingCustomers', 'Pending Customers', PendingCustomer),
+    ('suppliers', 'Suppliers', 'Suppliers', Supplier),
+    ('asset_types', 'AssetTypes', 'Asset Types', AssetType),
+    ('cpu_options', 'CPUOptions', 'CPU Options', CPUOption),
+    ('ram_options', 'RAMOptions', 'RAM Options', RAMOption),
+    ('hdd_options', 'HDDOptions', 'HDD Options', HDDOption),
+    ('graphics_options', 'GraphicsOptions', 'Graphics Options', GraphicsOption),
+    ('display_size_options', 'DisplaySizeOptions', 'Display Size Options', DisplaySizeOption),
+    ('products', 'Products', 'Products', ProductAsset),
+    ('pending_products', 'PendingProducts', 'Pending Products', PendingProduct),
+    ('configurations', 'Configurations', 'Configurations', ProductConfiguration),
+    ('pending_configurations', 'PendingConfigurations', 'Pending Configurations', PendingProductConfiguration),
+    ('rentals', 'Rentals', 'Rentals', Rental),
+    ('pending_rentals', 'PendingRentals', 'Pending Rentals', PendingRental),
+    ('repairs', 'Repairs', 'Repairs', Repair),
+    ('pending_repairs', 'PendingRepairs', 'Pending Repairs', PendingRepair),
+]
+
+
+# -----------------------------
+# Columns
+# -----------------------------
+# Same columns and values as views.safe_serialize, but resolved to
+# values_list() lookups so related names come from a JOIN instead of one
+# lazy load per row.
+
+def _related_label(field):
+    related = field.related_model
+    for attr in ('name', 'asset_id', 'username'):
+        if hasattr(related, attr):
+            return f"{field.name}__{attr}"
+    return field.attname
+
+
+def export_columns(model):
+    """[(header, values_list lookup)] for every concrete field of `model`."""
+    columns = []
+    for field in model._meta.concrete_fields:
+        lookup = _related_label(field) if field.is_relation else field.name
+        columns.append((field.name, lookup))
+    return columns
+
+
+def _format(value):
+    if value is None:
+        return None
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return str(value)
+
+
+def iter_export_rows(model, chunk_size=EXPORT_CHUNK_SIZE):
+    """Yield formatted rows (lists of str/None) for `model`, reading `chunk_size` rows at a time."""
+    lookups = [lookup for _, lookup in export_columns(model)]
+    queryset = model._default_manager.order_by('pk').values_list(*lookups)
+    for row in queryset.iterator(chunk_size=chunk_size):
+        yield [_format(value) for value in row]
+
+
+# -----------------------------
+# Streaming ZIP of CSVs
+# -----------------------------
+
+class _ChunkBuffer:
+    """Write-only file object that hands back whatever was written since the last drain."""
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+class _Echo:
+    def write(self, value):
+        return value
+
+
+def stream_csv_zip(datasets=None, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Generate a ZIP archive with one CSV per dataset, as byte chunks.
+    Memory use is bounded by `chunk_size` rows; empty tables are skipped.
+    """
+    datasets = EXPORT_DATASETS if datasets is None else datasets
+    buffer = _ChunkBuffer()
+    line = csv.writer(_Echo())
+
+    with ZipFile(buffer, 'w', compression=ZIP_DEFLATED) as archive:
+        for stem, _, _, model in datasets:
+            headers = [header for header, _ in export_columns(model)]
+            entry = None
+            pending = []
+            for row in iter_export_rows(model, chunk_size):
+                if entry is None:
+                    entry = archive.open(f"{stem}.csv", 'w', force_zip64=True)
+                    pending.append(line.writerow(headers))
+                pending.append(line.writerow(row))
+                if len(pending) >= chunk_size:
+                    entry.write(''.join(pending).encode('utf-8'))
+                    pending = []
+                    yield buffer.drain()
+            if entry is not None:
+                entry.write(''.join(pending).encode('utf-8'))
+                entry.close()
+                yield buffer.drain()
+
+    yield buffer.drain()
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from rentals.revenue import rebuild_revenue_ledger
+
+
+# python manage.py backfill_revenue_ledger
+# Run once after migrating to the revenue ledger, and after writes that skip
+# Rental.save() (QuerySet.update(), raw SQL, restoring a dump). The daily
+# extend_revenue_ledger() run only appends to rentals it can see are behind.
+class Command(BaseCommand):
+    help = "Rebuild the per-month revenue ledger of every rental and the asset revenue totals"
+
+    def handle(self, *args, **kwargs):
+        count = rebuild_revenue_ledger()
+        self.stdout.write(self.style.SUCCESS(f"Revenue ledger reconciled for {count} rentals."))
@@ -2,10 +2,42 @@ import pandas as pd
 from django.core.management.base import BaseCommand
 from django.contrib.auth.models import User
 from rentals.models import ProductAsset, AssetType, Supplier
+from rentals.importing import parse_date_column, parse_decimal_column
+from rentals.workbook import READ_CHUNK_SIZE, read_workbook, workbook_sheet_names
 from django.utils.dateparse import parse_date
+from collections import Counter
 from datetime import datetime, date
 import uuid  # for generating unique serial numbers
 
+DEFAULT_PURCHASE_DATE = date(2006, 5, 18)
+PURCHASE_DATE_FORMATS = ("%d-%m-%Y", "%Y-%m-%d")
+AMOUNT_COLUMNS = ['Our Purchase Cost', 'Current Value']
+
+
+def parse_purchase_date(raw):
+    """Cell parser behind the Purchase Date column: date objects, dd-mm-yyyy or ISO text."""
+    if isinstance(raw, datetime):
+        return raw.date()
+    if isinstance(raw, date):
+        return raw
+    text = str(raw).strip()
+    try:
+        return datetime.strptime(text, "%d-%m-%Y").date()
+    except ValueError:
+        pass
+    try:
+        return parse_date(text)
+    except ValueError:
+        return None
+
+
+def present_values(df, column, blanks=("", "nan")):
+    """Cells of `column` (all None if the sheet lacks it), with blank markers turned into None."""
+    if column not in df.columns:
+        return [None] * len(df)
+    values = df[column].astype(object)
+    return values.where(~values.astype(str).str.strip().str.lower().isin(blanks), None).tolist()
+
 
 # python manage.py import_assets "C:\Users\YourUser\Downloads\my_asset_data.xlsx"
 # python manage.py import_assets "data/my_asset_data.xlsx"
@@ -14,33 +46,60 @@ class Command(BaseCommand):
 
     def add_arguments(self, parser):
         parser.add_argument('file_path', type=str, help='Path to the Excel file')
+        parser.add_argument('--chunk-size', type=int, default=READ_CHUNK_SIZE,
+                            help='Rows read from the sheet at a time')
+
+    def iter_clean_rows(self, file_path, chunk_size):
+        """(index, row) for the first sheet, read and cleaned one chunk at a time."""
+        first_sheet = workbook_sheet_names(file_path)[0]
+        self.row_count = 0
+        self.parse_failures = Counter()
+        for number, (_, df) in enumerate(read_workbook(file_path, [first_sheet], chunk_size)):
+            # Clean column names
+            df.columns = df.columns.str.strip()
+
+            # Remove completely empty rows first
+            df = df.dropna(how='all')
+
+            # Now fill remaining NaN values with empty string
+            df = df.fillna("")
+            self.row_count += len(df)
+
+            if number == 0:
+                # Show preview for debugging
+                self.stdout.write(self.style.NOTICE(f"Columns found: {list(df.columns)}"))
+                self.stdout.write(self.style.NOTICE(f"Preview:\n{df.head()}"))
+
+            self.parse_columns(df)
+            yield from df.iterrows()
+
+    def parse_columns(self, df):
+        """
+        Replace the date and amount columns of a chunk with parsed values,
+        a column at a time. Unparseable cells get the defaults the row loop
+        used to fall back to and are counted in self.parse_failures.
+        """
+        dates, failed = parse_date_column(
+            present_values(df, 'Purchase Date', blanks=("", "unknown", "nan")),
+            formats=PURCHASE_DATE_FORMATS, fallback=parse_purchase_date,
+        )
+        self.parse_failures['Purchase Date'] += failed
+        df['Purchase Date'] = pd.Series([day or DEFAULT_PURCHASE_DATE for day in dates], index=df.index, dtype=object)
+
+        for column in AMOUNT_COLUMNS:
+            amounts, failed = parse_decimal_column(present_values(df, column))
+            self.parse_failures[column] += failed
+            df[column] = pd.Series([amount or 0.0 for amount in amounts], index=df.index, dtype=object)
 
     def handle(self, *args, **kwargs):
         file_path = kwargs['file_path']
         self.stdout.write(self.style.NOTICE(f"Reading Excel file: {file_path}"))
 
-        # === Load Excel ===
-        df = pd.read_excel(file_path)
-
-        # Clean column names
-        df.columns = df.columns.str.strip()
-        
-        # Remove completely empty rows first
-        df = df.dropna(how='all')
-        
-        # Now fill remaining NaN values with empty string
-        df = df.fillna("")
-
-        # Show preview for debugging
-        self.stdout.write(self.style.NOTICE(f"Columns found: {list(df.columns)}"))
-        self.stdout.write(self.style.NOTICE(f"Total rows after removing empty rows: {len(df)}"))
-        self.stdout.write(self.style.NOTICE(f"Preview:\n{df.head()}"))
-
         # === Process Each Row ===
         processed_count = 0
         skipped_count = 0
         
-        for index, row in df.iterrows():
+        for index, row in self.iter_clean_rows(file_path, max(1, kwargs['chunk_size'])):
             # --------- Early validation: Check if row has essential data ----------
             asset_id_val = str(row.get('Asset ID Tag', "")).strip()
             asset_type_val = str(row.get('Asset Type', "")).strip()
@@ -86,41 +145,10 @@ class Command(BaseCommand):
             if purchased_from_val:
                 purchased_from, _ = Supplier.objects.get_or_create(name=purchased_from_val)
 
-            # --------- Handle Purchase Date ----------
-            purchase_date_val = row.get('Purchase Date', None)
-            purchase_date = None
-
-            if (
-                purchase_date_val is None
-                or str(purchase_date_val).strip().lower() in ["", "unknown", "nan"]
-            ):
-                purchase_date = date(2006, 5, 18)
-            elif isinstance(purchase_date_val, pd.Timestamp):
-                purchase_date = purchase_date_val.date()
-            elif isinstance(purchase_date_val, date):
-                purchase_date = purchase_date_val
-            else:
-                try:
-                    purchase_date = datetime.strptime(str(purchase_date_val).strip(), "%d-%m-%Y").date()
-                except (ValueError, TypeError):
-                    purchase_date = parse_date(str(purchase_date_val).strip())
-                    if purchase_date is None:
-                        purchase_date = date(2006, 5, 18)
-
-            # --------- Handle Numeric Fields ----------
-            def parse_float(value):
-                try:
-                    if pd.isna(value):
-                        return 0.0
-                    value_str = str(value).strip()
-                    if value_str == "" or value_str.lower() == "nan":
-                        return 0.0
-                    return float(value_str)
-                except (ValueError, TypeError):
-                    return 0.0
-
-            purchase_price = parse_float(row.get('Our Purchase Cost', 0.0))
-            current_value = parse_float(row.get('Current Value', 0.0))
+            # --------- Dates and amounts (parsed per chunk in parse_columns) ----------
+            purchase_date = row['Purchase Date']
+            purchase_price = row['Our Purchase Cost']
+            current_value = row['Current Value']
 
             # --------- Handle Serial No ----------
             serial_no_val = str(row.get('Serial No', "")).strip()
@@ -156,5 +184,9 @@ class Command(BaseCommand):
 
         # --------- Final Summary ----------
         self.stdout.write(self.style.SUCCESS(f"✅ Import completed!"))
+        self.stdout.write(self.style.NOTICE(f"Total rows after removing empty rows: {self.row_count}"))
+        for column, count in self.parse_failures.items():
+            if count:
+                self.stdout.write(self.style.WARNING(f"{column}: {count} unparseable value(s), used the default"))
         self.stdout.write(self.style.SUCCESS(f"📊 Processed: {processed_count} assets"))
         self.stdout.write(self.style.WARNING(f"⚠️  Skipped: {skipped_count} rows"))
\ No newline at end of file
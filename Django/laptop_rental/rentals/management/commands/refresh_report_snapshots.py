@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from rentals.reporting import rebuild_report_snapshots, refresh_stale_snapshots, snapshots_built
+
+
+# python manage.py refresh_report_snapshots [--full]
+# Schedule every few minutes (cron / Task Scheduler) to apply the snapshot
+# rows queued by writes, and nightly with --full. The first run builds
+# everything; until then the dashboard uses live queries.
+class Command(BaseCommand):
+    help = "Refresh the precomputed report snapshot tables used by the report dashboard"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true', help="Rebuild every snapshot table from scratch")
+
+    def handle(self, *args, **kwargs):
+        if kwargs['full'] or not snapshots_built():
+            rebuild_report_snapshots()
+            self.stdout.write(self.style.SUCCESS("Report snapshots rebuilt."))
+            return
+        refreshed = refresh_stale_snapshots()
+        self.stdout.write(self.style.SUCCESS(f"Refreshed {refreshed} queued report snapshot(s)."))
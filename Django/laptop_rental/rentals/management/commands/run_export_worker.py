@@ -0,0 +1,67 @@
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.utils import timezone
+
+from rentals.export_jobs import (
+    claim_jobs, init_export_worker, purge_expired_exports, requeue_stale_jobs, run_export_job,
+)
+from rentals.models import ExportJob
+
+HOUSEKEEPING_EVERY_SECONDS = 600
+
+
+# python manage.py run_export_worker            (keep running, e.g. under systemd/supervisor)
+# python manage.py run_export_worker --once     (drain the queue and exit, e.g. from cron)
+class Command(BaseCommand):
+    help = "Generate queued Excel/PDF exports in a pool of worker processes"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=getattr(settings, 'EXPORT_WORKER_PROCESSES', 2))
+        parser.add_argument('--poll', type=float, default=5.0, help="Seconds between queue checks")
+        parser.add_argument('--once', action='store_true', help="Exit when the queue is empty")
+
+    def handle(self, *args, **options):
+        workers = max(1, options['workers'])
+        requeue_stale_jobs()
+        purge_expired_exports()
+        last_housekeeping = time.monotonic()
+
+        # Children must not inherit the parent's database connections
+        connections.close_all()
+        running = {}
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_export_worker) as pool:
+            while True:
+                for job_id in claim_jobs(workers - len(running)):
+                    running[pool.submit(run_export_job, job_id)] = job_id
+                    self.stdout.write(f"Started export #{job_id}")
+
+                if not running:
+                    if options['once']:
+                        break
+                    time.sleep(options['poll'])
+                else:
+                    finished, _ = wait(running, timeout=options['poll'], return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        job_id = running.pop(future)
+                        try:
+                            self.stdout.write(f"Export #{job_id}: {future.result()}")
+                        except BrokenProcessPool:
+                            raise
+                        except Exception as e:
+                            ExportJob.objects.filter(pk=job_id).update(
+                                status='failed', error=str(e), finished_at=timezone.now(),
+                            )
+                            self.stderr.write(f"Export #{job_id} failed: {e}")
+
+                # Also picks up jobs of workers that died on other hosts
+                if time.monotonic() - last_housekeeping > HOUSEKEEPING_EVERY_SECONDS:
+                    requeue_stale_jobs()
+                    purge_expired_exports()
+                    last_housekeeping = time.monotonic()
+
+        self.stdout.write(self.style.SUCCESS("Export queue drained."))
@@ -0,0 +1,48 @@
+# Generated by Django 5.0.14 on 2026-10-18 21:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rentals', '0022_export_jobs'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportJournalEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sheet', models.CharField(max_length=64)),
+                ('row_key', models.CharField(help_text="Hash of the row's natural key, or of its content", max_length=32)),
+                ('content_hash', models.CharField(max_length=32)),
+                ('imported_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ImportRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('file_name', models.CharField(max_length=255)),
+                ('file_hash', models.CharField(help_text='SHA-256 of the imported file', max_length=64)),
+                ('status', models.CharField(choices=[('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')], default='running', max_length=10)),
+                ('sheet', models.CharField(blank=True, help_text='Sheet of the last committed batch', max_length=64)),
+                ('rows_done', models.PositiveIntegerField(default=0, help_text='Rows of that sheet committed so far')),
+                ('needs_refresh', models.BooleanField(default=False, help_text='Live rows were written; ledger and reports need a refresh')),
+                ('started_at', models.DateTimeField(auto_now_add=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'ordering': ['-started_at'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='importjournalentry',
+            constraint=models.UniqueConstraint(fields=('sheet', 'row_key'), name='unique_import_journal_row'),
+        ),
+        migrations.AddIndex(
+            model_name='importrun',
+            index=models.Index(fields=['file_hash', 'status'], name='rentals_imp_file_ha_326965_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.14 on 2026-10-18 22:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rentals', '0024_stale_report_keys'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='exportjob',
+            name='heartbeat_at',
+            field=models.DateTimeField(blank=True, help_text='Last sign of life from the worker running it', null=True),
+        ),
+    ]
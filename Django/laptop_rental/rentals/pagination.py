@@ -0,0 +1,170 @@
+import base64
+import binascii
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import F, Q
+
+PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+# -----------------------------
+# Keyset (seek) pagination
+# -----------------------------
+# Pages are addressed by the sort key of the last (or first) row shown rather
+# than by an OFFSET, so every page costs one indexed range scan no matter how
+# deep it is. The primary key is always the last sort key, which keeps the
+# order total and stable while rows are being added.
+#
+# NULLs sort first in ascending order and last in descending order on every
+# backend, so a seek condition can be built for nullable columns as well.
+
+def _encode_cursor(direction, values):
+    payload = json.dumps({'d': direction, 'v': values}, cls=DjangoJSONEncoder)
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def _decode_cursor(token, key_count):
+    if not token:
+        return None
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        direction, values = data['d'], data['v']
+    except (binascii.Error, ValueError, TypeError, KeyError):
+        return None
+    if direction not in ('next', 'prev') or not isinstance(values, list) or len(values) != key_count:
+        return None
+    return direction, values
+
+
+def _normalise_ordering(ordering):
+    keys = []
+    for field in ordering:
+        descending = field.startswith('-')
+        keys.append((field.lstrip('-'), descending))
+    if not any(name in ('pk', 'id') for name, _ in keys):
+        keys.append(('pk', keys[0][1] if keys else False))
+    return keys
+
+
+def _order_expression(alias, descending):
+    if descending:
+        return F(alias).desc(nulls_last=True)
+    return F(alias).asc(nulls_first=True)
+
+
+def _after(alias, value, descending):
+    """Rows strictly after `value` on one key, in the order being walked."""
+    if descending:
+        if value is None:
+            return Q(pk__in=[])
+        return Q(**{f'{alias}__lt': value}) | Q(**{f'{alias}__isnull': True})
+    if value is None:
+        return Q(**{f'{alias}__isnull': False})
+    return Q(**{f'{alias}__gt': value})
+
+
+def _equal(alias, value):
+    if value is None:
+        return Q(**{f'{alias}__isnull': True})
+    return Q(**{alias: value})
+
+
+def _seek(aliases, values, directions):
+    """(k1 > v1) OR (k1 = v1 AND k2 > v2) OR ... for the walked order."""
+    condition = Q(pk__in=[])
+    equal_so_far = Q()
+    for alias, value, descending in zip(aliases, values, directions):
+        condition |= equal_so_far & _after(alias, value, descending)
+        equal_so_far &= _equal(alias, value)
+    return condition
+
+
+class KeysetPage:
+    """One page of rows plus the query strings for its neighbours."""
+
+    def __init__(self, object_list, request, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+        self._params = request.GET
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __bool__(self):
+        return bool(self.object_list)
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def _query(self, cursor):
+        params = self._params.copy()
+        params['cursor'] = cursor
+        return params.urlencode()
+
+    @property
+    def next_query(self):
+        return self._query(self.next_cursor) if self.has_next else ''
+
+    @property
+    def previous_query(self):
+        return self._query(self.previous_cursor) if self.has_previous else ''
+
+
+def page_size_from(request, default=PAGE_SIZE):
+    try:
+        size = int(request.GET.get('per_page', default))
+    except (TypeError, ValueError):
+        return default
+    return max(1, min(size, MAX_PAGE_SIZE))
+
+
+def keyset_paginate(request, queryset, ordering, page_size=None):
+    """
+    Return a KeysetPage of `queryset` ordered by `ordering` (field names,
+    optionally prefixed with '-', related lookups allowed). The position
+    comes from the `cursor` GET parameter.
+    """
+    page_size = page_size or page_size_from(request)
+    keys = _normalise_ordering(ordering)
+    aliases = [f'_seek_{i}' for i in range(len(keys))]
+    queryset = queryset.annotate(**{alias: F(name) for alias, (name, _) in zip(aliases, keys)})
+
+    cursor = _decode_cursor(request.GET.get('cursor'), len(keys))
+    backwards = cursor is not None and cursor[0] == 'prev'
+    directions = [descending != backwards for _, descending in keys]
+
+    queryset = queryset.order_by(*[
+        _order_expression(alias, descending) for alias, descending in zip(aliases, directions)
+    ])
+    if cursor is not None:
+        queryset = queryset.filter(_seek(aliases, cursor[1], directions))
+
+    rows = list(queryset[:page_size + 1])
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+    if backwards:
+        rows.reverse()
+
+    def position(row):
+        return [getattr(row, alias) for alias in aliases]
+
+    next_cursor = previous_cursor = None
+    if rows:
+        if has_more or backwards:
+            next_cursor = _encode_cursor('next', position(rows[-1]))
+        if cursor is not None and (has_more or not backwards):
+            previous_cursor = _encode_cursor('prev', position(rows[0]))
+
+    return KeysetPage(rows, request, next_cursor, previous_cursor)
@@ -0,0 +1,377 @@
+from collections import defaultdict
+from datetime import date
+from decimal import Decimal
+
+from dateutil.relativedelta import relativedelta
+from django.db import transaction
+from django.db.models import (
+    Count, DecimalField, DurationField, ExpressionWrapper, F, OuterRef, Q, Subquery, Sum, Value,
+)
+from django.db.models.functions import Coalesce, ExtractMonth, ExtractYear, TruncMonth
+
+from .models import (
+    AssetReportSnapshot, AssetTypeReportSnapshot, CustomerReportSnapshot,
+    MonthlyReportSnapshot, ProductAsset, ProductConfiguration, Rental, Repair,
+    ReportRefreshLog, StaleReportKey,
+)
+
+
+def month_start(value):
+    return date(value.year, value.month, 1) if value else None
+
+
+def _add_months(start, months):
+    if start and months and months > 0:
+        return start + relativedelta(months=months)
+    return None
+
+
+# -----------------------------
+# Per-customer
+# -----------------------------
+
+def refresh_customer_snapshots(customer_ids=None):
+    """Recompute rental count and payment totals for the given customers (all if None)."""
+    rentals = Rental.objects.all()
+    snapshots = CustomerReportSnapshot.objects.all()
+    if customer_ids is not None:
+        customer_ids = [c for c in customer_ids if c]
+        if not customer_ids:
+            return
+        rentals = rentals.filter(customer_id__in=customer_ids)
+        snapshots = snapshots.filter(customer_id__in=customer_ids)
+
+    totals = (
+        rentals.order_by()
+        .values('customer_id')
+        .annotate(rental_count=Count('id'), total_payment=Sum('payment_amount'))
+    )
+
+    with transaction.atomic():
+        snapshots.delete()
+        CustomerReportSnapshot.objects.bulk_create([
+            CustomerReportSnapshot(
+                customer_id=row['customer_id'],
+                rental_count=row['rental_count'],
+                total_payment=row['total_payment'] or Decimal('0.00'),
+            )
+            for row in totals
+        ], batch_size=500)
+
+
+# -----------------------------
+# Per-month (by rental start)
+# -----------------------------
+
+def refresh_monthly_snapshots(months=None):
+    """Recompute monthly rental count, payment and rented days (all months if None)."""
+    rentals = Rental.objects.all()
+    snapshots = MonthlyReportSnapshot.objects.all()
+    if months is not None:
+        months = sorted({m for m in months if m})
+        if not months:
+            return
+        in_months = Q()
+        for month in months:
+            in_months |= Q(rental_start_date__gte=month, rental_start_date__lt=month + relativedelta(months=1))
+        rentals = rentals.filter(in_months)
+        snapshots = snapshots.filter(month__in=months)
+
+    buckets = defaultdict(lambda: [0, Decimal('0.00'), 0])
+    for start, end, payment in rentals.values_list('rental_start_date', 'rental_end_date', 'payment_amount').iterator():
+        bucket = buckets[month_start(start)]
+        bucket[0] += 1
+        bucket[1] += payment or 0
+        if end and start:
+            bucket[2] += max((end - start).days, 0)
+
+    with transaction.atomic():
+        snapshots.delete()
+        MonthlyReportSnapshot.objects.bulk_create([
+            MonthlyReportSnapshot(month=month, rental_count=count, total_payment=payment, rental_days=days)
+            for month, (count, payment, days) in buckets.items()
+        ], batch_size=500)
+
+
+# -----------------------------
+# Per-asset-type
+# -----------------------------
+
+def refresh_asset_type_snapshots(asset_type_ids=None):
+    """Recompute asset counts and revenue per asset type (all types if None)."""
+    assets = ProductAsset.objects.all()
+    snapshots = AssetTypeReportSnapshot.objects.all()
+    if asset_type_ids is not None:
+        asset_type_ids = [t for t in asset_type_ids if t]
+        if not asset_type_ids:
+            return
+        assets = assets.filter(type_of_asset_id__in=asset_type_ids)
+        snapshots = snapshots.filter(asset_type_id__in=asset_type_ids)
+
+    totals = (
+        assets.order_by()
+        .values('type_of_asset_id')
+        .annotate(asset_count=Count('id'), revenue=Sum('revenue'))
+    )
+
+    with transaction.atomic():
+        snapshots.delete()
+        AssetTypeReportSnapshot.objects.bulk_create([
+            AssetTypeReportSnapshot(
+                asset_type_id=row['type_of_asset_id'],
+                asset_count=row['asset_count'],
+                revenue=row['revenue'] or Decimal('0.00'),
+            )
+            for row in totals
+        ], batch_size=500)
+
+
+def mark_asset_types_stale(asset_ids):
+    """Queue the asset type snapshots of the given assets for the next refresh."""
+    mark_stale(asset_types=ProductAsset.objects.filter(pk__in=asset_ids).values_list('type_of_asset_id', flat=True))
+
+
+# -----------------------------
+# Per-asset
+# -----------------------------
+
+def refresh_asset_snapshots(asset_ids=None):
+    """Recompute repair/config costs and warranty dates for the given assets (all if None)."""
+    assets = ProductAsset.objects.all()
+    repairs = Repair.objects.all()
+    configs = ProductConfiguration.objects.all()
+    snapshots = AssetReportSnapshot.objects.all()
+    if asset_ids is not None:
+        asset_ids = [a for a in asset_ids if a]
+        if not asset_ids:
+            return
+        assets = assets.filter(pk__in=asset_ids)
+        repairs = repairs.filter(product_id__in=asset_ids)
+        configs = configs.filter(asset_id__in=asset_ids)
+        snapshots = snapshots.filter(asset_id__in=asset_ids)
+
+    repair_totals = {
+        row['product_id']: row
+        for row in repairs.order_by().values('product_id').annotate(count=Count('id'), cost=Sum('cost'))
+    }
+    config_totals = dict(
+        configs.order_by().values('asset_id').annotate(cost=Sum('cost')).values_list('asset_id', 'cost')
+    )
+
+    repair_warranty_until = {}
+    for product_id, repair_date, months in repairs.filter(repair_warranty_months__gt=0).values_list(
+        'product_id', 'date', 'repair_warranty_months'
+    ).iterator():
+        expiry = _add_months(repair_date, months)
+        if expiry and (product_id not in repair_warranty_until or expiry > repair_warranty_until[product_id]):
+            repair_warranty_until[product_id] = expiry
+
+    rows = []
+    for asset_id, purchase_date, warranty_months in assets.values_list(
+        'id', 'purchase_date', 'warranty_duration_months'
+    ).iterator():
+        repair = repair_totals.get(asset_id, {})
+        rows.append(AssetReportSnapshot(
+            asset_id=asset_id,
+            repair_count=repair.get('count', 0),
+            repair_cost=repair.get('cost') or Decimal('0.00'),
+            config_cost=config_totals.get(asset_id) or Decimal('0.00'),
+            warranty_expiry=_add_months(purchase_date, warranty_months),
+            repair_warranty_until=repair_warranty_until.get(asset_id),
+        ))
+
+    with transaction.atomic():
+        snapshots.delete()
+        AssetReportSnapshot.objects.bulk_create(rows, batch_size=500)
+
+
+# -----------------------------
+# Queued and full refreshes
+# -----------------------------
+# Saving a row only queues the snapshot keys it affects; repeated writes to
+# the same customer, month, type or asset collapse into one StaleReportKey.
+# refresh_stale_snapshots() recomputes each queued key once per run.
+
+def mark_stale(customers=(), months=(), asset_types=(), assets=()):
+    """Queue snapshot rows for the next refresh (None keys are ignored)."""
+    keys = [
+        StaleReportKey(kind=kind, key=str(value))
+        for kind, values in [('customer', customers), ('month', months), ('asset_type', asset_types), ('asset', assets)]
+        for value in set(values) if value is not None
+    ]
+    StaleReportKey.objects.bulk_create(keys, ignore_conflicts=True)
+
+
+def refresh_stale_snapshots():
+    """Recompute the queued snapshot rows; returns how many keys were processed."""
+    with transaction.atomic():
+        queued = list(StaleReportKey.objects.select_for_update().values_list('pk', 'kind', 'key'))
+        if not queued:
+            return 0
+        keys = defaultdict(set)
+        for _, kind, key in queued:
+            keys[kind].add(key)
+
+        refresh_customer_snapshots({int(key) for key in keys['customer']})
+        refresh_monthly_snapshots({date.fromisoformat(key) for key in keys['month']})
+        refresh_asset_type_snapshots({int(key) for key in keys['asset_type']})
+        refresh_asset_snapshots({int(key) for key in keys['asset']})
+        StaleReportKey.objects.filter(pk__in=[pk for pk, _, _ in queued]).delete()
+        ReportRefreshLog.objects.create(full=False)
+    return len(queued)
+
+
+def rebuild_report_snapshots():
+    """Rebuild every snapshot table from scratch."""
+    with transaction.atomic():
+        StaleReportKey.objects.all().delete()
+        refresh_customer_snapshots()
+        refresh_monthly_snapshots()
+        refresh_asset_type_snapshots()
+        refresh_asset_snapshots()
+        ReportRefreshLog.objects.create(full=True)
+
+
+def snapshots_built():
+    return ReportRefreshLog.objects.filter(full=True).exists()
+
+
+# -----------------------------
+# Set-based live aggregates
+# -----------------------------
+# Used by report_dashboard for filtered views, and for everything when
+# settings.REPORT_DASHBOARD_USE_SNAPSHOTS is False. Each helper is one
+# GROUP BY query whatever the table sizes.
+
+def monthly_rental_totals(rentals):
+    """
+    Payment per start month, rental count and rented days for a Rental queryset.
+    Returns (ordered {"YYYY-MM": total}, total_rentals, total_days).
+    """
+    rows = (
+        rentals.order_by()
+        .annotate(month=TruncMonth('rental_start_date'))
+        .values('month')
+        .annotate(
+            rental_count=Count('id'),
+            total_payment=Sum('payment_amount'),
+            # Rentals ending before they start count as 0 days, as in the snapshots
+            rented=Sum(
+                ExpressionWrapper(F('rental_end_date') - F('rental_start_date'), output_field=DurationField()),
+                filter=Q(rental_end_date__gte=F('rental_start_date')),
+            ),
+        )
+        .order_by('month')
+    )
+
+    monthly = {}
+    total_rentals = 0
+    total_days = 0
+    for row in rows:
+        monthly[row['month'].strftime("%Y-%m")] = float(row['total_payment'] or 0)
+        total_rentals += row['rental_count']
+        total_days += row['rented'].days if row['rented'] else 0
+    return monthly, total_rentals, float(total_days)
+
+
+def customer_payment_totals(customers):
+    """[{'name', 'total'}] for a Customer queryset, summed over their rentals."""
+    return [
+        {'name': row['name'], 'total': row['total'] or 0}
+        for row in customers.order_by().values('id', 'name').annotate(total=Sum('rental__payment_amount'))
+    ]
+
+
+def customer_revenue_ranking():
+    """[(name, total)] for customers with rental business, largest first."""
+    rows = (
+        Rental.objects.order_by()
+        .values('customer_id', 'customer__name')
+        .annotate(total=Sum('payment_amount'))
+        .filter(total__gt=0)
+        .order_by('-total')
+    )
+    return [(row['customer__name'], float(row['total'])) for row in rows]
+
+
+def asset_type_revenue():
+    """[(type name, revenue)] in asset type display order."""
+    rows = (
+        ProductAsset.objects.order_by()
+        .values('type_of_asset__name', 'type_of_asset__display_order')
+        .annotate(revenue=Sum('revenue'))
+        .order_by('type_of_asset__display_order', 'type_of_asset__name')
+    )
+    return [(row['type_of_asset__name'], row['revenue'] or Decimal('0.00')) for row in rows]
+
+
+def with_maintenance_costs(assets):
+    """Annotate repair_cost and config_cost onto a ProductAsset queryset using correlated subqueries."""
+    money = DecimalField(max_digits=12, decimal_places=2)
+    repair_cost = (
+        Repair.objects.filter(product=OuterRef('pk')).order_by()
+        .values('product').annotate(total=Sum('cost')).values('total')
+    )
+    config_cost = (
+        ProductConfiguration.objects.filter(asset=OuterRef('pk')).order_by()
+        .values('asset').annotate(total=Sum('cost')).values('total')
+    )
+    return assets.annotate(
+        repair_cost=Coalesce(Subquery(repair_cost, output_field=money), Value(Decimal('0.00')), output_field=money),
+        config_cost=Coalesce(Subquery(config_cost, output_field=money), Value(Decimal('0.00')), output_field=money),
+    )
+
+
+def _still_covered(date_field, months_field, today):
+    """
+    SQL filter for `date_field + months_field months >= today`.
+    Compares month indexes (year * 12 + month) so it runs on every backend;
+    on the expiry month itself the day of month decides, which matches
+    relativedelta's end-of-month clamping.
+    """
+    expiry_month = ExtractYear(date_field) * 12 + ExtractMonth(date_field) + F(months_field)
+    today_month = today.year * 12 + today.month
+    return (
+        Q(**{f'{months_field}__gt': 0}) &
+        (Q(_expiry_month__gt=today_month) | Q(_expiry_month=today_month, **{f'{date_field}__day__gte': today.day}))
+    ), expiry_month
+
+
+def assets_in_warranty(today):
+    """Assets whose purchase warranty has not expired, filtered in SQL."""
+    covered, expiry_month = _still_covered('purchase_date', 'warranty_duration_months', today)
+    assets = (
+        ProductAsset.objects.annotate(_expiry_month=expiry_month)
+        .filter(covered)
+        .only('asset_id', 'brand', 'model_no', 'purchase_date', 'warranty_duration_months')
+    )
+    rows = []
+    for asset in assets:
+        expiry_date = _add_months(asset.purchase_date, asset.warranty_duration_months)
+        rows.append({
+            "asset_id": asset.asset_id,
+            "brand": asset.brand,
+            "model_no": asset.model_no,
+            "expiry_date": expiry_date,
+            "days_left": (expiry_date - today).days,
+        })
+    rows.sort(key=lambda row: row['expiry_date'])
+    return rows
+
+
+def repairs_in_warranty(today):
+    """Repairs whose repair warranty has not expired, filtered in SQL."""
+    covered, expiry_month = _still_covered('date', 'repair_warranty_months', today)
+    return list(
+        Repair.objects.annotate(_expiry_month=expiry_month)
+        .filter(covered)
+        .select_related('product')
+    )
+
+
+def top_repaired_assets(limit=5):
+    return list(
+        Repair.objects.values('product__asset_id', 'product__brand', 'product__model_no')
+        .annotate(total_repairs=Count('id'), total_cost=Sum('cost'))
+        .order_by('-total_cost')[:limit]
+    )
@@ -19,36 +19,14 @@ def calculate_rental_revenue(rental_start, rental_end, monthly_payment):
     """
     Calculate total revenue for a rental between start and end dates,
     pro-rated by the actual days in each month.
+    Uses the shared batch engine in rentals/revenue.py.
     """
+    from .revenue import rental_revenue_totals
+
     if not rental_end:
         rental_end = date.today()  # If rental is still active
 
-    total_revenue = 0
-    current_date = rental_start
-
-    while current_date <= rental_end:
-        # Days in the current month
-        days_in_month = monthrange(current_date.year, current_date.month)[1]
-
-        # Start and end boundaries for this month
-        start_of_month = date(current_date.year, current_date.month, 1)
-        end_of_month = date(current_date.year, current_date.month, days_in_month)
-
-        # Actual active days in this month
-        active_start = max(rental_start, start_of_month)
-        active_end = min(rental_end, end_of_month)
-        active_days = (active_end - active_start).days + 1  # inclusive
-
-        # Calculate daily rate
-        daily_rate = monthly_payment / days_in_month
-
-        # Add this month's revenue
-        total_revenue += active_days * daily_rate
-
-        # Move to next month
-        current_date = end_of_month + timedelta(days=1)
-
-    return round(total_revenue, 2)
+    return rental_revenue_totals([rental_start], [rental_end], [monthly_payment])[0]
 
 
 import logging
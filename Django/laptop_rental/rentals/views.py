@@ -1,5 +1,5 @@
 from django.shortcuts import render, redirect, get_object_or_404
-from .models import Rental, Customer, ProductAsset, ProductConfiguration,Repair, PendingProduct, PendingCustomer, PendingRental, PendingProductConfiguration, Supplier, AssetType,CPUOption, HDDOption, RAMOption, DisplaySizeOption, GraphicsOption, PendingRepair
+from .models import ExportJob, Rental, Customer, ProductAsset, ProductConfiguration,Repair, PendingProduct, PendingCustomer, PendingRental, PendingProductConfiguration, Supplier, AssetType,CPUOption, HDDOption, RAMOption, DisplaySizeOption, GraphicsOption, PendingRepair
 from .forms import CustomerForm, ProductAssetForm, ProductConfigurationForm, RentalForm, PendingCustomerForm, PendingRentalForm, PendingProductConfigurationForm, SupplierForm, RepairForm, AssetTypeForm,CPUOptionForm,  HDDOptionForm, RAMOptionForm, DisplaySizeOptionForm, GraphicsOptionForm
 from django.contrib.auth.decorators import login_required
 from django.db.models import Q, Sum, Count
@@ -19,13 +19,19 @@ import json
 from collections import defaultdict
 import csv
 import pandas as pd
-from django.http import HttpResponse
+from django.http import FileResponse, Http404, HttpResponse, JsonResponse, StreamingHttpResponse
 from reportlab.pdfgen import canvas
 from django.urls import reverse
 from dateutil.relativedelta import relativedelta
 from decimal import Decimal, ROUND_HALF_UP
+from .pagination import keyset_paginate
+from .approvals import parse_approval_items, process_approvals
+from .exports import stream_csv_zip
+from .export_jobs import ARTIFACT_NAMES, artifact_path, enqueue_export
 # from .site_logger import log_action
 
+PRODUCT_SORT_FIELDS = ('asset_id', '-asset_id', 'purchase_date', '-purchase_date')
+
 
 def logout_view(request):
     logout(request)
@@ -43,8 +49,9 @@ def homepage(request):
 
 @login_required
 def sold_assets(request):
-    products = ProductAsset.objects.filter(condition_status='sold').order_by('-sale_date')
-    return render(request, 'rentals/sold_assets.html', {'products': products})
+    products = ProductAsset.objects.filter(condition_status='sold')
+    page = keyset_paginate(request, products, ['-sale_date'])
+    return render(request, 'rentals/sold_assets.html', {'products': page, 'page': page})
 
 @login_required
 def settings_page(request):
@@ -58,7 +65,7 @@ def customer_list(request):
     is_permanent = request.GET.get('permanent') == 'on'
     is_bni = request.GET.get('bni') == 'on'
 
-    customers = Customer.objects.all()
+    customers = Customer.objects.select_related('edited_by')
     if query:
         customers = customers.filter(
             Q(name__icontains=query) |
@@ -73,13 +80,16 @@ def customer_list(request):
     if is_bni:
         customers = customers.filter(is_bni_member=True)
 
-    return render(request, 'rentals/customer_list.html', {'customers': customers})
+    page = keyset_paginate(request, customers, ['pk'])
+    return render(request, 'rentals/customer_list.html', {'customers': page, 'page': page})
 
 
 @login_required
 def product_list(request):
     query = request.GET.get('q', '')
     sort_by = request.GET.get('sort', 'asset_id')
+    if sort_by not in PRODUCT_SORT_FIELDS:
+        sort_by = 'asset_id'
     asset_type = request.GET.get('type')
     start_date = request.GET.get('start_date')
     end_date = request.GET.get('end_date')
@@ -95,7 +105,8 @@ def product_list(request):
         # No year in URL -> use session value or default
         selected_year = str(request.session.get('selected_year', 2025))
 
-    products = ProductAsset.objects.all()
+    # Availability and current renter are annotated in the same query
+    products = ProductAsset.objects.with_availability().select_related('type_of_asset', 'edited_by')
 
     # 🔎 FILTER BY YEAR USING asset_id CONTAINS
     products = products.filter(asset_id__icontains=selected_year)
@@ -107,12 +118,6 @@ def product_list(request):
     if end_date:
         products = products.filter(purchase_date__lte=parse_date(end_date))
 
-    active_rentals = {
-        rental.asset.id: rental.customer.name
-        for rental in Rental.objects.filter(status='ongoing')
-        if rental.asset
-    }
-
     if query:
         products = products.filter(
             Q(asset_id__icontains=query) |
@@ -124,7 +129,7 @@ def product_list(request):
     if asset_type:
         products = products.filter(type_of_asset=asset_type)
 
-    products = products.order_by(sort_by)
+    page = keyset_paginate(request, products, [sort_by])
 
     asset_types = ProductAsset.objects.values_list('type_of_asset', flat=True).distinct()
 
@@ -132,7 +137,8 @@ def product_list(request):
     year_list = list(range(2015, datetime.now().year + 1))
 
     return render(request, 'rentals/product_list.html', {
-        'products': products,
+        'products': page,
+        'page': page,
         'query': query,
         'sort_by': sort_by,
         'asset_type': asset_type,
@@ -141,7 +147,6 @@ def product_list(request):
         'selected_year': int(selected_year),   # important for UI
         'start_date': start_date,
         'end_date': end_date,
-        'active_rentals': active_rentals,
     })
 
 
@@ -212,6 +217,54 @@ def approval_dashboard(request):
     })
 
 
+@login_required
+@user_passes_test(lambda u: u.is_superuser)
+def bulk_approval(request):
+    """
+    Approve or reject many pending items in one transaction.
+    Form posts: items=<type>:<id> (repeated) and action=approve|reject.
+    JSON posts: {"action": "approve", "items": [{"type": "product", "id": 3}, ...]}
+    """
+    if request.method != 'POST':
+        return redirect('approval_dashboard')
+
+    as_json = request.content_type == 'application/json'
+    if as_json:
+        try:
+            payload = json.loads(request.body or b'{}')
+        except ValueError:
+            return JsonResponse({'error': 'Invalid JSON body.'}, status=400)
+        action = payload.get('action')
+        items = parse_approval_items(
+            f"{item.get('type')}:{item.get('id')}" if isinstance(item, dict) else item
+            for item in payload.get('items', [])
+        )
+    else:
+        action = request.POST.get('action')
+        items = parse_approval_items(request.POST.getlist('items'))
+
+    if action not in ('approve', 'reject'):
+        if as_json:
+            return JsonResponse({'error': "action must be 'approve' or 'reject'."}, status=400)
+        messages.error(request, "Unknown bulk action.")
+        return redirect('approval_dashboard')
+
+    results = process_approvals(items, action)
+
+    if as_json:
+        return JsonResponse({'results': results})
+
+    done = sum(1 for r in results if r['status'] != 'conflict')
+    if done:
+        messages.success(request, f"{done} item(s) {'approved' if action == 'approve' else 'rejected'}.")
+    for r in results:
+        if r['status'] == 'conflict':
+            messages.warning(request, f"{r['type'].title()} #{r['id']}: {r['message']}")
+    if not items:
+        messages.info(request, "No items selected.")
+    return redirect('approval_dashboard')
+
+
 @login_required
 @user_passes_test(lambda u: u.is_superuser)
 def approve_config(request, pk):
@@ -333,7 +386,7 @@ def rental_history(request):
     query = request.GET.get('q', '')
 
     # Filter only completed rentals
-    rentals = Rental.objects.filter(status='completed')
+    rentals = Rental.objects.filter(status='completed').select_related('customer', 'asset', 'edited_by')
 
     # Search functionality
     if query:
@@ -346,15 +399,16 @@ def rental_history(request):
             Q(edited_by__username__icontains=query)
         )
 
-    rentals = rentals.order_by('-asset__asset_id')
+    # Newest first, on a Rental column so the seek stays on rental_history_idx
+    # (sorting on the joined asset ID could not use an index)
+    page = keyset_paginate(request, rentals, ['-rental_end_date'])
     # Add end_date for display
     # for rental in rentals:
     #     rental.end_date = rental.rental_start_date + timedelta(days=rental.duration_days)
 
-      # newest first
-
     return render(request, 'rentals/rental_history.html', {
-        'rentals': rentals,
+        'rentals': page,
+        'page': page,
         'query': query
     })
 
@@ -439,7 +493,7 @@ def add_product(request):
             pending.save()
             # log_action(request.user, "Submitted new product for approval", "PendingProduct", obj_id=pending.id)
 
-            messages.success(request, f"Product {form.cleaned_data.get('asset_id')} submitted for approval and pending review.")
+            messages.success(request, f"Product {pending.asset_id} submitted for approval and pending review.")
             return redirect(redirect_url)
 
     return render(request, 'rentals/add_product.html', {'form': form})
@@ -940,7 +994,7 @@ def rental_list(request):
 
     # Filter by status first
     # if filter_type == 'ongoing':
-    rentals = Rental.objects.filter(status='ongoing')
+    rentals = Rental.objects.filter(status='ongoing').select_related('customer', 'asset', 'edited_by')
     
     if query:
         rentals = rentals.filter(
@@ -950,12 +1004,13 @@ def rental_list(request):
         )
 
     # Sort and calculate due date
-    rentals = rentals.order_by('-rental_start_date')
+    page = keyset_paginate(request, rentals, ['-rental_start_date'])
     # for rental in rentals:
     #     rental.due_date = rental.rental_start_date + timedelta(days=rental.duration_days)
 
     return render(request, 'rentals/rental_list.html', {
-        'rentals': rentals,
+        'rentals': page,
+        'page': page,
         'filter_type': filter_type
     })
 
@@ -977,13 +1032,26 @@ from django.shortcuts import render
 from django.utils.dateparse import parse_date
 import json
 
+from django.db.models import F
+
 from .models import Customer, ProductAsset, Rental, Repair, ProductConfiguration
+from .models import AssetReportSnapshot, AssetTypeReportSnapshot, CustomerReportSnapshot, MonthlyReportSnapshot
+from django.conf import settings
+from .reporting import (
+    snapshots_built, monthly_rental_totals, customer_payment_totals, customer_revenue_ranking,
+    asset_type_revenue, with_maintenance_costs, assets_in_warranty, repairs_in_warranty, top_repaired_assets,
+)
 
 
 @login_required
 def report_dashboard(request):
-    customers = Customer.objects.all()
-    products = ProductAsset.objects.all()
+    # Unfiltered aggregates come from the report snapshot tables (rentals/reporting.py)
+    # unless REPORT_DASHBOARD_USE_SNAPSHOTS is off or refresh_report_snapshots has
+    # never run; everything else is set-based SQL.
+    use_snapshots = getattr(settings, 'REPORT_DASHBOARD_USE_SNAPSHOTS', True) and snapshots_built()
+
+    customers = Customer.objects.only('id', 'name')
+    products = ProductAsset.objects.only('id', 'asset_id')
 
     customer_id = request.GET.get('customer')
     product_id = request.GET.get('product')
@@ -993,7 +1061,6 @@ def report_dashboard(request):
 
     # Fetch all rentals
     rentals = Rental.objects.select_related('asset', 'customer').all()
-    customer_business = []
 
     # Filter rentals based on customer type
     if customer_type == 'BNI':
@@ -1005,18 +1072,25 @@ def report_dashboard(request):
         selected_customers = Customer.objects.filter(is_permanent=True)
 
     else:
-        selected_customers = []
-
-    # Calculate customer business totals
-    for customer in selected_customers:
-        total = Rental.objects.filter(customer=customer).aggregate(total=Sum('payment_amount'))['total'] or 0
-        customer_business.append({'name': customer.name, 'total': total})
+        selected_customers = Customer.objects.none()
+
+    # Customer business totals (one grouped read)
+    if use_snapshots:
+        customer_business = [
+            {'name': row['name'], 'total': row['report_snapshot__total_payment'] or 0}
+            for row in selected_customers.values('name', 'report_snapshot__total_payment')
+        ]
+    else:
+        customer_business = customer_payment_totals(selected_customers)
 
     # If product selected, calculate profit
     product_obj = None
     if product_id:
         try:
-            product_obj = ProductAsset.objects.get(id=product_id)
+            if use_snapshots:
+                product_obj = ProductAsset.objects.select_related('report_snapshot').get(id=product_id)
+            else:
+                product_obj = with_maintenance_costs(ProductAsset.objects.all()).get(id=product_id)
         except ProductAsset.DoesNotExist:
             product_obj = None
 
@@ -1031,11 +1105,14 @@ def report_dashboard(request):
         if product_obj.condition_status == 'sold' and product_obj.sale_price:
             sold_asset = float(product_obj.sale_price or 0)
 
-        # Repair cost
-        repair_cost = Repair.objects.filter(product=product_obj).aggregate(total=Sum('cost'))['total'] or 0
-
-        # Config cost
-        config_cost = ProductConfiguration.objects.filter(asset=product_obj).aggregate(total=Sum('cost'))['total'] or 0
+        # Repair + config cost
+        if use_snapshots:
+            snapshot = getattr(product_obj, 'report_snapshot', None)
+            repair_cost = snapshot.repair_cost if snapshot else 0
+            config_cost = snapshot.config_cost if snapshot else 0
+        else:
+            repair_cost = product_obj.repair_cost
+            config_cost = product_obj.config_cost
 
         maintenance_cost = float(repair_cost) + float(config_cost)
         net_profit = gross_profit - maintenance_cost - purchase_price
@@ -1050,83 +1127,94 @@ def report_dashboard(request):
     if end:
         rentals = rentals.filter(rental_start_date__lte=parse_date(end))
 
-    # Total revenue directly from ProductAsset revenue
-    total_revenue = ProductAsset.objects.aggregate(total=Sum('revenue'))['total'] or 0
-    total_rentals = rentals.count()
-
-    # Total rental days
-    total_days = float(sum(
-        (r.rental_end_date - r.rental_start_date).days
-        for r in rentals if r.rental_end_date and r.rental_start_date
-    ))
-
-    # Monthly revenue trends
-    monthly = {}
-    for r in rentals:
-        month = r.rental_start_date.strftime("%Y-%m")
-        monthly[month] = monthly.get(month, 0) + float(r.payment_amount or 0)
+    # Revenue by asset type (also gives the overall revenue total)
+    if use_snapshots:
+        type_revenue = [
+            (snapshot.asset_type.name, snapshot.revenue)
+            for snapshot in AssetTypeReportSnapshot.objects.select_related('asset_type').order_by(
+                'asset_type__display_order', 'asset_type__name'
+            )
+        ]
+    else:
+        type_revenue = asset_type_revenue()
+    type_labels = [name for name, _ in type_revenue]
+    type_values = [float(value) for _, value in type_revenue]
+    total_revenue = sum((value for _, value in type_revenue), Decimal('0.00'))
+
+    # Monthly revenue trends, rental count and rented days
+    if use_snapshots and not any([customer_type, customer_id, product_id, start, end]):
+        total_rentals = 0
+        total_days = 0.0
+        monthly = {}
+        for snapshot in MonthlyReportSnapshot.objects.all():
+            total_rentals += snapshot.rental_count
+            total_days += snapshot.rental_days
+            monthly[snapshot.month.strftime("%Y-%m")] = float(snapshot.total_payment)
+    else:
+        monthly, total_rentals, total_days = monthly_rental_totals(rentals)
 
     # Top 5 assets by revenue
     top_assets = (
-        ProductAsset.objects.annotate(total_income=Sum('revenue'))
-        .filter(total_income__gt=0)
-        .order_by('-total_income')[:5]
+        ProductAsset.objects.filter(revenue__gt=0)
+        .annotate(total_income=F('revenue'))
+        .order_by('-revenue')[:5]
     )
 
-    # Revenue by asset type
-    type_revenue = defaultdict(float)
-    for asset in ProductAsset.objects.prefetch_related('rentals'):
-        asset_type = asset.type_of_asset.name if asset.type_of_asset else "Unknown"
-        type_revenue[asset_type] += float(asset.revenue or 0)
-
-    type_labels = list(type_revenue.keys())
-    type_values = [float(v) for v in type_revenue.values()]
-
     # Revenue by customer
-    customer_revenue = {}
-    for customer in Customer.objects.all():
-        total = Rental.objects.filter(customer=customer).aggregate(total=Sum('payment_amount'))['total']
-        if total:
-            customer_revenue[customer.name] = float(total)
-
-    sorted_customers = sorted(customer_revenue.items(), key=lambda x: x[1], reverse=True)
+    if use_snapshots:
+        sorted_customers = [
+            (s.customer.name, float(s.total_payment))
+            for s in CustomerReportSnapshot.objects.filter(total_payment__gt=0)
+            .select_related('customer')
+            .order_by('-total_payment')
+        ]
+    else:
+        sorted_customers = customer_revenue_ranking()
     customer_labels = [name for name, _ in sorted_customers]
     customer_values = [value for _, value in sorted_customers]
 
-
-    top_repaired_assets = (
-        Repair.objects.values('product__asset_id', 'product__brand', 'product__model_no')
-        .annotate(total_repairs=Count('id'), total_cost=Sum('cost'))
-        .order_by('-total_cost')[:5]
-    )
-
     today = timezone.now().date()
-    in_warranty_assets = []
-    for asset in products:
-        if asset.purchase_date and asset.warranty_duration_months and asset.warranty_duration_months > 0:
-            expiry_date = asset.purchase_date + relativedelta(months=asset.warranty_duration_months)
-            if today <= expiry_date:
-                in_warranty_assets.append({
-                    "asset_id": asset.asset_id,
-                    "brand": asset.brand,
-                    "model_no": asset.model_no,
-                    "expiry_date": expiry_date,
-                    "days_left": (expiry_date - today).days
-                })
+    if use_snapshots:
+        top_repaired = [
+            {
+                'product__asset_id': s.asset.asset_id,
+                'product__brand': s.asset.brand,
+                'product__model_no': s.asset.model_no,
+                'total_repairs': s.repair_count,
+                'total_cost': s.repair_cost,
+            }
+            for s in AssetReportSnapshot.objects.filter(repair_count__gt=0)
+            .select_related('asset')
+            .order_by('-repair_cost')[:5]
+        ]
+
+        in_warranty_assets = [
+            {
+                "asset_id": s.asset.asset_id,
+                "brand": s.asset.brand,
+                "model_no": s.asset.model_no,
+                "expiry_date": s.warranty_expiry,
+                "days_left": (s.warranty_expiry - today).days
+            }
+            for s in AssetReportSnapshot.objects.filter(warranty_expiry__gte=today)
+            .select_related('asset')
+            .order_by('warranty_expiry')
+        ]
+
+        # Repairs with active warranty (only assets whose latest repair warranty is still running)
+        repairs_with_warranty = [
+            r for r in Repair.objects.filter(
+                product__report_snapshot__repair_warranty_until__gte=today,
+                repair_warranty_months__gt=0,
+            ).select_related('product')
+            if r.repair_warranty_expiry_date and today <= r.repair_warranty_expiry_date
+        ]
+    else:
+        top_repaired = top_repaired_assets()
+        in_warranty_assets = assets_in_warranty(today)
+        repairs_with_warranty = repairs_in_warranty(today)
     in_warranty_count = len(in_warranty_assets)
 
-
-    # Repairs with active warranty
-    today = timezone.now().date()
-
-    repairs = Repair.objects.all()
-    repairs_with_warranty = []
-
-    for r in repairs:
-        expiry = r.repair_warranty_expiry_date  # use property method
-        if expiry and today <= expiry:
-            repairs_with_warranty.append(r)
-
     # Final context
     context = {
         'customers': customers,
@@ -1145,14 +1233,14 @@ def report_dashboard(request):
         "repairs_with_warranty":repairs_with_warranty,
 
         # Top repaired
-        "top_repaired_assets": top_repaired_assets,
+        "top_repaired_assets": top_repaired,
 
         'total_days': total_days,
         'net_profit': net_profit,
         'product_obj': product_obj,
         'product_id': product_id,
-        'monthly_labels': json.dumps(list(reversed(monthly.keys()))),
-        'monthly_values': json.dumps([float(v) for v in reversed(monthly.values())]),
+        'monthly_labels': json.dumps(list(monthly.keys())),
+        'monthly_values': json.dumps([float(v) for v in monthly.values()]),
         'top_assets': top_assets,
         'customer_business': customer_business,
         'type_labels': json.dumps(type_labels),
@@ -1171,94 +1259,25 @@ from django.contrib import messages
 from django.shortcuts import redirect
 from django.contrib.auth.decorators import login_required, user_passes_test
 from .models import Rental, ProductAsset
+from .revenue import extend_revenue_ledger
 
 
 @login_required
 @user_passes_test(lambda u: u.is_superuser)
 def run_revenue_calculator(request):
     """
-    View to recalculate revenue for all rentals and update each product's total revenue.
+    View to bring the revenue ledger up to date and refresh each product's total revenue.
+    Only rentals not yet processed up to today are touched.
     Accessible only to superusers.
     """
     today = date.today()
 
-    # Step 1: Reset all revenues to 0
-    ProductAsset.objects.update(revenue=Decimal('0.00'))
-
-    updated_rentals = 0
-
-    # Step 2: Get all rentals with valid payment amounts
-    rentals = Rental.objects.filter(payment_amount__gt=0)
-
-    for rental in rentals:
-        # ✅ Skip rentals with missing start date
-        if not rental.rental_start_date:
-            print(f"Skipping rental {rental.id} - No start date")
-            continue
-
-        # ✅ Determine the effective end date
-        end_date = rental.rental_end_date or today
-
-        # Don't calculate beyond today
-        if end_date > today:
-            end_date = today
-
-        # ✅ Skip if start date is after end date (invalid data)
-        if rental.rental_start_date > end_date:
-            print(f"Skipping rental {rental.id} - Start date after end date")
-            continue
-
-        total_rental_revenue = Decimal('0.00')
-        current_date = rental.rental_start_date
-
-        # Step 3: Loop through each month between start and end
-        while current_date <= end_date:
-            # Calculate days in current month
-            if current_date.month == 12:
-                next_month_start = date(current_date.year + 1, 1, 1)
-            else:
-                next_month_start = date(current_date.year, current_date.month + 1, 1)
-
-            days_in_month = (next_month_start - timedelta(days=1)).day
-
-            # Calculate end day for this segment
-            if current_date.month == end_date.month and current_date.year == end_date.year:
-                end_day = end_date.day
-            else:
-                end_day = days_in_month
-
-            # Number of active days in this month
-            days_to_count = end_day - current_date.day + 1
-
-            # Keep full precision for daily rate
-            daily_rate = rental.payment_amount / Decimal(days_in_month)
-
-            # Add precise total, round at the very end
-            total_rental_revenue += (daily_rate * Decimal(days_to_count))
-
-            # Move to the first day of next month
-            current_date = next_month_start
+    updated_rentals = extend_revenue_ledger(today)
 
-        # Round the final result once
-        total_rental_revenue = total_rental_revenue.quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
-
-
-        # Step 4: Update the product's total revenue
-        if rental.asset:
-            before = rental.asset.revenue
-            rental.asset.revenue += total_rental_revenue
-            rental.asset.save(update_fields=['revenue'])
-
-            updated_rentals += 1
-            print(
-                f"[{rental.asset.asset_id}] Before: {before} | Added: {total_rental_revenue} | After: {rental.asset.revenue}"
-            )
-
-    # Step 5: Display success message
     # log_action(request.user, "Ran revenue recalculation", "System Task")
     messages.success(
         request,
-        f"Revenue successfully recalculated for {updated_rentals} rentals as of {today}."
+        f"Revenue successfully updated for {updated_rentals} rentals as of {today}."
     )
     # query_string = request.GET.urlencode()
     # redirect_url = reverse('product_list')
@@ -1284,8 +1303,10 @@ def supplier_list(request):
             Q(reference_name__icontains=query)
         )
 
+    page = keyset_paginate(request, suppliers, ['pk'])
     return render(request, 'rentals/supplier_list.html', {
-        'suppliers': suppliers,
+        'suppliers': page,
+        'page': page,
         'query': query
     })
 
@@ -2248,40 +2269,8 @@ def serialize_supplier(s):
 # ----------------------------
 @login_required
 def export_reports_csv(request):
-    """Export all data models to a ZIP of CSVs"""
-    output = BytesIO()
-
-    def write_csv_to_zip(zip_file, filename, queryset):
-        if not queryset.exists():
-            return
-        rows = [safe_serialize(obj) for obj in queryset]
-        csv_buffer = StringIO()
-        writer = csv.DictWriter(csv_buffer, fieldnames=rows[0].keys())
-        writer.writeheader()
-        for row in rows:
-            writer.writerow(row)
-        zip_file.writestr(filename, csv_buffer.getvalue().encode('utf-8'))
-
-    with ZipFile(output, 'w') as zip_file:
-        write_csv_to_zip(zip_file, "customers.csv", Customer.objects.all())
-        write_csv_to_zip(zip_file, "pending_customers.csv", PendingCustomer.objects.all())
-        write_csv_to_zip(zip_file, "suppliers.csv", Supplier.objects.all())
-        write_csv_to_zip(zip_file, "asset_types.csv", AssetType.objects.all())
-        write_csv_to_zip(zip_file, "cpu_options.csv", CPUOption.objects.all())
-        write_csv_to_zip(zip_file, "ram_options.csv", RAMOption.objects.all())
-        write_csv_to_zip(zip_file, "hdd_options.csv", HDDOption.objects.all())
-        write_csv_to_zip(zip_file, "graphics_options.csv", GraphicsOption.objects.all())
-        write_csv_to_zip(zip_file, "display_size_options.csv", DisplaySizeOption.objects.all())
-        write_csv_to_zip(zip_file, "products.csv", ProductAsset.objects.select_related('type_of_asset', 'purchased_from', 'edited_by'))
-        write_csv_to_zip(zip_file, "pending_products.csv", PendingProduct.objects.select_related('type_of_asset', 'purchased_from', 'submitted_by'))
-        write_csv_to_zip(zip_file, "configurations.csv", ProductConfiguration.objects.select_related('asset', 'cpu', 'ram', 'hdd', 'graphics', 'display_size', 'edited_by'))
-        write_csv_to_zip(zip_file, "pending_configurations.csv", PendingProductConfiguration.objects.select_related('asset', 'cpu', 'ram', 'hdd', 'graphics', 'display_size', 'submitted_by'))
-        write_csv_to_zip(zip_file, "rentals.csv", Rental.objects.select_related('customer', 'asset', 'edited_by'))
-        write_csv_to_zip(zip_file, "pending_rentals.csv", PendingRental.objects.select_related('customer', 'asset', 'submitted_by'))
-        write_csv_to_zip(zip_file, "repairs.csv", Repair.objects.select_related('product', 'edited_by'))
-        write_csv_to_zip(zip_file, "pending_repairs.csv", PendingRepair.objects.select_related('product', 'submitted_by'))
-
-    response = HttpResponse(output.getvalue(), content_type='application/zip')
+    """Export all data models to a ZIP of CSVs, streamed as it is built"""
+    response = StreamingHttpResponse(stream_csv_zip(), content_type='application/zip')
     response['Content-Disposition'] = 'attachment; filename="full_report.zip"'
     # log_action(request.user, "Exported full report as CSV ZIP", "Report Export")
     return response
@@ -2291,139 +2280,42 @@ def export_reports_csv(request):
 # -------------------------------------------
 @login_required
 def export_reports_excel(request):
-    """Export all data models to a single Excel workbook"""
-    output = BytesIO()
-
-    def write_df(writer, sheet_name, queryset):
-        if not queryset.exists():
-            return
-        data = [safe_serialize(obj) for obj in queryset]
-        df = pd.DataFrame(data)
-        df.to_excel(writer, sheet_name=sheet_name[:30], index=False)
-
-    with pd.ExcelWriter(output, engine='openpyxl') as writer:
-        write_df(writer, 'Customers', Customer.objects.all())
-        write_df(writer, 'PendingCustomers', PendingCustomer.objects.all())
-        write_df(writer, 'Suppliers', Supplier.objects.all())
-        write_df(writer, 'AssetTypes', AssetType.objects.all())
-        write_df(writer, 'CPUOptions', CPUOption.objects.all())
-        write_df(writer, 'RAMOptions', RAMOption.objects.all())
-        write_df(writer, 'HDDOptions', HDDOption.objects.all())
-        write_df(writer, 'GraphicsOptions', GraphicsOption.objects.all())
-        write_df(writer, 'DisplaySizeOptions', DisplaySizeOption.objects.all())
-        write_df(writer, 'Products', ProductAsset.objects.select_related('type_of_asset', 'purchased_from', 'edited_by'))
-        write_df(writer, 'PendingProducts', PendingProduct.objects.select_related('type_of_asset', 'purchased_from', 'submitted_by'))
-        write_df(writer, 'Configurations', ProductConfiguration.objects.select_related('asset', 'cpu', 'ram', 'hdd', 'graphics', 'display_size', 'edited_by'))
-        write_df(writer, 'PendingConfigurations', PendingProductConfiguration.objects.select_related('asset', 'cpu', 'ram', 'hdd', 'graphics', 'display_size', 'submitted_by'))
-        write_df(writer, 'Rentals', Rental.objects.select_related('customer', 'asset', 'edited_by'))
-        write_df(writer, 'PendingRentals', PendingRental.objects.select_related('customer', 'asset', 'submitted_by'))
-        write_df(writer, 'Repairs', Repair.objects.select_related('product', 'edited_by'))
-        write_df(writer, 'PendingRepairs', PendingRepair.objects.select_related('product', 'submitted_by'))
-
-    response = HttpResponse(content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
-    response['Content-Disposition'] = 'attachment; filename="full_report.xlsx"'
-    response.write(output.getvalue())
+    """Queue a multi-sheet Excel export; the worker builds it off the request path"""
+    job = enqueue_export('xlsx', request.user)
     # log_action(request.user, "Exported full report as Excel", "Report Export")
-    return response
+    messages.success(request, f"Excel export #{job.pk} queued. It will be ready to download here shortly.")
+    return redirect('export_jobs')
+
 # ----------------------------
 # PDF export
 # ----------------------------
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
-from reportlab.lib.pagesizes import A4, landscape
-from reportlab.lib import colors
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.units import inch
-
 @login_required
 def export_reports_pdf(request):
-    """
-    Create a structured, unclipped PDF containing all key datasets.
-    """
-    output = BytesIO()
-    # Use landscape orientation for more horizontal space
-    doc = SimpleDocTemplate(output, pagesize=landscape(A4),
-                            leftMargin=20, rightMargin=20,
-                            topMargin=30, bottomMargin=30)
-    elements = []
-    styles = getSampleStyleSheet()
-
-    title_style = ParagraphStyle(
-        'SectionTitle',
-        parent=styles['Heading2'],
-        spaceAfter=10,
-        textColor=colors.HexColor("#2E3A59")
-    )
+    """Queue a PDF export of all key datasets; the worker builds it off the request path"""
+    job = enqueue_export('pdf', request.user)
+    # log_action(request.user, "Exported full report as PDF", "Report Export")
+    messages.success(request, f"PDF export #{job.pk} queued. It will be ready to download here shortly.")
+    return redirect('export_jobs')
 
-    normal_style = ParagraphStyle(
-        'NormalSmall',
-        parent=styles['Normal'],
-        fontSize=8,
-        leading=10,
-    )
 
-    def add_section(title, queryset):
-        """Adds a formatted table for a queryset to the PDF"""
-        elements.append(Paragraph(title, title_style))
-        elements.append(Spacer(1, 4))
-
-        if not queryset.exists():
-            elements.append(Paragraph("No data available", normal_style))
-            elements.append(Spacer(1, 12))
-            return
-
-        # Serialize objects safely
-        data = [safe_serialize(obj) for obj in queryset]
-
-        # Prepare headers + rows
-        headers = list(data[0].keys())
-        table_data = [headers]
-        for row in data:
-            row_values = [Paragraph(str(row.get(h, "")), normal_style) for h in headers]
-            table_data.append(row_values)
-
-        # Adjust column widths dynamically
-        col_count = len(headers)
-        max_table_width = 10.5 * inch  # roughly landscape A4 usable width
-        col_width = max_table_width / max(1, col_count)
-        col_widths = [col_width] * col_count
-
-        table = Table(table_data, colWidths=col_widths, repeatRows=1)
-        table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor("#E0E0E0")),
-            ('GRID', (0, 0), (-1, -1), 0.25, colors.grey),
-            ('FONT', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, -1), 8),
-            ('WORDWRAP', (0, 0), (-1, -1), True),
-            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-            ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-        ]))
-        elements.append(table)
-        elements.append(Spacer(1, 16))
-
-    # ---- Sections ----
-    add_section("Customers", Customer.objects.all())
-    add_section("Pending Customers", PendingCustomer.objects.all())
-    add_section("Suppliers", Supplier.objects.all())
-    add_section("Asset Types", AssetType.objects.all())
-    add_section("CPU Options", CPUOption.objects.all())
-    add_section("RAM Options", RAMOption.objects.all())
-    add_section("HDD Options", HDDOption.objects.all())
-    add_section("Graphics Options", GraphicsOption.objects.all())
-    add_section("Display Size Options", DisplaySizeOption.objects.all())
-    add_section("Products", ProductAsset.objects.select_related('type_of_asset', 'purchased_from', 'edited_by'))
-    add_section("Pending Products", PendingProduct.objects.select_related('type_of_asset', 'purchased_from', 'submitted_by'))
-    add_section("Configurations", ProductConfiguration.objects.select_related('asset', 'cpu', 'ram', 'hdd', 'graphics', 'display_size', 'edited_by'))
-    add_section("Pending Configurations", PendingProductConfiguration.objects.select_related('asset', 'cpu', 'ram', 'hdd', 'graphics', 'display_size', 'submitted_by'))
-    add_section("Rentals", Rental.objects.select_related('customer', 'asset', 'edited_by'))
-    add_section("Pending Rentals", PendingRental.objects.select_related('customer', 'asset', 'submitted_by'))
-    add_section("Repairs", Repair.objects.select_related('product', 'edited_by'))
-    add_section("Pending Repairs", PendingRepair.objects.select_related('product', 'submitted_by'))
-
-    # Build PDF
-    doc.build(elements)
-    response = HttpResponse(content_type='application/pdf')
-    response['Content-Disposition'] = 'attachment; filename="full_report.pdf"'
-    response.write(output.getvalue())
+@login_required
+def export_jobs(request):
+    jobs = ExportJob.objects.select_related('requested_by')
+    if not request.user.is_superuser:
+        jobs = jobs.filter(requested_by=request.user)
+    jobs = list(jobs[:50])
+    return render(request, 'rentals/export_jobs.html', {
+        'jobs': jobs,
+        'in_progress': any(job.status in ('queued', 'running') for job in jobs),
+    })
 
-    # log_action(request.user, "Exported full report as PDF", "Report Export")
-    return response
\ No newline at end of file
+
+@login_required
+def download_export(request, pk):
+    job = get_object_or_404(ExportJob, pk=pk, status='done')
+    if not request.user.is_superuser and job.requested_by_id != request.user.id:
+        raise Http404("Export not found")
+    path = artifact_path(job)
+    if not path or not path.exists():
+        raise Http404("Export file has expired")
+    return FileResponse(open(path, 'rb'), as_attachment=True, filename=ARTIFACT_NAMES[job.format])
\ No newline at end of file
@@ -51,6 +51,7 @@ INSTALLED_APPS = [
     'corsheaders',              # For allowing mobile app access
 ]
 MIDDLEWARE = [
+    'rentals.metrics.PerformanceMiddleware',  # first, so its timing covers the rest
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -60,6 +61,10 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# Per-URL wall time, SQL counts and response sizes at /metrics (superuser only)
+PERF_METRICS_ENABLED = False
+PERF_METRICS_WINDOW = 1000  # requests kept per URL name
+
 ROOT_URLCONF = 'laptop_rental.urls'
 
 TEMPLATES = [
@@ -192,3 +197,15 @@ LOGIN_URL = '/login/'
 LOGIN_REDIRECT_URL = '/'  
 LOGOUT_REDIRECT_URL = '/login/'  
 
+# Reports
+# True: report_dashboard reads the precomputed snapshot tables (rentals/reporting.py)
+# False: every figure is computed with set-based aggregate queries on each request
+REPORT_DASHBOARD_USE_SNAPSHOTS = True
+
+# Background exports (rentals/export_jobs.py, `manage.py run_export_worker`)
+EXPORT_ARTIFACT_DIR = BASE_DIR / "exports"
+EXPORT_RETENTION_DAYS = 7
+EXPORT_WORKER_PROCESSES = 2
+
+# Workbook imports (rentals/workbook.py, `manage.py import_all_data --bulk`)
+IMPORT_READER_PROCESSES = 2
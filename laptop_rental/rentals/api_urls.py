@@ -28,6 +28,9 @@ urlpatterns = [
     # Include all the router URLs above
     path('', include(router.urls)),
     
+    # Delta sync for the offline mobile cache
+    path('sync/', api_views.SyncView.as_view(), name='api_sync'),
+
     # Custom Login Endpoint
     path('login/', api_views.login_api, name='api_login'),
 ]
\ No newline at end of file
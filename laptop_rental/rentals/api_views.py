@@ -1,12 +1,17 @@
+import hashlib
+
 from rest_framework import viewsets, status, filters
 from rest_framework.decorators import action, api_view, permission_classes
 from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticated, IsAdminUser, AllowAny
+from rest_framework.views import APIView
+from rest_framework.pagination import CursorPagination
+from rest_framework.permissions import IsAuthenticated, IsAdminUser, AllowAny, SAFE_METHODS
 from rest_framework.authtoken.models import Token
 from django.contrib.auth import authenticate
-from django.db.models import Q
 from django.shortcuts import get_object_or_404
+from django.utils.cache import get_conditional_response, patch_cache_control
 from django.utils.dateparse import parse_date
+from django.utils.http import http_date
 
 # --- IMPORTS FROM YOUR APP ---
 from .models import (
@@ -23,8 +28,13 @@ from .serializers import (
     GraphicsOptionSerializer, DisplaySizeOptionSerializer,
     # Pending
     PendingCustomerSerializer, PendingProductSerializer, PendingRentalSerializer,
-    PendingRepairSerializer, PendingConfigSerializer
+    PendingRepairSerializer, PendingConfigSerializer,
+    query_param_list, source_models,
 )
+from .approvals import approval_feed
+from .search import search
+from .site_logger import log_action
+from .sync import changes_between, decode_token, encode_token, table_key, table_versions
 
 # ===================================================================
 # 1. AUTHENTICATION
@@ -47,11 +57,85 @@ def login_api(request):
     return Response({"error": "Invalid Credentials"}, status=400)
 
 
+# ===================================================================
+# 1b. EAGER LOADING
+# ===================================================================
+class EagerLoadingViewSetMixin:
+    """Applies the serializer's Meta.select_related / prefetch_related to get_queryset()."""
+
+    def get_queryset(self):
+        qs = super().get_queryset()
+        setup = getattr(self.get_serializer_class(), 'setup_eager_loading', None)
+        if setup is None:
+            return qs
+        expand = query_param_list(self.request, 'expand') if self.request.method in SAFE_METHODS else []
+        return setup(qs, expand=expand)
+
+
+# ===================================================================
+# 1c. PAGINATION
+# ===================================================================
+# Cursor pagination for the big lists: every page is a seek on an indexed
+# ordering instead of an OFFSET scan, so the last page costs the same as
+# the first. Clients follow the `next` / `previous` links; `page_size`
+# overrides PAGE_SIZE up to max_page_size. The primary key breaks ties so
+# rows with the same sort value keep a fixed order.
+
+class StableCursorPagination(CursorPagination):
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+
+
+class ProductCursorPagination(StableCursorPagination):
+    ordering = ('asset_id', 'id')
+
+
+class RentalCursorPagination(StableCursorPagination):
+    ordering = ('-rental_start_date', '-id')
+
+
+# ===================================================================
+# 1d. CONDITIONAL GET
+# ===================================================================
+# Lists and details carry an ETag built from the versions of every table
+# the response reads (rentals/sync.py), plus Last-Modified from the latest
+# change among them. A client sending them back in If-None-Match /
+# If-Modified-Since gets a bodiless 304 after a single query.
+
+class ConditionalGetMixin:
+    def version_tables(self):
+        expand = query_param_list(self.request, 'expand')
+        return sorted(table_key(model) for model in source_models(self.get_serializer_class(), expand))
+
+    def conditional(self, view, request, *args, **kwargs):
+        versions = table_versions(self.version_tables())
+        state = f"{request.get_full_path()}|{request.accepted_media_type}|{sorted(versions.items())}"
+        etag = f'"{hashlib.md5(state.encode()).hexdigest()}"'
+        changed = [changed_at for _, changed_at in versions.values()]
+        last_modified = int(max(changed).timestamp()) if changed else None
+
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = view(request, *args, **kwargs)
+        if response.status_code in (200, 304):
+            response['ETag'] = etag
+            if last_modified is not None:
+                response['Last-Modified'] = http_date(last_modified)
+            patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional(super().retrieve, request, *args, **kwargs)
+
+
 # ===================================================================
 # 2. DROPDOWN OPTIONS (Read Only)
 # ===================================================================
 # These ViewSets just provide lists for your dropdown menus
-class OptionViewSetMixin(viewsets.ReadOnlyModelViewSet):
+class OptionViewSetMixin(ConditionalGetMixin, viewsets.ReadOnlyModelViewSet):
     permission_classes = [IsAuthenticated]
     pagination_class = None # Dropdowns don't need pagination
 
@@ -84,10 +168,11 @@ class DisplayViewSet(OptionViewSetMixin):
 # 3. MAIN LOGIC VIEWSETS (The Heavy Lifters)
 # ===================================================================
 
-class ProductAssetViewSet(viewsets.ModelViewSet):
+class ProductAssetViewSet(ConditionalGetMixin, EagerLoadingViewSetMixin, viewsets.ModelViewSet):
     queryset = ProductAsset.objects.all().order_by('asset_id')
     serializer_class = ProductAssetSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = ProductCursorPagination
 
     def get_queryset(self):
         """Replicates search and date filtering from views.py"""
@@ -97,13 +182,7 @@ class ProductAssetViewSet(viewsets.ModelViewSet):
         end_date = self.request.query_params.get('end_date')
         asset_type = self.request.query_params.get('type')
 
-        if query:
-            qs = qs.filter(
-                Q(asset_id__icontains=query) |
-                Q(brand__icontains=query) |
-                Q(model_no__icontains=query) |
-                Q(serial_no__icontains=query)
-            )
+        qs = search(qs, query)
         if start_date:
             qs = qs.filter(purchase_date__gte=parse_date(start_date))
         if end_date:
@@ -158,10 +237,11 @@ class ProductAssetViewSet(viewsets.ModelViewSet):
             return Response({"message": "Edit submitted for approval"}, status=status.HTTP_202_ACCEPTED)
 
 
-class RentalViewSet(viewsets.ModelViewSet):
+class RentalViewSet(ConditionalGetMixin, EagerLoadingViewSetMixin, viewsets.ModelViewSet):
     queryset = Rental.objects.all().order_by('-rental_start_date')
     serializer_class = RentalSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = RentalCursorPagination
 
     def get_queryset(self):
         qs = super().get_queryset()
@@ -191,7 +271,7 @@ class RentalViewSet(viewsets.ModelViewSet):
             return Response({"message": "Rental submitted for approval"}, status=status.HTTP_202_ACCEPTED)
 
 
-class CustomerViewSet(viewsets.ModelViewSet):
+class CustomerViewSet(ConditionalGetMixin, EagerLoadingViewSetMixin, viewsets.ModelViewSet):
     queryset = Customer.objects.all()
     serializer_class = CustomerSerializer
     permission_classes = [IsAuthenticated]
@@ -208,17 +288,55 @@ class CustomerViewSet(viewsets.ModelViewSet):
 # 4. APPROVAL DASHBOARD (For the Mobile "Admin" Tab)
 # ===================================================================
 
+PENDING_SERIALIZERS = {
+    'products': PendingProductSerializer,
+    'customers': PendingCustomerSerializer,
+    'rentals': PendingRentalSerializer,
+    'configs': PendingConfigSerializer,
+    'repairs': PendingRepairSerializer,
+}
+
+MAX_APPROVAL_PAGE_SIZE = 100
+
+
 class ApprovalDashboardViewSet(viewsets.ViewSet):
     permission_classes = [IsAdminUser]
 
     def list(self, request):
-        """Get counts and lists of all pending items"""
-        return Response({
-            "products": PendingProductSerializer(PendingProduct.objects.all(), many=True).data,
-            "rentals": PendingRentalSerializer(PendingRental.objects.all(), many=True).data,
-            "customers": PendingCustomerSerializer(PendingCustomer.objects.all(), many=True).data,
-            "repairs": PendingRepairSerializer(PendingRepair.objects.all(), many=True).data,
-        })
+        """
+        Counts of all pending items and one page per type, each item with
+        what it changes. ?<type>_page=N picks a page, ?page_size= its size,
+        ?types=products,rentals limits the types returned.
+        """
+        types = query_param_list(request, 'types') or None
+        pages = {key: request.query_params.get(f'{key}_page', 1) for key in PENDING_SERIALIZERS}
+        try:
+            page_size = min(int(request.query_params.get('page_size', 0)), MAX_APPROVAL_PAGE_SIZE) or None
+        except ValueError:
+            return Response({"error": "page_size must be a number"}, status=status.HTTP_400_BAD_REQUEST)
+
+        feed = approval_feed(
+            pages=pages, page_size=page_size, types=types,
+            select_related={key: serializer.Meta.select_related for key, serializer in PENDING_SERIALIZERS.items()},
+        )
+        data = {"counts": feed['counts'], "total": feed['total']}
+        for key, section in feed['sections'].items():
+            page, serializer_class = section['page'], PENDING_SERIALIZERS[key]
+            data[key] = {
+                "count": page.paginator.count,
+                "page": page.number,
+                "num_pages": page.paginator.num_pages,
+                "next_page": page.next_page_number() if page.has_next() else None,
+                "results": [
+                    {
+                        "pending": serializer_class(item['pending']).data,
+                        "original_id": item['old'].pk if item['old'] else None,
+                        "changes": item['changes'],
+                    }
+                    for item in section['items']
+                ],
+            }
+        return Response(data)
 
     # --- ACTIONS ---
     
@@ -247,11 +365,78 @@ class ApprovalDashboardViewSet(viewsets.ViewSet):
             )
             
         pending.delete()
+        log_action(request.user, "Approved product", "PendingProduct", obj_id=pk, extra="api")
         return Response({"status": "Approved"})
 
     @action(detail=True, methods=['post'], url_path='reject-product')
     def reject_product(self, request, pk=None):
         get_object_or_404(PendingProduct, pk=pk).delete()
+        log_action(request.user, "Rejected product", "PendingProduct", obj_id=pk, extra="api")
         return Response({"status": "Rejected"})
     
-    # (Repeat @action pattern for approve-rental, approve-customer, etc.)
\ No newline at end of file
+    # (Repeat @action pattern for approve-rental, approve-customer, etc.)
+
+
+# ===================================================================
+# 5. DELTA SYNC (For the offline mobile cache)
+# ===================================================================
+# GET /api/v1/sync/ returns every row of the tables below with a `token`.
+# GET /api/v1/sync/?since=<token> returns only what was created, changed or
+# deleted since that token, and a new token. Rows are serialized like the
+# list endpoints; deleted rows are listed by id.
+
+SYNC_TABLES = {
+    'asset_types': AssetTypeSerializer,
+    'cpu': CPUOptionSerializer,
+    'ram': RAMOptionSerializer,
+    'hdd': HDDOptionSerializer,
+    'graphics': GraphicsOptionSerializer,
+    'display': DisplaySizeOptionSerializer,
+    'customers': CustomerSerializer,
+    'products': ProductAssetSerializer,
+    'configurations': ProductConfigurationSerializer,
+    'rentals': RentalSerializer,
+    'repairs': RepairSerializer,
+}
+
+
+def _sync_rows(serializer_class, pks=None):
+    model = serializer_class.Meta.model
+    qs = model.objects.all() if pks is None else model.objects.filter(pk__in=pks)
+    if hasattr(serializer_class, 'setup_eager_loading'):
+        qs = serializer_class.setup_eager_loading(qs)
+    return serializer_class(qs.order_by('pk'), many=True).data
+
+
+class SyncView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        since = request.query_params.get('since')
+        try:
+            known = decode_token(since) if since else None
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Versions are read first: a write landing while the rows are read
+        # is sent again next time instead of being missed.
+        tables = {name: table_key(serializer.Meta.model) for name, serializer in SYNC_TABLES.items()}
+        current = {table: version for table, (version, _) in table_versions(tables.values()).items()}
+
+        payload = {}
+        for name, serializer_class in SYNC_TABLES.items():
+            table = tables[name]
+            if known is None:
+                payload[name] = {"created": _sync_rows(serializer_class), "changed": [], "deleted": []}
+                continue
+            since_version, upto = known.get(table, 0), current.get(table, 0)
+            if since_version >= upto:
+                continue
+            created, changed, deleted = changes_between(serializer_class.Meta.model, since_version, upto)
+            payload[name] = {
+                "created": _sync_rows(serializer_class, created) if created else [],
+                "changed": _sync_rows(serializer_class, changed) if changed else [],
+                "deleted": deleted,
+            }
+
+        return Response({"token": encode_token(current), "full": known is None, "tables": payload})
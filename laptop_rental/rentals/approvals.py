@@ -0,0 +1,633 @@
+from collections import defaultdict
+from datetime import date
+
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from . import audit, search
+from .asset_ids import allocate_asset_numbers, format_asset_id, lock_asset_years, parse_asset_id
+from .models import (
+    Customer, PendingCustomer, PendingProduct, PendingProductConfiguration,
+    PendingRental, PendingRepair, ProductAsset, ProductConfiguration, Rental, Repair, SearchToken,
+)
+from .reporting import (
+    month_start, refresh_asset_snapshots, refresh_asset_type_snapshots,
+    refresh_customer_snapshots, refresh_monthly_snapshots,
+)
+from .revenue import _reconcile_ledger, refresh_asset_revenue
+from .status import contract_alert
+from .sync import record_changes, table_key
+
+# -----------------------------
+# Approval feed
+# -----------------------------
+# Shared by the web approval dashboard and the approvals API. Every type of
+# pending submission is loaded with the record it edits (if any) and every
+# related object either side shows, in one query per type plus one count,
+# so the feed costs the same number of queries however many items it holds.
+#
+# (key, pending model, field pointing at the edited record, select_related)
+APPROVAL_TYPES = [
+    ('products', PendingProduct, 'original_product', [
+        'submitted_by', 'type_of_asset', 'purchased_from',
+        'original_product__type_of_asset', 'original_product__purchased_from',
+    ]),
+    ('customers', PendingCustomer, 'original_customer', [
+        'submitted_by', 'original_customer',
+    ]),
+    ('rentals', PendingRental, 'original_rental', [
+        'submitted_by', 'customer', 'asset__type_of_asset',
+        'original_rental__customer', 'original_rental__asset__type_of_asset',
+    ]),
+    ('configs', PendingProductConfiguration, 'original_config', [
+        'submitted_by', 'asset', 'cpu', 'ram', 'hdd', 'graphics', 'display_size',
+        'original_config__asset', 'original_config__cpu', 'original_config__ram', 'original_config__hdd',
+        'original_config__graphics', 'original_config__display_size',
+    ]),
+    ('repairs', PendingRepair, 'original_repair', [
+        'submitted_by', 'product', 'original_repair__product',
+    ]),
+]
+
+# Bookkeeping fields left out of the old/new comparison
+DIFF_EXCLUDE = {'id', 'edited_by', 'edited_at', 'revenue', 'under_warranty', 'under_repair_warranty'}
+
+
+def approval_page_size():
+    return getattr(settings, 'APPROVAL_PAGE_SIZE', 25)
+
+
+def _label(value):
+    for attr in ('asset_id', 'name', 'username'):
+        if hasattr(value, attr):
+            return getattr(value, attr)
+    return str(value)
+
+
+def diff_fields(pending_model, original_model):
+    """Concrete fields the pending model shares with the model it edits."""
+    original = {field.name for field in original_model._meta.concrete_fields}
+    return [
+        field for field in pending_model._meta.concrete_fields
+        if field.name in original and field.name not in DIFF_EXCLUDE
+    ]
+
+
+def item_changes(pending, old, fields):
+    """[{field, old, new}] for every field the submission changes; [] for new records."""
+    if old is None:
+        return []
+    changes = []
+    for field in fields:
+        if getattr(pending, field.attname) == getattr(old, field.attname):
+            continue
+        if field.is_relation:
+            before, after = getattr(old, field.name), getattr(pending, field.name)
+            before = None if before is None else _label(before)
+            after = None if after is None else _label(after)
+        else:
+            before, after = getattr(old, field.name), getattr(pending, field.name)
+        changes.append({'field': field.name, 'old': before, 'new': after})
+    return changes
+
+
+def approval_feed(pages=None, page_size=None, types=None, select_related=None):
+    """
+    Counts and one page of items per pending type.
+
+    `pages` maps a type key to its page number (default 1); `types` limits
+    the feed to some keys; `select_related` maps a key to extra relations
+    (e.g. what a serializer reads). Returns {'counts': {key: n}, 'total': n,
+    'sections': {key: {'items': [...], 'page': Page}}}, where every item
+    is {'pending', 'old', 'changes'}.
+    """
+    pages = pages or {}
+    page_size = page_size or approval_page_size()
+    select_related = select_related or {}
+    counts, sections = {}, {}
+
+    for key, model, original_field, related in APPROVAL_TYPES:
+        if types is not None and key not in types:
+            continue
+        queryset = model.objects.select_related(*related, *select_related.get(key, ())).order_by('pk')
+        page = Paginator(queryset, page_size).get_page(pages.get(key, 1))
+        fields = diff_fields(model, model._meta.get_field(original_field).related_model)
+        items = []
+        for pending in page.object_list:
+            old = getattr(pending, original_field)
+            items.append({'pending': pending, 'old': old, 'changes': item_changes(pending, old, fields)})
+        counts[key] = page.paginator.count
+        sections[key] = {'items': items, 'page': page}
+
+    return {'counts': counts, 'total': sum(counts.values()), 'sections': sections}
+
+
+# -----------------------------
+# Bulk approval engine
+# -----------------------------
+# Approves or rejects many Pending* rows of mixed types in one transaction.
+# Conflicts are detected up front with one query per type and reported per
+# item; everything else is written with bulk_create/bulk_update.
+#
+# Bulk writes bypass the models' save() and their signals. What save() sets
+# (asset IDs, warranty flag, contract_alert, edited_at) is set here on each
+# object; what the receivers maintain (revenue ledger, report snapshots, row
+# versions, search tokens, audit events) is brought up to date once at the
+# end, for the rows of this batch only. New code in save() or signals.py
+# must be mirrored here.
+
+PENDING_MODELS = {
+    'product': PendingProduct,
+    'customer': PendingCustomer,
+    'rental': PendingRental,
+    'config': PendingProductConfiguration,
+    'repair': PendingRepair,
+}
+
+PENDING_RELATED = {
+    'product': ['original_product'],
+    'customer': ['original_customer'],
+    'rental': ['original_rental'],
+    'config': ['original_config'],
+    'repair': ['original_repair'],
+}
+
+PRODUCT_EDIT_FIELDS = [
+    "type_of_asset", "brand", "model_no", "serial_no",
+    "purchase_price", "current_value", "purchase_date",
+    "under_warranty", "warranty_duration_months",
+    "purchased_from", "condition_status", "asset_number",
+    "sold_to", "sale_price", "sale_date",
+    "date_marked_dead", "damage_narration",
+]
+PRODUCT_CREATE_FIELDS = PRODUCT_EDIT_FIELDS + ["asset_id", "asset_suffix"]
+
+CUSTOMER_FIELDS = [
+    "name", "email", "phone_number_primary", "phone_number_secondary",
+    "address_primary", "address_secondary", "is_permanent", "is_bni_member",
+    "reference_name",
+]
+
+RENTAL_FIELDS = [
+    "customer", "asset", "rental_start_date", "rental_end_date", "billing_day",
+    "contract_number", "contract_validity", "status", "payment_amount",
+]
+
+CONFIG_CREATE_FIELDS = [
+    "asset", "date_of_config", "cpu", "ram", "hdd", "ssd", "graphics",
+    "display_size", "power_supply", "detailed_config",
+]
+CONFIG_EDIT_FIELDS = ["ram", "hdd", "ssd", "graphics", "display_size", "power_supply", "detailed_config"]
+
+REPAIR_FIELDS = ["name", "cost", "date"]
+
+# Model written per pending type, and the fields that tell apart the rows
+# one batch creates (see _fill_created_pks)
+WRITTEN_MODELS = {
+    'product': (ProductAsset, ['asset_id']),
+    'customer': (Customer, ['name', 'phone_number_primary']),
+    'rental': (Rental, ['customer_id', 'asset_id', 'rental_start_date']),
+    'config': (ProductConfiguration, ['asset_id', 'date_of_config']),
+    'repair': (Repair, ['product_id', 'name', 'date']),
+}
+
+
+def parse_approval_items(values):
+    """["product:12", "rental:3", ...] -> [("product", 12), ("rental", 3)], ignoring malformed values."""
+    items = []
+    for value in values:
+        kind, _, pk = str(value).partition(':')
+        if kind in PENDING_MODELS and pk.isdigit():
+            items.append((kind, int(pk)))
+    return items
+
+
+def _copy(target, source, fields):
+    for field in fields:
+        setattr(target, field, getattr(source, field))
+    return target
+
+
+class _Batch:
+    """Collects results and the keys whose derived data must be refreshed."""
+
+    def __init__(self):
+        self.results = []
+        self.approved = defaultdict(list)
+        self.asset_ids = set()
+        self.new_asset_ids = []
+        self.asset_type_ids = set()
+        self.customer_ids = set()
+        self.months = set()
+        self.revenue_asset_ids = set()
+        self.edited_rentals = []
+        self.created_rentals = []
+        self.written = []  # (kind, object, created)
+
+    def ok(self, kind, pending, message):
+        self.approved[kind].append(pending.pk)
+        self.results.append({'type': kind, 'id': pending.pk, 'status': 'approved', 'message': message})
+
+    def conflict(self, kind, pk, message):
+        self.results.append({'type': kind, 'id': pk, 'status': 'conflict', 'message': message})
+
+
+def _write(batch, kind, rows, write):
+    """
+    Run `write(list_of_objects)` for (pending, obj, message) rows in one go.
+    If the bulk write hits an integrity error, retry row by row so only the
+    offending items are reported as conflicts.
+    """
+    if not rows:
+        return []
+    new = {id(obj) for _, obj, _ in rows if obj.pk is None}
+    try:
+        with transaction.atomic():
+            write([obj for _, obj, _ in rows])
+        written = rows
+    except IntegrityError:
+        written = []
+        for row in rows:
+            try:
+                with transaction.atomic():
+                    write([row[1]])
+                written.append(row)
+            except IntegrityError as e:
+                batch.conflict(kind, row[0].pk, f"Database rejected the change: {e}")
+    for pending, obj, message in written:
+        batch.ok(kind, pending, message)
+        batch.written.append((kind, obj, id(obj) in new))
+    return written
+
+
+# -----------------------------
+# Products
+# -----------------------------
+
+def _approve_products(batch, pendings):
+    now = timezone.now()
+    creates = [p for p in pendings if not (p.pending_type == 'edit' and p.original_product)]
+    edits = [p for p in pendings if p.pending_type == 'edit' and p.original_product]
+
+    # Resolve every asset ID of the batch in one pass, under the year locks:
+    # explicit numbers are formatted and checked in memory, automatic ones
+    # are handed out a block per year
+    numbered = set()
+    for p in creates:
+        if not p.asset_id and p.asset_number:
+            p.asset_id = format_asset_id(p.purchase_date.year, p.asset_number, p.asset_suffix)
+            numbered.add(p.pk)
+    years = set()
+    for p in creates:
+        id_year, _ = parse_asset_id(p.asset_id)
+        years.add(id_year or p.purchase_date.year)
+    lock_asset_years(years)
+
+    wanted_ids = [p.asset_id for p in creates if p.asset_id]
+    batch_pks = [p.pk for p in pendings]
+    taken = set(ProductAsset.objects.filter(asset_id__in=wanted_ids).values_list('asset_id', flat=True))
+    taken |= set(
+        PendingProduct.objects.filter(asset_id__in=wanted_ids).exclude(pk__in=batch_pks)
+        .values_list('asset_id', flat=True)
+    )
+
+    accepted, automatic = [], defaultdict(list)
+    seen = set()
+    for pending in creates:
+        if not pending.asset_id:
+            automatic[pending.purchase_date.year].append(pending)
+        elif pending.asset_id in taken or pending.asset_id in seen:
+            if pending.pk in numbered:
+                message = f"Asset Number '{pending.asset_number}' is already in use for year {pending.purchase_date.year}."
+            else:
+                message = f"Asset ID '{pending.asset_id}' already exists."
+            batch.conflict('product', pending.pk, message)
+            continue
+        else:
+            seen.add(pending.asset_id)
+        accepted.append(pending)
+
+    for year, group in automatic.items():
+        reserved = {number for id_year, number in map(parse_asset_id, seen) if id_year == year}
+        for pending, number in zip(group, allocate_asset_numbers(year, len(group), reserved)):
+            pending.asset_number, pending.asset_id = number, format_asset_id(year, number)
+
+    create_rows = []
+    for pending in accepted:
+        product = _copy(ProductAsset(), pending, PRODUCT_CREATE_FIELDS)
+        product.set_warranty_flag()
+        product.edited_by = pending.submitted_by
+        product.edited_at = now
+        create_rows.append((pending, product, f"Created {pending.asset_id}"))
+
+    edit_rows = []
+    for pending in edits:
+        product = pending.original_product
+        batch.asset_type_ids.add(product.type_of_asset_id)
+        _copy(product, pending, PRODUCT_EDIT_FIELDS)
+        product.set_warranty_flag()
+        product.edited_by = pending.submitted_by
+        product.edited_at = now
+        edit_rows.append((pending, product, f"Updated {product.asset_id}"))
+
+    for pending, _, _ in _write(batch, 'product', create_rows,
+                                lambda objs: ProductAsset.objects.bulk_create(objs)):
+        batch.new_asset_ids.append(pending.asset_id)
+        batch.asset_type_ids.add(pending.type_of_asset_id)
+
+    for _, product, _ in _write(batch, 'product', edit_rows, lambda objs: ProductAsset.objects.bulk_update(
+        objs, PRODUCT_EDIT_FIELDS + ['edited_by', 'edited_at'])):
+        batch.asset_ids.add(product.pk)
+        batch.asset_type_ids.add(product.type_of_asset_id)
+
+
+# -----------------------------
+# Customers
+# -----------------------------
+
+def _approve_customers(batch, pendings):
+    now = timezone.now()
+    keys = Q(pk__in=[])
+    for p in pendings:
+        keys |= Q(name=p.name, phone_number_primary=p.phone_number_primary)
+    existing = {
+        (name, phone): pk
+        for pk, name, phone in Customer.objects.filter(keys).values_list('pk', 'name', 'phone_number_primary')
+    }
+
+    create_rows, edit_rows = [], []
+    seen = set()
+    for pending in pendings:
+        key = (pending.name, pending.phone_number_primary)
+        original = pending.original_customer
+        holder = existing.get(key)
+        if key in seen or (holder and (original is None or holder != original.pk)):
+            batch.conflict('customer', pending.pk, f"A customer named '{pending.name}' with phone {pending.phone_number_primary} already exists.")
+            continue
+        seen.add(key)
+
+        customer = _copy(original or Customer(), pending, CUSTOMER_FIELDS)
+        customer.edited_by = pending.submitted_by
+        customer.edited_at = now
+        if original:
+            edit_rows.append((pending, customer, f"Updated {customer.name}"))
+        else:
+            create_rows.append((pending, customer, f"Created {customer.name}"))
+
+    _write(batch, 'customer', create_rows, lambda objs: Customer.objects.bulk_create(objs))
+    _write(batch, 'customer', edit_rows, lambda objs: Customer.objects.bulk_update(
+        objs, CUSTOMER_FIELDS + ['edited_by', 'edited_at']))
+
+
+# -----------------------------
+# Rentals
+# -----------------------------
+
+def _approve_rentals(batch, pendings):
+    now = timezone.now()
+    asset_ids = {p.asset_id for p in pendings if p.asset_id and p.status == 'ongoing'}
+    rented = defaultdict(set)
+    for asset_id, rental_pk in Rental.objects.filter(status='ongoing', asset_id__in=asset_ids).values_list('asset_id', 'pk'):
+        rented[asset_id].add(rental_pk)
+
+    create_rows, edit_rows = [], []
+    claimed = set()
+    for pending in pendings:
+        original = pending.original_rental
+        if pending.asset_id and pending.status == 'ongoing':
+            others = rented[pending.asset_id] - ({original.pk} if original else set())
+            if others or pending.asset_id in claimed:
+                batch.conflict('rental', pending.pk, f"Asset {pending.asset} already has an ongoing rental.")
+                continue
+            claimed.add(pending.asset_id)
+
+        if original:
+            batch.customer_ids.add(original.customer_id)
+            batch.months.add(month_start(original.rental_start_date))
+            batch.revenue_asset_ids.add(original.asset_id)
+
+        rental = _copy(original or Rental(), pending, RENTAL_FIELDS)
+        rental.contract_alert = contract_alert(rental.status, rental.contract_validity)
+        rental.edited_by = pending.submitted_by
+        rental.edited_at = now
+        row = (pending, rental, f"{'Updated' if original else 'Created'} rental for {pending.customer}")
+        (edit_rows if original else create_rows).append(row)
+
+    for _, rental, _ in _write(batch, 'rental', create_rows, lambda objs: Rental.objects.bulk_create(objs)):
+        batch.created_rentals.append(rental)
+        batch.customer_ids.add(rental.customer_id)
+        batch.months.add(month_start(rental.rental_start_date))
+
+    for _, rental, _ in _write(batch, 'rental', edit_rows, lambda objs: Rental.objects.bulk_update(
+        objs, RENTAL_FIELDS + ['contract_alert', 'edited_by', 'edited_at'])):
+        batch.edited_rentals.append(rental)
+        batch.customer_ids.add(rental.customer_id)
+        batch.months.add(month_start(rental.rental_start_date))
+
+
+# -----------------------------
+# Configurations / repairs
+# -----------------------------
+
+def _approve_configs(batch, pendings):
+    now = timezone.now()
+    create_rows, edit_rows = [], []
+    for pending in pendings:
+        if pending.is_edit:
+            config = pending.original_config
+            if config is None:
+                batch.conflict('config', pending.pk, "The configuration being edited no longer exists.")
+                continue
+            edit_rows.append((pending, _copy(config, pending, CONFIG_EDIT_FIELDS), "Configuration updated"))
+        else:
+            config = _copy(ProductConfiguration(), pending, CONFIG_CREATE_FIELDS)
+            config.edited_by = pending.submitted_by
+            config.edited_at = now
+            create_rows.append((pending, config, "Configuration added"))
+
+    for _, config, _ in _write(batch, 'config', create_rows, lambda objs: ProductConfiguration.objects.bulk_create(objs)):
+        batch.asset_ids.add(config.asset_id)
+    for _, config, _ in _write(batch, 'config', edit_rows, lambda objs: ProductConfiguration.objects.bulk_update(
+        objs, CONFIG_EDIT_FIELDS)):
+        batch.asset_ids.add(config.asset_id)
+
+
+def _approve_repairs(batch, pendings):
+    now = timezone.now()
+    create_rows, edit_rows, deletes = [], [], []
+    for pending in pendings:
+        if pending.is_delete:
+            if pending.original_repair is None:
+                batch.conflict('repair', pending.pk, "The repair being deleted no longer exists.")
+            else:
+                deletes.append(pending)
+            continue
+        if not (pending.name and pending.date and pending.cost is not None):
+            batch.conflict('repair', pending.pk, "Repair name, date and cost are required.")
+            continue
+        if pending.is_edit:
+            repair = pending.original_repair
+            if repair is None:
+                batch.conflict('repair', pending.pk, "The repair being edited no longer exists.")
+                continue
+            _copy(repair, pending, REPAIR_FIELDS)
+            repair.edited_by = pending.submitted_by
+            repair.edited_at = now
+            edit_rows.append((pending, repair, "Repair edit approved"))
+        else:
+            repair = _copy(Repair(product_id=pending.product_id), pending, REPAIR_FIELDS)
+            repair.edited_by = pending.submitted_by
+            repair.edited_at = now
+            create_rows.append((pending, repair, "New repair approved"))
+
+    for _, repair, _ in _write(batch, 'repair', create_rows, lambda objs: Repair.objects.bulk_create(objs)):
+        batch.asset_ids.add(repair.product_id)
+    for _, repair, _ in _write(batch, 'repair', edit_rows, lambda objs: Repair.objects.bulk_update(
+        objs, REPAIR_FIELDS + ['edited_by', 'edited_at'])):
+        batch.asset_ids.add(repair.product_id)
+
+    if deletes:
+        # The per-row delete signals keep the derived data in step; the
+        # pending rows go with their repairs (on_delete=CASCADE)
+        Repair.objects.filter(pk__in=[p.original_repair_id for p in deletes]).delete()
+        for pending in deletes:
+            batch.asset_ids.add(pending.product_id)
+            batch.ok('repair', pending, "Repair deleted")
+
+
+APPROVERS = {
+    'product': _approve_products,
+    'customer': _approve_customers,
+    'rental': _approve_rentals,
+    'config': _approve_configs,
+    'repair': _approve_repairs,
+}
+
+# Customers and products first, so rentals/configs in the same batch can use them
+APPROVAL_ORDER = ['customer', 'product', 'rental', 'config', 'repair']
+
+
+def _fill_created_pks(model, objs, fields):
+    """
+    Set the primary keys of bulk-created `objs`. Backends that return rows
+    from a bulk insert already did; on MySQL they are read back by the
+    objects' edited_at stamps and `fields`, in insert order.
+    """
+    missing = [obj for obj in objs if obj.pk is None]
+    if not missing:
+        return
+    inserted = defaultdict(list)
+    rows = (
+        model.objects.filter(edited_at__in={obj.edited_at for obj in missing})
+        .order_by('pk').values_list('pk', *fields)
+    )
+    for pk, *key in rows:
+        inserted[tuple(key)].append(pk)
+    for obj in missing:
+        obj.pk = inserted[tuple(getattr(obj, field) for field in fields)].pop(0)
+
+
+def _record_writes(batch):
+    """Row versions, search tokens and audit events of the rows written by the batch."""
+    by_kind = defaultdict(list)
+    for kind, obj, created in batch.written:
+        by_kind[kind].append((obj, created))
+
+    for kind, rows in by_kind.items():
+        model, key_fields = WRITTEN_MODELS[kind]
+        _fill_created_pks(model, [obj for obj, created in rows if created], key_fields)
+        record_changes(model, [obj.pk for obj, created in rows if created], created=True)
+        record_changes(model, [obj.pk for obj, created in rows if not created])
+
+        if model in search.SEARCH_FIELDS:
+            SearchToken.objects.filter(table=table_key(model), object_id__in=[obj.pk for obj, _ in rows]).delete()
+            SearchToken.objects.bulk_create(
+                [entry for obj, _ in rows for entry in search.entries_for(model, obj)], batch_size=1000,
+            )
+
+        for obj, created in rows:
+            audit.record(
+                table_key(model), obj.pk, 'create' if created else 'update',
+                user_id=getattr(obj, 'edited_by_id', None), data=audit.snapshot(obj),
+            )
+
+
+def _refresh_derived(batch, today):
+    if batch.new_asset_ids:
+        batch.asset_ids |= set(
+            ProductAsset.objects.filter(asset_id__in=batch.new_asset_ids).values_list('pk', flat=True)
+        )
+
+    # Created rentals have their pks from _record_writes()
+    batch.revenue_asset_ids |= _reconcile_ledger(batch.created_rentals + batch.edited_rentals, today)
+    batch.revenue_asset_ids.discard(None)
+    if batch.revenue_asset_ids:
+        refresh_asset_revenue(batch.revenue_asset_ids)
+
+    refresh_customer_snapshots(batch.customer_ids)
+    refresh_monthly_snapshots(batch.months)
+    refresh_asset_type_snapshots(batch.asset_type_ids)
+    refresh_asset_snapshots(batch.asset_ids)
+
+
+def _in_request_order(results, items):
+    position = {}
+    for index, item in enumerate(items):
+        position.setdefault(item, index)
+    return sorted(results, key=lambda r: position.get((r['type'], r['id']), len(position)))
+
+
+def process_approvals(items, action, today=None):
+    """
+    Approve or reject many pending rows at once.
+
+    `items` is a list of (type, pk) pairs where type is a key of
+    PENDING_MODELS and `action` is 'approve' or 'reject'. Returns one result
+    dict per item: {'type', 'id', 'status', 'message'} with status
+    'approved', 'rejected' or 'conflict'. Conflicting items are left pending;
+    the rest of the batch is still applied.
+    """
+    if action not in ('approve', 'reject'):
+        raise ValueError(f"Unknown approval action '{action}'.")
+    today = today or date.today()
+
+    requested = defaultdict(list)
+    for kind, pk in items:
+        if pk not in requested[kind]:
+            requested[kind].append(pk)
+
+    batch = _Batch()
+    with transaction.atomic():
+        found = {}
+        for kind in APPROVAL_ORDER:
+            if not requested[kind]:
+                continue
+            model = PENDING_MODELS[kind]
+            rows = model.objects.select_for_update(of=('self',)).select_related(*PENDING_RELATED[kind]).in_bulk(requested[kind])
+            found[kind] = [rows[pk] for pk in requested[kind] if pk in rows]
+            for pk in requested[kind]:
+                if pk not in rows:
+                    batch.conflict(kind, pk, "This request is no longer pending.")
+
+        if action == 'reject':
+            for kind, rows in found.items():
+                PENDING_MODELS[kind].objects.filter(pk__in=[p.pk for p in rows]).delete()
+                batch.results.extend(
+                    {'type': kind, 'id': p.pk, 'status': 'rejected', 'message': "Rejected"} for p in rows
+                )
+            return _in_request_order(batch.results, items)
+
+        for kind in APPROVAL_ORDER:
+            if found.get(kind):
+                APPROVERS[kind](batch, found[kind])
+
+        for kind, pks in batch.approved.items():
+            PENDING_MODELS[kind].objects.filter(pk__in=pks).delete()
+
+        _record_writes(batch)
+        _refresh_derived(batch, today)
+
+    return _in_request_order(batch.results, items)
@@ -4,3 +4,11 @@ from django.apps import AppConfig
 class RentalsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'rentals'
+
+    def ready(self):
+        import rentals.signals
+        from . import audit, autocomplete, search, sync
+        sync.connect_signals()
+        search.connect_signals()
+        autocomplete.connect_signals()
+        audit.connect_signals()
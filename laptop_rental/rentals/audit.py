@@ -0,0 +1,194 @@
+import atexit
+import logging
+import os
+import threading
+
+from django.apps import apps
+from django.conf import settings
+from django.db import DatabaseError, close_old_connections, transaction
+from django.db.models import Q
+from django.db.models.signals import post_delete, post_save
+from django.utils import timezone
+
+from .models import AuditEvent, Customer, ProductAsset, ProductConfiguration, Rental, Repair, Supplier
+from .sync import table_key
+
+# -----------------------------
+# Audit trail
+# -----------------------------
+# Saves and deletes of the models below, and every log_action() call from
+# the views, become AuditEvent rows. Nothing is written on the request
+# thread: an event joins an in-process buffer once its transaction commits,
+# and a background thread bulk-inserts the buffer every AUDIT_FLUSH_MS
+# milliseconds, or as soon as it holds AUDIT_FLUSH_EVENTS events. Whatever
+# is left is written at exit. Writes through QuerySet.update() send no
+# signals and are not audited.
+
+AUDITED_MODELS = [ProductAsset, ProductConfiguration, Customer, Rental, Repair, Supplier]
+
+# URL names of the per-object history pages
+HISTORY_MODELS = {'asset': ProductAsset, 'customer': Customer, 'rental': Rental}
+
+# Left out when comparing two versions of a row
+UNCOMPARED_FIELDS = {'edited_at', 'edited_by_id'}
+
+log = logging.getLogger(__name__)
+
+
+def flush_size():
+    return getattr(settings, 'AUDIT_FLUSH_EVENTS', 100)
+
+
+def flush_interval():
+    return getattr(settings, 'AUDIT_FLUSH_MS', 1000) / 1000
+
+
+class AuditBuffer:
+    def __init__(self):
+        self._events = []
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+        self._pid = None
+        self._stopping = False
+
+    def add(self, event):
+        with self._lock:
+            self._events.append(event)
+            full = len(self._events) >= flush_size()
+        self.start()
+        if full:
+            self._wake.set()
+
+    def flush(self):
+        """Write every buffered event in one bulk insert; returns how many."""
+        with self._lock:
+            events, self._events = self._events, []
+        if not events:
+            return 0
+        try:
+            AuditEvent.objects.bulk_create(events, batch_size=500)
+        except DatabaseError:
+            log.exception("Dropped %d audit events", len(events))
+            return 0
+        return len(events)
+
+    def _run(self):
+        while True:
+            self._wake.wait(flush_interval())
+            self._wake.clear()
+            if self._stopping:
+                return  # stop() writes the rest on its own thread
+            close_old_connections()
+            self.flush()
+
+    def start(self):
+        """Start this process's flushing thread, if it is not running yet."""
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid():
+                return
+            # A thread inherited through fork is not running; replace it
+            self._stopping = False
+            self._thread = threading.Thread(target=self._run, name='audit-flush', daemon=True)
+            self._pid = os.getpid()
+            self._thread.start()
+
+    def stop(self):
+        """Stop the flushing thread and write what is left."""
+        with self._lock:
+            thread, running = self._thread, self._pid == os.getpid()
+            self._thread = self._pid = None
+            self._stopping = True
+        if thread is not None and running:
+            self._wake.set()
+            thread.join()
+        self.flush()
+
+
+buffer = AuditBuffer()
+atexit.register(buffer.stop)
+
+
+# -----------------------------
+# Recording events
+# -----------------------------
+
+def record(table, object_id, event, user_id=None, description='', data=None):
+    """Queue one event; it is buffered when the current transaction commits, dropped if it rolls back."""
+    entry = AuditEvent(
+        table=table, object_id=object_id, event=event, user_id=user_id,
+        description=description[:255], data=data, created_at=timezone.now(),
+    )
+    transaction.on_commit(lambda: buffer.add(entry))
+
+
+def record_action(user, description, obj_type, obj_id=None):
+    """Event for a log_action() call; `obj_type` is a model name of this app or a free label."""
+    try:
+        table = table_key(apps.get_model('rentals', obj_type))
+    except LookupError:
+        table = obj_type
+    record(table, obj_id, 'action', user_id=getattr(user, 'pk', None), description=description)
+
+
+def snapshot(instance):
+    return {field.attname: field.value_from_object(instance) for field in instance._meta.concrete_fields}
+
+
+def _row_saved(sender, instance, created, raw=False, **kwargs):
+    if not raw:
+        record(
+            table_key(sender), instance.pk, 'create' if created else 'update',
+            user_id=getattr(instance, 'edited_by_id', None), data=snapshot(instance),
+        )
+
+
+def _row_deleted(sender, instance, **kwargs):
+    record(table_key(sender), instance.pk, 'delete', data=snapshot(instance))
+
+
+def connect_signals():
+    for model in AUDITED_MODELS:
+        post_save.connect(_row_saved, sender=model, dispatch_uid=f'audit-save-{table_key(model)}')
+        post_delete.connect(_row_deleted, sender=model, dispatch_uid=f'audit-delete-{table_key(model)}')
+
+
+# -----------------------------
+# Reading history
+# -----------------------------
+
+def history(model, pk):
+    """Events of one row, newest first."""
+    return (
+        AuditEvent.objects.filter(table=table_key(model), object_id=pk)
+        .select_related('user').order_by('-created_at', '-id')
+    )
+
+
+def add_changes(events, model, pk):
+    """
+    Set `changes` ([{field, old, new}]) on every write among `events` (one
+    page of history(), newest first), comparing it with the write before
+    it. Costs one query, for the write preceding the page.
+    """
+    writes = [event for event in events if event.data is not None]
+    for event in events:
+        event.changes = []
+    if not writes:
+        return events
+
+    oldest = writes[-1]
+    before = (
+        history(model, pk).filter(data__isnull=False)
+        .filter(Q(created_at__lt=oldest.created_at) | Q(created_at=oldest.created_at, id__lt=oldest.id))
+        .values_list('data', flat=True).first()
+    )
+    for event in reversed(writes):
+        if before is not None and event.event == 'update':
+            event.changes = [
+                {'field': field, 'old': before.get(field), 'new': value}
+                for field, value in event.data.items()
+                if field not in UNCOMPARED_FIELDS and before.get(field) != value
+            ]
+        before = event.data
+    return events
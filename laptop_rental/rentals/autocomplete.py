@@ -0,0 +1,154 @@
+import heapq
+import threading
+from bisect import bisect_left, bisect_right
+from collections import Counter, OrderedDict, namedtuple
+
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save
+
+from .models import Customer, ProductAsset, Rental
+from .search import query_terms, tokenize
+from .sync import table_key, table_versions
+
+# -----------------------------
+# In-memory autocomplete
+# -----------------------------
+# The add-rental form asks for suggestions on every keystroke. Each source
+# keeps its candidates in process memory as a sorted word list (prefix
+# lookup by bisect) and remembers recent answers in an LRU cache, so a
+# keystroke costs one lookup of the table versions (rentals/sync.py) and
+# no scan. Saves and deletes in this process drop the index at once; the
+# version check catches writes made by other processes.
+
+Suggestion = namedtuple('Suggestion', ['pk', 'label'])
+
+AUTOCOMPLETE_LIMIT = 100  # suggestions per query; the widget pages through them
+
+
+def cache_size():
+    return getattr(settings, 'AUTOCOMPLETE_CACHE_SIZE', 512)
+
+
+class PrefixIndex:
+    """Candidates of one source with their words, sorted for prefix lookup."""
+
+    def __init__(self, entries):
+        # entries: [(pk, label, words)] in default display order
+        self.suggestions = [Suggestion(pk, label) for pk, label, _ in entries]
+        self.position = {pk: i for i, (pk, _, _) in enumerate(entries)}
+        pairs = sorted((word, pk) for pk, _, words in entries for word in words)
+        self.keys = [word for word, _ in pairs]
+        self.pks = [pk for _, pk in pairs]
+        self.by_pk = {suggestion.pk: suggestion for suggestion in self.suggestions}
+
+    def prefixed(self, term):
+        lo = bisect_left(self.keys, term)
+        return self.pks[lo:bisect_left(self.keys, term + '\uffff', lo)]
+
+    def exact(self, term):
+        lo = bisect_left(self.keys, term)
+        return self.pks[lo:bisect_right(self.keys, term, lo)]
+
+    def query(self, terms, limit):
+        """Candidates with a word starting with every term; exact words first, then display order."""
+        if not terms:
+            return self.suggestions[:limit]
+        found = sorted((set(self.prefixed(term)) for term in terms), key=len)
+        matches = found[0].intersection(*found[1:])
+        if not matches:
+            return []
+
+        rank = Counter()
+        for term in terms:
+            rank.update(pk for pk in self.exact(term) if pk in matches)
+        # Only the first `limit` are needed: best rank first, display order within a rank
+        picked = []
+        for level in range(len(terms), -1, -1):
+            members = [pk for pk in matches if rank[pk] == level]
+            picked += heapq.nsmallest(limit - len(picked), members, key=self.position.__getitem__)
+            if len(picked) >= limit:
+                break
+        return [self.by_pk[pk] for pk in picked]
+
+
+class AutocompleteSource:
+    def __init__(self, name, models, load):
+        self.name = name
+        self.models = models
+        self.load = load  # () -> [(pk, label, words)]
+        self._lock = threading.Lock()
+        self._index = None
+        self._versions = None
+        self._cache = OrderedDict()
+
+    def invalidate(self, **kwargs):
+        with self._lock:
+            self._index = None
+            self._cache.clear()
+
+    def _current_index(self):
+        versions = table_versions([table_key(model) for model in self.models])
+        with self._lock:
+            if self._index is not None and versions == self._versions:
+                return self._index
+        index = PrefixIndex(self.load())
+        with self._lock:
+            self._index, self._versions = index, versions
+            self._cache.clear()
+        return index
+
+    def suggest(self, query, limit=AUTOCOMPLETE_LIMIT):
+        index = self._current_index()
+        key = (tuple(query_terms(query)), limit)
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return self._cache[key]
+        result = index.query(key[0], limit)
+        with self._lock:
+            self._cache[key] = result
+            while len(self._cache) > cache_size():
+                self._cache.popitem(last=False)
+        return result
+
+
+def _words(*values):
+    words = set()
+    for value in values:
+        words |= tokenize(value)
+    return words
+
+
+def _load_rentable_assets():
+    """Working assets without an ongoing or overdue rental."""
+    rented = Rental.objects.filter(status__in=['ongoing', 'overdue'], asset__isnull=False).values('asset_id')
+    rows = (
+        ProductAsset.objects.filter(condition_status='working').exclude(id__in=rented)
+        .order_by('asset_id', 'pk').values_list('pk', 'asset_id', 'brand', 'model_no', 'serial_no')
+    )
+    return [
+        (pk, f"{asset_id} - {brand} {model_no}", _words(asset_id, brand, model_no, serial_no))
+        for pk, asset_id, brand, model_no, serial_no in rows
+    ]
+
+
+def _load_customers():
+    rows = Customer.objects.order_by('name', 'pk').values_list(
+        'pk', 'name', 'phone_number_primary', 'phone_number_secondary', 'email',
+    )
+    return [
+        (pk, f"{name} - {phone}", _words(name, phone, other_phone, email))
+        for pk, name, phone, other_phone, email in rows
+    ]
+
+
+rentable_assets = AutocompleteSource('assets', [ProductAsset, Rental], _load_rentable_assets)
+customers = AutocompleteSource('customers', [Customer], _load_customers)
+
+
+def connect_signals():
+    for source in (rentable_assets, customers):
+        for model in source.models:
+            uid = f'autocomplete-{source.name}-{table_key(model)}'
+            post_save.connect(source.invalidate, sender=model, weak=False, dispatch_uid=uid + '-save')
+            post_delete.connect(source.invalidate, sender=model, weak=False, dispatch_uid=uid + '-delete')
@@ -0,0 +1,225 @@
+import os
+import time
+import traceback
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.db import close_old_connections, connections
+from django.db.models import Q
+from django.utils import timezone
+
+from .exports import EXPORT_DATASETS, export_columns, iter_export_rows
+from .models import ExportJob
+
+ARTIFACT_NAMES = {
+    'xlsx': 'full_report.xlsx',
+    'pdf': 'full_report.pdf',
+}
+
+# A running job's worker touches heartbeat_at at least this often (and on
+# every progress update) ...
+HEARTBEAT_INTERVAL = timedelta(seconds=30)
+# ... so a job whose heartbeat is older than this has lost its worker
+STALE_HEARTBEAT_AFTER = timedelta(minutes=10)
+
+
+def artifact_dir():
+    path = Path(getattr(settings, 'EXPORT_ARTIFACT_DIR', Path(settings.BASE_DIR) / 'exports'))
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def artifact_path(job):
+    return artifact_dir() / job.file_name if job.file_name else None
+
+
+# -----------------------------
+# Queue
+# -----------------------------
+
+def enqueue_export(export_format, user=None):
+    if export_format not in ARTIFACT_NAMES:
+        raise ValueError(f"Unsupported export format '{export_format}'.")
+    return ExportJob.objects.create(format=export_format, requested_by=user)
+
+
+def claim_jobs(limit):
+    """
+    Move up to `limit` queued jobs to running and return their ids.
+    The conditional UPDATE makes each claim atomic, so two workers never
+    pick up the same job.
+    """
+    claimed = []
+    if limit <= 0:
+        return claimed
+    candidates = ExportJob.objects.filter(status='queued').order_by('created_at').values_list('pk', flat=True)
+    for pk in list(candidates[:limit]):
+        now = timezone.now()
+        if ExportJob.objects.filter(pk=pk, status='queued').update(
+            status='running', progress=0, started_at=now, heartbeat_at=now, error='',
+        ):
+            claimed.append(pk)
+    return claimed
+
+
+def requeue_stale_jobs(now=None):
+    """Put running jobs whose worker stopped sending heartbeats back in the queue."""
+    cutoff = (now or timezone.now()) - STALE_HEARTBEAT_AFTER
+    stale = Q(heartbeat_at__lt=cutoff) | Q(heartbeat_at__isnull=True, started_at__lt=cutoff)
+    return ExportJob.objects.filter(stale, status='running').update(
+        status='queued', progress=0, heartbeat_at=None,
+    )
+
+
+def purge_expired_exports(now=None):
+    """Delete finished jobs (and their files) older than EXPORT_RETENTION_DAYS."""
+    now = now or timezone.now()
+    cutoff = now - timedelta(days=getattr(settings, 'EXPORT_RETENTION_DAYS', 7))
+    expired = ExportJob.objects.filter(status__in=['done', 'failed'], finished_at__lt=cutoff)
+    removed = 0
+    for job in expired:
+        path = artifact_path(job)
+        if path and path.exists():
+            path.unlink()
+        job.delete()
+        removed += 1
+    return removed
+
+
+# -----------------------------
+# Worker side
+# -----------------------------
+
+def init_export_worker():
+    """ProcessPoolExecutor initializer: each process opens its own DB connections."""
+    import django
+    django.setup()
+    connections.close_all()
+
+
+def _set_progress(job_id, done, total):
+    ExportJob.objects.filter(pk=job_id).update(
+        progress=int(done * 100 / max(total, 1)), heartbeat_at=timezone.now(),
+    )
+
+
+def _with_heartbeat(job_id, rows):
+    """Yield `rows`, touching the job's heartbeat every HEARTBEAT_INTERVAL."""
+    interval = HEARTBEAT_INTERVAL.total_seconds()
+    last_beat = time.monotonic()
+    for row in rows:
+        yield row
+        if time.monotonic() - last_beat >= interval:
+            ExportJob.objects.filter(pk=job_id).update(heartbeat_at=timezone.now())
+            last_beat = time.monotonic()
+
+
+def _write_xlsx(job_id, path):
+    from openpyxl import Workbook
+
+    # write_only keeps one row in memory at a time
+    workbook = Workbook(write_only=True)
+    for index, (_, sheet_name, _, model) in enumerate(EXPORT_DATASETS, start=1):
+        sheet = None
+        for row in _with_heartbeat(job_id, iter_export_rows(model)):
+            if sheet is None:
+                sheet = workbook.create_sheet(sheet_name[:30])
+                sheet.append([header for header, _ in export_columns(model)])
+            sheet.append(row)
+        _set_progress(job_id, index, len(EXPORT_DATASETS) + 1)
+    if not workbook.worksheets:
+        workbook.create_sheet('Empty').append(['No data available'])
+    workbook.save(path)
+
+
+def _write_pdf(job_id, path):
+    from reportlab.lib import colors
+    from reportlab.lib.pagesizes import A4, landscape
+    from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
+    from reportlab.lib.units import inch
+    from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
+
+    # Use landscape orientation for more horizontal space
+    doc = SimpleDocTemplate(str(path), pagesize=landscape(A4),
+                            leftMargin=20, rightMargin=20,
+                            topMargin=30, bottomMargin=30)
+    elements = []
+    styles = getSampleStyleSheet()
+    title_style = ParagraphStyle(
+        'SectionTitle',
+        parent=styles['Heading2'],
+        spaceAfter=10,
+        textColor=colors.HexColor("#2E3A59")
+    )
+    normal_style = ParagraphStyle(
+        'NormalSmall',
+        parent=styles['Normal'],
+        fontSize=8,
+        leading=10,
+    )
+    table_style = TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor("#E0E0E0")),
+        ('GRID', (0, 0), (-1, -1), 0.25, colors.grey),
+        ('FONT', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, -1), 8),
+        ('WORDWRAP', (0, 0), (-1, -1), True),
+        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+        ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+    ])
+
+    for index, (_, _, title, model) in enumerate(EXPORT_DATASETS, start=1):
+        elements.append(Paragraph(title, title_style))
+        elements.append(Spacer(1, 4))
+
+        headers = [header for header, _ in export_columns(model)]
+        table_data = [headers]
+        for row in _with_heartbeat(job_id, iter_export_rows(model)):
+            table_data.append([Paragraph(str(value if value is not None else ""), normal_style) for value in row])
+
+        if len(table_data) == 1:
+            elements.append(Paragraph("No data available", normal_style))
+            elements.append(Spacer(1, 12))
+        else:
+            # Adjust column widths to the landscape A4 usable width
+            col_width = 10.5 * inch / max(1, len(headers))
+            table = Table(table_data, colWidths=[col_width] * len(headers), repeatRows=1)
+            table.setStyle(table_style)
+            elements.append(table)
+            elements.append(Spacer(1, 16))
+        _set_progress(job_id, index, len(EXPORT_DATASETS) + 1)
+
+    doc.build(elements)
+
+
+WRITERS = {
+    'xlsx': _write_xlsx,
+    'pdf': _write_pdf,
+}
+
+
+def run_export_job(job_id):
+    """
+    Generate the artifact for one claimed job. Runs inside a worker process;
+    failures are recorded on the job rather than raised.
+    """
+    close_old_connections()
+    job = ExportJob.objects.get(pk=job_id)
+    file_name = f"export-{job.pk}-{ARTIFACT_NAMES[job.format]}"
+    final_path = artifact_dir() / file_name
+    partial_path = final_path.with_suffix(final_path.suffix + '.part')
+    try:
+        WRITERS[job.format](job.pk, partial_path)
+        os.replace(partial_path, final_path)
+    except Exception:
+        if partial_path.exists():
+            partial_path.unlink()
+        ExportJob.objects.filter(pk=job.pk).update(
+            status='failed', error=traceback.format_exc(limit=5), finished_at=timezone.now(),
+        )
+        return 'failed'
+
+    ExportJob.objects.filter(pk=job.pk).update(
+        status='done', progress=100, file_name=file_name, finished_at=timezone.now(),
+    )
+    return 'done'
@@ -76,6 +76,7 @@ from django import forms
 from django.core.exceptions import ValidationError
 from django.utils.timezone import now
 from .models import ProductAsset, PendingProduct
+from .asset_ids import asset_id_in_use, format_asset_id
 
 class ProductAssetForm(forms.ModelForm):
     class Meta:
@@ -144,40 +145,13 @@ class ProductAssetForm(forms.ModelForm):
     def clean(self):
         cleaned = super().clean()
 
-        # 1️⃣ Handle asset_id generation only if missing
-        if not cleaned.get('asset_id'):
+        # 1️⃣ Explicit asset_number: check it is free. The ID itself is
+        # allocated under the year lock in ProductAsset/PendingProduct.save().
+        if not cleaned.get('asset_id') and cleaned.get('asset_number'):
             year = cleaned['purchase_date'].year if cleaned.get('purchase_date') else now().year
-            prefix = f"Pixel/{year}/"
-
-            # Gather existing IDs from both ProductAsset and PendingProduct
-            existing_ids = list(ProductAsset.objects.filter(asset_id__startswith=prefix).values_list('asset_id', flat=True)) + \
-                           list(PendingProduct.objects.filter(asset_id__startswith=prefix).values_list('asset_id', flat=True))
-
-            # Check if user manually entered asset_number
-            manual_number = cleaned.get('asset_number')
-
-            if manual_number:  # ✅ Use provided asset_number directly
-                suffix = str(manual_number).zfill(3)
-                new_id = f"{prefix}{suffix}"
-
-                if new_id in existing_ids:
-                    self.add_error('asset_number', "⚠️ This Asset Number already exists for the selected year.")
-                else:
-                    cleaned['asset_id'] = new_id
-                    self.instance.asset_id = new_id
-                    self.instance.asset_number = manual_number
-            else:
-                # Auto-generate asset_number and asset_id if none given
-                number = 1
-                while True:
-                    suffix = str(number).zfill(3)
-                    new_id = f"{prefix}{suffix}"
-                    if new_id not in existing_ids:
-                        cleaned['asset_id'] = new_id
-                        self.instance.asset_id = new_id
-                        self.instance.asset_number = number
-                        break
-                    number += 1
+            new_id = format_asset_id(year, cleaned['asset_number'], cleaned.get('asset_suffix'))
+            if asset_id_in_use(new_id, exclude_product=self.instance.pk):
+                self.add_error('asset_number', "⚠️ This Asset Number already exists for the selected year.")
 
         # 2️⃣ Validate based on condition_status
         condition = cleaned.get("condition_status")
@@ -0,0 +1,185 @@
+import hashlib
+
+import pandas as pd
+
+from django.db import connection
+from django.utils import timezone
+
+from .importing import (
+    CUSTOMER_COLUMNS, IMPORT_BATCH_SIZE, IMPORT_SHEET_ORDER, OPTION_SHEETS, PRODUCT_COLUMNS,
+    RENTAL_COLUMNS, REPAIR_COLUMNS, SHEET_ALIASES, sheet_column,
+)
+from .models import ImportJournalEntry, ImportRun
+
+# Columns that identify a row of a sheet, as alias tuples. A later version
+# of the row replaces the journal entry of the earlier one. Sheets without a
+# natural key (pending rows, configurations) are keyed by the row content,
+# so an identical row is recognised and anything else counts as new.
+JOURNAL_KEYS = {
+    'AssetTypes': [('name', 'type_of_asset', 'Type of Asset')],
+    **{sheet: [('name',)] for sheet, _ in OPTION_SHEETS},
+    'Suppliers': [('name', 'supplier', 'supplier_name')],
+    'Customers': [CUSTOMER_COLUMNS['name']],
+    'Products': [PRODUCT_COLUMNS['asset_id']],
+    'Rentals': [RENTAL_COLUMNS['customer'], RENTAL_COLUMNS['asset']],
+    'Repairs': [REPAIR_COLUMNS['asset'], REPAIR_COLUMNS['name']],
+}
+
+
+def file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as handle:
+        for block in iter(lambda: handle.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+# -----------------------------
+# Row hashes
+# -----------------------------
+# pd.util.hash_pandas_object hashes a whole frame in one vectorized pass and
+# is stable between runs. The header is folded in so a renamed column
+# changes every row.
+
+def _hex(values):
+    return [f"{int(value):016x}" for value in values]
+
+
+def _fold(first, second):
+    return f"{(int(first, 16) * 31 + int(second, 16)) & 0xFFFFFFFFFFFFFFFF:016x}"
+
+
+def row_hashes(df):
+    """Content hash of every row of `df`, as 16 hex digits."""
+    columns = sorted(df.columns, key=str)
+    header = int(hashlib.sha1('\x1f'.join(map(str, columns)).encode()).hexdigest()[:16], 16)
+    hashes = pd.util.hash_pandas_object(df[columns].astype(object), index=False)
+    return _hex(hashes.to_numpy() ^ header)
+
+
+def row_keys(sheet, df, hashes):
+    """Journal key of every row: its natural key when the sheet has one and the row fills it, else its content hash."""
+    key_columns = JOURNAL_KEYS.get(sheet)
+    if not key_columns:
+        return list(hashes)
+    parts = [
+        pd.Series(sheet_column(df, *keys), dtype=object).map(lambda value: None if value is None else str(value).strip())
+        for keys in key_columns
+    ]
+    blank = pd.concat([part.isna() | (part == '') for part in parts], axis=1).any(axis=1)
+    joined = parts[0].fillna('')
+    for part in parts[1:]:
+        joined = joined + '\x1f' + part.fillna('')
+    keys = _hex(pd.util.hash_pandas_object(joined, index=False).to_numpy())
+    return [content if missing else key for key, content, missing in zip(keys, hashes, blank)]
+
+
+# -----------------------------
+# Journal
+# -----------------------------
+
+class ImportJournal:
+    """
+    What earlier imports already wrote, for BulkImporter.
+
+    Every committed batch records the content hash of its rows per sheet and
+    row key, in the same transaction as the rows themselves, and moves the
+    ImportRun checkpoint forward. A later import of the same file after a
+    failure skips what was committed before; any import skips rows whose
+    content is unchanged. `full=True` re-imports every row.
+    """
+
+    def __init__(self, path, full=False, batch_size=IMPORT_BATCH_SIZE):
+        self.path = path
+        self.full = full
+        self.batch_size = batch_size
+        self.file_hash = file_digest(path)
+        self.run = None
+        self.resumed = False
+        self.known = {}
+
+    def start(self, record=True):
+        """Resume the last run of this file if it did not finish, else start a new run (unless `record` is off)."""
+        previous = ImportRun.objects.filter(file_hash=self.file_hash).order_by('-started_at', '-pk').first()
+        if previous and previous.status != 'done' and not self.full:
+            self.run, self.resumed = previous, True
+            if record:
+                ImportRun.objects.filter(pk=previous.pk).update(status='running', finished_at=None)
+        elif record:
+            self.run = ImportRun.objects.create(file_name=str(self.path)[:255], file_hash=self.file_hash)
+        return self.run
+
+    def finish(self, status='done'):
+        if self.run is not None and self.run.pk:
+            ImportRun.objects.filter(pk=self.run.pk).update(status=status, finished_at=timezone.now())
+
+    @property
+    def needs_refresh(self):
+        """Whether a resumed run left live rows behind without refreshing the ledger and reports."""
+        return self.resumed and self.run.needs_refresh
+
+    def _committed(self, sheet, start, count):
+        """How many of the `count` rows starting at `start` the resumed run already committed."""
+        if not self.resumed or not self.run.sheet:
+            return 0
+        order = {name: position for position, name in enumerate(IMPORT_SHEET_ORDER)}
+        done_at = order.get(SHEET_ALIASES.get(self.run.sheet, self.run.sheet), -1)
+        here = order.get(sheet, len(order))
+        if here < done_at:
+            return count
+        if here == done_at:
+            return min(max(self.run.rows_done - start, 0), count)
+        return 0
+
+    def _known(self, sheet):
+        if sheet not in self.known:
+            self.known[sheet] = dict(
+                ImportJournalEntry.objects.filter(sheet=sheet).values_list('row_key', 'content_hash')
+            )
+        return self.known[sheet]
+
+    def pending(self, sheet, df, start=0):
+        """
+        Split a chunk starting at row `start` of `sheet` into what still has
+        to be imported. Returns (rows to import, {row key: content hash} to
+        record once they are written, number of rows skipped).
+        """
+        committed = self._committed(sheet, start, len(df))
+        if committed:
+            df = df.iloc[committed:]
+        if df.empty:
+            return df, {}, committed
+
+        hashes = row_hashes(df)
+        keys = row_keys(sheet, df, hashes)
+        combined = {}
+        for key, content in zip(keys, hashes):
+            # Several rows for one key (later ones override fields) are one entry
+            combined[key] = _fold(combined[key], content) if key in combined else content
+
+        known = {} if self.full else self._known(sheet)
+        changed = {key: content for key, content in combined.items() if known.get(key) != content}
+        keep = [key in changed for key in keys]
+        return df[keep], changed, committed + keep.count(False)
+
+    def record(self, sheet, entries, rows_done, live_rows_written=False):
+        """Store the hashes of a written batch and move the checkpoint; call inside the batch's transaction."""
+        if entries:
+            now = timezone.now()
+            objs = [
+                ImportJournalEntry(sheet=sheet, row_key=key, content_hash=content, imported_at=now)
+                for key, content in entries.items()
+            ]
+            # MySQL upserts on any unique key and does not take unique_fields
+            unique_fields = ['sheet', 'row_key'] if connection.features.supports_update_conflicts_with_target else None
+            ImportJournalEntry.objects.bulk_create(
+                objs, batch_size=self.batch_size, update_conflicts=True,
+                unique_fields=unique_fields, update_fields=['content_hash', 'imported_at'],
+            )
+            self._known(sheet).update(entries)
+        if self.run is not None and self.run.pk:
+            self.run.sheet, self.run.rows_done = sheet, rows_done
+            self.run.needs_refresh = self.run.needs_refresh or live_rows_written
+            ImportRun.objects.filter(pk=self.run.pk).update(
+                sheet=sheet, rows_done=rows_done, needs_refresh=self.run.needs_refresh,
+            )
@@ -0,0 +1,1297 @@
+from collections import Counter, defaultdict
+from datetime import date, datetime
+from functools import lru_cache, wraps
+from itertools import groupby
+
+import pandas as pd
+
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.db import DataError, IntegrityError, transaction
+from django.utils import timezone
+
+from .asset_ids import lock_asset_years, parse_asset_id
+from .models import (
+    AssetType, CPUOption, Customer, DisplaySizeOption, GraphicsOption, HDDOption,
+    PendingProduct, PendingProductConfiguration, PendingRental, PendingRepair,
+    ProductAsset, ProductConfiguration, RAMOption, Rental, Repair, Supplier,
+)
+from .reporting import rebuild_report_snapshots
+from .revenue import LEDGER_BATCH_SIZE, _reconcile_ledger, extend_revenue_ledger, refresh_asset_revenue
+from .search import SEARCH_FIELDS, rebuild_index
+from .status import refresh_contract_alerts
+from .sync import TRACKED_MODELS, record_changes
+
+User = get_user_model()
+
+IMPORT_BATCH_SIZE = 1000
+
+OPTION_SHEETS = [
+    ('CPUOptions', CPUOption),
+    ('RAMOptions', RAMOption),
+    ('HDDOptions', HDDOption),
+    ('GraphicsOptions', GraphicsOption),
+    ('DisplaySizeOptions', DisplaySizeOption),
+]
+
+# Dependency order: lookups before the rows that point at them
+IMPORT_SHEET_ORDER = [
+    'AssetTypes', *[sheet for sheet, _ in OPTION_SHEETS],
+    'Suppliers', 'Customers',
+    'Products', 'Pending_Products',
+    'Configurations', 'Pending_Configurations',
+    'Rentals', 'Pending_Rentals', 'PendingRentals',
+    'Repairs', 'Pending_Repairs',
+]
+
+SHEET_ALIASES = {'PendingRentals': 'Pending_Rentals'}
+
+
+# -----------------------------
+# Cell parsing
+# -----------------------------
+
+# Tried in this order; the first one that fits wins
+DATE_FORMATS = ("%Y-%m-%d", "%d-%m-%Y", "%d/%m/%Y", "%m/%d/%Y", "%Y/%m/%d", "%d %b %Y", "%d %B %Y")
+DATETIME_FORMATS = (
+    "%Y-%m-%d %H:%M:%S", "%Y-%m-%dT%H:%M:%S", "%Y-%m-%d %H:%M:%S.%f", "%Y-%m-%dT%H:%M:%S.%f",
+    "%d-%m-%Y %H:%M:%S", "%d/%m/%Y %H:%M:%S",
+)
+
+BLANK_STRINGS = ("", "nan", "nat", "none")
+
+PARSE_CACHE_SIZE = 4096
+
+
+def _memoized(parser):
+    """Cache `parser` by raw value; unhashable cells are parsed every time."""
+    cached = lru_cache(maxsize=PARSE_CACHE_SIZE)(parser)
+
+    @wraps(parser)
+    def wrapper(raw):
+        try:
+            return cached(raw)
+        except TypeError:
+            return parser(raw)
+    return wrapper
+
+
+@_memoized
+def parse_date(raw):
+    """Return date object or None. Accepts date, datetime, or many string formats."""
+    if raw is None:
+        return None
+    if isinstance(raw, date) and not isinstance(raw, datetime):
+        return raw
+    if isinstance(raw, datetime):
+        return raw.date()
+    s = str(raw).strip()
+    if s.lower() in BLANK_STRINGS:
+        return None
+    # try several formats
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(s, fmt).date()
+        except Exception:
+            pass
+    # try pandas parsing
+    try:
+        parsed = pd.to_datetime(s, errors="coerce")
+        if pd.isna(parsed):
+            return None
+        return parsed.date()
+    except Exception:
+        return None
+
+
+@_memoized
+def parse_datetime(raw):
+    """Return datetime or None."""
+    if raw is None:
+        return None
+    if isinstance(raw, datetime):
+        return raw
+    s = str(raw).strip()
+    if s.lower() in BLANK_STRINGS:
+        return None
+    for fmt in DATETIME_FORMATS:
+        try:
+            return datetime.strptime(s, fmt)
+        except Exception:
+            pass
+    try:
+        parsed = pd.to_datetime(s, errors="coerce")
+        if pd.isna(parsed):
+            return None
+        return parsed.to_pydatetime()
+    except Exception:
+        return None
+
+
+def parse_timestamp(raw):
+    """Datetime, or a date at midnight, or None."""
+    parsed = parse_datetime(raw)
+    if parsed:
+        return parsed
+    day = parse_date(raw)
+    return datetime.combine(day, datetime.min.time()) if day else None
+
+
+def parse_decimal(raw):
+    if raw is None:
+        return None
+    try:
+        return float(raw)
+    except Exception:
+        return None
+
+
+# -----------------------------
+# Column parsing
+# -----------------------------
+# Dates and amounts are parsed a column at a time. Each distinct raw value is
+# parsed once; the strings of a date column are converted by a single
+# pd.to_datetime call in the format that fits a sample of them, amounts by a
+# single pd.to_numeric call, and only what those leave over goes through the
+# cell parser. A column therefore reads "01/02/2024" the same way on every
+# row. Values that are present but still unparseable are counted, so the
+# caller can report them per column rather than per row.
+
+FORMAT_SAMPLE_SIZE = 50
+
+
+def detect_date_format(strings, formats=DATE_FORMATS, sample_size=FORMAT_SAMPLE_SIZE):
+    """The entry of `formats` that parses the most of a sample of `strings` (earliest on a tie), or None."""
+    sample = pd.Series(list(strings)[:sample_size], dtype=object)
+    best, best_count = None, 0
+    for fmt in formats:
+        count = int(pd.to_datetime(sample, format=fmt, errors="coerce").notna().sum())
+        if count > best_count:
+            best, best_count = fmt, count
+        if count == len(sample):
+            break
+    return best
+
+
+def _parse_distinct_dates(values, scalar, formats, convert):
+    """{raw value: parsed} for the distinct values of a date column, and the raw values that were blank."""
+    parsed, blank, strings = {}, set(), {}
+    for value in set(values):
+        if value is None:
+            continue
+        if not isinstance(value, str):
+            parsed[value] = scalar(value)  # datetimes, and numbers the cell parser rejects anyway
+            continue
+        text = value.strip()
+        if text.lower() in BLANK_STRINGS:
+            parsed[value] = None
+            blank.add(value)
+        else:
+            strings[value] = text
+
+    if strings:
+        fmt = detect_date_format(strings.values(), formats)
+        if fmt:
+            stamps = pd.to_datetime(pd.Series(list(strings.values()), dtype=object), format=fmt, errors="coerce")
+        else:
+            stamps = [pd.NaT] * len(strings)
+        for raw, stamp in zip(strings, stamps):
+            parsed[raw] = scalar(raw) if pd.isna(stamp) else convert(stamp)
+    return parsed, blank
+
+
+def _map_column(values, parsed, blank=()):
+    result = [None if value is None else parsed[value] for value in values]
+    failures = sum(1 for value, out in zip(values, result) if value is not None and out is None and value not in blank)
+    return result, failures
+
+
+def parse_date_column(values, formats=DATE_FORMATS, fallback=parse_date):
+    """
+    (dates, failure count) for a column of raw cells. Strings are matched
+    against `formats`; everything else, and strings no format fits, goes
+    through the cell parser `fallback`.
+    """
+    parsed, blank = _parse_distinct_dates(values, fallback, formats, lambda stamp: stamp.date())
+    return _map_column(values, parsed, blank)
+
+
+def parse_timestamp_column(values):
+    """(datetimes, failure count); date-only strings land at midnight, as in parse_timestamp."""
+    parsed, blank = _parse_distinct_dates(
+        values, parse_timestamp, DATETIME_FORMATS + DATE_FORMATS, lambda stamp: stamp.to_pydatetime(),
+    )
+    return _map_column(values, parsed, blank)
+
+
+def parse_decimal_column(values):
+    """(floats, failure count) for a column of raw cells."""
+    distinct = list({value for value in values if value is not None})
+    numbers = pd.to_numeric(pd.Series(distinct, dtype=object), errors="coerce")
+    parsed = {
+        raw: parse_decimal(raw) if pd.isna(number) else float(number)
+        for raw, number in zip(distinct, numbers)
+    }
+    return _map_column(values, parsed)
+
+
+COLUMN_PARSERS = {
+    parse_date: parse_date_column,
+    parse_timestamp: parse_timestamp_column,
+    parse_decimal: parse_decimal_column,
+}
+
+
+# -----------------------------
+# Column access
+# -----------------------------
+# A sheet is read column by column: each field is the first non-blank value
+# among its alias columns (same rule as import_all_data.try_get), and parsed
+# columns go through parse_column().
+
+def sheet_column(df, *keys):
+    """One list per sheet column, coalescing the alias columns `keys`; blanks become None."""
+    column = pd.Series([None] * len(df), index=df.index, dtype=object)
+    for key in reversed(keys):
+        if key not in df.columns:
+            continue
+        values = df[key].astype(object)
+        present = values.notna() & (values.astype(str).str.strip() != "")
+        column = values.where(present, column)
+    return column.tolist()
+
+
+def parse_column(values, parser):
+    """
+    (parsed values, failure count) for a column. Parsers with a column
+    version in COLUMN_PARSERS use it; any other parser runs once per
+    distinct raw value, and a None result counts as a failure.
+    """
+    if parser in COLUMN_PARSERS:
+        return COLUMN_PARSERS[parser](values)
+    parsed = {}
+    result = []
+    for value in values:
+        if value is None:
+            result.append(None)
+            continue
+        try:
+            if value not in parsed:
+                parsed[value] = parser(value)
+            result.append(parsed[value])
+        except TypeError:  # unhashable cell
+            result.append(parser(value))
+    failures = sum(1 for value, out in zip(values, result) if value is not None and out is None)
+    return result, failures
+
+
+def sheet_rows(df, columns, parsers=None, failures=None):
+    """
+    Dicts of {field: value} for every row of `df`. `columns` maps field
+    names to alias tuples, `parsers` maps field names to cell parsers.
+    Unparseable values are counted per field into the `failures` Counter.
+    """
+    parsers = parsers or {}
+    data = {}
+    for field, keys in columns.items():
+        values = sheet_column(df, *keys)
+        if field in parsers:
+            values, failed = parse_column(values, parsers[field])
+            if failed and failures is not None:
+                failures[field] += failed
+        data[field] = values
+    fields = list(data)
+    for values in zip(*data.values()):
+        yield dict(zip(fields, values))
+
+
+def _clean(value):
+    return str(value).strip() if value is not None else None
+
+
+def _present(values):
+    """Drop None values, like the `defaults` pruning in the row-by-row importer."""
+    return {k: v for k, v in values.items() if v is not None}
+
+
+def _comparable_fields(model):
+    """Fields an import sets: everything but the primary key and automatic timestamps."""
+    return [
+        field for field in model._meta.concrete_fields
+        if not field.primary_key
+        and not getattr(field, 'auto_now', False) and not getattr(field, 'auto_now_add', False)
+    ]
+
+
+def _comparable(field, value):
+    """`value` as the database would hand it back for `field`."""
+    if value is None:
+        return None
+    try:
+        return field.to_python(value)
+    except ValidationError:
+        return value
+
+
+def _assign(obj, values):
+    """Set `values` ({field name: value}) on `obj`; return the names of the fields that changed."""
+    changed = []
+    for name, value in values.items():
+        field = obj._meta.get_field(name)
+        if field.is_relation:
+            current, new = getattr(obj, field.attname), (value.pk if value is not None else None)
+        else:
+            current, new = getattr(obj, name), _comparable(field, value)
+        try:
+            same = current == new
+        except TypeError:  # e.g. naive vs aware datetimes
+            same = False
+        if not same:
+            setattr(obj, name, value)
+            changed.append(name)
+    return changed
+
+
+def _warranty_flag(product, values):
+    """under_warranty that ProductAsset.save() would store for `product` updated with `values`."""
+    probe = ProductAsset(
+        purchase_date=values.get('purchase_date', product.purchase_date),
+        warranty_duration_months=values.get('warranty_duration_months', product.warranty_duration_months),
+    )
+    probe.set_warranty_flag()
+    return probe.under_warranty
+
+
+def _missing_required(model, obj):
+    """Names of NOT NULL fields without a default that are still unset on a new object."""
+    missing = []
+    for field in model._meta.concrete_fields:
+        if field.primary_key or field.null or field.has_default():
+            continue
+        if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False):
+            continue
+        if getattr(obj, field.attname) is None:
+            missing.append(field.name)
+    return missing
+
+
+# -----------------------------
+# Lookup caches
+# -----------------------------
+
+def _first_by(queryset, key):
+    """{key: object} keeping the lowest pk, which is what .filter(...).first() returned."""
+    result = {}
+    for obj in queryset.order_by('pk'):
+        result.setdefault(getattr(obj, key), obj)
+    return result
+
+
+class LookupCache:
+    """
+    Name -> object maps for the tables rows point at, loaded once per import
+    so a sheet costs a handful of queries instead of several per row.
+    """
+
+    def __init__(self, importer):
+        self.importer = importer
+        self.asset_types = _first_by(AssetType.objects.all(), 'name')
+        self.options = {model: _first_by(model.objects.all(), 'name') for _, model in OPTION_SHEETS}
+        self.suppliers = _first_by(Supplier.objects.all(), 'name')
+        self.users = {user.username: user for user in User.objects.all()}
+        self._rentals = None
+        self._repairs = None
+        self._stored = {}
+        self.customers = _first_by(Customer.objects.all(), 'name')
+        self.assets = _first_by(ProductAsset.objects.all(), 'asset_id')
+        self.pending_asset_ids = set(
+            PendingProduct.objects.exclude(asset_id=None).values_list('asset_id', flat=True)
+        )
+
+    def rentals(self):
+        """{(customer pk, asset pk): rental}, loaded on first use."""
+        if self._rentals is None:
+            self._rentals = {}
+            for rental in Rental.objects.order_by('pk'):
+                self._rentals.setdefault((rental.customer_id, rental.asset_id), rental)
+        return self._rentals
+
+    def repairs(self):
+        """{(asset pk, repair name): repair}, loaded on first use."""
+        if self._repairs is None:
+            self._repairs = {}
+            for repair in Repair.objects.order_by('pk'):
+                self._repairs.setdefault((repair.product_id, repair.name), repair)
+        return self._repairs
+
+    def stored_rows(self, model, key):
+        """
+        {values of the `key` fields: [{attname: value}]} for every row of an
+        insert-only table, loaded on first use.
+        """
+        if model not in self._stored:
+            fields = _comparable_fields(model)
+            rows = self._stored[model] = {}
+            for values in model.objects.order_by('pk').values(*[field.attname for field in fields]):
+                stored = {field.attname: _comparable(field, values[field.attname]) for field in fields}
+                rows.setdefault(tuple(values[name] for name in key), []).append(stored)
+        return self._stored[model]
+
+    def user(self, username):
+        """Existing user by name; unknown names are left empty, like the row-by-row import."""
+        username = _clean(username)
+        return self.users.get(username) if username else None
+
+    def customer(self, name):
+        return self.customers.get(_clean(name)) if name is not None else None
+
+    def asset(self, asset_id):
+        return self.assets.get(_clean(asset_id)) if asset_id is not None else None
+
+    def ensure_named(self, model, values, order_field=None, counts=None):
+        """
+        Make sure a row exists for every name in `values` ({name: order or None})
+        and that given orders are stored. Returns {name: object}; the names
+        inserted, updated and left unchanged are tallied in the `counts` Counter.
+        """
+        cache = self.asset_types if model is AssetType else self.options[model]
+        created, reordered = [], []
+        for name, order in values.items():
+            obj = cache.get(name)
+            if obj is None:
+                obj = model(name=name)
+                created.append(obj)
+                cache[name] = obj
+            if order_field and order is not None:
+                try:
+                    order = int(order)
+                except (TypeError, ValueError):
+                    continue  # ignore bad order
+                if getattr(obj, order_field) != order:
+                    setattr(obj, order_field, order)
+                    if obj.pk is not None:
+                        reordered.append(obj)
+        if created:
+            model.objects.bulk_create(created, batch_size=self.importer.batch_size)
+            for obj in self.importer.reload(model, 'name', [o.name for o in created]):
+                cache[obj.name] = obj
+        if reordered:
+            model.objects.bulk_update(reordered, [order_field], batch_size=self.importer.batch_size)
+        if counts is not None:
+            counts['inserted'] += len(created)
+            counts['updated'] += len(reordered)
+            counts['unchanged'] += len(values) - len(created) - len(reordered)
+        if created or reordered:
+            self.importer.written_models.add(model)
+        return cache
+
+    def supplier_for(self, row):
+        """Supplier named on a product row, created from the row's supplier columns if new."""
+        name = _clean(row.get('supplier'))
+        if not name:
+            return None
+        if name not in self.suppliers:
+            supplier = Supplier(name=name, **_present({
+                field: row.get(f'supplier_{field}') for field in SUPPLIER_DETAIL_FIELDS
+            }))
+            supplier.save()
+            self.suppliers[name] = supplier
+        return self.suppliers[name]
+
+
+# -----------------------------
+# Sheet column maps
+# -----------------------------
+
+SUPPLIER_DETAIL_FIELDS = [
+    'gstin', 'address_primary', 'address_secondary', 'phone_primary',
+    'phone_secondary', 'email', 'reference_name',
+]
+
+SUPPLIER_DETAIL_COLUMNS = {
+    'gstin': ('gstin', 'gstin_number', 'gst_number'),
+    'address_primary': ('address_primary', 'address'),
+    'address_secondary': ('address_secondary',),
+    'phone_primary': ('phone_primary', 'phone', 'contact_number'),
+    'phone_secondary': ('phone_secondary',),
+    'email': ('email',),
+    'reference_name': ('reference_name',),
+}
+
+PRODUCT_SUPPLIER_COLUMNS = dict(
+    supplier=('purchased_from', 'purchased_from__name', 'supplier', 'supplier_name', 'purchased_from_name'),
+    **{f'supplier_{field}': keys for field, keys in SUPPLIER_DETAIL_COLUMNS.items()},
+)
+
+CUSTOMER_COLUMNS = {
+    'name': ('name', 'customer', 'customer_name'),
+    'email': ('email',),
+    'phone_number_primary': ('phone_number_primary', 'phone', 'phone_primary'),
+    'phone_number_secondary': ('phone_number_secondary',),
+    'address_primary': ('address_primary', 'address'),
+    'address_secondary': ('address_secondary',),
+    'is_permanent': ('is_permanent',),
+    'is_bni_member': ('is_bni_member',),
+    'reference_name': ('reference_name',),
+    'edited_by': ('edited_by', 'edited_by__username', 'edited_by_username'),
+}
+
+PRODUCT_COLUMNS = dict(
+    asset_id=('asset_id', 'Asset ID', 'asset'),
+    type_of_asset=('type_of_asset', 'type_of_asset__name', 'Type of Asset'),
+    type_display_order=('type_display_order',),
+    brand=('brand',),
+    model_no=('model_no',),
+    serial_no=('serial_no',),
+    asset_number=('asset_number',),
+    asset_suffix=('asset_suffix',),
+    purchase_date=('purchase_date', 'purchase_date__date', 'Purchase Date'),
+    purchase_price=('purchase_price', 'purchase_price__value'),
+    current_value=('current_value',),
+    under_warranty=('under_warranty',),
+    warranty_duration_months=('warranty_duration_months', 'warranty_months'),
+    condition_status=('condition_status',),
+    sold_to=('sold_to',),
+    sale_price=('sale_price',),
+    sale_date=('sale_date',),
+    date_marked_dead=('date_marked_dead',),
+    damage_narration=('damage_narration',),
+    edited_by=('edited_by', 'edited_by__username', 'edited_by_username'),
+    edited_at=('edited_at', 'edited_at__date', 'edited_at_datetime'),
+    **PRODUCT_SUPPLIER_COLUMNS,
+)
+
+PENDING_PRODUCT_COLUMNS = dict(
+    asset_id=('asset_id', 'Asset ID', 'asset'),
+    type_of_asset=('type_of_asset', 'type_of_asset__name', 'Type of Asset'),
+    brand=('brand',),
+    model_no=('model_no',),
+    serial_no=('serial_no',),
+    purchase_price=('purchase_price',),
+    current_value=('current_value',),
+    purchase_date=('purchase_date',),
+    under_warranty=('under_warranty',),
+    warranty_duration_months=('warranty_duration_months',),
+    condition_status=('condition_status',),
+    asset_number=('asset_number',),
+    sold_to=('sold_to',),
+    sale_price=('sale_price',),
+    sale_date=('sale_date',),
+    date_marked_dead=('date_marked_dead',),
+    damage_narration=('damage_narration',),
+    submitted_by=('submitted_by', 'submitted_by__username', 'submitted_by_username'),
+    **PRODUCT_SUPPLIER_COLUMNS,
+)
+
+PRODUCT_PARSERS = {
+    'purchase_date': parse_date,
+    'purchase_price': parse_decimal,
+    'current_value': parse_decimal,
+    'sale_price': parse_decimal,
+    'sale_date': parse_date,
+    'date_marked_dead': parse_date,
+    'edited_at': parse_timestamp,
+}
+
+CONFIG_OPTION_FIELDS = [
+    ('cpu', CPUOption, ('cpu',), ('cpu_order', 'order')),
+    ('ram', RAMOption, ('ram',), ('ram_order',)),
+    ('hdd', HDDOption, ('hdd',), ('hdd_order',)),
+    ('graphics', GraphicsOption, ('graphics',), ('graphics_order',)),
+    ('display_size', DisplaySizeOption, ('display_size',), ('display_size_order',)),
+]
+
+CONFIG_COLUMNS = dict(
+    date_of_config=('date_of_config', 'date'),
+    cost=('cost',),
+    ssd=('ssd',),
+    power_supply=('power_supply',),
+    **{field: keys for field, _, keys, _ in CONFIG_OPTION_FIELDS},
+    **{f'{field}_order': keys for field, _, _, keys in CONFIG_OPTION_FIELDS},
+)
+
+RENTAL_COLUMNS = {
+    'customer': ('customer', 'customer__name', 'Customer'),
+    'asset': ('asset', 'asset__asset_id', 'Asset'),
+    'rental_start_date': ('rental_start_date', 'rental_start_date__date'),
+    'rental_end_date': ('rental_end_date', 'rental_end_date__date'),
+    'payment_amount': ('payment_amount',),
+    'billing_day': ('billing_day',),
+    'status': ('status',),
+    'contract_number': ('contract_number',),
+}
+
+RENTAL_PARSERS = {
+    'rental_start_date': parse_date,
+    'rental_end_date': parse_date,
+    'payment_amount': parse_decimal,
+}
+
+REPAIR_COLUMNS = {
+    'asset': ('product__asset_id', 'asset_id', 'Asset ID', 'product'),
+    'name': ('name', 'Repair Name'),
+    'cost': ('cost',),
+    'info': ('info',),
+    'repair_warranty_months': ('repair_warranty_months', 'repair_warranty'),
+}
+
+
+# -----------------------------
+# Bulk importer
+# -----------------------------
+# Each sheet (or chunk of a sheet) is parsed column by column, split into rows
+# to insert and rows to update against the lookup caches, and written with
+# bulk_create / bulk_update in batches. A batch the database rejects is
+# retried row by row so only the bad rows are skipped. Rows that match what
+# is already stored are left alone.
+# With an ImportJournal each chunk commits on its own together with its
+# journal entries, and rows the journal has seen unchanged are not parsed at
+# all; without one, each sheet is one transaction. A dry run does the same
+# work inside a transaction that is rolled back.
+# Bulk writes bypass model signals, so what their receivers maintain -
+# revenue ledger, report snapshots, row versions, search tokens, contract
+# alerts - is brought up to date once at the end. Imported rows get no
+# audit events.
+
+class BulkImporter:
+
+    def __init__(self, batch_size=IMPORT_BATCH_SIZE, info=print, warn=print, journal=None, dry_run=False):
+        self.batch_size = batch_size
+        self.info = info
+        self.warn = warn
+        self.journal = journal
+        self.dry_run = dry_run
+        self.now = timezone.now()
+        self.summary = {}
+        self.diff = defaultdict(Counter)
+        self.parse_failures = Counter()
+        self.sheet = None
+        self.edited_rentals = []
+        self.created_rentals = False
+        self.live_rows_written = False
+        self.written_models = set()
+
+    def steps(self):
+        steps = {
+            'AssetTypes': self.import_asset_types,
+            'Suppliers': self.import_suppliers,
+            'Customers': self.import_customers,
+            'Products': self.import_products,
+            'Pending_Products': self.import_pending_products,
+            'Configurations': self.import_configurations,
+            'Pending_Configurations': self.import_pending_configurations,
+            'Rentals': self.import_rentals,
+            'Pending_Rentals': self.import_pending_rentals,
+            'Repairs': self.import_repairs,
+            'Pending_Repairs': self.import_pending_repairs,
+        }
+        for sheet, model in OPTION_SHEETS:
+            steps[sheet] = self._option_importer(model)
+        return steps
+
+    def run(self, sheets):
+        """
+        Import `sheets`: a {sheet name: DataFrame} dict, or (sheet name,
+        DataFrame chunk) pairs in IMPORT_SHEET_ORDER as produced by
+        rentals.workbook.read_workbook(). Returns {sheet: rows written};
+        self.diff has the inserted / updated / unchanged counts per sheet.
+        """
+        if isinstance(sheets, dict):
+            sheets = [(name, sheets[name]) for name in IMPORT_SHEET_ORDER if name in sheets]
+
+        if self.dry_run:
+            with transaction.atomic():
+                if self.journal:
+                    self._start_journal(record=False)
+                self._import_sheets(sheets)
+                transaction.set_rollback(True)
+            return self.summary
+
+        if self.journal:
+            self._start_journal()
+        try:
+            self._import_sheets(sheets)
+            full_refresh = bool(self.journal and self.journal.needs_refresh)
+            if self.written_models or full_refresh:
+                self.refresh_indexes(full=full_refresh)
+            if self.live_rows_written or full_refresh:
+                self.refresh_derived(full=full_refresh)
+        except BaseException:
+            if self.journal:
+                self.journal.finish('failed')
+            raise
+        if self.journal:
+            self.journal.finish()
+        return self.summary
+
+    def _start_journal(self, record=True):
+        self.journal.start(record)
+        if self.journal.resumed:
+            run = self.journal.run
+            where = f"{run.rows_done} rows into {run.sheet}" if run.sheet else "the start"
+            self.info(f"Resuming the unfinished import of this file from {where}")
+
+    def _import_sheets(self, sheets):
+        self.cache = LookupCache(self)
+        steps = self.steps()
+
+        for name, chunks in groupby(sheets, key=lambda pair: pair[0]):
+            sheet = SHEET_ALIASES.get(name, name)
+            if sheet not in steps or sheet in self.summary:
+                continue  # unknown sheet, or alias of a sheet already imported
+            self.sheet = sheet
+            self.summary[sheet] = 0
+            if self.journal:
+                position = 0
+                for _, frame in chunks:
+                    start, position = position, position + len(frame)
+                    with transaction.atomic():
+                        frame, entries, skipped = self.journal.pending(sheet, frame, start)
+                        self.diff[sheet]['unchanged'] += skipped
+                        if len(frame):
+                            self.summary[sheet] += steps[sheet](frame)
+                        self.journal.record(sheet, entries, position, self.live_rows_written)
+            else:
+                with transaction.atomic():
+                    self.summary[sheet] = sum(steps[sheet](frame) for _, frame in chunks)
+
+        for (sheet, field), count in self.parse_failures.items():
+            self.warn(f"{sheet}: {count} unparseable '{field}' value(s) imported as empty")
+
+    def rows(self, df, columns, parsers=None):
+        """sheet_rows() for the sheet being imported, counting parse failures per column."""
+        failures = Counter()
+        yield from sheet_rows(df, columns, parsers, failures)
+        for field, count in failures.items():
+            self.parse_failures[self.sheet, field] += count
+
+    # ---- writing ----
+
+    def _chunks(self, rows):
+        for start in range(0, len(rows), self.batch_size):
+            yield rows[start:start + self.batch_size]
+
+    def _write(self, rows, write, label):
+        """
+        Run `write(objects)` over (description, object) rows batch by batch.
+        Returns the number of rows written.
+        """
+        written = 0
+        for chunk in self._chunks(rows):
+            try:
+                with transaction.atomic():
+                    write([obj for _, obj in chunk])
+                written += len(chunk)
+            except (IntegrityError, DataError):
+                for description, obj in chunk:
+                    try:
+                        with transaction.atomic():
+                            write([obj])
+                        written += 1
+                    except (IntegrityError, DataError) as e:
+                        self.warn(f"Skipping {label} {description}: {e}")
+        return written
+
+    def create(self, model, rows, label):
+        written = self._write(rows, lambda objs: model.objects.bulk_create(objs), label)
+        self.diff[self.sheet]['inserted'] += written
+        if written:
+            self.written_models.add(model)
+        return written
+
+    def update(self, model, rows, fields, label):
+        # bulk_update skips auto_now, so stamp those fields like save() would
+        auto_now = [f.name for f in model._meta.concrete_fields if getattr(f, 'auto_now', False)]
+        for _, obj in rows:
+            for name in auto_now:
+                setattr(obj, name, self.now)
+        fields = sorted(set(fields) | set(auto_now))
+        if not fields:
+            return len(rows)
+        written = self._write(rows, lambda objs: model.objects.bulk_update(objs, fields), label)
+        self.diff[self.sheet]['updated'] += written
+        if written:
+            self.written_models.add(model)
+        return written
+
+    def reload(self, model, key, values):
+        """Freshly inserted rows by `key`, since MySQL does not return primary keys from a bulk insert."""
+        values = list(values)
+        for chunk in self._chunks(values):
+            yield from model.objects.filter(**{f'{key}__in': chunk}).order_by('pk')
+
+    def _apply(self, obj, values, changed):
+        """
+        Set `values` on an existing object and add the fields that differ to
+        `changed`. Returns False, counting the row as unchanged, if none did.
+        """
+        fields = _assign(obj, values)
+        if not fields:
+            self.diff[self.sheet]['unchanged'] += 1
+            return False
+        changed.update(fields)
+        return True
+
+    def _drop_existing(self, model, rows, key):
+        """
+        Drop new objects that match a row already in `model` (or earlier in
+        the sheet) on every field the sheet filled. Sheets that only ever
+        insert, like the pending ones, would otherwise add a copy of each
+        row on every re-import. `key` names the fields candidates must share.
+        """
+        existing = self.cache.stored_rows(model, key)
+        fields = _comparable_fields(model)
+        fresh = []
+        for description, obj in rows:
+            values = {
+                field.attname: _comparable(field, getattr(obj, field.attname))
+                for field in fields if getattr(obj, field.attname) is not None
+            }
+            candidates = existing.setdefault(tuple(getattr(obj, name) for name in key), [])
+            if any(all(stored.get(name) == value for name, value in values.items()) for stored in candidates):
+                self.diff[self.sheet]['unchanged'] += 1
+                continue
+            candidates.append(values)
+            fresh.append((description, obj))
+        return fresh
+
+    def _split_new(self, model, rows, label):
+        """Drop (and report) new objects missing required values."""
+        valid = []
+        for description, obj in rows:
+            missing = _missing_required(model, obj)
+            if missing:
+                self.warn(f"Skipping {label} {description}: missing {', '.join(missing)}")
+            else:
+                valid.append((description, obj))
+        return valid
+
+    # ---- dimension sheets ----
+
+    def import_asset_types(self, df):
+        values = {}
+        for row in self.rows(df, {'name': ('name', 'type_of_asset', 'Type of Asset'),
+                                   'order': ('display_order', 'order')}):
+            if row['name']:
+                values[_clean(row['name'])] = row['order']
+        self.cache.ensure_named(AssetType, values, 'display_order', self.diff[self.sheet])
+        return len(values)
+
+    def _option_importer(self, model):
+        def import_options(df):
+            values = {}
+            for row in self.rows(df, {'name': ('name',), 'order': ('order', 'display_order')}):
+                if row['name']:
+                    values[_clean(row['name'])] = row['order']
+            self.cache.ensure_named(model, values, 'order', self.diff[self.sheet])
+            return len(values)
+        return import_options
+
+    def import_suppliers(self, df):
+        columns = dict(name=('name', 'supplier', 'supplier_name'), **SUPPLIER_DETAIL_COLUMNS)
+        merged = {}
+        for row in self.rows(df, columns):
+            name = _clean(row.pop('name'))
+            if name:
+                merged.setdefault(name, {}).update(_present(row))
+
+        creates, updates, changed = [], [], set()
+        for name, values in merged.items():
+            supplier = self.cache.suppliers.get(name)
+            if supplier is None:
+                creates.append((name, Supplier(name=name, **values)))
+                continue
+            if self._apply(supplier, values, changed):
+                updates.append((name, supplier))
+
+        written = self.create(Supplier, creates, 'Supplier')
+        written += self.update(Supplier, updates, changed, 'Supplier')
+        for supplier in self.reload(Supplier, 'name', [name for name, _ in creates]):
+            self.cache.suppliers.setdefault(supplier.name, supplier)
+        return written
+
+    def import_customers(self, df):
+        merged = {}
+        for row in self.rows(df, CUSTOMER_COLUMNS):
+            name = _clean(row.pop('name'))
+            if not name:
+                continue
+            row['is_permanent'] = bool(row['is_permanent'] or False)
+            row['is_bni_member'] = bool(row['is_bni_member'] or False)
+            row['edited_by'] = self.cache.user(row['edited_by'])
+            merged.setdefault(name, {}).update(_present(row))
+
+        creates, updates, changed = [], [], set()
+        for name, values in merged.items():
+            customer = self.cache.customers.get(name)
+            if customer is None:
+                creates.append((name, Customer(name=name, **values)))
+                continue
+            if self._apply(customer, values, changed):
+                updates.append((name, customer))
+
+        written = self.create(Customer, self._split_new(Customer, creates, 'Customer'), 'Customer')
+        written += self.update(Customer, updates, changed, 'Customer')
+        for customer in self.reload(Customer, 'name', [name for name, _ in creates]):
+            self.cache.customers.setdefault(customer.name, customer)
+        self.live_rows_written = self.live_rows_written or bool(written)
+        return written
+
+    # ---- products ----
+
+    def _asset_types_for(self, rows, order_key=None):
+        values = {}
+        for row in rows:
+            name = _clean(row['type_of_asset'])
+            if name:
+                order = row.get(order_key) if order_key else None
+                if name not in values or order is not None:
+                    values[name] = order
+        return self.cache.ensure_named(AssetType, values, 'display_order')
+
+    def import_products(self, df):
+        rows = [row for row in self.rows(df, PRODUCT_COLUMNS, PRODUCT_PARSERS) if row['asset_id']]
+        asset_types = self._asset_types_for(rows, 'type_display_order')
+
+        merged = {}
+        for row in rows:
+            values = {
+                'type_of_asset': asset_types.get(_clean(row['type_of_asset'])),
+                'brand': row['brand'],
+                'model_no': row['model_no'],
+                'serial_no': row['serial_no'],
+                'asset_number': row['asset_number'],
+                'asset_suffix': row['asset_suffix'],
+                'purchase_date': row['purchase_date'],
+                'purchase_price': row['purchase_price'],
+                'current_value': row['current_value'],
+                'purchased_from': self.cache.supplier_for(row),
+                'under_warranty': bool(row['under_warranty'] or False),
+                'warranty_duration_months': row['warranty_duration_months'] or 0,
+                'condition_status': row['condition_status'],
+                'sold_to': row['sold_to'],
+                'sale_price': row['sale_price'],
+                'sale_date': row['sale_date'],
+                'date_marked_dead': row['date_marked_dead'],
+                'damage_narration': row['damage_narration'],
+                'edited_by': self.cache.user(row['edited_by']),
+                'edited_at': row['edited_at'],
+            }
+            merged.setdefault(_clean(row['asset_id']), {}).update(_present(values))
+
+        creates, updates, changed = [], [], set()
+        for asset_id, values in merged.items():
+            product = self.cache.assets.get(asset_id)
+            if product is None:
+                product = ProductAsset(asset_id=asset_id, **values)
+                product.set_warranty_flag()
+                if product.edited_by_id:
+                    product.edited_at = self.now
+                creates.append((asset_id, product))
+                continue
+            edited_at = values.pop('edited_at', None)  # not a change on its own
+            values['under_warranty'] = _warranty_flag(product, values)
+            if not self._apply(product, values, changed):
+                continue
+            if product.edited_by_id:
+                product.edited_at = self.now
+                changed.add('edited_at')
+            elif edited_at is not None:
+                product.edited_at = edited_at
+                changed.add('edited_at')
+            updates.append((asset_id, product))
+
+        creates = self._split_new(ProductAsset, creates, 'Product')
+        clashing = [asset_id for asset_id, _ in creates if asset_id in self.cache.pending_asset_ids]
+        for asset_id in clashing:
+            self.warn(f"Skipping Product {asset_id}: Asset ID '{asset_id}' already exists. Please use a unique one.")
+        creates = [(asset_id, product) for asset_id, product in creates if asset_id not in clashing]
+
+        # Hold the year counters like ProductAsset.save() does while the IDs are claimed
+        years = set()
+        for asset_id, product in creates:
+            id_year, _ = parse_asset_id(asset_id)
+            years.add(id_year or product.purchase_date.year)
+        lock_asset_years(years)
+
+        written = self.create(ProductAsset, creates, 'Product')
+        written += self.update(ProductAsset, updates, changed, 'Product')
+        for product in self.reload(ProductAsset, 'asset_id', [asset_id for asset_id, _ in creates]):
+            self.cache.assets.setdefault(product.asset_id, product)
+        self.live_rows_written = self.live_rows_written or bool(written)
+        return written
+
+    def import_pending_products(self, df):
+        rows = list(self.rows(df, PENDING_PRODUCT_COLUMNS, PRODUCT_PARSERS))
+        asset_types = self._asset_types_for(rows)
+
+        with_id, without_id = [], []
+        for row in rows:
+            values = _present({
+                'type_of_asset': asset_types.get(_clean(row['type_of_asset'])),
+                'brand': row['brand'],
+                'model_no': row['model_no'],
+                'serial_no': row['serial_no'],
+                'purchase_price': row['purchase_price'],
+                'current_value': row['current_value'],
+                'purchase_date': row['purchase_date'],
+                'under_warranty': bool(row['under_warranty'] or False),
+                'warranty_duration_months': row['warranty_duration_months'] or 0,
+                'purchased_from': self.cache.supplier_for(row),
+                'condition_status': row['condition_status'] or 'working',
+                'asset_number': row['asset_number'],
+                'asset_id': row['asset_id'],
+                'sold_to': row['sold_to'],
+                'sale_price': row['sale_price'],
+                'sale_date': row['sale_date'],
+                'date_marked_dead': row['date_marked_dead'],
+                'damage_narration': row['damage_narration'],
+                'submitted_by': self.cache.user(row['submitted_by']),
+            })
+            pending = PendingProduct(**values)
+            (with_id if pending.asset_id else without_id).append((row['asset_id'], pending))
+        with_id = self._drop_existing(PendingProduct, with_id, ('brand', 'model_no'))
+        without_id = self._drop_existing(PendingProduct, without_id, ('brand', 'model_no'))
+
+        written = self.create(PendingProduct, self._split_new(PendingProduct, with_id, 'PendingProduct row'), 'PendingProduct row')
+        # Rows without an ID need the allocator in PendingProduct.save()
+        for _, pending in self._split_new(PendingProduct, without_id, 'PendingProduct row'):
+            try:
+                with transaction.atomic():
+                    pending.save()
+                written += 1
+                self.diff[self.sheet]['inserted'] += 1
+            except (IntegrityError, DataError, ValueError) as e:
+                self.warn(f"Skipping PendingProduct row {pending.asset_number}: {e}")
+        self.cache.pending_asset_ids |= {pending.asset_id for _, pending in with_id + without_id if pending.asset_id}
+        return written
+
+    # ---- configurations ----
+
+    def _config_rows(self, df, extra_columns):
+        rows = list(self.rows(df, dict(CONFIG_COLUMNS, **extra_columns), {
+            'date_of_config': parse_date,
+            'cost': parse_decimal,
+        }))
+        options = {}
+        for field, model, _, _ in CONFIG_OPTION_FIELDS:
+            values = {}
+            for row in rows:
+                name = _clean(row[field])
+                if name:
+                    values[name] = row[f'{field}_order'] if row[f'{field}_order'] is not None else values.get(name)
+            options[field] = self.cache.ensure_named(model, values, 'order')
+
+        for row in rows:
+            asset = self.cache.asset(row['asset'])
+            if not asset:
+                yield row, None, None
+                continue
+            values = {
+                'asset': asset,
+                'date_of_config': row['date_of_config'] or self.now.date(),
+                'ssd': row['ssd'],
+                'power_supply': row['power_supply'],
+                'cost': row['cost'] or 0,
+            }
+            for field, _, _, _ in CONFIG_OPTION_FIELDS:
+                values[field] = options[field].get(_clean(row[field])) if row[field] is not None else None
+            yield row, asset, values
+
+    def import_configurations(self, df):
+        creates = []
+        for row, asset, values in self._config_rows(df, {
+            'asset': ('asset_id', 'asset__asset_id', 'Asset ID', 'asset'),
+            'detailed_config': ('detailed_config', 'detailed_config_description', 'detailed_config_text'),
+            'edited_by': ('edited_by', 'edited_by__username'),
+        }):
+            if row['asset'] is None:
+                continue
+            if not asset:
+                self.warn(f"Skipping configuration: asset {row['asset']} not found")
+                continue
+            config = ProductConfiguration(
+                detailed_config=row['detailed_config'], edited_by=self.cache.user(row['edited_by']), **values
+            )
+            creates.append((f"row for {row['asset']}", config))
+        creates = self._drop_existing(ProductConfiguration, creates, ('asset_id',))
+        written = self.create(ProductConfiguration, creates, 'configuration')
+        self.live_rows_written = self.live_rows_written or bool(written)
+        return written
+
+    def import_pending_configurations(self, df):
+        creates = []
+        for row, asset, values in self._config_rows(df, {
+            'asset': ('asset_id', 'asset__asset_id', 'Asset ID'),
+            'detailed_config': ('detailed_config',),
+            'submitted_by': ('submitted_by', 'submitted_by__username'),
+        }):
+            if not asset:
+                self.warn(f"Skipping pending config: asset {row['asset']} not found")
+                continue
+            config = PendingProductConfiguration(
+                detailed_config=row['detailed_config'], submitted_by=self.cache.user(row['submitted_by']), **values
+            )
+            creates.append((f"row for {row['asset']}", config))
+        creates = self._drop_existing(PendingProductConfiguration, creates, ('asset_id',))
+        return self.create(PendingProductConfiguration, creates, 'pending config')
+
+    # ---- rentals ----
+
+    def _rental_rows(self, df, extra_columns, label):
+        for row in self.rows(df, dict(RENTAL_COLUMNS, **extra_columns), RENTAL_PARSERS):
+            if not row['customer'] or not row['asset']:
+                continue
+            customer = self.cache.customer(row['customer'])
+            asset = self.cache.asset(row['asset'])
+            if not customer or not asset:
+                self.warn(f"Skipping {label}: missing customer or asset ({row['customer']}|{row['asset']})")
+                continue
+            values = {
+                'rental_start_date': row['rental_start_date'],
+                'rental_end_date': row['rental_end_date'],
+                'payment_amount': row['payment_amount'] or 0,
+                'billing_day': row['billing_day'] or 1,
+                'status': row['status'] or 'ongoing',
+                'contract_number': row['contract_number'] or row.get('contract'),
+            }
+            yield row, customer, asset, values
+
+    def import_rentals(self, df):
+        existing = self.cache.rentals()
+        merged = {}
+        for row, customer, asset, values in self._rental_rows(
+            df, {'contract': ('contract', 'contract_no'), 'edited_by': ('edited_by', 'edited_by__username')}, 'rental',
+        ):
+            values['edited_by'] = self.cache.user(row['edited_by'])
+            merged.setdefault((customer, asset), {}).update(_present(values))
+
+        creates, updates, changed = [], [], set()
+        for (customer, asset), values in merged.items():
+            description = f"row ({customer.name}|{asset.asset_id})"
+            rental = existing.get((customer.pk, asset.pk))
+            if rental is None:
+                creates.append((description, Rental(customer=customer, asset=asset, **values)))
+                continue
+            if self._apply(rental, values, changed):
+                updates.append((description, rental))
+
+        written = self.create(Rental, self._split_new(Rental, creates, 'rental'), 'rental')
+        written += self.update(Rental, updates, changed, 'rental')
+        for rental in self.reload(Rental, 'asset', {rental.asset_id for _, rental in creates}):
+            existing.setdefault((rental.customer_id, rental.asset_id), rental)
+        self.created_rentals = self.created_rentals or bool(creates)
+        self.edited_rentals.extend(rental for _, rental in updates)
+        self.live_rows_written = self.live_rows_written or bool(written)
+        return written
+
+    def import_pending_rentals(self, df):
+        creates = []
+        for row, customer, asset, values in self._rental_rows(
+            df, {'contract': ('contract',), 'submitted_by': ('submitted_by', 'submitted_by__username')}, 'pending rental',
+        ):
+            pending = PendingRental(
+                customer=customer, asset=asset, submitted_by=self.cache.user(row['submitted_by']), **values
+            )
+            creates.append((f"row ({row['customer']}|{row['asset']})", pending))
+        creates = self._drop_existing(PendingRental, creates, ('customer_id', 'asset_id'))
+        return self.create(PendingRental, self._split_new(PendingRental, creates, 'pending rental row'), 'pending rental row')
+
+    # ---- repairs ----
+
+    def import_repairs(self, df):
+        existing = self.cache.repairs()
+        merged = {}
+        columns = dict(REPAIR_COLUMNS, date=('date', 'repair_date'), edited_by=('edited_by', 'edited_by__username'))
+        for row in self.rows(df, columns, {'date': parse_date, 'cost': parse_decimal}):
+            if not row['asset']:
+                continue
+            asset = self.cache.asset(row['asset'])
+            if not asset:
+                self.warn(f"Skipping repair for missing asset {row['asset']}")
+                continue
+            values = {
+                'date': row['date'] or self.now.date(),
+                'cost': row['cost'] or 0,
+                'info': row['info'],
+                'repair_warranty_months': row['repair_warranty_months'] or 0,
+                'edited_by': self.cache.user(row['edited_by']),
+            }
+            merged.setdefault((asset, row['name']), {}).update(_present(values))
+
+        creates, updates, changed = [], [], set()
+        for (asset, name), values in merged.items():
+            description = f"row for {asset.asset_id}"
+            repair = existing.get((asset.pk, name))
+            if repair is None:
+                creates.append((description, Repair(product=asset, name=name, **values)))
+                continue
+            if self._apply(repair, values, changed):
+                updates.append((description, repair))
+
+        written = self.create(Repair, self._split_new(Repair, creates, 'repair'), 'repair')
+        written += self.update(Repair, updates, changed, 'repair')
+        for repair in self.reload(Repair, 'product', {repair.product_id for _, repair in creates}):
+            existing.setdefault((repair.product_id, repair.name), repair)
+        self.live_rows_written = self.live_rows_written or bool(written)
+        return written
+
+    def import_pending_repairs(self, df):
+        creates = []
+        columns = dict(REPAIR_COLUMNS, date=('date',), submitted_by=('submitted_by', 'submitted_by__username'))
+        for row in self.rows(df, columns, {'date': parse_date, 'cost': parse_decimal}):
+            asset = self.cache.asset(row['asset'])
+            if not asset:
+                self.warn(f"Skipping pending repair for missing asset {row['asset']}")
+                continue
+            creates.append((f"row for {row['asset']}", PendingRepair(
+                original_repair=None,
+                product=asset,
+                date=row['date'],
+                cost=row['cost'],
+                name=row['name'],
+                info=row['info'],
+                repair_warranty_months=row['repair_warranty_months'] or 0,
+                submitted_by=self.cache.user(row['submitted_by']),
+            )))
+        creates = self._drop_existing(PendingRepair, creates, ('product_id', 'name'))
+        return self.create(PendingRepair, creates, 'pending repair')
+
+    # ---- derived data ----
+
+    def refresh_indexes(self, full=False):
+        """
+        Row versions and search tokens of every table the import wrote to,
+        or of every table with `full`.
+        """
+        written = set(TRACKED_MODELS) if full else self.written_models
+        with transaction.atomic():
+            for model in TRACKED_MODELS:
+                if model in written:
+                    # Created rows have no primary keys on MySQL; stamp the whole table
+                    record_changes(model, model.objects.values_list('pk', flat=True))
+        indexed = [model for model in SEARCH_FIELDS if model in written]
+        if indexed:
+            rebuild_index(indexed)
+
+    def refresh_derived(self, today=None, full=False):
+        """
+        Revenue ledger, report snapshots and contract alerts, once for the
+        whole import. `full` reconciles every rental, for a resumed import
+        whose earlier attempt wrote rows it never got to refresh.
+        """
+        today = today or date.today()
+        if full or Rental in self.written_models:
+            refresh_contract_alerts(today, full=True)
+        with transaction.atomic():
+            if full:
+                for start in range(0, Rental.objects.count(), LEDGER_BATCH_SIZE):
+                    _reconcile_ledger(Rental.objects.order_by('pk')[start:start + LEDGER_BATCH_SIZE], today)
+                refresh_asset_revenue()
+            else:
+                asset_ids = _reconcile_ledger(self.edited_rentals, today)
+                if asset_ids:
+                    refresh_asset_revenue(asset_ids)
+            if full or self.created_rentals:
+                extend_revenue_ledger(today)
+            rebuild_report_snapshots()
@@ -1,32 +1,29 @@
-# # rentals/management/commands/check_overdue.py
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
 
-# from django.core.management.base import BaseCommand
-# from django.core.mail import send_mail
-# from django.utils import timezone
-# from rentals.models import Rental
+from rentals.status import refresh_contract_alerts
 
-# class Command(BaseCommand):
-#     help = 'Mark rentals as overdue and send email notifications'
 
-#     def handle(self, *args, **kwargs):
-#         today = timezone.now().date()
-#         rentals = Rental.objects.filter(status='ongoing')
+# python manage.py check_overdue [--full] [--date 2025-01-31]
+# Run daily, before send_reminders. Only rentals that can have changed since
+# the last run are read; use --full after changing REMINDER_CONTRACT_DAYS or
+# writing rentals with raw SQL. The first run is always a full pass.
+class Command(BaseCommand):
+    help = 'Flag ongoing rentals whose contract has ended or is about to end'
 
-#         for rental in rentals:
-#             due_date = rental.rental_start_date + timezone.timedelta(days=rental.duration_days)
-#             if due_date < today:
-#                 rental.status = 'overdue'
-#                 rental.save()
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true', help="Recheck every ongoing rental")
+        parser.add_argument('--date', help="Day to check for (YYYY-MM-DD); default today")
 
-#                 try:
-#                     send_mail(
-#                         subject='Rental Overdue Notification',
-#                         message=f'Rental for {rental.customer.name} is overdue.\nAsset ID: {rental.asset.asset_id}',
-#                         from_email='aryanpore3056@gmail.com',
-#                         recipient_list=['aryanpore3056@gmail.com'],
-#                         fail_silently=False,
-#                     )
-#                 except Exception as e:
-#                     self.stderr.write(f"Failed to send email: {e}")
+    def handle(self, *args, **options):
+        day = None
+        if options['date']:
+            day = parse_date(options['date'])
+            if day is None:
+                raise CommandError("--date must be YYYY-MM-DD")
 
-#         self.stdout.write(self.style.SUCCESS('Checked and updated overdue rentals.'))
+        result = refresh_contract_alerts(day, full=options['full'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Checked {result['checked']} rentals: {result['overdue']} now overdue, "
+            f"{result['expiring']} now expiring, {result['cleared']} cleared."
+        ))
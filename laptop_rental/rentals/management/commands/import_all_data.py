@@ -1,11 +1,17 @@
 import os
 import pandas as pd
 from datetime import datetime, date
+from django.conf import settings
 from django.core.management.base import BaseCommand, CommandError
 from django.db import transaction
 from django.contrib.auth import get_user_model
 from django.utils import timezone
 
+from rentals.importing import (
+    IMPORT_BATCH_SIZE, IMPORT_SHEET_ORDER, BulkImporter, parse_date, parse_datetime, parse_decimal,
+)
+from rentals.import_journal import ImportJournal
+from rentals.workbook import READ_CHUNK_SIZE, load_workbook_frames, read_workbook
 from rentals.models import (
     Customer, PendingCustomer, Supplier, AssetType,
     ProductAsset, PendingProduct, ProductConfiguration, PendingProductConfiguration,
@@ -15,6 +21,11 @@ from rentals.models import (
 
 User = get_user_model()
 
+# python manage.py import_all_data "data/my_asset_data.xlsx"
+# python manage.py import_all_data "data/full_report.xlsx" --bulk
+# python manage.py import_all_data "data/full_report.xlsx" --dry-run
+
+
 # ------------------------------
 # Helpers
 # ------------------------------
@@ -34,62 +45,6 @@ def try_get(row, *keys):
             return v
     return None
 
-def parse_date(raw):
-    """Return date object or None. Accepts date, datetime, or many string formats."""
-    if raw is None:
-        return None
-    if isinstance(raw, date) and not isinstance(raw, datetime):
-        return raw
-    if isinstance(raw, datetime):
-        return raw.date()
-    s = str(raw).strip()
-    if not s or s.lower() in ("nan", "nat", "none"):
-        return None
-    # try several formats
-    for fmt in ("%Y-%m-%d", "%d-%m-%Y", "%d/%m/%Y", "%m/%d/%Y", "%Y/%m/%d", "%d %b %Y", "%d %B %Y"):
-        try:
-            return datetime.strptime(s, fmt).date()
-        except Exception:
-            pass
-    # try pandas parsing
-    try:
-        parsed = pd.to_datetime(s, errors="coerce")
-        if pd.isna(parsed):
-            return None
-        return parsed.date()
-    except Exception:
-        return None
-
-def parse_datetime(raw):
-    """Return datetime or None."""
-    if raw is None:
-        return None
-    if isinstance(raw, datetime):
-        return raw
-    s = str(raw).strip()
-    if not s or s.lower() in ("nan", "nat", "none"):
-        return None
-    for fmt in ("%Y-%m-%d %H:%M:%S", "%Y-%m-%dT%H:%M:%S", "%d-%m-%Y %H:%M:%S", "%d/%m/%Y %H:%M:%S"):
-        try:
-            return datetime.strptime(s, fmt)
-        except Exception:
-            pass
-    try:
-        parsed = pd.to_datetime(s, errors="coerce")
-        if pd.isna(parsed):
-            return None
-        return parsed.to_pydatetime()
-    except Exception:
-        return None
-
-def parse_decimal(raw):
-    if raw is None:
-        return None
-    try:
-        return float(raw)
-    except Exception:
-        return None
-
 def get_user_by_username(username):
     if not username:
         return None
@@ -142,6 +97,21 @@ def get_or_create_supplier_from_row(row):
     supplier, _ = Supplier.objects.get_or_create(name=name, defaults={k:v for k,v in defaults.items() if v is not None})
     return supplier
 
+def create_unless_exists(model, **fields):
+    """
+    Create a row unless one with the same values is already stored, so that
+    re-importing a sheet of pending rows does not add copies. Returns True
+    if a row was created.
+    """
+    lookup = {
+        name: value for name, value in fields.items()
+        if not getattr(model._meta.get_field(name), 'auto_now', False)
+    }
+    if model.objects.filter(**lookup).exists():
+        return False
+    model.objects.create(**fields)
+    return True
+
 # ------------------------------
 # Command
 # ------------------------------
@@ -150,6 +120,18 @@ class Command(BaseCommand):
 
     def add_arguments(self, parser):
         parser.add_argument('file_path', type=str, help='Path to Excel (.xlsx) or CSV file')
+        parser.add_argument('--bulk', action='store_true',
+                            help='Load lookups once and write each sheet with bulk inserts/updates')
+        parser.add_argument('--batch-size', type=int, default=IMPORT_BATCH_SIZE,
+                            help='Rows per bulk write (with --bulk)')
+        parser.add_argument('--workers', type=int, default=getattr(settings, 'IMPORT_READER_PROCESSES', 2),
+                            help='Processes parsing workbook sheets in parallel')
+        parser.add_argument('--chunk-size', type=int, default=READ_CHUNK_SIZE,
+                            help='Rows per chunk handed from the reader to the importer (with --bulk, the unit that is committed)')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Report what would be inserted, updated and left unchanged, then roll back (implies --bulk)')
+        parser.add_argument('--full', action='store_true',
+                            help='Ignore the import journal and re-import every row (implies --bulk)')
 
     def handle(self, *args, **options):
         file_path = options['file_path']
@@ -157,17 +139,55 @@ class Command(BaseCommand):
             raise CommandError(f"❌ File not found: {file_path}")
 
         ext = os.path.splitext(file_path)[1].lower()
+        if ext not in ('.xlsx', '.xls', '.csv'):
+            raise CommandError("Unsupported file type. Use .xlsx or .csv")
+        workers = max(1, options['workers'])
+        chunk_size = max(1, options['chunk_size'])
+        bulk = options['bulk'] or options['dry_run'] or options['full']
+
         try:
-            if ext in ('.xlsx', '.xls'):
-                all_sheets = pd.read_excel(file_path, sheet_name=None)
-            elif ext == '.csv':
-                # assume Products if single CSV
-                all_sheets = {'Products': pd.read_csv(file_path)}
+            if ext == '.xls':
+                # openpyxl cannot read the old format
+                sheets = pd.read_excel(file_path, sheet_name=None)
+            elif bulk:
+                # Sheets are parsed in worker processes and written as they arrive
+                sheets = read_workbook(file_path, IMPORT_SHEET_ORDER, chunk_size, workers)
             else:
-                raise CommandError("Unsupported file type. Use .xlsx or .csv")
+                sheets = load_workbook_frames(file_path, IMPORT_SHEET_ORDER, chunk_size, workers)
         except Exception as e:
             raise CommandError(f"Error reading file: {e}")
 
+        if bulk:
+            batch_size = max(1, options['batch_size'])
+            importer = BulkImporter(
+                batch_size=batch_size,
+                info=self.stdout.write,
+                warn=lambda message: self.stdout.write(self.style.WARNING(message)),
+                journal=ImportJournal(file_path, full=options['full'], batch_size=batch_size),
+                dry_run=options['dry_run'],
+            )
+            summary = importer.run(sheets)
+        else:
+            summary = self.import_row_by_row(sheets)
+
+        # ------------------ Finished ------------------
+        if options['dry_run']:
+            self.stdout.write(self.style.SUCCESS("Dry run, nothing was written"))
+            for sheet in summary:
+                counts = importer.diff[sheet]
+                self.stdout.write(self.style.SUCCESS(
+                    f"  {sheet}: {counts['inserted']} to insert, {counts['updated']} to update, {counts['unchanged']} unchanged"
+                ))
+            return
+
+        self.stdout.write(self.style.SUCCESS("✅ Import Summary"))
+        for k,v in summary.items():
+            if bulk:
+                counts = importer.diff[k]
+                v = f"{v} ({counts['inserted']} inserted, {counts['updated']} updated, {counts['unchanged']} unchanged)"
+            self.stdout.write(self.style.SUCCESS(f"  {k}: {v} records imported"))
+
+    def import_row_by_row(self, all_sheets):
         summary = {}
 
         # ------------------ AssetTypes and Option tables ------------------
@@ -365,8 +385,8 @@ class Command(BaseCommand):
                 # Clean defaults
                 defaults = {k:v for k,v in defaults.items() if v is not None}
                 try:
-                    PendingProduct.objects.create(**defaults)
-                    cnt += 1
+                    if create_unless_exists(PendingProduct, **defaults):
+                        cnt += 1
                 except Exception as e:
                     self.stdout.write(self.style.WARNING(f"Skipping PendingProduct row {asset_id}: {e}"))
             summary['Pending_Products'] = cnt
@@ -400,7 +420,8 @@ class Command(BaseCommand):
                 edited_at_dt = parse_datetime(edited_at_raw) or (parse_date(edited_at_raw) and datetime.combine(parse_date(edited_at_raw), datetime.min.time()))
 
                 try:
-                    ProductConfiguration.objects.create(
+                    created = create_unless_exists(
+                        ProductConfiguration,
                         asset=asset,
                         date_of_config=date_of_config or timezone.now().date(),
                         cpu=cpu_obj,
@@ -415,7 +436,8 @@ class Command(BaseCommand):
                         edited_by=edited_by_user,
                         edited_at=edited_at_dt if edited_at_dt else None
                     )
-                    cnt += 1
+                    if created:
+                        cnt += 1
                 except Exception as e:
                     self.stdout.write(self.style.WARNING(f"Skipping configuration row for {asset_id}: {e}"))
             summary['Configurations'] = cnt
@@ -443,7 +465,8 @@ class Command(BaseCommand):
                 submitted_by_user = get_user_by_username(try_get(row, 'submitted_by', 'submitted_by__username'))
 
                 try:
-                    PendingProductConfiguration.objects.create(
+                    created = create_unless_exists(
+                        PendingProductConfiguration,
                         asset=asset,
                         date_of_config=date_of_config or timezone.now().date(),
                         cpu=cpu_obj,
@@ -457,7 +480,8 @@ class Command(BaseCommand):
                         cost=cost or 0,
                         submitted_by=submitted_by_user
                     )
-                    cnt += 1
+                    if created:
+                        cnt += 1
                 except Exception as e:
                     self.stdout.write(self.style.WARNING(f"Skipping pending config row for {asset_id}: {e}"))
             summary['Pending_Configurations'] = cnt
@@ -542,8 +566,8 @@ class Command(BaseCommand):
                     'contract_number': contract
                 }
                 try:
-                    PendingRental.objects.create(**defaults, submitted_by=submitted_by_user)
-                    cnt += 1
+                    if create_unless_exists(PendingRental, **defaults, submitted_by=submitted_by_user):
+                        cnt += 1
                 except Exception as e:
                     self.stdout.write(self.style.WARNING(f"Skipping pending rental row: {e}"))
             summary['Pending_Rentals'] = cnt
@@ -604,7 +628,8 @@ class Command(BaseCommand):
                 submitted_by_user = get_user_by_username(try_get(row, 'submitted_by', 'submitted_by__username'))
 
                 try:
-                    PendingRepair.objects.create(
+                    created = create_unless_exists(
+                        PendingRepair,
                         original_repair=None,
                         product=asset,
                         date=repair_date,
@@ -614,12 +639,10 @@ class Command(BaseCommand):
                         repair_warranty_months=try_get(row, 'repair_warranty_months') or 0,
                         submitted_by=submitted_by_user
                     )
-                    cnt += 1
+                    if created:
+                        cnt += 1
                 except Exception as e:
                     self.stdout.write(self.style.WARNING(f"Skipping pending repair row for {asset_id}: {e}"))
             summary['Pending_Repairs'] = cnt
 
-        # ------------------ Finished ------------------
-        self.stdout.write(self.style.SUCCESS("✅ Import Summary"))
-        for k,v in summary.items():
-            self.stdout.write(self.style.SUCCESS(f"  {k}: {v} records imported"))
+        return summary
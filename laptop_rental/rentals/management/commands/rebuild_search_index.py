@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from rentals.search import rebuild_index
+
+
+# python manage.py rebuild_search_index
+# Saves and deletes keep the index current; run this after writes that skip
+# model signals (QuerySet.update(), raw SQL, restoring a dump).
+class Command(BaseCommand):
+    help = "Rebuild the search index of products, customers, suppliers and rentals"
+
+    def handle(self, *args, **kwargs):
+        count = rebuild_index()
+        self.stdout.write(self.style.SUCCESS(f"Indexed {count} rows."))
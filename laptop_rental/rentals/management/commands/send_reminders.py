@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from rentals.reminders import REMINDER_KINDS, send_reminders
+
+
+# python manage.py send_reminders [--date 2025-01-31] [--kind billing] [--dry-run]
+# Meant to run once a day from cron; reminders already sent are skipped, so
+# reruns (or a missed-day catch-up with --date) send nothing twice.
+class Command(BaseCommand):
+    help = "Email today's billing and contract-expiry reminders, one email per recipient"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', help="Day to send for (YYYY-MM-DD); default today")
+        parser.add_argument('--kind', action='append', choices=REMINDER_KINDS, help="Only this kind (repeatable)")
+        parser.add_argument('--dry-run', action='store_true', help="List the reminders without sending")
+
+    def handle(self, *args, **options):
+        day = None
+        if options['date']:
+            day = parse_date(options['date'])
+            if day is None:
+                raise CommandError("--date must be YYYY-MM-DD")
+
+        try:
+            sent = send_reminders(day, kinds=options['kind'] or REMINDER_KINDS, dry_run=options['dry_run'])
+        except Exception as e:
+            raise CommandError(f"Error sending reminders: {e}")
+
+        for recipient, items in sent.items():
+            self.stdout.write(f"{recipient}: {len(items)} reminder(s)")
+        verb = "Would send" if options['dry_run'] else "Sent"
+        self.stdout.write(self.style.SUCCESS(f"{verb} {len(sent)} email(s)."))
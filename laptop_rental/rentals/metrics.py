@@ -0,0 +1,150 @@
+import logging
+import threading
+import time
+from collections import Counter, defaultdict, deque
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+# -----------------------------
+# Request metrics
+# -----------------------------
+# Opt-in (PERF_METRICS_ENABLED). For every request the middleware measures
+# wall time, the number and total time of SQL queries, how many of those
+# repeat a statement already run by the same request (the N+1 signature)
+# and the response size. Samples are kept per URL name in a rolling window
+# of the last PERF_METRICS_WINDOW requests and summarised at /metrics.
+
+# Upper bounds (ms) of the wall time histogram buckets
+BUCKETS_MS = [5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000]
+
+log = logging.getLogger(__name__)
+
+
+def window_size():
+    return getattr(settings, 'PERF_METRICS_WINDOW', 1000)
+
+
+def duplicate_warning_threshold():
+    return getattr(settings, 'PERF_DUPLICATE_QUERY_WARN', 10)
+
+
+class QueryRecorder:
+    """connection.execute_wrapper() that counts and times every statement."""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.statements = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.seconds += time.perf_counter() - start
+            self.count += 1
+            self.statements[sql] += 1
+
+    @property
+    def duplicates(self):
+        return self.count - len(self.statements)
+
+    def most_repeated(self):
+        if not self.statements:
+            return None, 0
+        return self.statements.most_common(1)[0]
+
+
+def _percentile(ordered, fraction):
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+class MetricsStore:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._samples = defaultdict(lambda: deque(maxlen=window_size()))
+        self._worst_duplicate = {}
+
+    def add(self, route, wall_ms, recorder, size, status):
+        sql, repeats = recorder.most_repeated()
+        with self._lock:
+            self._samples[route].append(
+                (wall_ms, recorder.count, recorder.seconds * 1000, recorder.duplicates, size, status)
+            )
+            if repeats > 1 and repeats >= self._worst_duplicate.get(route, (None, 0))[1]:
+                self._worst_duplicate[route] = (sql[:300], repeats)
+
+    def reset(self):
+        with self._lock:
+            self._samples.clear()
+            self._worst_duplicate.clear()
+
+    def summary(self):
+        """{url name: statistics over its window}, slowest p95 first."""
+        with self._lock:
+            samples = {route: list(window) for route, window in self._samples.items()}
+            worst = dict(self._worst_duplicate)
+
+        routes = {}
+        for route, rows in samples.items():
+            walls = sorted(row[0] for row in rows)
+            histogram = Counter(next((b for b in BUCKETS_MS if wall <= b), 'inf') for wall in walls)
+            count = len(rows)
+            routes[route] = {
+                'requests': count,
+                'wall_ms': {
+                    'p50': round(_percentile(walls, 0.50), 2),
+                    'p95': round(_percentile(walls, 0.95), 2),
+                    'p99': round(_percentile(walls, 0.99), 2),
+                    'max': round(walls[-1], 2),
+                },
+                'histogram_ms': {f'<={b}': histogram[b] for b in BUCKETS_MS} | {'>5000': histogram['inf']},
+                'queries': {
+                    'mean': round(sum(row[1] for row in rows) / count, 2),
+                    'max': max(row[1] for row in rows),
+                    'mean_ms': round(sum(row[2] for row in rows) / count, 2),
+                },
+                'duplicate_queries': {
+                    'mean': round(sum(row[3] for row in rows) / count, 2),
+                    'max': max(row[3] for row in rows),
+                    'worst': dict(zip(('sql', 'times'), worst[route])) if route in worst else None,
+                },
+                'response_bytes': {
+                    'mean': round(sum(row[4] for row in rows) / count),
+                    'max': max(row[4] for row in rows),
+                },
+                'errors': sum(1 for row in rows if row[5] >= 500),
+            }
+        return dict(sorted(routes.items(), key=lambda item: -item[1]['wall_ms']['p95']))
+
+
+store = MetricsStore()
+
+
+class PerformanceMiddleware:
+    def __init__(self, get_response):
+        if not getattr(settings, 'PERF_METRICS_ENABLED', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        recorder = QueryRecorder()
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(recorder))
+            response = self.get_response(request)
+        wall_ms = (time.perf_counter() - start) * 1000
+
+        match = getattr(request, 'resolver_match', None)
+        route = match.view_name if match else 'unresolved'
+        size = 0 if response.streaming else len(response.content)
+        store.add(route, wall_ms, recorder, size, response.status_code)
+
+        if recorder.duplicates >= duplicate_warning_threshold():
+            sql, repeats = recorder.most_repeated()
+            log.warning("%s ran %d duplicate queries; repeated %d times: %s", route, recorder.duplicates, repeats, sql[:300])
+        return response
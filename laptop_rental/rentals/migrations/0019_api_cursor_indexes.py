@@ -0,0 +1,23 @@
+# Generated by Django 5.0.14 on 2026-10-18 21:45
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rentals', '0018_alter_pendingproduct_serial_no'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='productasset',
+            index=models.Index(fields=['asset_id', 'id'], name='productasset_cursor_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='rental',
+            index=models.Index(fields=['-rental_start_date', '-id'], name='rental_cursor_idx'),
+        ),
+    ]
@@ -0,0 +1,60 @@
+# Generated by Django 5.0.14 on 2026-10-18 21:47
+
+import django.utils.timezone
+from django.db import migrations, models
+from django.db.models import Max
+
+TRACKED_MODELS = [
+    'AssetType', 'CPUOption', 'RAMOption', 'HDDOption', 'GraphicsOption', 'DisplaySizeOption',
+    'Supplier', 'Customer', 'ProductAsset', 'ProductConfiguration', 'Rental', 'Repair',
+]
+
+
+def seed_table_versions(apps, schema_editor):
+    """Start every tracked table at version 1, last changed at its latest edited_at."""
+    TableVersion = apps.get_model('rentals', 'TableVersion')
+    now = django.utils.timezone.now()
+    for name in TRACKED_MODELS:
+        model = apps.get_model('rentals', name)
+        changed_at = None
+        if any(field.name == 'edited_at' for field in model._meta.fields):
+            changed_at = model.objects.aggregate(latest=Max('edited_at'))['latest']
+        TableVersion.objects.create(table=f'rentals.{name.lower()}', version=1, changed_at=changed_at or now)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rentals', '0019_api_cursor_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TableVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('table', models.CharField(max_length=100, unique=True)),
+                ('version', models.PositiveBigIntegerField(default=0)),
+                ('changed_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='RowVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('table', models.CharField(max_length=100)),
+                ('object_id', models.PositiveBigIntegerField()),
+                ('version', models.PositiveBigIntegerField()),
+                ('created_version', models.PositiveBigIntegerField(default=0)),
+                ('deleted', models.BooleanField(default=False)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['table', 'version'], name='rowversion_table_version_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='rowversion',
+            constraint=models.UniqueConstraint(fields=('table', 'object_id'), name='unique_row_version'),
+        ),
+        migrations.RunPython(seed_table_versions, migrations.RunPython.noop),
+    ]
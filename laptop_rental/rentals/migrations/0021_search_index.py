@@ -0,0 +1,51 @@
+# Generated by Django 5.0.14 on 2026-10-18 21:51
+
+from django.db import migrations, models
+
+SEARCH_FIELDS = {
+    'ProductAsset': ['asset_id', 'brand', 'model_no', 'serial_no'],
+    'Customer': ['name', 'phone_number_primary', 'phone_number_secondary', 'email'],
+    'Supplier': ['name', 'gstin', 'phone_primary', 'phone_secondary', 'email', 'reference_name'],
+    'Rental': ['contract_number'],
+}
+
+
+def build_search_index(apps, schema_editor):
+    from rentals.search import tokenize
+
+    SearchToken = apps.get_model('rentals', 'SearchToken')
+    for name, fields in SEARCH_FIELDS.items():
+        table = f'rentals.{name.lower()}'
+        batch = []
+        for row in apps.get_model('rentals', name).objects.values('pk', *fields).iterator(chunk_size=1000):
+            tokens = set()
+            for field in fields:
+                tokens |= tokenize(row[field])
+            batch += [SearchToken(table=table, object_id=row['pk'], token=token) for token in tokens]
+            if len(batch) >= 1000:
+                SearchToken.objects.bulk_create(batch)
+                batch = []
+        SearchToken.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rentals', '0020_sync_versions'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchToken',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('table', models.CharField(max_length=100)),
+                ('object_id', models.PositiveBigIntegerField()),
+                ('token', models.CharField(max_length=64)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['table', 'token'], name='searchtoken_lookup_idx'), models.Index(fields=['table', 'object_id'], name='searchtoken_row_idx')],
+            },
+        ),
+        migrations.RunPython(build_search_index, migrations.RunPython.noop),
+    ]
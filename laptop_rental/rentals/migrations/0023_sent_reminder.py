@@ -0,0 +1,30 @@
+# Generated by Django 5.0.14 on 2026-10-18 22:01
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rentals', '0022_audit_event'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SentReminder',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('billing', 'Billing due'), ('contract', 'Contract expiring')], max_length=10)),
+                ('due_date', models.DateField()),
+                ('recipient', models.EmailField(max_length=254)),
+                ('sent_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('rental', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sent_reminders', to='rentals.rental')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='sentreminder',
+            constraint=models.UniqueConstraint(fields=('kind', 'rental', 'due_date', 'recipient'), name='unique_sent_reminder'),
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.0.14 on 2026-10-18 22:03
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rentals', '0023_sent_reminder'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='JobWatermark',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('run_date', models.DateField(blank=True, null=True)),
+                ('version', models.PositiveBigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='rental',
+            name='contract_alert',
+            field=models.CharField(blank=True, choices=[('', 'None'), ('expiring', 'Contract expiring'), ('overdue', 'Contract ended')], default='', editable=False, max_length=10),
+        ),
+        migrations.AddIndex(
+            model_name='rental',
+            index=models.Index(fields=['status', 'contract_validity'], name='rental_status_validity_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='rental',
+            index=models.Index(fields=['status', 'billing_day'], name='rental_status_billing_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='rental',
+            index=models.Index(fields=['status', 'contract_alert'], name='rental_status_alert_idx'),
+        ),
+    ]
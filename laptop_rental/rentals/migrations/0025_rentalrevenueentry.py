@@ -0,0 +1,33 @@
+# Generated by Django 5.0.14 on 2026-10-18 20:50
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rentals', '0024_rental_contract_alert'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RentalRevenueEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField(help_text='First day of the month')),
+                ('days', models.PositiveSmallIntegerField(default=0)),
+                ('amount', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('through_date', models.DateField(help_text='Last day of this month already counted')),
+                ('asset', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='revenue_entries', to='rentals.productasset')),
+                ('rental', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='revenue_entries', to='rentals.rental')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['asset', 'month'], name='rentals_ren_asset_i_2b20a8_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='rentalrevenueentry',
+            constraint=models.UniqueConstraint(fields=('rental', 'month'), name='unique_revenue_entry_per_rental_month'),
+        ),
+    ]
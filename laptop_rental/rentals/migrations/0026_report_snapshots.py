@@ -0,0 +1,75 @@
+# Generated by Django 5.0.14 on 2026-10-18 20:54
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rentals', '0025_rentalrevenueentry'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MonthlyReportSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField(help_text='First day of the month rentals started in', unique=True)),
+                ('rental_count', models.PositiveIntegerField(default=0)),
+                ('total_payment', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('rental_days', models.PositiveIntegerField(default=0)),
+                ('refreshed_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['month'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ReportRefreshLog',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('refreshed_at', models.DateTimeField(auto_now_add=True)),
+                ('full', models.BooleanField(default=False)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='AssetTypeReportSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('asset_count', models.PositiveIntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('refreshed_at', models.DateTimeField(auto_now=True)),
+                ('asset_type', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='report_snapshot', to='rentals.assettype')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='AssetReportSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('repair_count', models.PositiveIntegerField(default=0)),
+                ('repair_cost', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('config_cost', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('warranty_expiry', models.DateField(blank=True, db_index=True, null=True)),
+                ('repair_warranty_until', models.DateField(blank=True, db_index=True, null=True)),
+                ('refreshed_at', models.DateTimeField(auto_now=True)),
+                ('asset', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='report_snapshot', to='rentals.productasset')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['-repair_cost'], name='rentals_ass_repair__f52f66_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='CustomerReportSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rental_count', models.PositiveIntegerField(default=0)),
+                ('total_payment', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('refreshed_at', models.DateTimeField(auto_now=True)),
+                ('customer', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='report_snapshot', to='rentals.customer')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['-total_payment'], name='rentals_cus_total_p_55d6bf_idx')],
+            },
+        ),
+    ]
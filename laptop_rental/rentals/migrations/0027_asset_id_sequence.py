@@ -0,0 +1,39 @@
+# Generated by Django 5.0.14 on 2026-10-18 21:00
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rentals', '0026_report_snapshots'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AssetIdSequence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('year', models.PositiveIntegerField(unique=True)),
+                ('last_number', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='pendingproduct',
+            index=models.Index(fields=['asset_id'], name='rentals_pen_asset_i_fea26c_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pendingproduct',
+            index=models.Index(fields=['asset_number'], name='rentals_pen_asset_n_c4ef41_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='productasset',
+            index=models.Index(fields=['asset_id'], name='rentals_pro_asset_i_4f3333_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='productasset',
+            index=models.Index(fields=['asset_number'], name='rentals_pro_asset_n_a7e488_idx'),
+        ),
+    ]
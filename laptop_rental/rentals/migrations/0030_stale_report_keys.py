@@ -0,0 +1,25 @@
+# Generated by Django 5.0.14 on 2026-10-18 22:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rentals', '0029_import_journal'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StaleReportKey',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('customer', 'Customer'), ('month', 'Month'), ('asset_type', 'Asset type'), ('asset', 'Asset')], max_length=20)),
+                ('key', models.CharField(help_text='Primary key, or first day of the month', max_length=20)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='stalereportkey',
+            constraint=models.UniqueConstraint(fields=('kind', 'key'), name='unique_stale_report_key'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.0.14 on 2026-10-18 22:52
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rentals', '0031_export_job_heartbeat'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='rental',
+            index=models.Index(fields=['status', '-rental_end_date', '-id'], name='rental_history_idx'),
+        ),
+    ]
@@ -0,0 +1,64 @@
+# Generated by Django 5.0.14 on 2026-10-18 23:40
+
+from django.db import migrations, models
+
+
+# Frozen copies of rentals.asset_ids helpers, so later changes there cannot
+# alter what this migration does
+def format_asset_id(year, number):
+    return f"Pixel/{year}/{str(number).zfill(3)}"
+
+
+def parse_asset_id(asset_id):
+    try:
+        _, year, rest = asset_id.split('/', 2)
+        return int(year), int(rest.split()[0])
+    except (AttributeError, ValueError, IndexError):
+        return None, None
+
+
+def assign_missing_asset_ids(apps, schema_editor):
+    """Give every product stored without an asset ID the next free number of its purchase year."""
+    ProductAsset = apps.get_model('rentals', 'ProductAsset')
+    PendingProduct = apps.get_model('rentals', 'PendingProduct')
+    AssetIdSequence = apps.get_model('rentals', 'AssetIdSequence')
+
+    missing = list(ProductAsset.objects.filter(asset_id__isnull=True).order_by('pk'))
+    if not missing:
+        return
+
+    used = {}
+    for model in (ProductAsset, PendingProduct):
+        for asset_id in model.objects.exclude(asset_id__isnull=True).values_list('asset_id', flat=True).iterator():
+            year, number = parse_asset_id(asset_id)
+            if number:
+                used.setdefault(year, set()).add(number)
+
+    for product in missing:
+        year = product.purchase_date.year
+        taken = used.setdefault(year, set())
+        sequence, _ = AssetIdSequence.objects.get_or_create(year=year, defaults={'last_number': max(taken, default=0)})
+        number = sequence.last_number + 1
+        while number in taken:
+            number += 1
+        taken.add(number)
+        sequence.last_number = number
+        sequence.save(update_fields=['last_number'])
+        product.asset_number, product.asset_id = number, format_asset_id(year, number)
+        product.save(update_fields=['asset_number', 'asset_id'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rentals', '0032_rental_history_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(assign_missing_asset_ids, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='productasset',
+            name='asset_id',
+            field=models.CharField(blank=True, max_length=50),
+        ),
+    ]
@@ -1,9 +1,10 @@
-from django.db import models
+from django.db import models, transaction
 from django.utils.timezone import now
 from django.utils import timezone
 from datetime import timedelta, date
 from django.contrib.auth.models import User
 from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
 from dateutil.relativedelta import relativedelta
 
 # -----------------------------
@@ -74,6 +75,21 @@ class GraphicsOption(models.Model):
 # -----------------------------
 # Product Model (Type)
 # -----------------------------
+class ProductAssetQuerySet(models.QuerySet):
+    def with_availability(self):
+        """
+        Annotate rental state in the same query so is_available and the
+        rented_by filter need no per-row queries:
+        has_ongoing_rental, has_pending_rental and current_renter (customer name).
+        """
+        ongoing = Rental.objects.filter(asset=models.OuterRef('pk'), status='ongoing')
+        return self.annotate(
+            has_ongoing_rental=models.Exists(ongoing),
+            has_pending_rental=models.Exists(PendingRental.objects.filter(asset=models.OuterRef('pk'))),
+            current_renter=models.Subquery(ongoing.order_by('pk').values('customer__name')[:1]),
+        )
+
+
 class ProductAsset(models.Model):
     ASSET_TYPES = [
         ('Laptop', 'Laptop'),
@@ -93,7 +109,7 @@ class ProductAsset(models.Model):
     ]
     asset_number = models.PositiveIntegerField(help_text="Enter the asset id (e.g., 7 for 007)",null=True, blank=True)
 
-    asset_id = models.CharField(max_length=50, blank=True, null=True)
+    asset_id = models.CharField(max_length=50, blank=True)
 
     type_of_asset = models.ForeignKey(AssetType, on_delete=models.CASCADE)
     brand = models.CharField(max_length=100)
@@ -134,6 +150,16 @@ class ProductAsset(models.Model):
     edited_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
     edited_at = models.DateTimeField(null=True, blank=True) 
 
+    objects = ProductAssetQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['asset_id']),
+            models.Index(fields=['asset_number']),
+            # Cursor pagination order of the products API
+            models.Index(fields=['asset_id', 'id'], name='productasset_cursor_idx'),
+        ]
+
 
     # Calculate warranty expiry date dynamically
     # @property
@@ -194,66 +220,40 @@ class ProductAsset(models.Model):
         return "Active"
     
 
-    def save(self, *args, **kwargs):
-        # ... (keep your existing warranty logic here) ...
+    def set_warranty_flag(self):
+        """under_warranty from purchase date and warranty length."""
         expiry = self.warranty_expiry_date
         if expiry:
             self.under_warranty = timezone.now().date() <= expiry
         else:
             self.under_warranty = False
 
-        # --- START: REPLACEMENT LOGIC FOR ASSET ID ---
-        if not self.asset_id:
-            year = self.purchase_date.year if self.purchase_date else timezone.now().year
-            prefix = f"Pixel/{year}/"
-
-            # ✅ CORRECT: Query BOTH tables for existing IDs
-            existing_ids = list(ProductAsset.objects.filter(asset_id__startswith=prefix).values_list('asset_id', flat=True)) + \
-                           list(PendingProduct.objects.filter(asset_id__startswith=prefix).values_list('asset_id', flat=True))
-
-            # --- (The rest of the logic is for generating the next number) ---
-            if self.asset_number:  # Use manually provided asset_number
-                number_str = str(self.asset_number).zfill(3)
-                suffix = f" {self.asset_suffix}" if self.asset_suffix else ""
-                generated_id = f"{prefix}{number_str}{suffix}"
-
-                if generated_id in existing_ids:
-                    raise ValueError(f"Asset Number '{self.asset_number}' is already in use for year {year}.")
-
-            else:  # Auto-generate the next available number
-                used_numbers = set()
-                for aid in existing_ids:
-                    try:
-                        # Extract the numeric part of the asset ID
-                        num_part = aid.split('/')[-1].split()[0]
-                        used_numbers.add(int(num_part))
-                    except (ValueError, IndexError):
-                        continue
-                
-                next_number = 1
-                while next_number in used_numbers:
-                    next_number += 1
-                
-                self.asset_number = next_number # Also set the asset_number field
-                generated_id = f"{prefix}{str(next_number).zfill(3)}"
-
-            self.asset_id = generated_id
-        # --- END: REPLACEMENT LOGIC FOR ASSET ID ---
-
-        # Final check against both tables is good practice
+    def save(self, *args, **kwargs):
+        self.set_warranty_flag()
+
+        from .asset_ids import allocate_asset_id, claim_asset_id
+
+        year = self.purchase_date.year if self.purchase_date else timezone.now().year
         # Exclude the pending being approved (if set) to avoid false positive during approval
         pending_pk_to_exclude = getattr(self, '_pending_pk', None)
-        pending_conflict_qs = PendingProduct.objects.filter(asset_id=self.asset_id)
-        if pending_pk_to_exclude:
-            pending_conflict_qs = pending_conflict_qs.exclude(pk=pending_pk_to_exclude)
 
-        if ProductAsset.objects.exclude(pk=self.pk).filter(asset_id=self.asset_id).exists() or pending_conflict_qs.exists():
-            raise ValueError(f"Asset ID '{self.asset_id}' already exists. Please use a unique one.")
+        with transaction.atomic():
+            if not self.asset_id:
+                self.asset_number, self.asset_id = allocate_asset_id(
+                    year, self.asset_number, self.asset_suffix,
+                    exclude_product=self.pk, exclude_pending=pending_pk_to_exclude,
+                )
+            elif self._state.adding or self.asset_id != self._stored_asset_id():
+                # An unchanged ID was validated when it was stored
+                claim_asset_id(self.asset_id, year, exclude_product=self.pk, exclude_pending=pending_pk_to_exclude)
 
-        if self.edited_by:
-            self.edited_at = timezone.now()
+            if self.edited_by:
+                self.edited_at = timezone.now()
 
-        super().save(*args, **kwargs)
+            super().save(*args, **kwargs)
+
+    def _stored_asset_id(self):
+        return ProductAsset.objects.filter(pk=self.pk).values_list('asset_id', flat=True).first()
 
     # ... rest of your model ...
 
@@ -270,8 +270,13 @@ class ProductAsset(models.Model):
         2. It has NO ongoing rentals.
         3. It has NO pending rentals awaiting approval.
         """
-        has_ongoing_rental = self.rentals.filter(status='ongoing').exists()
-        has_pending_rental = PendingRental.objects.filter(asset=self).exists()
+        if hasattr(self, 'has_ongoing_rental'):
+            # Annotated by ProductAsset.objects.with_availability()
+            has_ongoing_rental = self.has_ongoing_rental
+            has_pending_rental = self.has_pending_rental
+        else:
+            has_ongoing_rental = self.rentals.filter(status='ongoing').exists()
+            has_pending_rental = PendingRental.objects.filter(asset=self).exists()
         
         return self.condition_status == 'working' and not has_ongoing_rental and not has_pending_rental
 
@@ -336,59 +341,37 @@ class PendingProduct(models.Model):
     submitted_at = models.DateTimeField(auto_now_add=True)
 
     def save(self, *args, **kwargs):
-        if not self.asset_id:
-            year = self.purchase_date.year if self.purchase_date else timezone.now().year
-            prefix = f"Pixel/{year}/"
-
-            # ✅ CORRECT: Query BOTH tables
-            existing_ids = list(ProductAsset.objects.filter(asset_id__startswith=prefix).values_list('asset_id', flat=True)) + \
-                           list(PendingProduct.objects.filter(asset_id__startswith=prefix).exclude(pk=self.pk).values_list('asset_id', flat=True))
-
-            if self.asset_number:
-                number_str = str(self.asset_number).zfill(3)
-                suffix = f" {self.asset_suffix}" if self.asset_suffix else ""
-                generated_id = f"{prefix}{number_str}{suffix}"
-                if generated_id in existing_ids:
-                    raise ValueError(f"Asset Number '{self.asset_number}' is already in use for year {year}.")
-            else:
-                used_numbers = set()
-                for aid in existing_ids:
-                    try:
-                        num_part = aid.split('/')[-1].split()[0]
-                        used_numbers.add(int(num_part))
-                    except (ValueError, IndexError):
-                        continue
-                
-                next_number = 1
-                while next_number in used_numbers:
-                    next_number += 1
-                
-                self.asset_number = next_number
-                generated_id = f"{prefix}{str(next_number).zfill(3)}"
-
-            self.asset_id = generated_id
+        from .asset_ids import allocate_asset_id
 
-        super().save(*args, **kwargs)
+        with transaction.atomic():
+            if not self.asset_id:
+                year = self.purchase_date.year if self.purchase_date else timezone.now().year
+                self.asset_number, self.asset_id = allocate_asset_id(
+                    year, self.asset_number, self.asset_suffix, exclude_pending=self.pk,
+                )
+
+            super().save(*args, **kwargs)
     # ... rest of your model ...
 
 
     def get_next_available_number(self, year):
-        prefix = f"Pixel/{year}/"
-        existing_ids = list(ProductAsset.objects.filter(asset_id__startswith=prefix).values_list('asset_id', flat=True)) + \
-                    list(PendingProduct.objects.filter(asset_id__startswith=prefix).values_list('asset_id', flat=True))
+        from .asset_ids import peek_next_number
+        return f"{peek_next_number(year):03d}"
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['asset_id']),
+            models.Index(fields=['asset_number']),
+        ]
 
-        used_numbers = set()
-        for aid in existing_ids:
-            try:
-                num_part = aid.replace(prefix, '').split()[0]
-                used_numbers.add(int(num_part))
-            except:
-                pass
 
-        for i in range(1, 1000):
-            if i not in used_numbers:
-                return f"{i:03d}"
-        return "999"
+class AssetIdSequence(models.Model):
+    """Last automatically allocated asset number per purchase year."""
+    year = models.PositiveIntegerField(unique=True)
+    last_number = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"Pixel/{self.year}/ -> {self.last_number}"
 
 
 
@@ -492,9 +475,32 @@ class Rental(models.Model):
     contract_number = models.CharField(max_length=50, blank=True)
     edited_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
     edited_at = models.DateTimeField(auto_now=True)
+
+    ALERT_CHOICES = [
+        ('', 'None'),
+        ('expiring', 'Contract expiring'),
+        ('overdue', 'Contract ended'),
+    ]
+    # Kept current by save() and the check_overdue job (rentals/status.py)
+    contract_alert = models.CharField(max_length=10, choices=ALERT_CHOICES, blank=True, default='', editable=False)
+
+    class Meta:
+        indexes = [
+            # Cursor pagination order of the rentals API
+            models.Index(fields=['-rental_start_date', '-id'], name='rental_cursor_idx'),
+            # Contract expiry and billing day lookups of the status job and reminders
+            models.Index(fields=['status', 'contract_validity'], name='rental_status_validity_idx'),
+            models.Index(fields=['status', 'billing_day'], name='rental_status_billing_idx'),
+            models.Index(fields=['status', 'contract_alert'], name='rental_status_alert_idx'),
+            # Rental history (completed rentals, newest first)
+            models.Index(fields=['status', '-rental_end_date', '-id'], name='rental_history_idx'),
+        ]
+
     def save(self, *args, **kwargs):
+        from .status import contract_alert
         if self.edited_by:
             self.edited_at = timezone.now()
+        self.contract_alert = contract_alert(self.status, self.contract_validity)
         super().save(*args, **kwargs)
 
     def is_active(self):
@@ -504,6 +510,30 @@ class Rental(models.Model):
         return f'''Rental of '{self.asset}' to "{self.customer}" starting from {self.rental_start_date}'''
 
 
+class RentalRevenueEntry(models.Model):
+    """
+    Revenue ledger: one row per rental per calendar month, pro-rated by days.
+    ProductAsset.revenue is the sum of these rows (see rentals/revenue.py).
+    """
+    rental = models.ForeignKey(Rental, on_delete=models.CASCADE, related_name='revenue_entries')
+    asset = models.ForeignKey(ProductAsset, on_delete=models.CASCADE, related_name='revenue_entries', null=True, blank=True)
+    month = models.DateField(help_text="First day of the month")
+    days = models.PositiveSmallIntegerField(default=0)
+    amount = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    through_date = models.DateField(help_text="Last day of this month already counted")
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['rental', 'month'], name='unique_revenue_entry_per_rental_month'),
+        ]
+        indexes = [
+            models.Index(fields=['asset', 'month']),
+        ]
+
+    def __str__(self):
+        return f"{self.rental_id} | {self.month:%Y-%m} | {self.amount}"
+
+
 class PendingRental(models.Model):
     original_rental = models.ForeignKey(Rental, null=True, blank=True, on_delete=models.SET_NULL)  # ✅ Add this
     customer = models.ForeignKey(Customer, on_delete=models.CASCADE)
@@ -645,3 +675,281 @@ class PendingRepair(models.Model):
 
     def __str__(self):
         return f"Pending Repair for {self.product.asset_id}"
+
+    @property
+    def is_delete(self):
+        """A delete request: an edit that carries no repair data (see views.delete_repair)."""
+        return self.is_edit and self.name is None and self.date is None and self.cost is None
+
+
+# -----------------------------
+# Sync versions
+# -----------------------------
+class TableVersion(models.Model):
+    """Write counter of one tracked table (see rentals/sync.py); drives API ETags and sync tokens."""
+    table = models.CharField(max_length=100, unique=True)  # model label, e.g. 'rentals.rental'
+    version = models.PositiveBigIntegerField(default=0)
+    changed_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"{self.table} v{self.version}"
+
+
+class RowVersion(models.Model):
+    """Table version at which a row was created and last changed or deleted."""
+    table = models.CharField(max_length=100)
+    object_id = models.PositiveBigIntegerField()
+    version = models.PositiveBigIntegerField()
+    created_version = models.PositiveBigIntegerField(default=0)  # 0 = existed before tracking began
+    deleted = models.BooleanField(default=False)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['table', 'object_id'], name='unique_row_version'),
+        ]
+        indexes = [models.Index(fields=['table', 'version'], name='rowversion_table_version_idx')]
+
+
+# -----------------------------
+# Search index
+# -----------------------------
+class SearchToken(models.Model):
+    """One lowercase word of a searchable row (see rentals/search.py)."""
+    table = models.CharField(max_length=100)  # model label, e.g. 'rentals.customer'
+    object_id = models.PositiveBigIntegerField()
+    token = models.CharField(max_length=64)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['table', 'token'], name='searchtoken_lookup_idx'),
+            models.Index(fields=['table', 'object_id'], name='searchtoken_row_idx'),
+        ]
+
+
+# -----------------------------
+# Audit trail
+# -----------------------------
+class AuditEvent(models.Model):
+    """One write to a row, or one action taken on it in a view (see rentals/audit.py)."""
+    EVENT_CHOICES = [
+        ('create', 'Created'),
+        ('update', 'Updated'),
+        ('delete', 'Deleted'),
+        ('action', 'Action'),
+    ]
+
+    table = models.CharField(max_length=100)  # model label, e.g. 'rentals.rental'
+    object_id = models.PositiveBigIntegerField(null=True, blank=True)  # empty for system tasks
+    event = models.CharField(max_length=10, choices=EVENT_CHOICES)
+    description = models.CharField(max_length=255, blank=True)
+    user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='audit_events')
+    data = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder)  # field values after the write
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['table', 'object_id', '-created_at'], name='auditevent_row_idx'),
+            models.Index(fields=['-created_at'], name='auditevent_time_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_event_display()} {self.table} #{self.object_id}"
+
+
+# -----------------------------
+# Reminders
+# -----------------------------
+class SentReminder(models.Model):
+    """A reminder already mailed (see rentals/reminders.py); makes reruns skip it."""
+    KIND_CHOICES = [
+        ('billing', 'Billing due'),
+        ('contract', 'Contract expiring'),
+    ]
+
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    rental = models.ForeignKey(Rental, on_delete=models.CASCADE, related_name='sent_reminders')
+    due_date = models.DateField()  # billing date, or the contract's validity
+    recipient = models.EmailField()
+    sent_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['kind', 'rental', 'due_date', 'recipient'], name='unique_sent_reminder'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_kind_display()} for rental #{self.rental_id} to {self.recipient}"
+
+
+# -----------------------------
+# Scheduled jobs
+# -----------------------------
+class JobWatermark(models.Model):
+    """How far an incremental job got on its last run (see rentals/status.py)."""
+    name = models.CharField(max_length=50, unique=True)
+    run_date = models.DateField(null=True, blank=True)  # None: next run processes everything
+    version = models.PositiveBigIntegerField(default=0)  # table version already processed
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name} @ {self.run_date} v{self.version}"
+
+
+# -----------------------------
+# Report snapshots
+# -----------------------------
+# Pre-aggregated figures read by report_dashboard. Writes queue the keys
+# they affect (StaleReportKey, from rentals/signals.py); the scheduled
+# `manage.py refresh_report_snapshots` recomputes those rows, or everything
+# with --full.
+
+class CustomerReportSnapshot(models.Model):
+    customer = models.OneToOneField(Customer, on_delete=models.CASCADE, related_name='report_snapshot')
+    rental_count = models.PositiveIntegerField(default=0)
+    total_payment = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    refreshed_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-total_payment']),
+        ]
+
+
+class AssetTypeReportSnapshot(models.Model):
+    asset_type = models.OneToOneField(AssetType, on_delete=models.CASCADE, related_name='report_snapshot')
+    asset_count = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    refreshed_at = models.DateTimeField(auto_now=True)
+
+
+class MonthlyReportSnapshot(models.Model):
+    month = models.DateField(unique=True, help_text="First day of the month rentals started in")
+    rental_count = models.PositiveIntegerField(default=0)
+    total_payment = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    rental_days = models.PositiveIntegerField(default=0)
+    refreshed_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['month']
+
+
+class AssetReportSnapshot(models.Model):
+    asset = models.OneToOneField(ProductAsset, on_delete=models.CASCADE, related_name='report_snapshot')
+    repair_count = models.PositiveIntegerField(default=0)
+    repair_cost = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    config_cost = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    warranty_expiry = models.DateField(null=True, blank=True, db_index=True)
+    repair_warranty_until = models.DateField(null=True, blank=True, db_index=True)
+    refreshed_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-repair_cost']),
+        ]
+
+
+class ReportRefreshLog(models.Model):
+    refreshed_at = models.DateTimeField(auto_now_add=True)
+    full = models.BooleanField(default=False)
+
+
+class StaleReportKey(models.Model):
+    KIND_CHOICES = [
+        ('customer', 'Customer'),
+        ('month', 'Month'),
+        ('asset_type', 'Asset type'),
+        ('asset', 'Asset'),
+    ]
+
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    key = models.CharField(max_length=20, help_text="Primary key, or first day of the month")
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['kind', 'key'], name='unique_stale_report_key'),
+        ]
+
+
+# -----------------------------
+# Background exports
+# -----------------------------
+# Queued by the Excel/PDF export views and processed by
+# `manage.py run_export_worker` (see rentals/export_jobs.py).
+
+class ExportJob(models.Model):
+    FORMAT_CHOICES = [
+        ('xlsx', 'Excel'),
+        ('pdf', 'PDF'),
+    ]
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+    format = models.CharField(max_length=10, choices=FORMAT_CHOICES)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='queued')
+    progress = models.PositiveSmallIntegerField(default=0, help_text="Percent complete")
+    requested_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    heartbeat_at = models.DateTimeField(null=True, blank=True, help_text="Last sign of life from the worker running it")
+    finished_at = models.DateTimeField(null=True, blank=True)
+    file_name = models.CharField(max_length=255, blank=True)
+    error = models.TextField(blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'created_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.get_format_display()} export #{self.pk} ({self.status})"
+
+
+# -----------------------------
+# Import journal
+# -----------------------------
+# Written by `manage.py import_all_data --bulk` (see rentals/import_journal.py)
+# so re-imports skip unchanged rows and interrupted imports pick up where
+# they stopped.
+
+class ImportRun(models.Model):
+    STATUS_CHOICES = [
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+    file_name = models.CharField(max_length=255)
+    file_hash = models.CharField(max_length=64, help_text="SHA-256 of the imported file")
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='running')
+    sheet = models.CharField(max_length=64, blank=True, help_text="Sheet of the last committed batch")
+    rows_done = models.PositiveIntegerField(default=0, help_text="Rows of that sheet committed so far")
+    needs_refresh = models.BooleanField(default=False, help_text="Live rows were written; ledger and reports need a refresh")
+    started_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-started_at']
+        indexes = [
+            models.Index(fields=['file_hash', 'status']),
+        ]
+
+    def __str__(self):
+        return f"Import of {self.file_name} ({self.status})"
+
+
+class ImportJournalEntry(models.Model):
+    sheet = models.CharField(max_length=64)
+    row_key = models.CharField(max_length=32, help_text="Hash of the row's natural key, or of its content")
+    content_hash = models.CharField(max_length=32)
+    imported_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['sheet', 'row_key'], name='unique_import_journal_row'),
+        ]
+
+    def __str__(self):
+        return f"{self.sheet} {self.row_key}"
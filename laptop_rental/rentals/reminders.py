@@ -0,0 +1,125 @@
+import calendar
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import send_mass_mail
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Rental, SentReminder
+
+# -----------------------------
+# Billing and contract reminders
+# -----------------------------
+# Run once a day (manage.py send_reminders). Ongoing rentals due for
+# billing that day, and those whose contract ends within
+# REMINDER_CONTRACT_DAYS (or has already ended), are loaded in one query,
+# grouped into one email per recipient and sent over a single SMTP
+# connection. Every reminder sent is stored as a SentReminder, so a rerun
+# on the same day - or the daily runs before a contract ends - skip it.
+
+REMINDER_KINDS = ('billing', 'contract')
+
+
+def contract_notice_days():
+    return getattr(settings, 'REMINDER_CONTRACT_DAYS', 7)
+
+
+def office_recipients():
+    return list(getattr(settings, 'REMINDER_RECIPIENTS', ['accounts@pixelitsolution.com']))
+
+
+def notify_customers():
+    return getattr(settings, 'REMINDER_NOTIFY_CUSTOMERS', False)
+
+
+def billing_days(day):
+    """Billing days that fall on `day`: its own, and 29-31 on the last day of a shorter month."""
+    if day.day == calendar.monthrange(day.year, day.month)[1]:
+        return list(range(day.day, 32))
+    return [day.day]
+
+
+def due_reminders(day, kinds=REMINDER_KINDS):
+    """[(kind, due date, rental)] due on `day`, with customer and asset loaded."""
+    days = billing_days(day)
+    horizon = day + timedelta(days=contract_notice_days())
+    condition = Q(pk__in=[])
+    if 'billing' in kinds:
+        condition |= Q(billing_day__in=days)
+    if 'contract' in kinds:
+        condition |= Q(contract_validity__lte=horizon)
+
+    due = []
+    rentals = (
+        Rental.objects.filter(condition, status='ongoing')
+        .select_related('customer', 'asset').order_by('customer__name', 'pk')
+    )
+    for rental in rentals:
+        if 'billing' in kinds and rental.billing_day in days:
+            due.append(('billing', day, rental))
+        if 'contract' in kinds and rental.contract_validity and rental.contract_validity <= horizon:
+            due.append(('contract', rental.contract_validity, rental))
+    return due
+
+
+def pending_reminders(day, kinds=REMINDER_KINDS):
+    """{recipient: [(kind, due date, rental)]} of the reminders due on `day` not sent yet."""
+    due = due_reminders(day, kinds)
+    sent = set(
+        SentReminder.objects.filter(rental__in={rental.pk for _, _, rental in due}, kind__in=kinds)
+        .values_list('kind', 'rental_id', 'due_date', 'recipient')
+    ) if due else set()
+
+    grouped = defaultdict(list)
+    for kind, due_date, rental in due:
+        recipients = office_recipients()
+        if notify_customers() and rental.customer.email:
+            recipients.append(rental.customer.email)
+        for recipient in recipients:
+            if (kind, rental.pk, due_date, recipient) not in sent:
+                grouped[recipient].append((kind, due_date, rental))
+    return grouped
+
+
+def _line(kind, due_date, rental):
+    asset_id = rental.asset.asset_id if rental.asset else 'Unknown'
+    line = f"- Asset: {asset_id} | Customer: {rental.customer.name} | Contract #: {rental.contract_number or 'N/A'}"
+    if kind == 'contract':
+        line += f" | Contract valid until: {due_date}"
+    return line
+
+
+def compose(day, items):
+    """(subject, body) of the email for one recipient."""
+    sections = []
+    for kind, heading in [('billing', "Billing due today"), ('contract', "Contracts ending soon or ended")]:
+        lines = [_line(*item) for item in items if item[0] == kind]
+        if lines:
+            sections.append(f"{heading}:\n\n" + "\n".join(lines))
+    return f"Rental reminders for {day:%d %b %Y}", "\n\n".join(sections)
+
+
+def send_reminders(day=None, kinds=REMINDER_KINDS, dry_run=False):
+    """
+    Mail the reminders due on `day` (default today) that have not been sent
+    yet, and record them. Returns what was (or, with dry_run, would be)
+    sent as {recipient: [(kind, due date, rental)]}. Mail errors propagate
+    and nothing is recorded, so the next run tries again.
+    """
+    day = day or timezone.now().date()
+    grouped = pending_reminders(day, kinds)
+    if dry_run or not grouped:
+        return grouped
+
+    send_mass_mail(
+        [(*compose(day, items), settings.DEFAULT_FROM_EMAIL, [recipient]) for recipient, items in grouped.items()],
+        fail_silently=False,
+    )
+    SentReminder.objects.bulk_create([
+        SentReminder(kind=kind, rental=rental, due_date=due_date, recipient=recipient)
+        for recipient, items in grouped.items()
+        for kind, due_date, rental in items
+    ], ignore_conflicts=True)
+    return grouped
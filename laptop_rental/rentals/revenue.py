@@ -0,0 +1,300 @@
+from collections import defaultdict
+from datetime import date
+from decimal import Decimal, ROUND_HALF_UP
+
+import numpy as np
+import pandas as pd
+
+from django.db import transaction
+from django.db.models import DecimalField, F, Max, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce, Least
+
+from .models import ProductAsset, Rental, RentalRevenueEntry
+from .reporting import mark_asset_types_stale, refresh_asset_type_snapshots
+from .sync import ID_BATCH_SIZE, record_changes
+
+LEDGER_BATCH_SIZE = 2000
+
+
+# -----------------------------
+# Batch revenue engine
+# -----------------------------
+# Every revenue code path (ledger, daily script, utils.calculate_rental_revenue)
+# goes through revenue_segments(), with one rounding policy: a rental's
+# revenue is the exact sum of its month fractions rounded once, half-even, to
+# paise (as round() did in the old per-month loop in utils). A ledger row
+# holds what its month adds to that rounded running total, so the rows of a
+# rental always add up to rental_revenue_totals().
+
+# Common multiple of every month length (28-31 days), so exact month
+# fractions can be summed in integers
+_MONTH_LENGTHS_LCM = 377580
+
+def _to_paise(payment_amount):
+    return int((Decimal(payment_amount or 0) * 100).quantize(Decimal('1'), rounding=ROUND_HALF_UP))
+
+
+def paise_to_decimal(paise):
+    return Decimal(int(paise)).scaleb(-2)
+
+
+def _round_half_even(numerators, denominator):
+    quotient, remainder = np.divmod(numerators, denominator)
+    return quotient + ((2 * remainder > denominator) | ((2 * remainder == denominator) & (quotient % 2 == 1)))
+
+
+def revenue_segments(starts, ends, payments):
+    """
+    Split every rental into calendar-month segments in one vectorized pass.
+
+    `starts`/`ends` are sequences of dates (end inclusive) and `payments` the
+    monthly amounts, all of the same length. Returns a DataFrame with one row
+    per (rental, month): position, month, days, days_in_month, through_date
+    and amount_paise. Rentals whose end is before their start yield no rows.
+    """
+    columns = ['position', 'month', 'days', 'days_in_month', 'through_date', 'amount_paise']
+    if len(starts) == 0:
+        return pd.DataFrame(columns=columns)
+
+    starts = np.asarray(starts, dtype='datetime64[D]')
+    ends = np.asarray(ends, dtype='datetime64[D]')
+    paise = np.asarray([_to_paise(p) for p in payments], dtype=np.int64)
+
+    start_months = starts.astype('datetime64[M]')
+    end_months = ends.astype('datetime64[M]')
+    month_counts = np.where(ends >= starts, (end_months - start_months).astype(np.int64) + 1, 0)
+
+    # One row per (rental, month)
+    position = np.repeat(np.arange(len(starts)), month_counts)
+    first_row = np.repeat(np.cumsum(month_counts) - month_counts, month_counts)
+    offset = np.arange(len(position)) - first_row
+
+    months = start_months[position] + offset.astype('timedelta64[M]')
+    month_first = months.astype('datetime64[D]')
+    next_month_first = (months + np.timedelta64(1, 'M')).astype('datetime64[D]')
+    days_in_month = (next_month_first - month_first).astype(np.int64)
+
+    segment_start = np.maximum(starts[position], month_first)
+    segment_end = np.minimum(ends[position], next_month_first - np.timedelta64(1, 'D'))
+    days = (segment_end - segment_start).astype(np.int64) + 1
+
+    # Running total of the exact fractions payment * days / days_in_month,
+    # in 1/_MONTH_LENGTHS_LCM paise, rounded; each segment adds the step
+    fractions = paise[position] * days * (_MONTH_LENGTHS_LCM // days_in_month)
+    running = pd.Series(fractions).groupby(position).cumsum().to_numpy(dtype=np.int64)
+    rounded = _round_half_even(running, _MONTH_LENGTHS_LCM)
+    amount_paise = rounded - np.where(offset == 0, 0, np.roll(rounded, 1))
+
+    return pd.DataFrame({
+        'position': position,
+        'month': month_first,
+        'days': days,
+        'days_in_month': days_in_month,
+        'through_date': segment_end,
+        'amount_paise': amount_paise,
+    }, columns=columns)
+
+
+def rental_revenue_totals(starts, ends, payments):
+    """
+    Total revenue (Decimal) for each rental: the exact sum of its month
+    fractions (payment * days / days_in_month), rounded half-even to paise
+    once. Equal to the sum of the rental's ledger rows.
+    """
+    segments = revenue_segments(starts, ends, payments)
+    totals = np.zeros(len(starts), dtype=np.int64)
+    np.add.at(
+        totals, segments['position'].to_numpy(dtype=np.int64), segments['amount_paise'].to_numpy(dtype=np.int64),
+    )
+    return [paise_to_decimal(t) for t in totals]
+
+
+def effective_end_date(rental, today):
+    """Last day a rental earns revenue as of `today` (never in the future)."""
+    end_date = rental.rental_end_date or today
+    return min(end_date, today)
+
+
+# -----------------------------
+# Ledger maintenance
+# -----------------------------
+
+def _reconcile_ledger(rentals, today):
+    """
+    Bring the ledger rows of `rentals` in line with their dates and payment.
+    Only changed months are written; returns the set of touched asset ids.
+    """
+    rentals = list(rentals)
+    if not rentals:
+        return set()
+
+    existing = defaultdict(dict)
+    touched_assets = set()
+    for entry in RentalRevenueEntry.objects.filter(rental__in=rentals):
+        existing[entry.rental_id][entry.month] = entry
+        touched_assets.add(entry.asset_id)
+
+    to_create, to_update, to_delete = [], [], []
+
+    earning = [
+        r for r in rentals
+        if r.payment_amount and r.payment_amount > 0 and r.rental_start_date
+    ]
+    segments = revenue_segments(
+        [r.rental_start_date for r in earning],
+        [effective_end_date(r, today) for r in earning],
+        [r.payment_amount for r in earning],
+    )
+
+    wanted = defaultdict(dict)
+    for position, month, days, through, amount_paise in zip(
+        segments['position'], segments['month'], segments['days'],
+        segments['through_date'], segments['amount_paise'],
+    ):
+        wanted[earning[position].pk][month.date()] = (int(days), through.date(), paise_to_decimal(amount_paise))
+
+    for rental in rentals:
+        current = existing.get(rental.pk, {})
+        wanted_months = wanted.get(rental.pk, {})
+
+        for month, entry in current.items():
+            if month not in wanted_months:
+                to_delete.append(entry.pk)
+
+        for month, (days, through, amount) in wanted_months.items():
+            entry = current.get(month)
+            if entry is None:
+                to_create.append(RentalRevenueEntry(
+                    rental=rental, asset_id=rental.asset_id, month=month,
+                    days=days, amount=amount, through_date=through,
+                ))
+            elif (entry.days, entry.amount, entry.through_date, entry.asset_id) != (days, amount, through, rental.asset_id):
+                entry.days, entry.amount, entry.through_date, entry.asset_id = days, amount, through, rental.asset_id
+                to_update.append(entry)
+
+        if rental.asset_id:
+            touched_assets.add(rental.asset_id)
+
+    if to_delete:
+        RentalRevenueEntry.objects.filter(pk__in=to_delete).delete()
+    if to_create:
+        RentalRevenueEntry.objects.bulk_create(to_create, batch_size=500)
+    if to_update:
+        RentalRevenueEntry.objects.bulk_update(
+            to_update, ['days', 'amount', 'through_date', 'asset'], batch_size=500
+        )
+
+    touched_assets.discard(None)
+    return touched_assets
+
+
+def refresh_asset_revenue(asset_ids=None):
+    """
+    Set ProductAsset.revenue to the ledger total, writing only the assets
+    whose total changed and stamping them for sync (rentals/sync.py), since
+    UPDATE sends no post_save. Pass asset_ids to limit the refresh to the
+    assets that changed. Returns the number of assets updated.
+    """
+    ledger_total = (
+        RentalRevenueEntry.objects.filter(asset=OuterRef('pk'))
+        .values('asset')
+        .annotate(total=Sum('amount'))
+        .values('total')
+    )
+    total = Coalesce(
+        Subquery(ledger_total, output_field=DecimalField(max_digits=12, decimal_places=2)),
+        Value(Decimal('0.00')),
+    )
+    assets = ProductAsset.objects.all()
+    if asset_ids is not None:
+        assets = assets.filter(pk__in=asset_ids)
+    changed = list(
+        assets.annotate(ledger_revenue=total).exclude(revenue=F('ledger_revenue')).values_list('pk', flat=True)
+    )
+    for start in range(0, len(changed), ID_BATCH_SIZE):
+        ProductAsset.objects.filter(pk__in=changed[start:start + ID_BATCH_SIZE]).update(revenue=total)
+    record_changes(ProductAsset, changed)
+
+    # Revenue-by-type report snapshot follows the asset totals
+    if asset_ids is None:
+        refresh_asset_type_snapshots()
+    else:
+        mark_asset_types_stale(asset_ids)
+    return len(changed)
+
+
+def sync_rental_revenue(rental, today=None, extra_asset_ids=()):
+    """
+    Rewrite the ledger for one rental after it was created, edited or completed,
+    then refresh the revenue of every asset it touches.
+    """
+    today = today or date.today()
+    with transaction.atomic():
+        asset_ids = _reconcile_ledger([rental], today) | set(extra_asset_ids)
+        asset_ids.discard(None)
+        if asset_ids:
+            refresh_asset_revenue(asset_ids)
+
+
+def extend_revenue_ledger(today=None):
+    """
+    Incremental daily run: append revenue for every rental whose ledger stops
+    before its effective end date. Rentals already processed up to their end
+    date (or up to today) are not touched, and neither are rentals ending
+    before they start: they earn nothing, so their ledger never advances.
+    Returns the number of rentals that were brought up to date.
+    """
+    today = today or date.today()
+
+    pending = (
+        Rental.objects.filter(payment_amount__gt=0, rental_start_date__lte=today)
+        .exclude(rental_end_date__lt=F('rental_start_date'))
+        .annotate(
+            processed_through=Max('revenue_entries__through_date'),
+            earns_until=Least(Coalesce('rental_end_date', Value(today)), Value(today)),
+        )
+        .filter(
+            Q(processed_through__isnull=True) |
+            Q(processed_through__lt=F('earns_until'))
+        )
+    )
+
+    updated = 0
+    asset_ids = set()
+    with transaction.atomic():
+        batch = []
+        for rental in pending.iterator(chunk_size=LEDGER_BATCH_SIZE):
+            batch.append(rental)
+            if len(batch) >= LEDGER_BATCH_SIZE:
+                asset_ids |= _reconcile_ledger(batch, today)
+                updated += len(batch)
+                batch = []
+        if batch:
+            asset_ids |= _reconcile_ledger(batch, today)
+            updated += len(batch)
+
+        if asset_ids:
+            refresh_asset_revenue(asset_ids)
+
+    return updated
+
+
+def rebuild_revenue_ledger(today=None):
+    """
+    Reconcile the ledger of every rental and refresh every asset's revenue.
+    Backfills rentals written before the ledger existed or through paths
+    that skip Rental.save(); returns the number of rentals checked.
+    """
+    today = today or date.today()
+    checked = 0
+    with transaction.atomic():
+        last_pk = 0
+        while True:
+            batch = list(Rental.objects.filter(pk__gt=last_pk).order_by('pk')[:LEDGER_BATCH_SIZE])
+            if not batch:
+                break
+            _reconcile_ledger(batch, today)
+            checked += len(batch)
+            last_pk = batch[-1].pk
+        refresh_asset_revenue()
+    return checked
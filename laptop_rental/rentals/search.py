@@ -0,0 +1,150 @@
+import re
+from functools import reduce
+from operator import or_
+
+from django.db import transaction
+from django.db.models import Case, IntegerField, Max, OuterRef, Q, Subquery, Value, When
+from django.db.models.signals import post_delete, post_save
+
+from .models import Customer, ProductAsset, Rental, SearchToken, Supplier
+
+# Columns indexed per model. Every value is split into lowercase words
+# (plus the value with its separators removed, so "98765 43210" is found
+# by "9876543"), one SearchToken row per word. A search matches rows that
+# have, for every word of the query, a token starting with it; that is an
+# index range scan on (table, token) instead of a LIKE '%q%' table scan.
+SEARCH_FIELDS = {
+    ProductAsset: ['asset_id', 'brand', 'model_no', 'serial_no'],
+    Customer: ['name', 'phone_number_primary', 'phone_number_secondary', 'email'],
+    Supplier: ['name', 'gstin', 'phone_primary', 'phone_secondary', 'email', 'reference_name'],
+    Rental: ['contract_number'],
+}
+
+TOKEN_LENGTH = 64
+MAX_QUERY_TERMS = 8
+WORD_RE = re.compile(r'[^\W_]+')
+
+
+def table_key(model):
+    return model._meta.label_lower
+
+
+def tokenize(value):
+    """Distinct search words of one value, lowercased."""
+    if value is None:
+        return set()
+    text = str(value).lower()
+    words = WORD_RE.findall(text)
+    tokens = {word[:TOKEN_LENGTH] for word in words}
+    if len(words) > 1:
+        tokens.add(''.join(words)[:TOKEN_LENGTH])
+    return tokens
+
+
+def query_terms(query):
+    words = WORD_RE.findall((query or '').lower())
+    return list(dict.fromkeys(word[:TOKEN_LENGTH] for word in words))[:MAX_QUERY_TERMS]
+
+
+# -----------------------------
+# Index maintenance
+# -----------------------------
+
+def entries_for(model, instance, fields=None):
+    fields = fields or SEARCH_FIELDS[model]
+    tokens = set()
+    for field in fields:
+        tokens |= tokenize(getattr(instance, field))
+    table = table_key(model)
+    return [SearchToken(table=table, object_id=instance.pk, token=token) for token in sorted(tokens)]
+
+
+def index_instance(model, instance):
+    with transaction.atomic():
+        SearchToken.objects.filter(table=table_key(model), object_id=instance.pk).delete()
+        SearchToken.objects.bulk_create(entries_for(model, instance))
+
+
+def unindex_instance(model, pk):
+    SearchToken.objects.filter(table=table_key(model), object_id=pk).delete()
+
+
+def rebuild_index(models=None, batch_size=1000):
+    """Re-create the tokens of every row of `models` (all indexed models by default); returns rows indexed."""
+    count = 0
+    for model in models or SEARCH_FIELDS:
+        fields = SEARCH_FIELDS[model]
+        with transaction.atomic():
+            SearchToken.objects.filter(table=table_key(model)).delete()
+            batch = []
+            for instance in model.objects.only('pk', *fields).iterator(chunk_size=batch_size):
+                batch += entries_for(model, instance, fields)
+                count += 1
+                if len(batch) >= batch_size:
+                    SearchToken.objects.bulk_create(batch)
+                    batch = []
+            SearchToken.objects.bulk_create(batch)
+    return count
+
+
+def _row_saved(sender, instance, raw=False, **kwargs):
+    if not raw:
+        index_instance(sender, instance)
+
+
+def _row_deleted(sender, instance, **kwargs):
+    unindex_instance(sender, instance.pk)
+
+
+def connect_signals():
+    for model in SEARCH_FIELDS:
+        post_save.connect(_row_saved, sender=model, dispatch_uid=f'search-save-{table_key(model)}')
+        post_delete.connect(_row_deleted, sender=model, dispatch_uid=f'search-delete-{table_key(model)}')
+
+
+# -----------------------------
+# Queries
+# -----------------------------
+
+def matching(model, query):
+    """
+    Ids of `model` rows matching every word of `query` by prefix, as a
+    values() queryset with a `rank`: how many of the words match a token
+    exactly rather than only as a prefix.
+    None when the query has no words.
+    """
+    terms = query_terms(query)
+    if not terms:
+        return None
+    flags = {
+        f'm{i}': Max(Case(When(token__istartswith=term, then=Value(1)), default=Value(0), output_field=IntegerField()))
+        for i, term in enumerate(terms)
+    }
+    exact = [
+        Max(Case(When(token=term, then=Value(1)), default=Value(0), output_field=IntegerField()))
+        for term in terms
+    ]
+    return (
+        SearchToken.objects
+        .filter(table=table_key(model))
+        .filter(reduce(or_, [Q(token__istartswith=term) for term in terms]))
+        .values('object_id')
+        .annotate(**flags, rank=reduce(lambda a, b: a + b, exact))
+        .filter(**{name: 1 for name in flags})
+    )
+
+
+def search(queryset, query, rank=False):
+    """
+    Filter `queryset` to the rows matching `query` through the search
+    index; with `rank`, best matches first. A blank query returns the
+    queryset unchanged.
+    """
+    matches = matching(queryset.model, query)
+    if matches is None:
+        return queryset
+    queryset = queryset.filter(pk__in=matches.values('object_id'))
+    if rank:
+        best = matches.filter(object_id=OuterRef('pk')).values('rank')[:1]
+        queryset = queryset.annotate(search_rank=Subquery(best)).order_by('-search_rank', 'pk')
+    return queryset
@@ -1,10 +1,121 @@
+from django.core.exceptions import ImproperlyConfigured
+from django.db.models import Prefetch
 from rest_framework import serializers
+from rest_framework.permissions import SAFE_METHODS
 from .models import (
     Customer, ProductAsset, Rental, ProductConfiguration, Repair, Supplier,
     PendingCustomer, PendingProduct, PendingRental, PendingProductConfiguration, PendingRepair,
     AssetType, CPUOption, HDDOption, RAMOption, DisplaySizeOption, GraphicsOption
 )
 
+# ===================================================================
+# 0. EAGER LOADING & SPARSE FIELDSETS
+# ===================================================================
+# Serializers list the relations their `source='x.y'` fields walk in
+# Meta.select_related / Meta.prefetch_related. The viewsets apply them to
+# their querysets, so a page of results costs the same few queries no
+# matter how many rows it holds.
+#
+# On reads, `?fields=id,brand` keeps only the listed fields and
+# `?expand=customer` replaces a relation by the nested object, for the
+# relations a serializer lists in Meta.expandable (field name -> serializer
+# class, or its name when the class is defined further down; a name that
+# does not resolve raises ImproperlyConfigured, and a test checks them all).
+# Expanded relations are always included and loaded with the queryset.
+
+def query_param_list(request, name):
+    """Comma-separated query parameter as a list (empty when absent)."""
+    if request is None:
+        return []
+    raw = request.query_params.get(name, '')
+    return [part.strip() for part in raw.split(',') if part.strip()]
+
+
+def source_models(serializer_class, expand=()):
+    if hasattr(serializer_class, 'source_models'):
+        return serializer_class.source_models(expand)
+    return {serializer_class.Meta.model}
+
+
+class EagerLoadingMixin:
+    @classmethod
+    def expandable(cls):
+        names = getattr(getattr(cls, 'Meta', None), 'expandable', {})
+        resolved = {}
+        for field, serializer in names.items():
+            if isinstance(serializer, str):
+                serializer = globals().get(serializer)
+            if not (isinstance(serializer, type) and issubclass(serializer, serializers.BaseSerializer)):
+                raise ImproperlyConfigured(
+                    f"{cls.__name__}.Meta.expandable['{field}'] is not a serializer: {names[field]!r}"
+                )
+            resolved[field] = serializer
+        return resolved
+
+    @classmethod
+    def setup_eager_loading(cls, queryset, expand=()):
+        meta = getattr(cls, 'Meta', None)
+        select = list(getattr(meta, 'select_related', ()))
+        prefetch = list(getattr(meta, 'prefetch_related', ()))
+
+        expandable = cls.expandable()
+        for name in expand:
+            nested = expandable.get(name)
+            if nested is None:
+                continue
+            field = meta.model._meta.get_field(name)
+            if field.one_to_many or field.many_to_many:
+                nested_qs = nested.setup_eager_loading(nested.Meta.model.objects.all())
+                prefetch.append(Prefetch(name, queryset=nested_qs))
+            else:
+                nested_meta = nested.Meta
+                select.append(name)
+                select += [f"{name}__{path}" for path in getattr(nested_meta, 'select_related', ())]
+                prefetch += [f"{name}__{path}" for path in getattr(nested_meta, 'prefetch_related', ())]
+
+        if select:
+            queryset = queryset.select_related(*select)
+        if prefetch:
+            queryset = queryset.prefetch_related(*prefetch)
+        return queryset
+
+    @classmethod
+    def source_models(cls, expand=()):
+        """Models whose rows end up in the output: Meta.model and every related one it loads."""
+        meta = cls.Meta
+        models = {meta.model}
+        for path in [*getattr(meta, 'select_related', ()), *getattr(meta, 'prefetch_related', ())]:
+            model = meta.model
+            for part in path.split('__'):
+                model = model._meta.get_field(part).related_model
+                models.add(model)
+        expandable = cls.expandable()
+        for name in expand:
+            if name in expandable:
+                models |= source_models(expandable[name])
+        return models
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+        if request is None or request.method not in SAFE_METHODS:
+            return
+
+        expand = [name for name in query_param_list(request, 'expand') if name in self.expandable()]
+        for name in expand:
+            field = self.Meta.model._meta.get_field(name)
+            self.fields[name] = self.expandable()[name](
+                many=field.one_to_many or field.many_to_many, read_only=True,
+            )
+
+        wanted = query_param_list(request, 'fields')
+        if wanted:
+            keep = set(wanted) | set(expand)
+            for name in list(self.fields):
+                if name not in keep:
+                    self.fields.pop(name)
+
+
 # ===================================================================
 # 1. OPTION SERIALIZERS (For Mobile Dropdowns)
 # ===================================================================
@@ -44,17 +155,18 @@ class DisplaySizeOptionSerializer(serializers.ModelSerializer):
 # ===================================================================
 
 # --- CUSTOMER ---
-class CustomerSerializer(serializers.ModelSerializer):
+class CustomerSerializer(EagerLoadingMixin, serializers.ModelSerializer):
     edited_by_name = serializers.ReadOnlyField(source='edited_by.username')
 
     class Meta:
         model = Customer
         fields = '__all__'
+        select_related = ['edited_by']
         read_only_fields = ['edited_by', 'edited_at']
 
 
 # --- PRODUCT ASSET ---
-class ProductAssetSerializer(serializers.ModelSerializer):
+class ProductAssetSerializer(EagerLoadingMixin, serializers.ModelSerializer):
     # Read-Only fields for display (shows "Laptop" instead of "1")
     type_of_asset_name = serializers.ReadOnlyField(source='type_of_asset.name')
     purchased_from_name = serializers.ReadOnlyField(source='purchased_from.name')
@@ -63,6 +175,12 @@ class ProductAssetSerializer(serializers.ModelSerializer):
     class Meta:
         model = ProductAsset
         fields = '__all__'
+        select_related = ['type_of_asset', 'purchased_from', 'edited_by']
+        expandable = {
+            'type_of_asset': AssetTypeSerializer,
+            'configurations': 'ProductConfigurationSerializer',
+            'repairs': 'RepairSerializer',
+        }
         # This allows you to send ID '1' when saving, but read Name 'Dell' when viewing
         extra_kwargs = {
             'type_of_asset': {'write_only': True},
@@ -73,7 +191,7 @@ class ProductAssetSerializer(serializers.ModelSerializer):
 
 
 # --- RENTAL ---
-class RentalSerializer(serializers.ModelSerializer):
+class RentalSerializer(EagerLoadingMixin, serializers.ModelSerializer):
     customer_name = serializers.ReadOnlyField(source='customer.name')
     asset_id_display = serializers.ReadOnlyField(source='asset.asset_id')
     edited_by_name = serializers.ReadOnlyField(source='edited_by.username')
@@ -81,6 +199,8 @@ class RentalSerializer(serializers.ModelSerializer):
     class Meta:
         model = Rental
         fields = '__all__'
+        select_related = ['customer', 'asset', 'edited_by']
+        expandable = {'customer': CustomerSerializer, 'asset': ProductAssetSerializer}
         extra_kwargs = {
             'customer': {'write_only': True},
             'asset': {'write_only': True},
@@ -89,7 +209,7 @@ class RentalSerializer(serializers.ModelSerializer):
 
 
 # --- PRODUCT CONFIGURATION ---
-class ProductConfigurationSerializer(serializers.ModelSerializer):
+class ProductConfigurationSerializer(EagerLoadingMixin, serializers.ModelSerializer):
     # For displaying names
     cpu_name = serializers.ReadOnlyField(source='cpu.name')
     ram_name = serializers.ReadOnlyField(source='ram.name')
@@ -100,6 +220,7 @@ class ProductConfigurationSerializer(serializers.ModelSerializer):
     class Meta:
         model = ProductConfiguration
         fields = '__all__'
+        select_related = ['cpu', 'ram', 'hdd', 'graphics', 'display_size']
         extra_kwargs = {
             'cpu': {'write_only': True},
             'ram': {'write_only': True},
@@ -111,12 +232,13 @@ class ProductConfigurationSerializer(serializers.ModelSerializer):
 
 
 # --- REPAIR ---
-class RepairSerializer(serializers.ModelSerializer):
+class RepairSerializer(EagerLoadingMixin, serializers.ModelSerializer):
     product_display = serializers.ReadOnlyField(source='product.asset_id')
 
     class Meta:
         model = Repair
         fields = '__all__'
+        select_related = ['product']
         read_only_fields = ['edited_by', 'edited_at']
 
 
@@ -125,15 +247,16 @@ class RepairSerializer(serializers.ModelSerializer):
 # ===================================================================
 # These are critical for your mobile "Approve/Reject" feature.
 
-class PendingProductSerializer(serializers.ModelSerializer):
+class PendingProductSerializer(EagerLoadingMixin, serializers.ModelSerializer):
     submitted_by_name = serializers.ReadOnlyField(source='submitted_by.username')
     type_of_asset_name = serializers.ReadOnlyField(source='type_of_asset.name')
 
     class Meta:
         model = PendingProduct
         fields = '__all__'
+        select_related = ['submitted_by', 'type_of_asset']
 
-class PendingRentalSerializer(serializers.ModelSerializer):
+class PendingRentalSerializer(EagerLoadingMixin, serializers.ModelSerializer):
     submitted_by_name = serializers.ReadOnlyField(source='submitted_by.username')
     customer_name = serializers.ReadOnlyField(source='customer.name')
     asset_name = serializers.ReadOnlyField(source='asset.asset_id')
@@ -141,26 +264,30 @@ class PendingRentalSerializer(serializers.ModelSerializer):
     class Meta:
         model = PendingRental
         fields = '__all__'
+        select_related = ['submitted_by', 'customer', 'asset']
 
-class PendingCustomerSerializer(serializers.ModelSerializer):
+class PendingCustomerSerializer(EagerLoadingMixin, serializers.ModelSerializer):
     submitted_by_name = serializers.ReadOnlyField(source='submitted_by.username')
 
     class Meta:
         model = PendingCustomer
         fields = '__all__'
+        select_related = ['submitted_by']
 
-class PendingRepairSerializer(serializers.ModelSerializer):
+class PendingRepairSerializer(EagerLoadingMixin, serializers.ModelSerializer):
     submitted_by_name = serializers.ReadOnlyField(source='submitted_by.username')
     product_name = serializers.ReadOnlyField(source='product.asset_id')
 
     class Meta:
         model = PendingRepair
         fields = '__all__'
+        select_related = ['submitted_by', 'product']
 
-class PendingConfigSerializer(serializers.ModelSerializer):
+class PendingConfigSerializer(EagerLoadingMixin, serializers.ModelSerializer):
     submitted_by_name = serializers.ReadOnlyField(source='submitted_by.username')
     asset_name = serializers.ReadOnlyField(source='asset.asset_id')
 
     class Meta:
         model = PendingProductConfiguration
-        fields = '__all__'
\ No newline at end of file
+        fields = '__all__'
+        select_related = ['submitted_by', 'asset']
\ No newline at end of file
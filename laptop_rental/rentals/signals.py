@@ -0,0 +1,106 @@
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+
+from .models import ProductAsset, ProductConfiguration, Rental, Repair
+from .reporting import mark_stale, month_start
+from .revenue import sync_rental_revenue, refresh_asset_revenue
+
+
+def _previous_values(sender, instance, *fields):
+    """Values currently stored for an existing row, so edits can refresh the old keys too."""
+    if instance.pk is None:
+        return {}
+    return sender.objects.filter(pk=instance.pk).values(*fields).first() or {}
+
+
+# -----------------------------
+# Rental
+# -----------------------------
+
+@receiver(pre_save, sender=Rental)
+def remember_rental_keys(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    instance._report_previous = _previous_values(sender, instance, 'customer_id', 'rental_start_date')
+
+
+@receiver(post_save, sender=Rental)
+def update_rental_revenue(sender, instance, raw=False, **kwargs):
+    """Keep the revenue ledger in step, and queue the report snapshots, whenever a rental is created, edited or completed."""
+    if raw:
+        return
+    sync_rental_revenue(instance)
+
+    previous = getattr(instance, '_report_previous', {})
+    mark_stale(
+        customers=[instance.customer_id, previous.get('customer_id')],
+        months=[month_start(instance.rental_start_date), month_start(previous.get('rental_start_date'))],
+    )
+
+
+@receiver(post_delete, sender=Rental)
+def remove_rental_revenue(sender, instance, **kwargs):
+    # Ledger rows cascade with the rental; only the asset total needs a refresh
+    if instance.asset_id:
+        refresh_asset_revenue([instance.asset_id])
+    mark_stale(customers=[instance.customer_id], months=[month_start(instance.rental_start_date)])
+
+
+# -----------------------------
+# ProductAsset
+# -----------------------------
+
+@receiver(pre_save, sender=ProductAsset)
+def remember_asset_type(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    instance._report_previous = _previous_values(sender, instance, 'type_of_asset_id')
+
+
+@receiver(post_save, sender=ProductAsset)
+def update_asset_report(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    previous = getattr(instance, '_report_previous', {})
+    mark_stale(assets=[instance.pk], asset_types=[instance.type_of_asset_id, previous.get('type_of_asset_id')])
+
+
+@receiver(post_delete, sender=ProductAsset)
+def remove_asset_report(sender, instance, **kwargs):
+    mark_stale(asset_types=[instance.type_of_asset_id])
+
+
+# -----------------------------
+# Repair / ProductConfiguration costs
+# -----------------------------
+
+@receiver(pre_save, sender=Repair)
+def remember_repair_product(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    instance._report_previous = _previous_values(sender, instance, 'product_id')
+
+
+@receiver(pre_save, sender=ProductConfiguration)
+def remember_config_asset(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    instance._report_previous = _previous_values(sender, instance, 'asset_id')
+
+
+@receiver(post_save, sender=Repair)
+@receiver(post_delete, sender=Repair)
+def update_repair_report(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    previous = getattr(instance, '_report_previous', {})
+    mark_stale(assets=[instance.product_id, previous.get('product_id')])
+
+
+@receiver(post_save, sender=ProductConfiguration)
+@receiver(post_delete, sender=ProductConfiguration)
+def update_config_report(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    previous = getattr(instance, '_report_previous', {})
+    mark_stale(assets=[instance.asset_id, previous.get('asset_id')])
@@ -1,32 +1,154 @@
+import atexit
+import glob
+import json
 import logging
-from datetime import datetime
-from django.conf import settings
 import os
+import queue
+import threading
+from datetime import datetime, timedelta, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+from django.conf import settings
+
+from .audit import record_action
 
-# Define log directory
-LOG_DIR = os.path.join(settings.BASE_DIR, 'logs')
-os.makedirs(LOG_DIR, exist_ok=True)
+# -----------------------------
+# Action log
+# -----------------------------
+# log_action() only puts the record on an in-memory queue; a background
+# listener thread writes it to logs/site_YYYY-MM-DD.log (local date) as one
+# JSON object per line. The listener is started on first use in each
+# process (so forked workers get their own) and drained at exit.
+# Every process appends to the same day's file, each line with a single
+# O_APPEND write, and a new day simply opens a new file: nothing is ever
+# renamed, so there is no rollover for the processes to race on. Days
+# older than SITE_LOG_BACKUP_DAYS are deleted when a writer opens a new day.
 
-# Configure logger
 logger = logging.getLogger('site_logger')
 logger.setLevel(logging.INFO)
+logger.propagate = False  # keep the root console handler off the request thread
 
-# Log file with date
-log_file = os.path.join(LOG_DIR, f"site_{datetime.now().strftime('%Y-%m-%d')}.log")
-file_handler = logging.FileHandler(log_file)
-formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
-file_handler.setFormatter(formatter)
+_queue = queue.SimpleQueue()
+_lock = threading.Lock()
+_listener = None
+_listener_pid = None
 
 if not logger.handlers:
-    logger.addHandler(file_handler)
+    logger.addHandler(QueueHandler(_queue))
+
+
+def log_dir():
+    return getattr(settings, 'SITE_LOG_DIR', os.path.join(settings.BASE_DIR, 'logs'))
+
+
+class JsonLinesFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+        }
+        entry.update(getattr(record, 'action', None) or {'message': record.getMessage()})
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+def log_path(day, directory=None):
+    return os.path.join(directory or log_dir(), f"site_{day:%Y-%m-%d}.log")
+
+
+class DailyFileHandler(logging.Handler):
+    """Appends each record to its day's file; safe to share between processes."""
+
+    def __init__(self, directory, backup_days):
+        super().__init__()
+        self.directory = directory
+        self.backup_days = backup_days
+        self.day = None
+        self.fd = None
+
+    def emit(self, record):
+        try:
+            line = (self.format(record) + '\n').encode('utf-8')
+            day = datetime.fromtimestamp(record.created).date()
+            if day != self.day:
+                self._open(day)
+            os.write(self.fd, line)
+        except Exception:
+            self.handleError(record)
+
+    def _open(self, day):
+        self._close_file()
+        os.makedirs(self.directory, exist_ok=True)
+        self.fd = os.open(log_path(day, self.directory), os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        self.day = day
+        self.prune(day)
+
+    def prune(self, today):
+        oldest = log_path(today - timedelta(days=self.backup_days), self.directory)
+        for path in glob.glob(os.path.join(self.directory, 'site_????-??-??.log')):
+            if path < oldest:
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass  # pruned by another process
+
+    def _close_file(self):
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = self.day = None
+
+    def close(self):
+        self.acquire()
+        try:
+            self._close_file()
+        finally:
+            self.release()
+        super().close()
+
+
+def _file_handler():
+    handler = DailyFileHandler(log_dir(), getattr(settings, 'SITE_LOG_BACKUP_DAYS', 90))
+    handler.setFormatter(JsonLinesFormatter())
+    return handler
+
+
+def start():
+    """Start this process's writer thread, if it is not running yet."""
+    global _listener, _listener_pid
+    with _lock:
+        if _listener is not None and _listener_pid == os.getpid():
+            return
+        # A listener inherited through fork has no thread; replace it
+        _listener = QueueListener(_queue, _file_handler(), respect_handler_level=True)
+        _listener_pid = os.getpid()
+        _listener.start()
+
+
+def stop():
+    """Write out everything queued so far and stop the writer thread."""
+    global _listener, _listener_pid
+    with _lock:
+        if _listener is None or _listener_pid != os.getpid():
+            _listener = None
+            return
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = _listener_pid = None
+
+
+atexit.register(stop)
+
 
 def log_action(user, action, obj_type, obj_id=None, extra=None):
     """
-    Record user actions or system events.
+    Record user actions or system events, in the log file and the audit trail.
     """
-    message = f"User: {user.username if user else 'System'} | Action: {action} | Object: {obj_type}"
-    if obj_id:
-        message += f" | ID: {obj_id}" 
-    if extra:
-        message += f" | Details: {extra}"
-    logger.info(message)
+    record_action(user, action, obj_type, obj_id)
+    start()
+    logger.info(action, extra={'action': {
+        'user': user.username if user else 'System',
+        'action': action,
+        'object_type': obj_type,
+        'object_id': obj_id,
+        'details': extra,
+    }})
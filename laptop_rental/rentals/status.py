@@ -0,0 +1,92 @@
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import JobWatermark, Rental, RowVersion, TableVersion
+from .reminders import contract_notice_days
+from .sync import record_changes, table_key
+
+# -----------------------------
+# Contract alerts
+# -----------------------------
+# Rental.contract_alert flags ongoing rentals whose contract has ended
+# ('overdue') or ends within REMINDER_CONTRACT_DAYS ('expiring'), so lists
+# filter on an indexed column instead of comparing dates row by row.
+# save() sets it; the daily check_overdue job catches what changes without
+# a save. Between two runs that is only:
+#   - contracts that crossed a threshold as the date moved on, found by a
+#     range scan of the (status, contract_validity) index;
+#   - rentals written without save() (QuerySet.update()), found through
+#     their row versions (rentals/sync.py) after the last run's watermark.
+
+WATERMARK = 'rental_contract_alerts'
+
+
+def contract_alert(status, validity, today=None):
+    if status != 'ongoing' or validity is None:
+        return ''
+    today = today or timezone.now().date()
+    if validity < today:
+        return 'overdue'
+    if validity <= today + timedelta(days=contract_notice_days()):
+        return 'expiring'
+    return ''
+
+
+def _candidates(watermark, today, version):
+    """Rentals whose alert can differ from the stored one."""
+    if watermark.run_date is None:
+        return Rental.objects.filter(Q(status='ongoing', contract_validity__isnull=False) | ~Q(contract_alert=''))
+
+    notice = timedelta(days=contract_notice_days())
+    last = watermark.run_date
+    crossed = (
+        Q(status='ongoing', contract_validity__gt=last + notice, contract_validity__lte=today + notice)  # now expiring
+        | Q(status='ongoing', contract_validity__gte=last, contract_validity__lt=today)  # now ended
+    )
+    written = RowVersion.objects.filter(
+        table=table_key(Rental), version__gt=watermark.version, version__lte=version, deleted=False,
+    ).values('object_id')
+    return Rental.objects.filter(crossed | Q(pk__in=written))
+
+
+def refresh_contract_alerts(today=None, full=False):
+    """
+    Bring contract_alert up to date for `today` (default: today), looking
+    only at rentals that can have changed since the last run unless `full`.
+    Returns {'checked': n, 'overdue': n, 'expiring': n, 'cleared': n}.
+    """
+    today = today or timezone.now().date()
+    with transaction.atomic():
+        watermark, _ = JobWatermark.objects.select_for_update().get_or_create(name=WATERMARK)
+        if full or (watermark.run_date and today < watermark.run_date):
+            watermark.run_date = None  # rerun for an earlier day: start over
+        version = TableVersion.objects.filter(table=table_key(Rental)).values_list('version', flat=True).first() or 0
+
+        rows = _candidates(watermark, today, version).values_list('pk', 'status', 'contract_validity', 'contract_alert')
+        changes = {'overdue': [], 'expiring': [], '': []}
+        checked = 0
+        for pk, status, validity, stored in rows.iterator():
+            checked += 1
+            alert = contract_alert(status, validity, today)
+            if alert != stored:
+                changes[alert].append(pk)
+
+        for alert, pks in changes.items():
+            if pks:
+                Rental.objects.filter(pk__in=pks).update(contract_alert=alert)
+        stamped = record_changes(Rental, [pk for pks in changes.values() for pk in pks])
+
+        # Skip our own version bump next time, unless someone else wrote
+        # rentals in between: their rows must still be read.
+        if stamped == version + 1:
+            version = stamped
+        watermark.run_date, watermark.version = today, version
+        watermark.save()
+
+    return {
+        'checked': checked, 'overdue': len(changes['overdue']),
+        'expiring': len(changes['expiring']), 'cleared': len(changes['']),
+    }
@@ -0,0 +1,129 @@
+import base64
+import binascii
+import json
+
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save
+from django.utils import timezone
+
+from .models import (
+    AssetType, CPUOption, Customer, DisplaySizeOption, GraphicsOption, HDDOption, ProductAsset,
+    ProductConfiguration, RAMOption, Rental, Repair, RowVersion, Supplier, TableVersion,
+)
+
+# Tables whose saves and deletes are versioned. Writes through
+# QuerySet.update()/bulk_create() send no signals; call record_changes()
+# next to them.
+TRACKED_MODELS = [
+    AssetType, CPUOption, RAMOption, HDDOption, GraphicsOption, DisplaySizeOption,
+    Supplier, Customer, ProductAsset, ProductConfiguration, Rental, Repair,
+]
+
+ID_BATCH_SIZE = 1000
+
+
+def table_key(model):
+    return model._meta.label_lower
+
+
+# -----------------------------
+# Recording writes
+# -----------------------------
+
+def bump_version(table, now=None):
+    """Increment the version of `table` and return the new value; call inside a transaction."""
+    now = now or timezone.now()
+    if not TableVersion.objects.filter(table=table).update(version=F('version') + 1, changed_at=now):
+        TableVersion.objects.get_or_create(table=table, defaults={'changed_at': now})
+        TableVersion.objects.filter(table=table).update(version=F('version') + 1, changed_at=now)
+    return TableVersion.objects.values_list('version', flat=True).get(table=table)
+
+
+def record_changes(model, pks, created=False, deleted=False):
+    """Stamp rows `pks` of `model` with a new table version and return it (None without rows)."""
+    pks = list(pks)
+    if not pks:
+        return None
+    table = table_key(model)
+    with transaction.atomic():
+        version = bump_version(table)
+        for start in range(0, len(pks), ID_BATCH_SIZE):
+            batch = pks[start:start + ID_BATCH_SIZE]
+            rows = RowVersion.objects.filter(table=table, object_id__in=batch)
+            existing = set(rows.values_list('object_id', flat=True))
+            rows.update(version=version, deleted=deleted)
+            RowVersion.objects.bulk_create([
+                RowVersion(
+                    table=table, object_id=pk, version=version,
+                    created_version=version if created else 0, deleted=deleted,
+                )
+                for pk in batch if pk not in existing
+            ])
+    return version
+
+
+def _row_saved(sender, instance, created, raw=False, **kwargs):
+    if not raw:  # fixtures loading
+        record_changes(sender, [instance.pk], created=created)
+
+
+def _row_deleted(sender, instance, **kwargs):
+    record_changes(sender, [instance.pk], deleted=True)
+
+
+def connect_signals():
+    for model in TRACKED_MODELS:
+        post_save.connect(_row_saved, sender=model, dispatch_uid=f'sync-save-{table_key(model)}')
+        post_delete.connect(_row_deleted, sender=model, dispatch_uid=f'sync-delete-{table_key(model)}')
+
+
+# -----------------------------
+# Reading versions
+# -----------------------------
+
+def table_versions(tables):
+    """{table: (version, changed_at)} for the tracked tables among `tables`."""
+    return {
+        table: (version, changed_at)
+        for table, version, changed_at in TableVersion.objects.filter(table__in=list(tables))
+        .values_list('table', 'version', 'changed_at')
+    }
+
+
+def encode_token(versions):
+    """Opaque sync token for {table: version}."""
+    raw = json.dumps(versions, sort_keys=True, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_token(token):
+    """{table: version} from a sync token; ValueError if it is not one."""
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        versions = json.loads(raw)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise ValueError("Invalid sync token.")
+    if not isinstance(versions, dict) or not all(isinstance(v, int) for v in versions.values()):
+        raise ValueError("Invalid sync token.")
+    return versions
+
+
+def changes_between(model, since, upto):
+    """
+    Ids of `model` rows created, changed and deleted after table version
+    `since` up to `upto`. A row both created and deleted in between is left
+    out; one created and then changed counts as created.
+    """
+    created, changed, deleted = [], [], []
+    rows = RowVersion.objects.filter(table=table_key(model), version__gt=since, version__lte=upto)
+    for object_id, created_version, is_deleted in rows.values_list('object_id', 'created_version', 'deleted'):
+        is_new = created_version > since
+        if is_deleted:
+            if not is_new:
+                deleted.append(object_id)
+        elif is_new:
+            created.append(object_id)
+        else:
+            changed.append(object_id)
+    return created, changed, deleted
@@ -8,7 +8,11 @@ def rented_by(asset):
     Returns the name of the customer who has rented this asset if it's ongoing,
     otherwise returns 'Available'.
     """
-    ongoing_rental = asset.rentals.filter(status='ongoing').first()
+    if hasattr(asset, 'current_renter'):
+        # Annotated by ProductAsset.objects.with_availability()
+        return asset.current_renter or "Available"
+
+    ongoing_rental = asset.rentals.filter(status='ongoing').select_related('customer').first()
     if ongoing_rental:
         return ongoing_rental.customer.name
     return "Available"
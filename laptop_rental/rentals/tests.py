@@ -1,3 +1,1518 @@
-from django.test import TestCase
+import json
+import logging
+import os
+import shutil
+import tempfile
+from calendar import monthrange
+from collections import Counter
+from io import StringIO
+from datetime import date, datetime, timedelta
+from decimal import Decimal
 
-# Create your tests here.
+import pandas as pd
+from django.contrib.auth.models import User
+from django.core import mail
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.db import IntegrityError, connection, transaction
+from django.http import QueryDict
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.serializers import BaseSerializer
+from rest_framework.test import APITestCase
+
+from .models import (
+    AssetIdSequence, AssetReportSnapshot, AuditEvent, AssetType, CPUOption, Customer, CustomerReportSnapshot,
+    ExportJob, ImportRun, MonthlyReportSnapshot, PendingCustomer, PendingProduct, PendingProductConfiguration, PendingRental,
+    PendingRepair, ProductAsset, ProductConfiguration, Rental, RentalRevenueEntry, Repair, ReportRefreshLog,
+    SearchToken, SentReminder, StaleReportKey, Supplier,
+)
+from . import audit, metrics
+from .approvals import process_approvals
+from .import_journal import ImportJournal
+from .importing import (
+    PRODUCT_PARSERS, BulkImporter, LookupCache, detect_date_format, parse_date_column, parse_decimal_column, sheet_rows,
+)
+from .export_jobs import (
+    _set_progress, artifact_path, claim_jobs, enqueue_export, purge_expired_exports, requeue_stale_jobs, run_export_job,
+)
+from .autocomplete import customers as customer_suggestions, rentable_assets
+from .pagination import keyset_paginate
+from .revenue import _reconcile_ledger, extend_revenue_ledger, rebuild_revenue_ledger, rental_revenue_totals
+from .utils import calculate_rental_revenue
+from .search import rebuild_index, search
+from .serializers import EagerLoadingMixin, ProductAssetSerializer
+from .status import refresh_contract_alerts
+from .sync import record_changes
+from . import site_logger
+
+
+class APIFixtureMixin:
+    def setUp(self):
+        self.admin = User.objects.create_superuser('admin', 'admin@example.com', 'pass')
+        self.client.force_authenticate(self.admin)
+        self.serial = 0
+
+    def add_rows(self, count):
+        """`count` rows per table, each pointing at its own related objects."""
+        for _ in range(count):
+            self.serial += 1
+            n = self.serial
+            user = User.objects.create_user(f'user{n}')
+            asset_type = AssetType.objects.create(name=f'Type {n}')
+            supplier = Supplier.objects.create(name=f'Supplier {n}')
+            customer = Customer.objects.create(
+                name=f'Customer {n}', phone_number_primary=str(n), address_primary='Pune', edited_by=user,
+            )
+            product = ProductAsset.objects.create(
+                type_of_asset=asset_type, brand='Dell', model_no=f'M{n}', purchase_price=Decimal('100'),
+                current_value=Decimal('80'), purchase_date=date(2024, 1, 1), purchased_from=supplier,
+                edited_by=user,
+            )
+            Rental.objects.create(customer=customer, asset=product, rental_start_date=date(2024, 2, 1), edited_by=user)
+            ProductConfiguration.objects.create(
+                asset=product, date_of_config=date(2024, 1, 2), cpu=CPUOption.objects.create(name=f'i{n}'),
+            )
+            Repair.objects.create(product=product, name='Keyboard', date=date(2024, 4, 1), cost=Decimal('20'))
+            PendingProduct.objects.create(
+                type_of_asset=asset_type, brand='HP', model_no=f'P{n}', purchase_price=Decimal('100'),
+                current_value=Decimal('80'), purchase_date=date(2024, 1, 1), condition_status='working',
+                submitted_by=user,
+            )
+            PendingRental.objects.create(
+                customer=customer, asset=product, rental_start_date=date(2024, 3, 1), submitted_by=user,
+            )
+            PendingCustomer.objects.create(
+                name=f'New {n}', phone_number_primary=str(n), address_primary='Pune', submitted_by=user,
+            )
+            PendingRepair.objects.create(product=product, name='Screen', submitted_by=user)
+            PendingProductConfiguration.objects.create(
+                asset=product, date_of_config=date(2024, 5, 1), ssd='512GB', submitted_by=user,
+                original_config=product.configurations.get(), is_edit=True,
+            )
+            PendingCustomer.objects.create(
+                original_customer=customer, name=customer.name, phone_number_primary='000',
+                address_primary='Mumbai', submitted_by=user,
+            )
+
+
+
+# -----------------------------
+# API query budgets
+# -----------------------------
+# Every list endpoint must cost the same number of queries whatever the
+# page size: related names come from the serializers' declared
+# select_related, not one lazy load per row.
+
+class APIQueryCountTests(APIFixtureMixin, APITestCase):
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def assertConstantQueries(self, url):
+        self.add_rows(2)
+        few = self.count_queries(url)
+        self.add_rows(8)
+        many = self.count_queries(url)
+        self.assertEqual(few, many, f"{url}: {few} queries for 2 rows, {many} for 10")
+
+    def test_products_list(self):
+        self.assertConstantQueries('/api/v1/products/')
+
+    def test_rentals_list(self):
+        self.assertConstantQueries('/api/v1/rentals/')
+
+    def test_customers_list(self):
+        self.assertConstantQueries('/api/v1/customers/')
+
+    def test_approvals_list(self):
+        self.assertConstantQueries('/api/v1/approvals/')
+
+    def test_expanded_lists(self):
+        self.assertConstantQueries('/api/v1/products/?expand=type_of_asset,configurations,repairs')
+        self.assertConstantQueries('/api/v1/rentals/?expand=customer,asset')
+
+    def test_web_approval_dashboard(self):
+        self.client.force_login(self.admin)
+        self.assertConstantQueries('/approvals/')
+
+    def test_product_names_come_from_the_join(self):
+        self.add_rows(3)
+        with self.assertNumQueries(2):  # table versions + page; cursor pages skip the COUNT
+            response = self.client.get('/api/v1/products/')
+        first = response.data['results'][0]
+        self.assertEqual(first['type_of_asset_name'], 'Type 1')
+        self.assertEqual(first['purchased_from_name'], 'Supplier 1')
+        self.assertEqual(first['edited_by_name'], 'user1')
+
+
+# -----------------------------
+# API pagination & sparse fieldsets
+# -----------------------------
+
+class APIListShapeTests(APIFixtureMixin, APITestCase):
+    def test_cursor_pages_walk_every_product_once(self):
+        self.add_rows(7)
+        seen, url = [], '/api/v1/products/?page_size=3'
+        while url:
+            response = self.client.get(url)
+            seen += [row['asset_id'] for row in response.data['results']]
+            url = response.data['next']
+        self.assertEqual(seen, sorted(ProductAsset.objects.values_list('asset_id', flat=True)))
+
+    def test_cursor_column_is_never_null(self):
+        # ProductCursorPagination positions on asset_id; a NULL would drop rows between pages
+        self.add_rows(1)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            ProductAsset.objects.update(asset_id=None)
+
+    def test_rentals_newest_first(self):
+        self.add_rows(2)
+        Rental.objects.filter(pk=Rental.objects.order_by('pk').first().pk).update(rental_start_date=date(2025, 1, 1))
+        response = self.client.get('/api/v1/rentals/')
+        dates = [row['rental_start_date'] for row in response.data['results']]
+        self.assertEqual(dates, sorted(dates, reverse=True))
+
+    def test_fields_and_expand(self):
+        self.add_rows(1)
+        response = self.client.get('/api/v1/rentals/?fields=id,status&expand=customer')
+        row = response.data['results'][0]
+        self.assertEqual(set(row), {'id', 'status', 'customer'})
+        self.assertEqual(row['customer']['name'], 'Customer 1')
+
+        response = self.client.get('/api/v1/products/?fields=asset_id&expand=configurations')
+        self.assertEqual(response.data['results'][0]['configurations'][0]['cpu_name'], 'i1')
+
+        response = self.client.get('/api/v1/products/?fields=asset_id,bogus')
+        self.assertEqual(list(response.data['results'][0]), ['asset_id'])
+
+    def test_expandable_serializers_resolve(self):
+        for serializer in EagerLoadingMixin.__subclasses__():
+            for field, nested in serializer.expandable().items():
+                serializer.Meta.model._meta.get_field(field)
+                self.assertTrue(issubclass(nested, BaseSerializer))
+
+        class Misspelt(ProductAssetSerializer):
+            class Meta(ProductAssetSerializer.Meta):
+                expandable = {'repairs': 'RepairSerialiser'}
+
+        with self.assertRaisesMessage(ImproperlyConfigured, "Misspelt.Meta.expandable['repairs']"):
+            Misspelt.expandable()
+
+
+# -----------------------------
+# API conditional GET & delta sync
+# -----------------------------
+
+class APISyncTests(APIFixtureMixin, APITestCase):
+    def test_unchanged_list_returns_304(self):
+        self.add_rows(2)
+        first = self.client.get('/api/v1/products/')
+        etag = first['ETag']
+
+        with self.assertNumQueries(1):
+            again = self.client.get('/api/v1/products/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(again.status_code, 304)
+        self.assertEqual(again['ETag'], etag)
+
+        # A change to a related table the list shows invalidates it
+        AssetType.objects.filter(name='Type 1').get().save()
+        changed = self.client.get('/api/v1/products/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(changed.status_code, 200)
+        self.assertNotEqual(changed['ETag'], etag)
+
+    def test_option_lists_send_validators(self):
+        CPUOption.objects.create(name='i5')
+        response = self.client.get('/api/v1/options/cpu/')
+        self.assertIn('Last-Modified', response)
+        again = self.client.get('/api/v1/options/cpu/', HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(again.status_code, 304)
+
+    def test_sync_returns_only_the_delta(self):
+        self.add_rows(2)
+        full = self.client.get('/api/v1/sync/').data
+        self.assertTrue(full['full'])
+        self.assertEqual(len(full['tables']['customers']['created']), 2)
+
+        nothing = self.client.get('/api/v1/sync/', {'since': full['token']}).data
+        self.assertEqual(nothing['tables'], {})
+
+        first, second = Customer.objects.order_by('pk')
+        first.reference_name = 'Walk-in'
+        first.save()
+        Rental.objects.filter(customer=second).delete()
+        second_pk = second.pk
+        second.delete()
+        new = Customer.objects.create(name='Late', phone_number_primary='99', address_primary='Pune')
+
+        delta = self.client.get('/api/v1/sync/', {'since': full['token']}).data
+        customers = delta['tables']['customers']
+        self.assertEqual([row['id'] for row in customers['created']], [new.pk])
+        self.assertEqual([row['reference_name'] for row in customers['changed']], ['Walk-in'])
+        self.assertEqual(customers['deleted'], [second_pk])
+        self.assertEqual(len(delta['tables']['rentals']['deleted']), 1)
+        self.assertNotIn('products', delta['tables'])
+
+    def test_revenue_refresh_is_a_change(self):
+        self.add_rows(2)
+        etag = self.client.get('/api/v1/products/')['ETag']
+        token = self.client.get('/api/v1/sync/').data['token']
+
+        # Written without save(): only the ledger rebuild moves the revenue
+        rental = Rental.objects.order_by('pk').first()
+        Rental.objects.filter(pk=rental.pk).update(payment_amount=Decimal('1000'))
+        rebuild_revenue_ledger()
+        self.assertEqual(self.client.get('/api/v1/products/', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+        delta = self.client.get('/api/v1/sync/', {'since': token}).data
+        [changed] = delta['tables']['products']['changed']
+        self.assertEqual(changed['id'], rental.asset_id)
+        self.assertEqual(Decimal(changed['revenue']), ProductAsset.objects.get(pk=rental.asset_id).revenue)
+
+        # Totals that come out the same are not a change
+        etag = self.client.get('/api/v1/products/')['ETag']
+        extend_revenue_ledger()
+        rebuild_revenue_ledger()
+        self.assertEqual(self.client.get('/api/v1/products/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+    def test_sync_rejects_bad_token(self):
+        response = self.client.get('/api/v1/sync/', {'since': 'not-a-token'})
+        self.assertEqual(response.status_code, 400)
+
+
+# -----------------------------
+# Approval feed
+# -----------------------------
+
+class ApprovalFeedTests(APIFixtureMixin, APITestCase):
+    def test_feed_counts_pages_and_changes(self):
+        self.add_rows(3)
+        data = self.client.get('/api/v1/approvals/', {'page_size': 2}).data
+        self.assertEqual(data['counts'], {'products': 3, 'customers': 6, 'rentals': 3, 'configs': 3, 'repairs': 3})
+        self.assertEqual(data['total'], 18)
+
+        customers = data['customers']
+        self.assertEqual((customers['num_pages'], customers['next_page']), (3, 2))
+        self.assertEqual(len(customers['results']), 2)
+
+        edit = self.client.get('/api/v1/approvals/', {'types': 'customers', 'customers_page': 2}).data['customers']
+        edits = [item for item in edit['results'] if item['original_id']]
+        self.assertTrue(edits)
+        original = Customer.objects.get(pk=edits[0]['original_id'])
+        self.assertEqual(
+            {change['field']: (change['old'], change['new']) for change in edits[0]['changes']},
+            {'phone_number_primary': (original.phone_number_primary, '000'), 'address_primary': ('Pune', 'Mumbai')},
+        )
+
+        configs = self.client.get('/api/v1/approvals/', {'types': 'configs'}).data
+        self.assertEqual(list(configs), ['counts', 'total', 'configs'])
+        self.assertEqual(configs['configs']['results'][0]['changes'][0]['field'], 'date_of_config')
+
+
+# -----------------------------
+# Search index
+# -----------------------------
+
+class SearchTests(APIFixtureMixin, APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.add_rows(3)
+        self.dell = ProductAsset.objects.get(model_no='M2')
+        self.dell.brand, self.dell.serial_no = 'Dell Latitude', 'SN-88 41'
+        self.dell.save()
+
+    def test_prefix_words_must_all_match(self):
+        self.assertEqual(list(search(ProductAsset.objects.all(), 'lat')), [self.dell])
+        self.assertEqual(list(search(ProductAsset.objects.all(), 'DELL lati')), [self.dell])
+        self.assertEqual(list(search(ProductAsset.objects.all(), 'latitude m3')), [])
+        self.assertEqual(list(search(ProductAsset.objects.all(), 'sn8841')), [self.dell])
+        self.assertEqual(search(ProductAsset.objects.all(), ' / ').count(), 3)
+
+    def test_exact_words_rank_first(self):
+        Customer.objects.create(name='Customer 10', phone_number_primary='10', address_primary='Pune')
+        names = [c.name for c in search(Customer.objects.all(), 'customer 1', rank=True)]
+        self.assertEqual(names, ['Customer 1', 'Customer 10'])
+
+    def test_index_follows_saves_and_deletes(self):
+        self.dell.brand = 'Lenovo'
+        self.dell.save()
+        self.assertFalse(search(ProductAsset.objects.all(), 'latitude').exists())
+        customer = Customer.objects.get(name='Customer 3')
+        customer.delete()
+        self.assertFalse(SearchToken.objects.filter(table='rentals.customer', object_id=customer.pk).exists())
+
+    def test_views_use_the_index(self):
+        self.client.force_login(self.admin)
+        response = self.client.get('/api/v1/products/', {'q': 'latitude'})
+        self.assertEqual([row['id'] for row in response.data['results']], [self.dell.pk])
+
+        response = self.client.get(reverse('rental_history'), {'q': 'customer 2'})
+        self.assertEqual(response.status_code, 200)
+
+    def test_rebuild(self):
+        SearchToken.objects.all().delete()
+        self.assertEqual(rebuild_index(), 3 + 3 + 3 + 3)
+        self.assertEqual(list(search(ProductAsset.objects.all(), 'latitude')), [self.dell])
+
+
+# -----------------------------
+# Autocomplete
+# -----------------------------
+
+class AutocompleteTests(APIFixtureMixin, APITestCase):
+    def setUp(self):
+        super().setUp()
+        rentable_assets.invalidate()
+        customer_suggestions.invalidate()
+        self.add_rows(3)
+
+    def suggest(self, name, q):
+        response = self.client.get(reverse(name), {'q': q})
+        return [row['text'] for row in response.json()['results']]
+
+    def test_only_rentable_assets(self):
+        self.assertEqual(self.suggest('asset-autocomplete', 'dell'), [])  # all rented
+        Rental.objects.filter(asset__model_no='M2').update(status='completed')
+        rentable_assets.invalidate()
+        self.assertEqual(self.suggest('asset-autocomplete', 'dell m2'), [
+            f"{ProductAsset.objects.get(model_no='M2').asset_id} - Dell M2",
+        ])
+
+    def test_cached_keystroke_costs_one_query(self):
+        self.suggest('customer-autocomplete', 'cust')
+        with self.assertNumQueries(1):  # table versions
+            self.assertEqual(self.suggest('customer-autocomplete', 'cust'), ['Customer 1 - 1', 'Customer 2 - 2', 'Customer 3 - 3'])
+
+    def test_writes_refresh_suggestions(self):
+        self.assertEqual(self.suggest('customer-autocomplete', 'customer 3'), ['Customer 3 - 3'])
+        Customer.objects.filter(name='Customer 3').get().delete()
+        Customer.objects.create(name='Cusack', phone_number_primary='77', address_primary='Pune')
+        self.assertEqual(self.suggest('customer-autocomplete', 'customer 3'), [])
+        self.assertEqual(self.suggest('customer-autocomplete', 'cus')[0], 'Cusack - 77')
+
+
+# -----------------------------
+# Action log
+# -----------------------------
+
+class SiteLoggerTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'pass')
+        cls.pending = PendingProduct.objects.create(
+            type_of_asset=AssetType.objects.create(name='Laptop'), brand='HP', model_no='P1',
+            purchase_price=Decimal('100'), current_value=Decimal('80'), purchase_date=date(2024, 1, 1),
+            condition_status='working',
+        )
+
+    def setUp(self):
+        site_logger.stop()
+        directory = tempfile.mkdtemp()
+        override = self.settings(SITE_LOG_DIR=directory)
+        override.enable()
+        logging.disable(logging.NOTSET)
+        self.addCleanup(shutil.rmtree, directory)
+        self.addCleanup(override.disable)
+        self.addCleanup(logging.disable, logging.CRITICAL)
+        self.addCleanup(site_logger.stop)
+        self.directory = directory
+
+    def entries(self, day=None):
+        site_logger.stop()  # drain the queue
+        with open(site_logger.log_path(day or date.today()), encoding='utf-8') as log:
+            return [json.loads(line) for line in log]
+
+    def test_actions_are_written_as_json_lines(self):
+        site_logger.log_action(self.admin, "Edited rental", "Rental", obj_id=7, extra={'status': 'completed'})
+        site_logger.log_action(None, "Ran revenue recalculation", "System Task")
+        first, second = self.entries()
+        self.assertEqual(
+            {key: first[key] for key in ('level', 'user', 'action', 'object_type', 'object_id', 'details')},
+            {'level': 'INFO', 'user': 'admin', 'action': 'Edited rental', 'object_type': 'Rental',
+             'object_id': 7, 'details': {'status': 'completed'}},
+        )
+        self.assertEqual((second['user'], second['object_id']), ('System', None))
+
+    def test_approvals_are_logged(self):
+        self.client.force_authenticate(self.admin)
+        self.client.post(f'/api/v1/approvals/{self.pending.pk}/reject-product/')
+        [entry] = self.entries()
+        self.assertEqual((entry['action'], entry['object_id']), ('Rejected product', str(self.pending.pk)))
+
+    def test_processes_share_each_day_file(self):
+        def record(day, message):
+            entry = logging.LogRecord('site_logger', logging.INFO, __file__, 0, message, None, None)
+            entry.created = datetime.combine(day, datetime.min.time()).replace(hour=23, minute=59).timestamp()
+            return entry
+
+        old, yesterday, today = date(2025, 1, 1), date(2025, 3, 30), date(2025, 3, 31)
+        open(site_logger.log_path(old), 'w').close()
+        # One writer per process, each with its own file descriptor
+        first, second = (site_logger.DailyFileHandler(self.directory, backup_days=30) for _ in range(2))
+        for handler in (first, second):
+            handler.setFormatter(site_logger.JsonLinesFormatter())
+            self.addCleanup(handler.close)
+
+        first.emit(record(yesterday, 'first, before midnight'))
+        second.emit(record(yesterday, 'second, before midnight'))
+        first.emit(record(today, 'first, after midnight'))
+        second.emit(record(yesterday, 'second, late'))
+        second.emit(record(today, 'second, after midnight'))
+
+        self.assertEqual(
+            [entry['message'] for entry in self.entries(yesterday)],
+            ['first, before midnight', 'second, before midnight', 'second, late'],
+        )
+        self.assertEqual([entry['message'] for entry in self.entries(today)], ['first, after midnight', 'second, after midnight'])
+        self.assertFalse(os.path.exists(site_logger.log_path(old)))
+
+
+# -----------------------------
+# Audit trail
+# -----------------------------
+
+class AuditTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'pass')
+        cls.user = User.objects.create_user('user1')
+        cls.asset_type = AssetType.objects.create(name='Laptop')
+
+    def setUp(self):
+        audit.buffer.stop()
+        override = self.settings(AUDIT_FLUSH_EVENTS=1000, AUDIT_FLUSH_MS=60000)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.addCleanup(audit.buffer.stop)
+
+    def add_rental(self, name):
+        customer = Customer.objects.create(name=name, phone_number_primary='1', address_primary='Pune', edited_by=self.user)
+        asset = ProductAsset.objects.create(
+            type_of_asset=self.asset_type, brand='Dell', model_no='M1', purchase_price=Decimal('100'),
+            current_value=Decimal('80'), purchase_date=date(2024, 1, 1), edited_by=self.user,
+        )
+        return Rental.objects.create(customer=customer, asset=asset, rental_start_date=date(2024, 2, 1), edited_by=self.user)
+
+    def test_events_are_buffered_then_bulk_inserted(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            rental = self.add_rental('Acme')
+            self.add_rental('Globex')
+        self.assertFalse(AuditEvent.objects.exists())
+
+        with self.assertNumQueries(1):
+            written = audit.buffer.flush()
+        self.assertEqual(written, AuditEvent.objects.count())
+        created = AuditEvent.objects.get(table='rentals.rental', object_id=rental.pk)
+        self.assertEqual((created.event, created.user_id), ('create', self.user.pk))
+
+    def test_rolled_back_writes_are_not_recorded(self):
+        self.add_rental('Acme')
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    Customer.objects.get().delete()
+                    raise IntegrityError
+            except IntegrityError:
+                pass
+        self.assertEqual(audit.buffer.flush(), 0)
+
+    def test_history_view_shows_changes_and_filters(self):
+        rental = self.add_rental('Acme')
+        with self.captureOnCommitCallbacks(execute=True):
+            rental.save()
+            rental.payment_amount = Decimal('500')
+            rental.save()
+            audit.record_action(self.admin, "Marked rental as completed", "Rental", rental.pk)
+        audit.buffer.flush()
+
+        self.client.force_login(self.admin)
+        url = reverse('audit_history', args=['rental', rental.pk])
+        action, update, first = self.client.get(url).context['page'].object_list
+        self.assertEqual((action.event, action.user, action.description), ('action', self.admin, "Marked rental as completed"))
+        self.assertEqual([change['field'] for change in update.changes], ['payment_amount'])
+        self.assertEqual(first.changes, [])
+
+        filtered = self.client.get(url, {'event': 'update', 'user': 'user'}).context['page'].object_list
+        self.assertEqual(len(filtered), 2)
+        self.assertEqual(self.client.get(reverse('audit_history', args=['supplier', 1])).status_code, 404)
+
+
+# -----------------------------
+# Request metrics
+# -----------------------------
+
+@override_settings(PERF_METRICS_ENABLED=True)
+class MetricsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'pass')
+        cls.clerk = User.objects.create_user('clerk')
+        for name in ('Acme', 'Globex'):
+            Customer.objects.create(name=name, phone_number_primary='1', address_primary='Pune')
+
+    def setUp(self):
+        metrics.store.reset()
+
+    def test_recorder_counts_repeated_statements(self):
+        recorder = metrics.QueryRecorder()
+        with connection.execute_wrapper(recorder):
+            for customer in Customer.objects.all():
+                Customer.objects.get(pk=customer.pk)
+        self.assertEqual((recorder.count, recorder.duplicates), (3, 1))
+        self.assertEqual(recorder.most_repeated()[1], 2)
+
+    def test_requests_are_summarised_per_url_name(self):
+        self.client.force_login(self.admin)
+        for _ in range(3):
+            self.client.get(reverse('customer_list'))
+        self.client.get('/api/v1/customers/')
+
+        routes = self.client.get(reverse('metrics')).json()['routes']
+        customers = routes['customer_list']
+        self.assertEqual(customers['requests'], 3)
+        self.assertEqual(sum(customers['histogram_ms'].values()), 3)
+        self.assertGreater(customers['queries']['max'], 0)
+        self.assertGreater(customers['response_bytes']['mean'], 0)
+        self.assertIn('customer-list', routes)
+
+    def test_superuser_only(self):
+        self.client.force_login(self.clerk)
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 302)
+
+
+# -----------------------------
+# Reminders
+# -----------------------------
+
+@override_settings(REMINDER_RECIPIENTS=['accounts@example.com'], REMINDER_CONTRACT_DAYS=7)
+class ReminderTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.asset_type = AssetType.objects.create(name='Laptop')
+        cls.first = cls.add_rental(1, billing_day=15)
+        cls.second = cls.add_rental(2, contract_validity=date(2025, 1, 20))
+        cls.add_rental(3, billing_day=15, status='completed')
+        cls.add_rental(4, billing_day=16, contract_validity=date(2025, 3, 1))
+        Customer.objects.filter(rental=cls.first).update(email='first@example.com')
+
+    @classmethod
+    def add_rental(cls, n, **fields):
+        customer = Customer.objects.create(name=f'Customer {n}', phone_number_primary=str(n), address_primary='Pune')
+        asset = ProductAsset.objects.create(
+            type_of_asset=cls.asset_type, brand='Dell', model_no=f'M{n}', purchase_price=Decimal('100'),
+            current_value=Decimal('80'), purchase_date=date(2024, 1, 1),
+        )
+        return Rental.objects.create(customer=customer, asset=asset, rental_start_date=date(2024, 2, 1), **fields)
+
+    def send(self, day='2025-01-15', *args):
+        call_command('send_reminders', '--date', day, *args, stdout=StringIO())
+
+    def test_one_email_per_recipient_and_reruns_send_nothing(self):
+        with self.assertNumQueries(3):  # rentals, already sent, record
+            self.send()
+        [message] = mail.outbox
+        self.assertEqual(message.to, ['accounts@example.com'])
+        self.assertIn("Customer 1", message.body)
+        self.assertIn("Contract valid until: 2025-01-20", message.body)
+        self.assertNotIn("Customer 3", message.body)
+        self.assertEqual(SentReminder.objects.count(), 2)
+
+        self.send()
+        self.send('2025-01-16', '--kind', 'contract')
+        self.assertEqual(len(mail.outbox), 1)
+
+    def test_customers_and_short_months(self):
+        Rental.objects.filter(pk=self.first.pk).update(billing_day=31)
+        with self.settings(REMINDER_NOTIFY_CUSTOMERS=True):
+            self.send('2025-02-28', '--kind', 'billing')
+        self.assertEqual(sorted(message.to[0] for message in mail.outbox), ['accounts@example.com', 'first@example.com'])
+
+    def test_dry_run_sends_and_records_nothing(self):
+        self.send('2025-01-15', '--dry-run')
+        self.assertEqual((len(mail.outbox), SentReminder.objects.count()), (0, 0))
+
+
+# -----------------------------
+# Contract alerts
+# -----------------------------
+
+@override_settings(REMINDER_CONTRACT_DAYS=7)
+class ContractAlertTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'pass')
+        cls.asset_type = AssetType.objects.create(name='Laptop')
+        cls.ending = cls.add_rental('Acme', date(2025, 1, 5))
+        cls.later = cls.add_rental('Globex', date(2025, 1, 20))
+        cls.open_ended = cls.add_rental('Initech', None)
+        cls.other = cls.add_rental('Umbrella', date(2025, 6, 1))
+
+    @classmethod
+    def add_rental(cls, name, contract_validity):
+        customer = Customer.objects.create(name=name, phone_number_primary='1', address_primary='Pune')
+        asset = ProductAsset.objects.create(
+            type_of_asset=cls.asset_type, brand='Dell', model_no='M1', purchase_price=Decimal('100'),
+            current_value=Decimal('80'), purchase_date=date(2024, 1, 1),
+        )
+        rental = Rental.objects.create(customer=customer, asset=asset, rental_start_date=date(2024, 2, 1))
+        # Dated without save(), so only the check job sets the alert
+        Rental.objects.filter(pk=rental.pk).update(contract_validity=contract_validity)
+        return rental
+
+    def alerts(self):
+        return dict(Rental.objects.exclude(contract_alert='').values_list('pk', 'contract_alert'))
+
+    def test_save_sets_the_alert(self):
+        rental = self.open_ended
+        rental.contract_validity = timezone.now().date() - timedelta(days=1)
+        rental.save()
+        self.assertEqual(Rental.objects.get(pk=rental.pk).contract_alert, 'overdue')
+
+    def test_incremental_runs_only_read_what_can_have_changed(self):
+        result = refresh_contract_alerts(date(2025, 1, 1))
+        self.assertEqual((result['checked'], result['expiring']), (3, 1))  # first run: every dated rental
+        self.assertEqual(self.alerts(), {self.ending.pk: 'expiring'})
+
+        result = refresh_contract_alerts(date(2025, 1, 14))
+        self.assertEqual(result['checked'], 2)
+        self.assertEqual(self.alerts(), {self.ending.pk: 'overdue', self.later.pk: 'expiring'})
+
+        Rental.objects.filter(pk=self.ending.pk).update(status='completed')
+        record_changes(Rental, [self.ending.pk])
+        result = refresh_contract_alerts(date(2025, 1, 14))
+        self.assertEqual((result['checked'], result['cleared']), (1, 1))
+        self.assertEqual(self.alerts(), {self.later.pk: 'expiring'})
+
+    def test_rental_list_filters_on_the_flag(self):
+        refresh_contract_alerts(date(2025, 1, 14))
+        self.client.force_login(self.admin)
+        listed = self.client.get(reverse('rental_list'), {'filter': 'overdue'}).context['rentals']
+        self.assertEqual([rental.pk for rental in listed], [self.ending.pk])
+
+
+# -----------------------------
+# Report dashboard
+# -----------------------------
+
+class ReportDashboardQueryBudgetTests(TestCase):
+    """report_dashboard must issue a fixed number of queries, whatever the data size."""
+
+    QUERY_BUDGET = 16
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_superuser('admin', 'admin@example.com', 'pass')
+        cls.asset_type = AssetType.objects.create(name='Laptop')
+
+    def add_rentals(self, count, offset=0):
+        for i in range(offset, offset + count):
+            asset = ProductAsset.objects.create(
+                type_of_asset=self.asset_type, brand='Dell', model_no=f'M{i}',
+                purchase_price=Decimal('100'), current_value=Decimal('80'),
+                purchase_date=date.today() - timedelta(days=30), warranty_duration_months=12,
+            )
+            customer = Customer.objects.create(
+                name=f'Customer {i}', phone_number_primary=str(9000000000 + i),
+                address_primary='Pune', is_bni_member=True,
+            )
+            Rental.objects.create(
+                customer=customer, asset=asset, payment_amount=Decimal('1000'),
+                rental_start_date=date(2025, i % 12 + 1, 1), rental_end_date=date(2025, 12, 31),
+            )
+            ProductConfiguration.objects.create(asset=asset, date_of_config=date.today(), cost=Decimal('10'))
+        return asset
+
+    def count_dashboard_queries(self, params=''):
+        self.client.force_login(self.user)
+        url = reverse('report_dashboard') + params
+        call_command('refresh_report_snapshots', stdout=StringIO())
+        self.client.get(url)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def assert_flat_query_count(self, params=''):
+        asset = self.add_rentals(3)
+        small = self.count_dashboard_queries(params.format(asset=asset.pk))
+        asset = self.add_rentals(30, offset=3)
+        large = self.count_dashboard_queries(params.format(asset=asset.pk))
+
+        self.assertLessEqual(large, self.QUERY_BUDGET)
+        self.assertEqual(small, large)
+
+    def test_snapshot_mode(self):
+        self.assert_flat_query_count()
+
+    def test_snapshot_mode_filtered(self):
+        self.assert_flat_query_count('?customer_type=BNI&product={asset}')
+
+    @override_settings(REPORT_DASHBOARD_USE_SNAPSHOTS=False)
+    def test_set_based_mode(self):
+        self.assert_flat_query_count()
+
+    @override_settings(REPORT_DASHBOARD_USE_SNAPSHOTS=False)
+    def test_set_based_mode_filtered(self):
+        self.assert_flat_query_count('?customer_type=BNI&product={asset}&start_date=2025-01-01')
+
+    @override_settings(REPORT_DASHBOARD_USE_SNAPSHOTS=False)
+    def test_modes_agree(self):
+        asset = self.add_rentals(5)
+        Rental.objects.create(
+            customer=Customer.objects.first(), asset=asset, payment_amount=Decimal('1000'),
+            rental_start_date=date(2025, 6, 1), rental_end_date=date(2025, 3, 1),  # inverted dates
+        )
+        call_command('refresh_report_snapshots', stdout=StringIO())
+        self.client.force_login(self.user)
+        for params in ['', f'?product={asset.pk}']:
+            url = reverse('report_dashboard') + params
+            live = self.client.get(url).context
+            with self.settings(REPORT_DASHBOARD_USE_SNAPSHOTS=True):
+                cached = self.client.get(url).context
+
+            for key in ('total_revenue', 'maintenance_cost', 'type_values', 'customer_values', 'in_warranty_count',
+                        'total_rentals', 'total_days'):
+                self.assertEqual(live[key], cached[key], f'{params} {key}')
+
+
+class ReportSnapshotRefreshTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_superuser('admin', 'admin@example.com', 'pass')
+        cls.customer = Customer.objects.create(name='Acme', phone_number_primary='1', address_primary='Pune')
+        cls.asset = ProductAsset.objects.create(
+            type_of_asset=AssetType.objects.create(name='Laptop'), brand='Dell', model_no='M1',
+            purchase_price=Decimal('100'), current_value=Decimal('80'), purchase_date=date(2024, 1, 1),
+        )
+
+    def refresh(self, *args):
+        call_command('refresh_report_snapshots', *args, stdout=StringIO())
+
+    def test_writes_queue_each_key_once(self):
+        self.refresh()
+        rental = Rental.objects.create(
+            customer=self.customer, asset=self.asset, payment_amount=Decimal('1000'),
+            rental_start_date=date(2025, 1, 10), rental_end_date=date(2025, 1, 20),
+        )
+        for payment in ['1100', '1200', '1300']:
+            rental.payment_amount = Decimal(payment)
+            rental.save()
+        ProductConfiguration.objects.create(asset=self.asset, date_of_config=date(2025, 2, 1), cost=Decimal('50'))
+
+        self.assertEqual(sorted(StaleReportKey.objects.values_list('kind', 'key')), [
+            ('asset', str(self.asset.pk)),
+            ('asset_type', str(self.asset.type_of_asset_id)),
+            ('customer', str(self.customer.pk)),
+            ('month', '2025-01-01'),
+        ])
+        self.assertFalse(MonthlyReportSnapshot.objects.exists())
+
+        self.refresh()
+        self.assertFalse(StaleReportKey.objects.exists())
+        self.assertEqual(self.customer.report_snapshot.total_payment, Decimal('1300.00'))
+        month = MonthlyReportSnapshot.objects.get()
+        self.assertEqual((month.month, month.rental_count, month.rental_days), (date(2025, 1, 1), 1, 10))
+        self.assertEqual(AssetReportSnapshot.objects.get(asset=self.asset).config_cost, Decimal('50.00'))
+
+    def test_first_run_and_full_rebuild(self):
+        Rental.objects.create(
+            customer=self.customer, asset=self.asset, payment_amount=Decimal('1000'),
+            rental_start_date=date(2025, 1, 10),
+        )
+        self.refresh()
+        self.assertTrue(ReportRefreshLog.objects.filter(full=True).exists())
+        self.assertFalse(StaleReportKey.objects.exists())
+
+        MonthlyReportSnapshot.objects.all().delete()
+        self.refresh()
+        self.assertFalse(MonthlyReportSnapshot.objects.exists())
+        self.refresh('--full')
+        self.assertEqual(MonthlyReportSnapshot.objects.get().rental_count, 1)
+
+    def test_dashboard_never_builds_snapshots(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('report_dashboard'))
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(ReportRefreshLog.objects.exists())
+        self.assertFalse(CustomerReportSnapshot.objects.exists())
+
+
+# -----------------------------
+# Revenue ledger
+# -----------------------------
+
+class RevenueLedgerTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.customer = Customer.objects.create(name='Acme', phone_number_primary='1', address_primary='Pune')
+        cls.asset = ProductAsset.objects.create(
+            type_of_asset=AssetType.objects.create(name='Laptop'), brand='Dell', model_no='M1',
+            purchase_price=Decimal('100'), current_value=Decimal('80'), purchase_date=date(2024, 1, 1),
+        )
+
+    def add_rental(self, start, end=None, payment='3100'):
+        return Rental.objects.create(
+            customer=self.customer, asset=self.asset, rental_start_date=start, rental_end_date=end,
+            payment_amount=Decimal(payment),
+        )
+
+    def ledger(self, rental):
+        return list(rental.revenue_entries.order_by('month').values_list('month', 'days', 'amount', 'through_date'))
+
+    def entry_ids(self, rental):
+        return list(rental.revenue_entries.order_by('month').values_list('pk', flat=True))
+
+    def test_extend_appends_months_and_completes_the_last_one_in_place(self):
+        rental = self.add_rental(date(2024, 1, 15))
+        _reconcile_ledger([rental], date(2024, 2, 10))
+        ids = self.entry_ids(rental)
+
+        self.assertEqual(extend_revenue_ledger(date(2024, 3, 20)), 1)
+        self.assertEqual(self.ledger(rental), [
+            (date(2024, 1, 1), 17, Decimal('1700.00'), date(2024, 1, 31)),
+            (date(2024, 2, 1), 29, Decimal('3100.00'), date(2024, 2, 29)),
+            (date(2024, 3, 1), 20, Decimal('2000.00'), date(2024, 3, 20)),
+        ])
+        self.assertEqual(self.entry_ids(rental)[:2], ids)
+        self.assertEqual(extend_revenue_ledger(date(2024, 3, 20)), 0)
+
+    def test_edits_update_entries_in_place(self):
+        rental = self.add_rental(date(2024, 1, 1), date(2024, 2, 29))
+        ids = self.entry_ids(rental)
+
+        rental.payment_amount = Decimal('6200')
+        rental.save()
+        self.assertEqual(self.entry_ids(rental), ids)
+        self.assertEqual([amount for _, _, amount, _ in self.ledger(rental)], [Decimal('6200.00')] * 2)
+
+        rental.rental_end_date = date(2024, 1, 31)
+        rental.save()
+        self.assertEqual(self.entry_ids(rental), ids[:1])
+        self.asset.refresh_from_db()
+        self.assertEqual(self.asset.revenue, Decimal('6200.00'))
+
+    def test_inverted_dates_earn_nothing_and_are_not_picked_up_again(self):
+        rental = self.add_rental(date(2024, 3, 1), date(2024, 2, 1))
+        self.assertEqual(self.ledger(rental), [])
+        self.assertEqual(extend_revenue_ledger(date(2024, 4, 1)), 0)
+
+        valid = self.add_rental(date(2024, 1, 1), date(2024, 1, 31))
+        valid.rental_end_date = date(2023, 12, 1)
+        valid.save()
+        self.assertEqual(self.ledger(valid), [])
+        self.asset.refresh_from_db()
+        self.assertEqual(self.asset.revenue, Decimal('0.00'))
+
+    def test_backfill_command_rebuilds_the_ledger(self):
+        first = self.add_rental(date(2024, 1, 15), date(2024, 3, 10))
+        second = self.add_rental(date(2024, 5, 1))
+        expected = [self.ledger(first), self.ledger(second)]
+        RentalRevenueEntry.objects.all().delete()
+        ProductAsset.objects.update(revenue=0)
+
+        call_command('backfill_revenue_ledger', stdout=StringIO())
+        self.assertEqual([self.ledger(first), self.ledger(second)], expected)
+        self.asset.refresh_from_db()
+        self.assertEqual(self.asset.revenue, sum(RentalRevenueEntry.objects.values_list('amount', flat=True)))
+
+
+    def test_ledger_adds_up_to_the_rental_revenue(self):
+        # One rounding policy: the rows of a rental sum to calculate_rental_revenue()
+        for start, end, payment in [
+            (date(2024, 1, 31), date(2024, 2, 1), '1.00'),  # 0.0323 + 0.0357: 0.07, not 0.03 + 0.04
+            (date(2024, 1, 15), date(2024, 2, 10), '1000'),
+            (date(2023, 2, 28), date(2023, 3, 1), '0.99'),
+            (date(2024, 4, 30), date(2024, 5, 1), '3000'),
+            (date(2024, 12, 31), date(2025, 1, 1), '3100'),
+            (date(2023, 3, 7), date(2024, 8, 19), '2999.99'),
+            (date(2024, 4, 7), date(2024, 4, 13), '4432.05'),
+        ]:
+            with self.subTest(start=start, end=end, payment=payment):
+                rental = self.add_rental(start, end, payment)
+                amounts = [amount for _, _, amount, _ in self.ledger(rental)]
+                self.assertEqual(sum(amounts), calculate_rental_revenue(start, end, Decimal(payment)))
+                self.assertTrue(all(amount >= 0 for amount in amounts))
+        self.assertEqual(calculate_rental_revenue(date(2024, 1, 31), date(2024, 2, 1), Decimal('1.00')), Decimal('0.07'))
+
+def legacy_rental_revenue(rental_start, rental_end, monthly_payment):
+    """The per-month loop utils.calculate_rental_revenue ran before the batch engine."""
+    total_revenue = 0
+    current_date = rental_start
+    while current_date <= rental_end:
+        days_in_month = monthrange(current_date.year, current_date.month)[1]
+        start_of_month = date(current_date.year, current_date.month, 1)
+        end_of_month = date(current_date.year, current_date.month, days_in_month)
+        active_days = (min(rental_end, end_of_month) - max(rental_start, start_of_month)).days + 1
+        total_revenue += active_days * (monthly_payment / days_in_month)
+        current_date = end_of_month + timedelta(days=1)
+    return round(total_revenue, 2)
+
+
+def rental_revenue(start, end, payment):
+    return rental_revenue_totals([start], [end], [Decimal(payment)])[0]
+
+
+class RevenueEngineTests(TestCase):
+    def assertMatchesLoop(self, start, end, payment):
+        revenue = rental_revenue(start, end, payment)
+        self.assertIsInstance(revenue, Decimal)
+        self.assertEqual(revenue, legacy_rental_revenue(start, end, Decimal(payment)))
+
+    def test_rounds_the_total_once(self):
+        # Per-month rounding would give 548.39 + 344.83 = 893.22
+        self.assertEqual(rental_revenue(date(2024, 1, 15), date(2024, 2, 10), '1000'), Decimal('893.21'))
+        for start, end, payment in [
+            (date(2024, 1, 15), date(2024, 2, 10), '1000'),
+            (date(2023, 3, 7), date(2024, 8, 19), '2999.99'),
+            (date(2024, 6, 3), date(2024, 6, 5), '1234.57'),
+            (date(2024, 4, 7), date(2024, 4, 13), '4432.05'),  # 1034.145: ties round half-even
+            (date(2022, 11, 30), date(2025, 1, 2), '0.01'),
+        ]:
+            with self.subTest(start=start, end=end, payment=payment):
+                self.assertMatchesLoop(start, end, payment)
+
+    def test_month_edges(self):
+        for start, end, payment in [
+            (date(2024, 2, 1), date(2024, 2, 29), '2900'),    # leap February
+            (date(2023, 2, 1), date(2023, 2, 28), '2900'),
+            (date(2024, 4, 30), date(2024, 5, 1), '3000'),    # 30 -> 31 day month
+            (date(2024, 12, 31), date(2025, 1, 1), '3100'),   # year end
+            (date(2024, 3, 31), date(2024, 3, 31), '3100'),   # single day
+            (date(2024, 1, 1), date(2024, 12, 31), '1000.50'),
+        ]:
+            with self.subTest(start=start, end=end):
+                self.assertMatchesLoop(start, end, payment)
+        self.assertEqual(rental_revenue(date(2024, 2, 1), date(2024, 2, 29), '2900'), Decimal('2900.00'))
+
+    def test_open_ended_rentals_run_to_today(self):
+        # Open rentals are priced up to today (utils and the ledger both substitute it)
+        today = date.today()
+        for start in [today, today - timedelta(days=45), today.replace(day=1) - timedelta(days=400)]:
+            with self.subTest(start=start):
+                self.assertMatchesLoop(start, today, '1799.99')
+
+    def test_inverted_dates_earn_nothing(self):
+        self.assertEqual(rental_revenue(date(2024, 3, 1), date(2024, 2, 1), '1000'), Decimal('0.00'))
+
+
+# -----------------------------
+# Asset IDs
+# -----------------------------
+
+class AssetIdAllocationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.asset_type = AssetType.objects.create(name='Laptop')
+
+    def add_asset(self, purchase_date=date(2025, 3, 1), **fields):
+        return ProductAsset.objects.create(
+            type_of_asset=self.asset_type, brand='Dell', model_no='M1', purchase_price=Decimal('100'),
+            current_value=Decimal('80'), purchase_date=purchase_date, **fields,
+        )
+
+    def test_counter_advances_past_explicit_numbers(self):
+        self.assertEqual(self.add_asset().asset_id, 'Pixel/2025/001')
+        self.assertEqual(self.add_asset(asset_number=3).asset_id, 'Pixel/2025/003')
+        self.assertEqual(AssetIdSequence.objects.get(year=2025).last_number, 1)
+
+        self.assertEqual(self.add_asset().asset_id, 'Pixel/2025/002')
+        self.assertEqual(self.add_asset().asset_id, 'Pixel/2025/004')
+        self.assertEqual(AssetIdSequence.objects.get(year=2025).last_number, 4)
+        self.assertEqual(self.add_asset(purchase_date=date(2024, 5, 1)).asset_id, 'Pixel/2024/001')
+
+    def test_explicit_numbers_with_suffixes(self):
+        self.assertEqual(self.add_asset(asset_number=5, asset_suffix='A').asset_id, 'Pixel/2025/005 A')
+        self.assertEqual(self.add_asset(asset_number=5, asset_suffix='B').asset_id, 'Pixel/2025/005 B')
+        with self.assertRaises(ValueError):
+            self.add_asset(asset_number=5, asset_suffix='A')
+
+        # A suffixed number is taken for automatic allocation too
+        AssetIdSequence.objects.filter(year=2025).update(last_number=4)
+        self.assertEqual(self.add_asset().asset_id, 'Pixel/2025/006')
+
+    def test_collisions_with_pending_rows(self):
+        pending = PendingProduct.objects.create(
+            type_of_asset=self.asset_type, brand='HP', model_no='P1', purchase_price=Decimal('100'),
+            current_value=Decimal('80'), purchase_date=date(2025, 3, 1), condition_status='working',
+        )
+        self.assertEqual(pending.asset_id, 'Pixel/2025/001')
+        self.assertEqual(self.add_asset().asset_id, 'Pixel/2025/002')
+
+        with self.assertRaises(ValueError):
+            self.add_asset(asset_number=1)
+        with self.assertRaises(ValueError):
+            self.add_asset(asset_id='Pixel/2025/001')
+
+        # Approving the pending row itself is not a clash
+        approved = ProductAsset(
+            type_of_asset=self.asset_type, brand='HP', model_no='P1', purchase_price=Decimal('100'),
+            current_value=Decimal('80'), purchase_date=date(2025, 3, 1), asset_id=pending.asset_id,
+        )
+        approved._pending_pk = pending.pk
+        approved.save()
+        self.assertEqual(approved.asset_id, 'Pixel/2025/001')
+
+    def test_unchanged_id_is_not_claimed_again(self):
+        asset = self.add_asset()
+        other = self.add_asset()
+
+        asset.brand = 'Lenovo'
+        with CaptureQueriesContext(connection) as queries:
+            asset.save()
+        self.assertFalse([q for q in queries if 'assetidsequence' in q['sql'].lower()])
+
+        asset.asset_id = other.asset_id
+        with self.assertRaises(ValueError):
+            asset.save()
+
+
+# -----------------------------
+# Bulk approvals
+# -----------------------------
+
+class ApprovalBatchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('clerk', password='pass')
+        cls.asset_type = AssetType.objects.create(name='Laptop')
+        cls.customer = Customer.objects.create(name='Acme', phone_number_primary='1', address_primary='Pune')
+        cls.asset = cls.add_asset('M1')
+        cls.spare = cls.add_asset('M2')
+
+    @classmethod
+    def add_asset(cls, model_no):
+        return ProductAsset.objects.create(
+            type_of_asset=cls.asset_type, brand='Dell', model_no=model_no, purchase_price=Decimal('100'),
+            current_value=Decimal('80'), purchase_date=date(2024, 1, 1),
+        )
+
+    def pending_product(self, **fields):
+        return PendingProduct.objects.create(
+            type_of_asset=self.asset_type, brand='HP', model_no='P1', purchase_price=Decimal('100'),
+            current_value=Decimal('80'), purchase_date=date(2025, 1, 1), condition_status='working',
+            submitted_by=self.user, **fields,
+        )
+
+    def pending_rental(self, asset):
+        return PendingRental.objects.create(
+            customer=self.customer, asset=asset, rental_start_date=date(2025, 1, 1),
+            payment_amount=Decimal('3100'), submitted_by=self.user,
+        )
+
+    def test_mixed_batch_reconciles_only_its_own_rentals(self):
+        lagging = Rental.objects.create(
+            customer=self.customer, asset=self.spare, rental_start_date=date(2024, 12, 1),
+            rental_end_date=date(2024, 12, 31), status='completed', payment_amount=Decimal('3100'),
+        )
+        lagging.revenue_entries.all().delete()  # left for the scheduled ledger run
+
+        customer = PendingCustomer.objects.create(
+            name='Beta', phone_number_primary='2', address_primary='Mumbai', submitted_by=self.user,
+        )
+        product = self.pending_product()
+        rental = self.pending_rental(self.asset)
+        config = PendingProductConfiguration.objects.create(
+            asset=self.asset, date_of_config=date(2025, 1, 5), cost=Decimal('10'), submitted_by=self.user,
+        )
+        items = [('rental', rental.pk), ('customer', customer.pk), ('product', product.pk), ('config', config.pk)]
+
+        results = process_approvals(items, 'approve', today=date(2025, 2, 10))
+
+        self.assertEqual([(r['type'], r['id'], r['status']) for r in results], [item + ('approved',) for item in items])
+        self.assertTrue(Customer.objects.filter(name='Beta').exists())
+        self.assertEqual(ProductAsset.objects.get(model_no='P1').asset_id, 'Pixel/2025/001')
+        self.assertEqual(self.asset.configurations.count(), 1)
+
+        created = Rental.objects.get(asset=self.asset)
+        self.assertEqual(list(created.revenue_entries.order_by('month').values_list('month', 'amount')), [
+            (date(2025, 1, 1), Decimal('3100.00')),
+            (date(2025, 2, 1), Decimal('1107.14')),
+        ])
+        self.asset.refresh_from_db()
+        self.assertEqual(self.asset.revenue, Decimal('4207.14'))
+        self.assertFalse(lagging.revenue_entries.exists())
+
+    def test_conflicts_are_reported_per_item(self):
+        first = self.pending_rental(self.asset)
+        second = self.pending_rental(self.asset)
+        taken = self.pending_product(asset_id=self.asset.asset_id)
+        free = self.pending_rental(self.spare)
+        items = [('rental', first.pk), ('rental', second.pk), ('product', taken.pk), ('rental', free.pk), ('repair', 999)]
+
+        results = process_approvals(items, 'approve', today=date(2025, 2, 10))
+
+        self.assertEqual([(r['type'], r['id'], r['status']) for r in results], [
+            ('rental', first.pk, 'approved'),
+            ('rental', second.pk, 'conflict'),
+            ('product', taken.pk, 'conflict'),
+            ('rental', free.pk, 'approved'),
+            ('repair', 999, 'conflict'),
+        ])
+        messages = [r['message'] for r in results if r['status'] == 'conflict']
+        self.assertIn("already has an ongoing rental", messages[0])
+        self.assertIn("already exists", messages[1])
+        self.assertEqual(messages[2], "This request is no longer pending.")
+
+        # Conflicting items stay pending, the rest of the batch is applied
+        self.assertEqual(list(PendingRental.objects.values_list('pk', flat=True)), [second.pk])
+        self.assertTrue(PendingProduct.objects.filter(pk=taken.pk).exists())
+        self.assertEqual(Rental.objects.filter(asset__in=[self.asset, self.spare]).count(), 2)
+
+    def test_automatic_asset_ids_are_allocated_a_block_per_year(self):
+        # Rows inserted in bulk (imports) reach approval without an asset ID
+        first, second, third = PendingProduct.objects.bulk_create([
+            PendingProduct(
+                type_of_asset=self.asset_type, brand='HP', model_no=f'B{n}', purchase_price=Decimal('100'),
+                current_value=Decimal('80'), purchase_date=date(2025, 1, 1), submitted_by=self.user,
+            )
+            for n in range(3)
+        ])
+        explicit = self.pending_product(asset_number=2)
+        items = [('product', p.pk) for p in (first, explicit, second, third)]
+
+        with CaptureQueriesContext(connection) as queries:
+            results = process_approvals(items, 'approve', today=date(2025, 2, 10))
+
+        self.assertEqual([r['message'] for r in results], [
+            'Created Pixel/2025/001', 'Created Pixel/2025/002', 'Created Pixel/2025/003', 'Created Pixel/2025/004',
+        ])
+        self.assertEqual(AssetIdSequence.objects.get(year=2025).last_number, 4)
+        sequence_updates = [
+            q['sql'] for q in queries.captured_queries
+            if q['sql'].startswith('UPDATE') and 'assetidsequence' in q['sql']
+        ]
+        self.assertEqual(len(sequence_updates), 1)
+
+    def test_delete_requests_remove_their_repairs(self):
+        repair = Repair.objects.create(product=self.asset, name='Screen', date=date(2025, 1, 3), cost=Decimal('50'))
+        delete = PendingRepair.objects.create(original_repair=repair, product=self.asset, is_edit=True, submitted_by=self.user)
+        new = PendingRepair.objects.create(
+            product=self.asset, name='Fan', date=date(2025, 1, 4), cost=Decimal('20'), submitted_by=self.user,
+        )
+
+        results = process_approvals([('repair', delete.pk), ('repair', new.pk)], 'approve', today=date(2025, 2, 10))
+
+        self.assertEqual([(r['id'], r['status'], r['message']) for r in results], [
+            (delete.pk, 'approved', "Repair deleted"),
+            (new.pk, 'approved', "New repair approved"),
+        ])
+        self.assertEqual(list(self.asset.repairs.values_list('name', flat=True)), ['Fan'])
+        self.assertFalse(PendingRepair.objects.exists())
+
+
+# -----------------------------
+# Background exports
+# -----------------------------
+
+class ExportJobTests(TestCase):
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        override = self.settings(EXPORT_ARTIFACT_DIR=directory, EXPORT_RETENTION_DAYS=7)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.now = timezone.now()
+
+    def add_job(self, minutes_ago=0, **fields):
+        job = enqueue_export('xlsx')
+        ExportJob.objects.filter(pk=job.pk).update(created_at=self.now - timedelta(minutes=minutes_ago), **fields)
+        job.refresh_from_db()
+        return job
+
+    def test_claim_takes_oldest_queued_jobs_once(self):
+        newest, oldest, middle = self.add_job(1), self.add_job(30), self.add_job(10)
+        self.add_job(60, status='done')
+
+        self.assertEqual(claim_jobs(2), [oldest.pk, middle.pk])
+        self.assertEqual(claim_jobs(5), [newest.pk])
+        self.assertEqual(claim_jobs(5), [])
+        for job in ExportJob.objects.filter(status='running'):
+            self.assertEqual(job.progress, 0)
+            self.assertIsNotNone(job.heartbeat_at)
+
+    def test_requeues_only_jobs_without_a_recent_heartbeat(self):
+        long_running = self.add_job(
+            status='running', started_at=self.now - timedelta(hours=3), heartbeat_at=self.now - timedelta(minutes=1),
+        )
+        lost = self.add_job(
+            status='running', progress=40, started_at=self.now - timedelta(hours=1),
+            heartbeat_at=self.now - timedelta(minutes=30),
+        )
+        never_beat = self.add_job(status='running', started_at=self.now - timedelta(minutes=30))
+
+        self.assertEqual(requeue_stale_jobs(self.now), 2)
+        self.assertEqual(ExportJob.objects.get(pk=long_running.pk).status, 'running')
+        for job in ExportJob.objects.filter(pk__in=[lost.pk, never_beat.pk]):
+            self.assertEqual((job.status, job.progress, job.heartbeat_at), ('queued', 0, None))
+
+    def test_progress_keeps_the_job_alive(self):
+        job = self.add_job(status='running', started_at=self.now - timedelta(hours=1), heartbeat_at=self.now - timedelta(hours=1))
+        _set_progress(job.pk, 1, 4)
+        job.refresh_from_db()
+        self.assertEqual(job.progress, 25)
+        self.assertEqual(requeue_stale_jobs(), 0)
+
+    def test_run_writes_the_artifact(self):
+        job = self.add_job()
+        claim_jobs(1)
+        self.assertEqual(run_export_job(job.pk), 'done')
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.progress), ('done', 100))
+        self.assertTrue(artifact_path(job).exists())
+
+    def test_retention_removes_old_finished_jobs_and_files(self):
+        expired = self.add_job(status='done', file_name='old.xlsx', finished_at=self.now - timedelta(days=8))
+        failed = self.add_job(status='failed', finished_at=self.now - timedelta(days=30))
+        recent = self.add_job(status='done', file_name='new.xlsx', finished_at=self.now - timedelta(days=1))
+        running = self.add_job(status='running', started_at=self.now - timedelta(days=30), heartbeat_at=self.now)
+        for job in (expired, recent):
+            artifact_path(job).write_bytes(b'xlsx')
+
+        self.assertEqual(purge_expired_exports(self.now), 2)
+        self.assertEqual(set(ExportJob.objects.values_list('pk', flat=True)), {recent.pk, running.pk})
+        self.assertFalse(artifact_path(expired).exists())
+        self.assertTrue(artifact_path(recent).exists())
+        self.assertFalse(ExportJob.objects.filter(pk=failed.pk).exists())
+
+
+# -----------------------------
+# Keyset pagination
+# -----------------------------
+
+class KeysetPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_superuser('admin', 'admin@example.com', 'pass')
+        cls.asset_type = AssetType.objects.create(name='Laptop')
+        customer = Customer.objects.create(name='Acme', phone_number_primary='1', address_primary='Pune')
+        cls.asset = asset = cls.add_asset(date(2025, 1, 1))
+        ends = [date(2025, 3, 1)] * 3 + [date(2025, 2, 1), None, None, date(2025, 4, 1)]
+        cls.rentals = [
+            Rental.objects.create(
+                customer=customer, asset=asset, rental_start_date=date(2025, 1, 1), rental_end_date=end,
+                status='completed', payment_amount=Decimal('100'),
+            )
+            for end in ends
+        ]
+
+    @classmethod
+    def add_asset(cls, purchase_date):
+        return ProductAsset.objects.create(
+            type_of_asset=cls.asset_type, brand='Dell', model_no='M1', purchase_price=Decimal('100'),
+            current_value=Decimal('80'), purchase_date=purchase_date,
+        )
+
+    def get_page(self, ordering, size, queryset=None, **params):
+        request = RequestFactory().get('/', params)
+        return keyset_paginate(request, Rental.objects.all() if queryset is None else queryset, ordering, page_size=size)
+
+    def walk(self, ordering, size):
+        """Pages of pks from first to last, and again from last to first through the previous links."""
+        forward = [self.get_page(ordering, size)]
+        while forward[-1].has_next:
+            forward.append(self.get_page(ordering, size, cursor=forward[-1].next_cursor))
+        backward = [forward[-1]]
+        while backward[-1].has_previous:
+            backward.append(self.get_page(ordering, size, cursor=backward[-1].previous_cursor))
+        return [[r.pk for r in page] for page in forward], [[r.pk for r in page] for page in reversed(backward)]
+
+    def newest_first(self):
+        # NULLs last, ties broken by the newest pk
+        return sorted(
+            self.rentals, key=lambda r: (r.rental_end_date is None, -(r.rental_end_date or date.min).toordinal(), -r.pk),
+        )
+
+    def test_ties_and_nulls_across_page_boundaries(self):
+        # Ascending: NULLs first, ties broken by the oldest pk
+        oldest_first = sorted(
+            self.rentals, key=lambda r: (r.rental_end_date is not None, r.rental_end_date or date.min, r.pk),
+        )
+        for ordering, expected in [(['-rental_end_date'], self.newest_first()), (['rental_end_date'], oldest_first)]:
+            for size in (1, 2, 3, 7):
+                with self.subTest(ordering=ordering, size=size):
+                    forward, backward = self.walk(ordering, size)
+                    self.assertEqual(sum(forward, []), [r.pk for r in expected])
+                    self.assertEqual(backward, forward)
+                    self.assertTrue(all(len(page) == size for page in forward[:-1]))
+
+    def test_first_and_last_page(self):
+        first = self.get_page(['-rental_end_date'], 3)
+        self.assertFalse(first.has_previous)
+        self.assertEqual(first.previous_query, '')
+        self.assertTrue(first.has_next)
+
+        second = self.get_page(['-rental_end_date'], 3, cursor=first.next_cursor)
+        last = self.get_page(['-rental_end_date'], 3, cursor=second.next_cursor)
+        self.assertEqual([r.pk for r in last], [r.pk for r in self.newest_first()[6:]])
+        self.assertFalse(last.has_next)
+        self.assertTrue(last.has_previous)
+
+        single = self.get_page(['-rental_end_date'], 10)
+        self.assertFalse(single.has_next or single.has_previous)
+        empty = self.get_page(['-rental_end_date'], 3, queryset=Rental.objects.none())
+        self.assertFalse(empty or empty.has_next or empty.has_previous)
+        # An unreadable cursor shows the first page
+        self.assertEqual(list(self.get_page(['-rental_end_date'], 3, cursor='not-a-cursor')), list(first))
+
+    def test_page_links_keep_the_sort_param(self):
+        first = self.get_page(['-rental_end_date'], 2, sort='-purchase_date', q='acme')
+        params = QueryDict(first.next_query)
+        self.assertEqual((params['sort'], params['q'], params['cursor']), ('-purchase_date', 'acme', first.next_cursor))
+
+        newest, middle, oldest = self.add_asset(date(2025, 3, 1)), self.add_asset(date(2025, 2, 1)), self.add_asset(date(2025, 1, 15))
+        self.client.force_login(self.user)
+        url = reverse('product_list')
+        response = self.client.get(url, {'sort': '-purchase_date', 'per_page': 2, 'year': 2025})
+        self.assertEqual(response.context['sort_by'], '-purchase_date')
+        self.assertEqual([p.pk for p in response.context['page']], [newest.pk, middle.pk])
+        response = self.client.get(f"{url}?{response.context['page'].next_query}")
+        self.assertEqual([p.pk for p in response.context['page']], [oldest.pk, self.asset.pk])
+
+        # Unknown sort keys fall back to the asset ID
+        response = self.client.get(url, {'sort': 'serial_no', 'per_page': 2, 'year': 2025})
+        self.assertEqual(response.context['sort_by'], 'asset_id')
+
+    def test_rental_history_is_newest_first(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('rental_history'), {'per_page': 3})
+        self.assertEqual([r.pk for r in response.context['page']], [r.pk for r in self.newest_first()[:3]])
+
+
+# -----------------------------
+# Bulk import
+# -----------------------------
+
+class BulkImportTests(TestCase):
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.path = os.path.join(directory, 'full_report.xlsx')
+        self.sheets = {
+            'AssetTypes': pd.DataFrame({'name': ['Laptop'], 'display_order': [1]}),
+            'Customers': pd.DataFrame({
+                'name': ['Acme', 'Globex', 'Initech'], 'phone_number_primary': ['1', '2', '3'],
+                'address_primary': ['Pune', 'Pune', 'Mumbai'],
+            }),
+            'Products': pd.DataFrame({
+                'asset_id': ['Pixel/2020/001', 'Pixel/2024/001'], 'type_of_asset': ['Laptop', 'Laptop'],
+                'brand': ['Dell', 'HP'], 'model_no': ['M1', 'M2'], 'purchase_date': ['01/02/2020', '15/03/2024'],
+                'purchase_price': [100, '250.50'], 'current_value': [80, 200],
+                # Exported while the warranty ran; it has expired since
+                'under_warranty': [True, False], 'warranty_duration_months': [12, 0],
+            }),
+            'Rentals': pd.DataFrame({
+                'customer': ['Acme', 'Globex'], 'asset': ['Pixel/2020/001', 'Pixel/2024/001'],
+                'rental_start_date': ['01/03/2024', '01/04/2024'], 'payment_amount': [1000, 1500],
+            }),
+        }
+        with pd.ExcelWriter(self.path) as writer:
+            for name, frame in self.sheets.items():
+                frame.to_excel(writer, sheet_name=name, index=False)
+        self.warnings = []
+
+    def importer(self, **options):
+        return BulkImporter(info=lambda message: None, warn=self.warnings.append, **options)
+
+    def dry_run_counts(self):
+        out = StringIO()
+        call_command('import_all_data', self.path, '--dry-run', '--full', workers=1, stdout=out)
+        return [line.strip() for line in out.getvalue().splitlines() if 'to update' in line]
+
+    def test_column_parsers(self):
+        self.assertEqual(detect_date_format(['13/02/2024', '01/03/2024']), '%d/%m/%Y')
+        self.assertEqual(detect_date_format(['02/13/2024', '03/01/2024']), '%m/%d/%Y')
+        self.assertIsNone(detect_date_format(['soon']))
+
+        # One format for the whole column: 01/03 is March, as 13/02 showed
+        dates, failed = parse_date_column(['13/02/2024', '01/03/2024', 'soon', '', None, date(2024, 5, 1)])
+        self.assertEqual(dates, [date(2024, 2, 13), date(2024, 3, 1), None, None, None, date(2024, 5, 1)])
+        self.assertEqual(failed, 1)
+        self.assertEqual(parse_decimal_column(['250.50', 80, 'n/a', None]), ([250.5, 80.0, None, None], 1))
+
+        failures = Counter()
+        frame = pd.DataFrame({'purchase_date': ['soon', '01/02/2020'], 'purchase_price': ['x', 'y'], 'brand': ['Dell', '']})
+        rows = list(sheet_rows(frame, {field: (field,) for field in frame}, PRODUCT_PARSERS, failures))
+        self.assertEqual(rows[1], {'purchase_date': date(2020, 2, 1), 'purchase_price': None, 'brand': None})
+        self.assertEqual(failures, {'purchase_date': 1, 'purchase_price': 2})
+
+        products = self.sheets['Products'].assign(sale_price=['tbd', None])
+        self.importer().run({'AssetTypes': self.sheets['AssetTypes'], 'Products': products})
+        self.assertEqual(self.warnings, ["Products: 1 unparseable 'sale_price' value(s) imported as empty"])
+        self.assertEqual(ProductAsset.objects.count(), 2)
+
+    def test_lookup_caches(self):
+        self.importer().run(self.sheets)
+        Customer.objects.create(name='Acme', phone_number_primary='9', address_primary='Goa')
+        cache = LookupCache(self.importer())
+        with self.assertNumQueries(0):
+            self.assertEqual(cache.customer(' Acme ').phone_number_primary, '1')  # lowest pk, like .first()
+            self.assertEqual(cache.asset('Pixel/2024/001 ').brand, 'HP')
+            self.assertIsNone(cache.customer('Umbrella'))
+            self.assertIsNone(cache.user('nobody'))
+
+        counts = Counter()
+        cache.importer.sheet = 'AssetTypes'
+        with self.assertNumQueries(3):  # insert, reload, reorder
+            types = cache.ensure_named(AssetType, {'Laptop': 2, 'Desktop': None, 'Tablet': 'x'}, 'display_order', counts)
+        self.assertEqual(counts, Counter(inserted=2, updated=1))
+        self.assertIsNotNone(types['Tablet'].pk)
+        self.assertEqual(AssetType.objects.get(name='Laptop').display_order, 2)
+
+    def test_rows_split_into_inserts_and_updates(self):
+        self.importer().run(self.sheets)
+        customers = self.sheets['Customers'].copy()
+        customers.loc[0, 'phone_number_primary'] = '100'
+        customers.loc[3] = ['Umbrella', '4', 'Goa']
+
+        importer = self.importer()
+        importer.run({'Customers': customers})
+        self.assertEqual(importer.diff['Customers'], Counter(inserted=1, updated=1, unchanged=2))
+        self.assertEqual(Customer.objects.get(name='Acme').phone_number_primary, '100')
+        self.assertEqual(Customer.objects.count(), 4)
+
+    def test_resume_after_failed_batch(self):
+        customers = self.sheets['Customers']
+
+        def chunks(fail):
+            yield 'AssetTypes', self.sheets['AssetTypes']
+            yield 'Customers', customers.iloc[:2]
+            if fail:
+                raise OSError("workbook reader died")
+            yield 'Customers', customers.iloc[2:]
+
+        with self.assertRaises(OSError):
+            self.importer(journal=ImportJournal(self.path)).run(chunks(fail=True))
+        run = ImportRun.objects.get()
+        self.assertEqual((run.status, run.sheet, run.rows_done), ('failed', 'Customers', 2))
+        self.assertEqual(Customer.objects.count(), 2)
+
+        importer = self.importer(journal=ImportJournal(self.path))
+        importer.run(chunks(fail=False))
+        self.assertTrue(importer.journal.resumed)
+        self.assertEqual(importer.diff['Customers'], Counter(inserted=1, unchanged=2))
+        self.assertEqual(ImportRun.objects.get().status, 'done')
+        self.assertEqual(sorted(Customer.objects.values_list('name', flat=True)), ['Acme', 'Globex', 'Initech'])
+
+        # A rerun of the same rows parses none of them
+        importer = self.importer(journal=ImportJournal(self.path))
+        importer.run(chunks(fail=False))
+        self.assertEqual(importer.diff['Customers'], Counter(unchanged=3))
+        self.assertEqual(ImportRun.objects.latest('pk').status, 'done')
+
+    def test_bulk_import_then_full_dry_run_changes_nothing(self):
+        call_command('import_all_data', self.path, '--bulk', workers=1, stdout=StringIO())
+        self.assertFalse(ProductAsset.objects.get(asset_id='Pixel/2020/001').under_warranty)
+        self.assertEqual(Rental.objects.count(), 2)
+        counts = self.dry_run_counts()
+        self.assertEqual(len(counts), 4)
+        for line in counts:
+            self.assertIn(': 0 to insert, 0 to update', line)
+
+    def test_row_import_then_full_dry_run_changes_nothing(self):
+        call_command('import_all_data', self.path, workers=1, stdout=StringIO())
+        self.assertFalse(ProductAsset.objects.get(asset_id='Pixel/2020/001').under_warranty)
+        for line in self.dry_run_counts():
+            self.assertIn(': 0 to insert, 0 to update', line)
@@ -45,6 +45,7 @@ urlpatterns = [
     path("check-contracts/", views.check_contracts, name="check_contracts"),
     
     path('history/', views.rental_history, name='rental_history'),    
+    path('history/<str:kind>/<int:pk>/', views.audit_history, name='audit_history'),
 
     path('config/edit/<int:config_id>/', views.edit_config, name='edit_config'),
     path('config/delete/<int:config_id>/', views.delete_config, name='delete_config'),
@@ -53,6 +54,7 @@ urlpatterns = [
 
     # path('products/submit/', views.submit_product, name='submit_product'),
     path('approvals/', views.approval_dashboard, name='approval_dashboard'),
+    path('approvals/bulk/', views.bulk_approval, name='bulk_approval'),
     path('approvals/product/approve/<int:pk>/', views.approve_product, name='approve_product'),
     path('approvals/product/reject/<int:pk>/', views.reject_product, name='reject_product'),
     path('approvals/customer/approve/<int:pk>/', views.approve_customer, name='approve_customer'),
@@ -76,6 +78,9 @@ urlpatterns = [
     path('reports/export/csv/', views.export_reports_csv, name='export_reports_csv'),
     path('reports/export/excel/', views.export_reports_excel, name='export_reports_excel'),
     path('reports/export/pdf/', views.export_reports_pdf, name='export_reports_pdf'),
+    path('reports/exports/', views.export_jobs, name='export_jobs'),
+    path('reports/exports/<int:pk>/download/', views.download_export, name='download_export'),
+    path('metrics', views.metrics, name='metrics'),
 
 
     path('customer-autocomplete/', CustomerAutocomplete.as_view(), name='customer-autocomplete'),
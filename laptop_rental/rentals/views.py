@@ -1,8 +1,17 @@
 from django.shortcuts import render, redirect, get_object_or_404
-from .models import Rental, Customer, ProductAsset, ProductConfiguration,Repair, PendingProduct, PendingCustomer, PendingRental, PendingProductConfiguration, Supplier, AssetType,CPUOption, HDDOption, RAMOption, DisplaySizeOption, GraphicsOption, PendingRepair
+from .models import ExportJob, Rental, Customer, ProductAsset, ProductConfiguration,Repair, PendingProduct, PendingCustomer, PendingRental, PendingProductConfiguration, Supplier, AssetType,CPUOption, HDDOption, RAMOption, DisplaySizeOption, GraphicsOption, PendingRepair
+from .approvals import APPROVAL_TYPES, approval_feed
+from .audit import HISTORY_MODELS, add_changes, history
+from .reminders import send_reminders
+from .metrics import store as metrics_store, window_size as metrics_window_size
+from .autocomplete import customers as customer_suggestions, rentable_assets
+from .search import matching, query_terms, search
 from .forms import CustomerForm, ProductAssetForm, ProductConfigurationForm, RentalForm, PendingCustomerForm, PendingRentalForm, PendingProductConfigurationForm, SupplierForm, RepairForm, AssetTypeForm,CPUOptionForm,  HDDOptionForm, RAMOptionForm, DisplaySizeOptionForm, GraphicsOptionForm
+from django.conf import settings
 from django.contrib.auth.decorators import login_required
+from django.core.paginator import Paginator
 from django.db.models import Q, Sum, Count
+from django.http import Http404, JsonResponse
 from django.db import IntegrityError
 from django.contrib import messages
 from django.utils.timezone import now
@@ -11,7 +20,6 @@ import uuid
 from datetime import date,timedelta
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth import logout
-from django.core.mail import send_mail
 from django.utils import timezone
 from django.contrib.auth.decorators import user_passes_test
 from datetime import datetime
@@ -19,17 +27,23 @@ import json
 from collections import defaultdict
 import csv
 import pandas as pd
-from django.http import HttpResponse
+from django.http import FileResponse, Http404, HttpResponse, JsonResponse, StreamingHttpResponse
 from reportlab.pdfgen import canvas
 from django.urls import reverse
 from dateutil.relativedelta import relativedelta
 from decimal import Decimal, ROUND_HALF_UP
-# from .site_logger import log_action
+from .pagination import keyset_paginate
+from .approvals import PENDING_MODELS, parse_approval_items, process_approvals
+from .exports import stream_csv_zip
+from .export_jobs import ARTIFACT_NAMES, artifact_path, enqueue_export
+from .site_logger import log_action
+
+PRODUCT_SORT_FIELDS = ('asset_id', '-asset_id', 'purchase_date', '-purchase_date')
 
 
 def logout_view(request):
+    log_action(request.user, "Logged out", "User")
     logout(request)
-    # log_action(request.user, "Logged out", "User")
     return redirect('login')
 
 @login_required
@@ -43,8 +57,9 @@ def homepage(request):
 
 @login_required
 def sold_assets(request):
-    products = ProductAsset.objects.filter(condition_status='sold').order_by('-sale_date')
-    return render(request, 'rentals/sold_assets.html', {'products': products})
+    products = ProductAsset.objects.filter(condition_status='sold')
+    page = keyset_paginate(request, products, ['-sale_date'])
+    return render(request, 'rentals/sold_assets.html', {'products': page, 'page': page})
 
 @login_required
 def settings_page(request):
@@ -58,14 +73,7 @@ def customer_list(request):
     is_permanent = request.GET.get('permanent') == 'on'
     is_bni = request.GET.get('bni') == 'on'
 
-    customers = Customer.objects.all()
-    if query:
-        customers = customers.filter(
-            Q(name__icontains=query) |
-            Q(email__icontains=query) |
-            Q(phone_number_primary__icontains=query) |
-            Q(phone_number_secondary__icontains=query)
-        )
+    customers = search(Customer.objects.select_related('edited_by'), query)
 
     if is_permanent:
         customers = customers.filter(is_permanent=True)
@@ -73,49 +81,41 @@ def customer_list(request):
     if is_bni:
         customers = customers.filter(is_bni_member=True)
 
-    return render(request, 'rentals/customer_list.html', {'customers': customers})
+    page = keyset_paginate(request, customers, ['pk'])
+    return render(request, 'rentals/customer_list.html', {'customers': page, 'page': page})
 
 
 @login_required
 def product_list(request):
     query = request.GET.get('q','')
     sort_by = request.GET.get('sort', 'asset_id')
+    if sort_by not in PRODUCT_SORT_FIELDS:
+        sort_by = 'asset_id'
     asset_type = request.GET.get('type')
     start_date = request.GET.get('start_date')
     end_date = request.GET.get('end_date')
-    products = ProductAsset.objects.all()
+    # Availability and current renter are annotated in the same query
+    products = ProductAsset.objects.with_availability().select_related('type_of_asset', 'edited_by')
 
     if start_date:
         products = products.filter(purchase_date__gte=parse_date(start_date))
     if end_date:
         products = products.filter(purchase_date__lte=parse_date(end_date))
-    
-    active_rentals = {
-        rental.asset.id: rental.customer.name
-        for rental in Rental.objects.filter(status='ongoing')
-    }
-    
-    if query:
-        products = products.filter(
-            Q(asset_id__icontains=query) |
-            Q(brand__icontains=query) |
-            Q(model_no__icontains=query) |
-            Q(serial_no__icontains=query)
-        )
+
+    products = search(products, query)
 
     if asset_type:
         products = products.filter(type_of_asset=asset_type)
 
-
-
-    products = products.order_by(sort_by)
+    page = keyset_paginate(request, products, [sort_by])
 
     asset_types = ProductAsset.objects.values_list('type_of_asset', flat=True).distinct()
 
     year_list = list(range(2015 , datetime.now().year + 1))
 
     return render(request, 'rentals/product_list.html', {
-        'products': products,
+        'products': page,
+        'page': page,
         'query': query,
         'sort_by': sort_by,
         'asset_type': asset_type,
@@ -123,7 +123,6 @@ def product_list(request):
         'year_list': year_list,
         'start_date': start_date,
         'end_date': end_date,
-        "active_rentals": active_rentals,
     })
 
 @login_required
@@ -139,7 +138,7 @@ def add_asset_type(request):
     form = AssetTypeForm(request.POST or None)
     if form.is_valid():
         form.save()
-        # log_action(request.user, "Added new asset type", "AssetType")
+        log_action(request.user, "Added new asset type", "AssetType")
         return redirect('asset_type_list')
     return render(request, 'products/add_asset_type.html', {'form': form})
 
@@ -151,7 +150,7 @@ def edit_asset_type(request, pk):
     form = AssetTypeForm(request.POST or None, instance=asset_type)
     if form.is_valid():
         form.save()
-        # log_action(request.user, "Edited asset type", "AssetType", obj_id=asset_type.id)
+        log_action(request.user, "Edited asset type", "AssetType", obj_id=asset_type.id)
         return redirect('asset_type_list')
     return render(request, 'products/edit_asset_type.html', {'form': form})
 
@@ -159,38 +158,72 @@ def edit_asset_type(request, pk):
 
 @login_required
 def approval_dashboard(request):
-    pending_products = PendingProduct.objects.all()
-    pending_customers = PendingCustomer.objects.all()
-    pending_rentals = PendingRental.objects.all()
-    pending_configs = PendingProductConfiguration.objects.all()
-    pending_repairs = PendingRepair.objects.select_related('product', 'original_repair', 'submitted_by')
- 
-
-    products_data = [
-        {"pending": p, "old": p.original_product} for p in pending_products
-    ]
-    customers_data = [
-        {"pending": pc, "old": pc.original_customer} for pc in pending_customers
-    ]
-    rentals_data = [
-        {"pending": pr, "old": pr.original_rental} for pr in pending_rentals
-    ]
-    configs_data = [
-        {"pending": cfg, "old": cfg.original_config} for cfg in pending_configs
-    ]
-    repairs_data = [
-        {"pending": pr, "old": pr.original_repair} for pr in pending_repairs
-    ]
+    pages = {key: request.GET.get(f'{key}_page', 1) for key, *_ in APPROVAL_TYPES}
+    feed = approval_feed(pages=pages)
+    sections = feed['sections']
 
     return render(request, "rentals/approval_dashboard.html", {
-        "pending_products": products_data,
-        "pending_customers": customers_data,
-        "pending_rentals": rentals_data,
-        "pending_configs": configs_data,
-        "pending_repairs": repairs_data,
+        "pending_products": sections['products']['items'],
+        "pending_customers": sections['customers']['items'],
+        "pending_rentals": sections['rentals']['items'],
+        "pending_configs": sections['configs']['items'],
+        "pending_repairs": sections['repairs']['items'],
+        "pages": {key: section['page'] for key, section in sections.items()},
+        "counts": feed['counts'],
     })
 
 
+@login_required
+@user_passes_test(lambda u: u.is_superuser)
+def bulk_approval(request):
+    """
+    Approve or reject many pending items in one transaction.
+    Form posts: items=<type>:<id> (repeated) and action=approve|reject.
+    JSON posts: {"action": "approve", "items": [{"type": "product", "id": 3}, ...]}
+    """
+    if request.method != 'POST':
+        return redirect('approval_dashboard')
+
+    as_json = request.content_type == 'application/json'
+    if as_json:
+        try:
+            payload = json.loads(request.body or b'{}')
+        except ValueError:
+            return JsonResponse({'error': 'Invalid JSON body.'}, status=400)
+        action = payload.get('action')
+        items = parse_approval_items(
+            f"{item.get('type')}:{item.get('id')}" if isinstance(item, dict) else item
+            for item in payload.get('items', [])
+        )
+    else:
+        action = request.POST.get('action')
+        items = parse_approval_items(request.POST.getlist('items'))
+
+    if action not in ('approve', 'reject'):
+        if as_json:
+            return JsonResponse({'error': "action must be 'approve' or 'reject'."}, status=400)
+        messages.error(request, "Unknown bulk action.")
+        return redirect('approval_dashboard')
+
+    results = process_approvals(items, action)
+    for r in results:
+        if r['status'] != 'conflict':
+            log_action(request.user, f"{r['status'].title()} {r['type']} in bulk", PENDING_MODELS[r['type']].__name__, obj_id=r['id'])
+
+    if as_json:
+        return JsonResponse({'results': results})
+
+    done = sum(1 for r in results if r['status'] != 'conflict')
+    if done:
+        messages.success(request, f"{done} item(s) {'approved' if action == 'approve' else 'rejected'}.")
+    for r in results:
+        if r['status'] == 'conflict':
+            messages.warning(request, f"{r['type'].title()} #{r['id']}: {r['message']}")
+    if not items:
+        messages.info(request, "No items selected.")
+    return redirect('approval_dashboard')
+
+
 @login_required
 @user_passes_test(lambda u: u.is_superuser)
 def approve_config(request, pk):
@@ -219,14 +252,14 @@ def approve_config(request, pk):
     #         edited_by=request.user
     #     )
     pending.delete()
-    # log_action(request.user, "Approved product configuration", "PendingProductConfiguration", obj_id=pending.id)
+    log_action(request.user, "Approved product configuration", "PendingProductConfiguration", obj_id=pk)
     return redirect('approval_dashboard')
 
 @login_required
 @user_passes_test(lambda u: u.is_superuser)
 def reject_config(request, pk):
     pending = get_object_or_404(PendingProductConfiguration, pk=pk)
-    # log_action(request.user, "Rejected product configuration", "PendingProductConfiguration", obj_id=pending.id)
+    log_action(request.user, "Rejected product configuration", "PendingProductConfiguration", obj_id=pending.id)
     pending.delete()
     return redirect('approval_dashboard')
 
@@ -256,7 +289,7 @@ def approve_product(request, pk):
 
             product.edited_by = pending.submitted_by
             product.edited_at = pending.submitted_at
-            # log_action(request.user, "Approved product", "PendingProduct", obj_id=pending.id)
+            log_action(request.user, "Approved product", "PendingProduct", obj_id=pending.id)
             product.save()
 
         else:
@@ -286,7 +319,7 @@ def approve_product(request, pk):
             # tell new_product.save() to ignore this pending record when checking PendingProduct table
             new_product._pending_pk = pending.pk
             new_product.save()
-            # log_action(request.user, "Approved product", "PendingProduct", obj_id=pending.id)
+            log_action(request.user, "Approved product", "PendingProduct", obj_id=pending.id)
 
         # only delete pending after successful save
         pending.delete()
@@ -303,7 +336,7 @@ def approve_product(request, pk):
 @user_passes_test(lambda u: u.is_superuser)
 def reject_product(request, pk):
     get_object_or_404(PendingProduct, pk=pk).delete()
-    # log_action(request.user, "Rejected product", "PendingProduct", obj_id=pk)
+    log_action(request.user, "Rejected product", "PendingProduct", obj_id=pk)
     return redirect('approval_dashboard')
 
 
@@ -312,32 +345,68 @@ def rental_history(request):
     query = request.GET.get('q', '')
 
     # Filter only completed rentals
-    rentals = Rental.objects.filter(status='completed')
+    rentals = Rental.objects.filter(status='completed').select_related('customer', 'asset', 'edited_by')
 
     # Search functionality
-    if query:
+    if query and query_terms(query):
         rentals = rentals.filter(
-            Q(customer__name__icontains=query) |
-            Q(asset__asset_id__icontains=query) |
-            Q(asset__serial_no__icontains=query) |
-            Q(asset__model_no__icontains=query) |
-            Q(contract_number__icontains=query) |
-            Q(edited_by__username__icontains=query)
+            Q(pk__in=matching(Rental, query).values('object_id')) |
+            Q(customer__in=matching(Customer, query).values('object_id')) |
+            Q(asset__in=matching(ProductAsset, query).values('object_id')) |
+            Q(edited_by__username__istartswith=query)
         )
 
-    rentals = rentals.order_by('-asset__asset_id')
+    # Newest first, on a Rental column so the seek stays on rental_history_idx
+    # (sorting on the joined asset ID could not use an index)
+    page = keyset_paginate(request, rentals, ['-rental_end_date'])
     # Add end_date for display
     # for rental in rentals:
     #     rental.end_date = rental.rental_start_date + timedelta(days=rental.duration_days)
 
-      # newest first
-
     return render(request, 'rentals/rental_history.html', {
-        'rentals': rentals,
+        'rentals': page,
+        'page': page,
         'query': query
     })
 
 
+@login_required
+def audit_history(request, kind, pk):
+    """Every recorded change and action on one asset, customer or rental."""
+    model = HISTORY_MODELS.get(kind)
+    if model is None:
+        raise Http404("No history for this kind of record.")
+    events = history(model, pk)
+
+    event = request.GET.get('event')
+    username = request.GET.get('user', '').strip()
+    start_date = request.GET.get('start_date')
+    end_date = request.GET.get('end_date')
+    if event:
+        events = events.filter(event=event)
+    if username:
+        events = events.filter(user__username__istartswith=username)
+    if start_date and parse_date(start_date):
+        events = events.filter(created_at__date__gte=parse_date(start_date))
+    if end_date and parse_date(end_date):
+        events = events.filter(created_at__date__lte=parse_date(end_date))
+
+    page = Paginator(events, getattr(settings, 'AUDIT_PAGE_SIZE', 50)).get_page(request.GET.get('page'))
+    page.object_list = add_changes(list(page.object_list), model, pk)
+    filters = request.GET.copy()
+    filters.pop('page', None)
+
+    return render(request, 'rentals/audit_history.html', {
+        'kind': kind,
+        'record': model.objects.filter(pk=pk).first(),  # None once deleted; its history stays
+        'pk': pk,
+        'page': page,
+        'event_choices': events.model.EVENT_CHOICES,
+        'filters': request.GET,
+        'filter_query': filters.urlencode(),
+    })
+
+
 @login_required
 def add_customer(request):
     if request.method == 'POST':
@@ -347,7 +416,7 @@ def add_customer(request):
                 customer = form.save(commit=False)
                 customer.edited_by = request.user
                 customer.save()
-                # log_action(request.user, "Added new customer", "Customer", obj_id=customer.id)
+                log_action(request.user, "Added new customer", "Customer", obj_id=customer.id)
 
                 return redirect('customer_list')
         else:
@@ -356,7 +425,7 @@ def add_customer(request):
                 pending = form.save(commit=False)
                 pending.submitted_by = request.user
                 pending.save()
-                # log_action(request.user, "Added new pending customer", "Customer", obj_id=customer.id)
+                log_action(request.user, "Added new pending customer", "PendingCustomer", obj_id=pending.id)
 
                 return redirect('customer_list')
     else:
@@ -388,7 +457,7 @@ def add_product(request):
             product = form.save(commit=False)
             product.edited_by = request.user
             product.save()
-            # log_action(request.user, "Created new product", "ProductAsset", obj_id=product.id)
+            log_action(request.user, "Created new product", "ProductAsset", obj_id=product.id)
             messages.success(request, f"✅ Product '{product.asset_id}' was successfully created.")
             return redirect(redirect_url)
 
@@ -416,9 +485,9 @@ def add_product(request):
                 submitted_by=request.user
             )
             pending.save()
-            # log_action(request.user, "Submitted new product for approval", "PendingProduct", obj_id=pending.id)
+            log_action(request.user, "Submitted new product for approval", "PendingProduct", obj_id=pending.id)
 
-            messages.success(request, f"Product {form.cleaned_data.get('asset_id')} submitted for approval and pending review.")
+            messages.success(request, f"Product {pending.asset_id} submitted for approval and pending review.")
             return redirect(redirect_url)
 
     return render(request, 'rentals/add_product.html', {'form': form})
@@ -444,7 +513,7 @@ def approve_customer(request, pk):
         customer.reference_name = pending.reference_name
         customer.edited_by = pending.submitted_by
         customer.save()
-        # log_action(request.user, "Approved customer", "PendingCustomer", obj_id=pending.id)
+        log_action(request.user, "Approved customer", "PendingCustomer", obj_id=pending.id)
     else:
         Customer.objects.create(
             name=pending.name,
@@ -459,7 +528,7 @@ def approve_customer(request, pk):
             edited_by=pending.submitted_by,
         )
 
-    # log_action(request.user, "Approved customer", "PendingCustomer", obj_id=pending.id)
+    log_action(request.user, "Approved customer", "PendingCustomer", obj_id=pending.id)
     pending.delete()
     messages.success(request, "Customer approved successfully.")
     return redirect("approval_dashboard")
@@ -468,7 +537,7 @@ def approve_customer(request, pk):
 @user_passes_test(lambda u: u.is_superuser)
 def reject_customer(request, pk):
     get_object_or_404(PendingCustomer, pk=pk).delete()
-    # log_action(request.user, "Rejected customer", "PendingCustomer", obj_id=pk)
+    log_action(request.user, "Rejected customer", "PendingCustomer", obj_id=pk)
     return redirect('approval_dashboard')
 
 from django.contrib.auth.decorators import login_required
@@ -485,7 +554,7 @@ def add_rental(request):
                 rental = form.save(commit=False)
                 rental.edited_by = request.user
                 rental.save()
-                # log_action(request.user, "Created rental", "Rental", obj_id=rental.id)
+                log_action(request.user, "Created rental", "Rental", obj_id=rental.id)
                 messages.success(request, "Rental added successfully.")
                 return redirect('rental_list')
 
@@ -497,7 +566,7 @@ def add_rental(request):
                 pending.submitted_by = request.user
                 pending.edited_by = request.user
                 pending.save()
-                # log_action(request.user, "Created rental for approval", "Rental")
+                log_action(request.user, "Created rental for approval", "Rental")
                 messages.success(request, "Rental submitted for approval.")
 
                 return redirect('rental_list')
@@ -545,7 +614,7 @@ def approve_rental(request, pk):
 
     # ✅ Remove pending request after approval
     pending.delete()
-    # log_action(request.user, "Approved rental", "PendingRental", obj_id=pending.id)
+    log_action(request.user, "Approved rental", "PendingRental", obj_id=pk)
     messages.success(request, "Rental approved successfully.")
     return redirect("approval_dashboard")
 
@@ -553,7 +622,7 @@ def approve_rental(request, pk):
 @user_passes_test(lambda u: u.is_superuser)
 def reject_rental(request, pk):
     get_object_or_404(PendingRental, pk=pk).delete()
-    # log_action(request.user, "Rejected rental", "PendingRental", obj_id=pk)
+    log_action(request.user, "Rejected rental", "PendingRental", obj_id=pk)
     return redirect('approval_dashboard')
 
 
@@ -568,7 +637,7 @@ def edit_rental(request, rental_id):
         if request.method == "POST" and form.is_valid():
             updated_rental = form.save(commit=False)
             updated_rental.edited_by = request.user
-            # log_action(request.user, "Edited rental", "Rental", obj_id=updated_rental.id)
+            log_action(request.user, "Edited rental", "Rental", obj_id=updated_rental.id)
             updated_rental.save()
             messages.success(request, "Rental updated successfully.")
             return redirect("rental_list")
@@ -594,7 +663,7 @@ def edit_rental(request, rental_id):
                     submitted_by=request.user,
                 )
                 pending.save()
-                # log_action(request.user, "Submitted rental edit for approval", "PendingRental", obj_id=pending.id)
+                log_action(request.user, "Submitted rental edit for approval", "PendingRental", obj_id=pending.id)
                 messages.success(request, "Rental changes submitted for approval.")
                 return redirect("rental_list")
         else:
@@ -612,7 +681,7 @@ def edit_customer(request, pk):
         if request.method == "POST" and form.is_valid():
             updated_customer = form.save(commit=False)
             updated_customer.edited_by = request.user
-            # log_action(request.user, "Edited customer", "Customer", obj_id=updated_customer.id)
+            log_action(request.user, "Edited customer", "Customer", obj_id=updated_customer.id)
             updated_customer.save()
             messages.success(request, "Customer updated successfully.")
             return redirect("customer_list")
@@ -634,8 +703,8 @@ def edit_customer(request, pk):
                     reference_name=cleaned.get("reference_name"),
                     submitted_by=request.user,
                 )
-                # log_action(request.user, "Submitted customer edit for approval", "PendingCustomer", obj_id=pending.id)
                 pending.save()
+                log_action(request.user, "Submitted customer edit for approval", "PendingCustomer", obj_id=pending.id)
                 messages.success(request, "Customer changes submitted for approval.")
                 return redirect("customer_list")
         else:
@@ -661,7 +730,7 @@ def edit_product(request, pk):
             product = form.save(commit=False)
             product.edited_by = request.user
             product.save()
-            # log_action(request.user, "Submitted edit for product", "ProductAsset", obj_id=product.id)
+            log_action(request.user, "Submitted edit for product", "ProductAsset", obj_id=product.id)
 
             messages.success(request, f"✏️ Product '{product.asset_id}' was successfully updated.")
             return redirect(redirect_url)
@@ -692,7 +761,7 @@ def edit_product(request, pk):
                 date_marked_dead=cleaned.get('date_marked_dead'),
                 damage_narration=cleaned.get('damage_narration'),
             )
-            # log_action(request.user, "Submitted edit for product for approval", "ProductAsset", obj_id=product.id)
+            log_action(request.user, "Submitted edit for product for approval", "ProductAsset", obj_id=product.id)
             messages.success(request, "Changes submitted for approval.")
             return redirect(redirect_url)
 
@@ -723,8 +792,8 @@ def add_config(request, pk):
                 config = form.save(commit=False)
                 config.asset = asset
                 config.edited_by = request.user
-                # log_action(request.user, "Added product configuration", "ProductConfiguration", obj_id=config.id)
                 config.save()
+                log_action(request.user, "Added product configuration", "ProductConfiguration", obj_id=config.id)
                 return redirect('product_detail', pk=pk)
             else:
                 # Handle non-superuser submission to PendingProductConfiguration
@@ -742,8 +811,8 @@ def add_config(request, pk):
                     detailed_config=form.cleaned_data.get('detailed_config'),
                     submitted_by=request.user
                 )
-                # log_action(request.user, "Submitted product configuration for approval", "PendingProductConfiguration", obj_id=pending.id)
                 pending.save()
+                log_action(request.user, "Submitted product configuration for approval", "PendingProductConfiguration", obj_id=pending.id)
                 return redirect('product_detail', pk=pk)
     else:
         if last_config:
@@ -840,7 +909,7 @@ def product_detail(request, pk):
 def delete_config(request, config_id):
     config = get_object_or_404(ProductConfiguration, pk=config_id)
     asset_id = config.asset.pk
-    # log_action(request.user, "Deleted product configuration", "ProductConfiguration", obj_id=config.id)
+    log_action(request.user, "Deleted product configuration", "ProductConfiguration", obj_id=config.id)
     config.delete()
     return redirect('product_detail', pk=asset_id)
 
@@ -871,7 +940,7 @@ def clone_product(request, pk):
             edited_by=request.user
         )
         new_product.save()
-        # log_action(request.user, "Cloned product", "ProductAsset", obj_id=new_product.id)
+        log_action(request.user, "Cloned product", "ProductAsset", obj_id=new_product.id)
         messages.success(request, f"Product cloned successfully {new_product.asset_id}. Please update details as per need.")
         return redirect(redirect_url)
 
@@ -905,8 +974,8 @@ def clone_product(request, pk):
             condition_status=original.condition_status,
             edited_by=request.user
         )
-        # log_action(request.user, "Cloned product for approval", "PendingProduct", obj_id=new_product.id)
         new_product.save()
+        log_action(request.user, "Cloned product for approval", "PendingProduct", obj_id=new_product.id)
         messages.success(request, f"Product clone {new_product.asset_id} submitted for approval.")
         return redirect(redirect_url)
 
@@ -920,9 +989,10 @@ def rental_list(request):
     filter_type = request.GET.get('filter')
 
     # Filter by status first
-    # if filter_type == 'ongoing':
-    rentals = Rental.objects.filter(status='ongoing')
-    
+    rentals = Rental.objects.filter(status='ongoing').select_related('customer', 'asset', 'edited_by')
+    if filter_type in ('overdue', 'expiring'):
+        rentals = rentals.filter(contract_alert=filter_type)
+
     if query:
         rentals = rentals.filter(
             Q(customer__name__icontains=query) |
@@ -931,12 +1001,13 @@ def rental_list(request):
         )
 
     # Sort and calculate due date
-    rentals = rentals.order_by('-rental_start_date')
+    page = keyset_paginate(request, rentals, ['-rental_start_date'])
     # for rental in rentals:
     #     rental.due_date = rental.rental_start_date + timedelta(days=rental.duration_days)
 
     return render(request, 'rentals/rental_list.html', {
-        'rentals': rentals,
+        'rentals': page,
+        'page': page,
         'filter_type': filter_type
     })
 
@@ -945,7 +1016,7 @@ def rental_list(request):
 def mark_rental_completed(request, rental_id):
     rental = get_object_or_404(Rental, pk=rental_id)
     rental.status = 'completed'
-    # log_action(request.user, "Marked rental as completed", "Rental", obj_id=rental.id)
+    log_action(request.user, "Marked rental as completed", "Rental", obj_id=rental.id)
     rental.save()
     return redirect('rental_list')
 
@@ -958,13 +1029,26 @@ from django.shortcuts import render
 from django.utils.dateparse import parse_date
 import json
 
+from django.db.models import F
+
 from .models import Customer, ProductAsset, Rental, Repair, ProductConfiguration
+from .models import AssetReportSnapshot, AssetTypeReportSnapshot, CustomerReportSnapshot, MonthlyReportSnapshot
+from django.conf import settings
+from .reporting import (
+    snapshots_built, monthly_rental_totals, customer_payment_totals, customer_revenue_ranking,
+    asset_type_revenue, with_maintenance_costs, assets_in_warranty, repairs_in_warranty, top_repaired_assets,
+)
 
 
 @login_required
 def report_dashboard(request):
-    customers = Customer.objects.all()
-    products = ProductAsset.objects.all()
+    # Unfiltered aggregates come from the report snapshot tables (rentals/reporting.py)
+    # unless REPORT_DASHBOARD_USE_SNAPSHOTS is off or refresh_report_snapshots has
+    # never run; everything else is set-based SQL.
+    use_snapshots = getattr(settings, 'REPORT_DASHBOARD_USE_SNAPSHOTS', True) and snapshots_built()
+
+    customers = Customer.objects.only('id', 'name')
+    products = ProductAsset.objects.only('id', 'asset_id')
 
     customer_id = request.GET.get('customer')
     product_id = request.GET.get('product')
@@ -974,7 +1058,6 @@ def report_dashboard(request):
 
     # Fetch all rentals
     rentals = Rental.objects.select_related('asset', 'customer').all()
-    customer_business = []
 
     # Filter rentals based on customer type
     if customer_type == 'BNI':
@@ -986,18 +1069,25 @@ def report_dashboard(request):
         selected_customers = Customer.objects.filter(is_permanent=True)
 
     else:
-        selected_customers = []
-
-    # Calculate customer business totals
-    for customer in selected_customers:
-        total = Rental.objects.filter(customer=customer).aggregate(total=Sum('payment_amount'))['total'] or 0
-        customer_business.append({'name': customer.name, 'total': total})
+        selected_customers = Customer.objects.none()
+
+    # Customer business totals (one grouped read)
+    if use_snapshots:
+        customer_business = [
+            {'name': row['name'], 'total': row['report_snapshot__total_payment'] or 0}
+            for row in selected_customers.values('name', 'report_snapshot__total_payment')
+        ]
+    else:
+        customer_business = customer_payment_totals(selected_customers)
 
     # If product selected, calculate profit
     product_obj = None
     if product_id:
         try:
-            product_obj = ProductAsset.objects.get(id=product_id)
+            if use_snapshots:
+                product_obj = ProductAsset.objects.select_related('report_snapshot').get(id=product_id)
+            else:
+                product_obj = with_maintenance_costs(ProductAsset.objects.all()).get(id=product_id)
         except ProductAsset.DoesNotExist:
             product_obj = None
 
@@ -1012,11 +1102,14 @@ def report_dashboard(request):
         if product_obj.condition_status == 'sold' and product_obj.sale_price:
             sold_asset = float(product_obj.sale_price or 0)
 
-        # Repair cost
-        repair_cost = Repair.objects.filter(product=product_obj).aggregate(total=Sum('cost'))['total'] or 0
-
-        # Config cost
-        config_cost = ProductConfiguration.objects.filter(asset=product_obj).aggregate(total=Sum('cost'))['total'] or 0
+        # Repair + config cost
+        if use_snapshots:
+            snapshot = getattr(product_obj, 'report_snapshot', None)
+            repair_cost = snapshot.repair_cost if snapshot else 0
+            config_cost = snapshot.config_cost if snapshot else 0
+        else:
+            repair_cost = product_obj.repair_cost
+            config_cost = product_obj.config_cost
 
         maintenance_cost = float(repair_cost) + float(config_cost)
         net_profit = gross_profit - maintenance_cost - purchase_price
@@ -1031,83 +1124,94 @@ def report_dashboard(request):
     if end:
         rentals = rentals.filter(rental_start_date__lte=parse_date(end))
 
-    # Total revenue directly from ProductAsset revenue
-    total_revenue = ProductAsset.objects.aggregate(total=Sum('revenue'))['total'] or 0
-    total_rentals = rentals.count()
-
-    # Total rental days
-    total_days = float(sum(
-        (r.rental_end_date - r.rental_start_date).days
-        for r in rentals if r.rental_end_date and r.rental_start_date
-    ))
-
-    # Monthly revenue trends
-    monthly = {}
-    for r in rentals:
-        month = r.rental_start_date.strftime("%Y-%m")
-        monthly[month] = monthly.get(month, 0) + float(r.payment_amount or 0)
+    # Revenue by asset type (also gives the overall revenue total)
+    if use_snapshots:
+        type_revenue = [
+            (snapshot.asset_type.name, snapshot.revenue)
+            for snapshot in AssetTypeReportSnapshot.objects.select_related('asset_type').order_by(
+                'asset_type__display_order', 'asset_type__name'
+            )
+        ]
+    else:
+        type_revenue = asset_type_revenue()
+    type_labels = [name for name, _ in type_revenue]
+    type_values = [float(value) for _, value in type_revenue]
+    total_revenue = sum((value for _, value in type_revenue), Decimal('0.00'))
+
+    # Monthly revenue trends, rental count and rented days
+    if use_snapshots and not any([customer_type, customer_id, product_id, start, end]):
+        total_rentals = 0
+        total_days = 0.0
+        monthly = {}
+        for snapshot in MonthlyReportSnapshot.objects.all():
+            total_rentals += snapshot.rental_count
+            total_days += snapshot.rental_days
+            monthly[snapshot.month.strftime("%Y-%m")] = float(snapshot.total_payment)
+    else:
+        monthly, total_rentals, total_days = monthly_rental_totals(rentals)
 
     # Top 5 assets by revenue
     top_assets = (
-        ProductAsset.objects.annotate(total_income=Sum('revenue'))
-        .filter(total_income__gt=0)
-        .order_by('-total_income')[:5]
+        ProductAsset.objects.filter(revenue__gt=0)
+        .annotate(total_income=F('revenue'))
+        .order_by('-revenue')[:5]
     )
 
-    # Revenue by asset type
-    type_revenue = defaultdict(float)
-    for asset in ProductAsset.objects.prefetch_related('rentals'):
-        asset_type = asset.type_of_asset.name if asset.type_of_asset else "Unknown"
-        type_revenue[asset_type] += float(asset.revenue or 0)
-
-    type_labels = list(type_revenue.keys())
-    type_values = [float(v) for v in type_revenue.values()]
-
     # Revenue by customer
-    customer_revenue = {}
-    for customer in Customer.objects.all():
-        total = Rental.objects.filter(customer=customer).aggregate(total=Sum('payment_amount'))['total']
-        if total:
-            customer_revenue[customer.name] = float(total)
-
-    sorted_customers = sorted(customer_revenue.items(), key=lambda x: x[1], reverse=True)
+    if use_snapshots:
+        sorted_customers = [
+            (s.customer.name, float(s.total_payment))
+            for s in CustomerReportSnapshot.objects.filter(total_payment__gt=0)
+            .select_related('customer')
+            .order_by('-total_payment')
+        ]
+    else:
+        sorted_customers = customer_revenue_ranking()
     customer_labels = [name for name, _ in sorted_customers]
     customer_values = [value for _, value in sorted_customers]
 
-
-    top_repaired_assets = (
-        Repair.objects.values('product__asset_id', 'product__brand', 'product__model_no')
-        .annotate(total_repairs=Count('id'), total_cost=Sum('cost'))
-        .order_by('-total_cost')[:5]
-    )
-
     today = timezone.now().date()
-    in_warranty_assets = []
-    for asset in products:
-        if asset.purchase_date and asset.warranty_duration_months and asset.warranty_duration_months > 0:
-            expiry_date = asset.purchase_date + relativedelta(months=asset.warranty_duration_months)
-            if today <= expiry_date:
-                in_warranty_assets.append({
-                    "asset_id": asset.asset_id,
-                    "brand": asset.brand,
-                    "model_no": asset.model_no,
-                    "expiry_date": expiry_date,
-                    "days_left": (expiry_date - today).days
-                })
+    if use_snapshots:
+        top_repaired = [
+            {
+                'product__asset_id': s.asset.asset_id,
+                'product__brand': s.asset.brand,
+                'product__model_no': s.asset.model_no,
+                'total_repairs': s.repair_count,
+                'total_cost': s.repair_cost,
+            }
+            for s in AssetReportSnapshot.objects.filter(repair_count__gt=0)
+            .select_related('asset')
+            .order_by('-repair_cost')[:5]
+        ]
+
+        in_warranty_assets = [
+            {
+                "asset_id": s.asset.asset_id,
+                "brand": s.asset.brand,
+                "model_no": s.asset.model_no,
+                "expiry_date": s.warranty_expiry,
+                "days_left": (s.warranty_expiry - today).days
+            }
+            for s in AssetReportSnapshot.objects.filter(warranty_expiry__gte=today)
+            .select_related('asset')
+            .order_by('warranty_expiry')
+        ]
+
+        # Repairs with active warranty (only assets whose latest repair warranty is still running)
+        repairs_with_warranty = [
+            r for r in Repair.objects.filter(
+                product__report_snapshot__repair_warranty_until__gte=today,
+                repair_warranty_months__gt=0,
+            ).select_related('product')
+            if r.repair_warranty_expiry_date and today <= r.repair_warranty_expiry_date
+        ]
+    else:
+        top_repaired = top_repaired_assets()
+        in_warranty_assets = assets_in_warranty(today)
+        repairs_with_warranty = repairs_in_warranty(today)
     in_warranty_count = len(in_warranty_assets)
 
-
-    # Repairs with active warranty
-    today = timezone.now().date()
-
-    repairs = Repair.objects.all()
-    repairs_with_warranty = []
-
-    for r in repairs:
-        expiry = r.repair_warranty_expiry_date  # use property method
-        if expiry and today <= expiry:
-            repairs_with_warranty.append(r)
-
     # Final context
     context = {
         'customers': customers,
@@ -1126,14 +1230,14 @@ def report_dashboard(request):
         "repairs_with_warranty":repairs_with_warranty,
 
         # Top repaired
-        "top_repaired_assets": top_repaired_assets,
+        "top_repaired_assets": top_repaired,
 
         'total_days': total_days,
         'net_profit': net_profit,
         'product_obj': product_obj,
         'product_id': product_id,
-        'monthly_labels': json.dumps(list(reversed(monthly.keys()))),
-        'monthly_values': json.dumps([float(v) for v in reversed(monthly.values())]),
+        'monthly_labels': json.dumps(list(monthly.keys())),
+        'monthly_values': json.dumps([float(v) for v in monthly.values()]),
         'top_assets': top_assets,
         'customer_business': customer_business,
         'type_labels': json.dumps(type_labels),
@@ -1152,94 +1256,25 @@ from django.contrib import messages
 from django.shortcuts import redirect
 from django.contrib.auth.decorators import login_required, user_passes_test
 from .models import Rental, ProductAsset
+from .revenue import extend_revenue_ledger
 
 
 @login_required
 @user_passes_test(lambda u: u.is_superuser)
 def run_revenue_calculator(request):
     """
-    View to recalculate revenue for all rentals and update each product's total revenue.
+    View to bring the revenue ledger up to date and refresh each product's total revenue.
+    Only rentals not yet processed up to today are touched.
     Accessible only to superusers.
     """
     today = date.today()
 
-    # Step 1: Reset all revenues to 0
-    ProductAsset.objects.update(revenue=Decimal('0.00'))
-
-    updated_rentals = 0
-
-    # Step 2: Get all rentals with valid payment amounts
-    rentals = Rental.objects.filter(payment_amount__gt=0)
+    updated_rentals = extend_revenue_ledger(today)
 
-    for rental in rentals:
-        # ✅ Skip rentals with missing start date
-        if not rental.rental_start_date:
-            print(f"Skipping rental {rental.id} - No start date")
-            continue
-
-        # ✅ Determine the effective end date
-        end_date = rental.rental_end_date or today
-
-        # Don't calculate beyond today
-        if end_date > today:
-            end_date = today
-
-        # ✅ Skip if start date is after end date (invalid data)
-        if rental.rental_start_date > end_date:
-            print(f"Skipping rental {rental.id} - Start date after end date")
-            continue
-
-        total_rental_revenue = Decimal('0.00')
-        current_date = rental.rental_start_date
-
-        # Step 3: Loop through each month between start and end
-        while current_date <= end_date:
-            # Calculate days in current month
-            if current_date.month == 12:
-                next_month_start = date(current_date.year + 1, 1, 1)
-            else:
-                next_month_start = date(current_date.year, current_date.month + 1, 1)
-
-            days_in_month = (next_month_start - timedelta(days=1)).day
-
-            # Calculate end day for this segment
-            if current_date.month == end_date.month and current_date.year == end_date.year:
-                end_day = end_date.day
-            else:
-                end_day = days_in_month
-
-            # Number of active days in this month
-            days_to_count = end_day - current_date.day + 1
-
-            # Keep full precision for daily rate
-            daily_rate = rental.payment_amount / Decimal(days_in_month)
-
-            # Add precise total, round at the very end
-            total_rental_revenue += (daily_rate * Decimal(days_to_count))
-
-            # Move to the first day of next month
-            current_date = next_month_start
-
-        # Round the final result once
-        total_rental_revenue = total_rental_revenue.quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
-
-
-        # Step 4: Update the product's total revenue
-        if rental.asset:
-            before = rental.asset.revenue
-            rental.asset.revenue += total_rental_revenue
-            rental.asset.save(update_fields=['revenue'])
-
-            updated_rentals += 1
-            print(
-                f"[{rental.asset.asset_id}] Before: {before} | Added: {total_rental_revenue} | After: {rental.asset.revenue}"
-            )
-
-    # Step 5: Display success message
-    # log_action(request.user, "Ran revenue recalculation", "System Task")
+    log_action(request.user, "Ran revenue recalculation", "System Task")
     messages.success(
         request,
-        f"Revenue successfully recalculated for {updated_rentals} rentals as of {today}."
+        f"Revenue successfully updated for {updated_rentals} rentals as of {today}."
     )
     # query_string = request.GET.urlencode()
     # redirect_url = reverse('product_list')
@@ -1254,19 +1289,12 @@ def run_revenue_calculator(request):
 @login_required
 def supplier_list(request):
     query = request.GET.get('q', '')
-    suppliers = Supplier.objects.all()
-    if query:
-        suppliers = suppliers.filter(
-            Q(name__icontains=query) |
-            Q(gstin__icontains=query) |
-            Q(phone_primary__icontains=query) |
-            Q(phone_secondary__icontains=query) |
-            Q(email__icontains=query) |
-            Q(reference_name__icontains=query)
-        )
+    suppliers = search(Supplier.objects.all(), query)
 
+    page = keyset_paginate(request, suppliers, ['pk'])
     return render(request, 'rentals/supplier_list.html', {
-        'suppliers': suppliers,
+        'suppliers': page,
+        'page': page,
         'query': query
     })
 
@@ -1277,7 +1305,7 @@ def add_supplier(request):
         form = SupplierForm(request.POST)
         if form.is_valid():
             form.save()
-            # log_action(request.user, "Added new supplier", "Supplier")
+            log_action(request.user, "Added new supplier", "Supplier")
             messages.success(request, "Vendor added successfully.")
             return redirect('supplier_list')
     else:
@@ -1291,7 +1319,7 @@ def edit_supplier(request, pk):
     if request.method == 'POST':
         form = SupplierForm(request.POST, instance=supplier)
         if form.is_valid():
-            # log_action(request.user, "Edited supplier", "Supplier", obj_id=supplier.id)
+            log_action(request.user, "Edited supplier", "Supplier", obj_id=supplier.id)
             form.save()
             return redirect('supplier_list')
     else:
@@ -1301,36 +1329,17 @@ def edit_supplier(request, pk):
 
 @login_required
 def send_billing_reminder(request):
-    today = now().day
-    print("Today's date:", today)
-    rentals_due_today = Rental.objects.filter(billing_day=today, status='ongoing')
-
-    if not rentals_due_today.exists():
-        messages.info(request, "No rentals due for billing today.")
-        return redirect('rental_list')
-    
-    body_lines = []
-    for rental in rentals_due_today:
-        asset_id = rental.asset.asset_id if rental.asset else 'Unknown'
-        customer_name = rental.customer.name if rental.customer else 'Unknown Customer'
-        body_lines.append(f"- Asset: {asset_id} | Customer: {customer_name}")
-
-    body = "Billing Reminder for Today:\n\n" + "\n".join(body_lines)
-
     try:
-        send_mail(
-            subject="Todays Billing Reminder",
-            message=body,
-            from_email='aryanpore3056@gmail.com',
-            recipient_list=['accounts@pixelitsolution.com'],
-            fail_silently=False,
-            )
-        # log_action(request.user, "Sent billing reminders", "System Task")
-        messages.success(request, "Billing reminder sent successfully!")
+        sent = send_reminders(kinds=['billing'])
     except Exception as e:
         messages.error(request, f"Failed to send reminder: {e}")
+        return redirect('rental_list')
 
-
+    if not sent:
+        messages.info(request, "No rentals due for billing today, or their reminders were already sent.")
+        return redirect('rental_list')
+    log_action(request.user, "Sent billing reminders", "System Task")
+    messages.success(request, "Billing reminder sent successfully!")
     return redirect('rental_list')
 
 @login_required
@@ -1351,8 +1360,8 @@ def add_repair(request, pk):
                 form_product = form.cleaned_data.get("product")
                 if not form_product and product:
                     repair.product = product
-                # log_action(request.user, "Added new repair", "Repair", obj_id=repair.id)
                 repair.save()
+                log_action(request.user, "Added new repair", "Repair", obj_id=repair.id)
                 messages.success(request, "Repair added successfully.")
                 return redirect('product_detail', pk=repair.product.pk)
             else:
@@ -1370,7 +1379,7 @@ def add_repair(request, pk):
                     is_edit=False,  # NEW REPAIR, not an edit
                 )
                 pending_repair.save()
-                # log_action(request.user, "Submitted new repair for approval", "PendingRepair", obj_id=pending_repair.id)
+                log_action(request.user, "Submitted new repair for approval", "PendingRepair", obj_id=pending_repair.id)
                 messages.success(
                     request,
                     "Repair submitted for approval. It will appear after superuser approval."
@@ -1397,7 +1406,7 @@ def edit_repair(request, pk):
             updated_repair = form.save(commit=False)
             updated_repair.edited_by = request.user
             updated_repair.save()
-            # log_action(request.user, "Edited repair", "Repair", obj_id=updated_repair.id)
+            log_action(request.user, "Edited repair", "Repair", obj_id=updated_repair.id)
             messages.success(request, "Repair updated successfully.")
             return redirect('product_detail', pk=repair.product.pk)
 
@@ -1421,7 +1430,7 @@ def edit_repair(request, pk):
                     pending_repair.product = repair.product
                     pending_repair.submitted_by = request.user
                     pending_repair.save()
-                    # log_action(request.user, "Updated existing pending repair edit", "PendingRepair", obj_id=pending_repair.id)
+                    log_action(request.user, "Updated existing pending repair edit", "PendingRepair", obj_id=pending_repair.id)
                     messages.success(request, "Repair edit updated and submitted for approval.")
                 else:
                     # Create a new pending edit request
@@ -1435,7 +1444,7 @@ def edit_repair(request, pk):
                         is_edit=True
                     )
                     messages.success(request, "Repair edit submitted for approval.")
-                    # log_action(request.user, "Submitted repair edit for approval", "PendingRepair", obj_id=repair.id)
+                    log_action(request.user, "Submitted repair edit for approval", "PendingRepair", obj_id=repair.id)
                 return redirect('product_detail', pk=repair.product.pk)
         else:
             form = RepairForm(instance=repair)
@@ -1450,8 +1459,8 @@ def delete_repair(request, pk):
 
     if request.user.is_superuser:
         # Superuser can delete directly
+        log_action(request.user, "Deleted repair", "Repair", obj_id=repair.id)
         repair.delete()
-        # log_action(request.user, "Deleted repair", "Repair", obj_id=repair.id)
         messages.success(request, "Repair deleted successfully.")
         return redirect('product_detail', pk=product_pk)
 
@@ -1477,7 +1486,7 @@ def delete_repair(request, pk):
                 name=None
             )
             messages.success(request, "Delete request submitted for approval.")
-            # log_action(request.user, "Submitted repair delete request for approval", "PendingRepair", obj_id=repair.id)
+            log_action(request.user, "Submitted repair delete request for approval", "PendingRepair", obj_id=repair.id)
 
         return redirect('product_detail', pk=product_pk)
 
@@ -1498,11 +1507,11 @@ def approve_repair_edit(request, pk):
             original.edited_by = pending_repair.submitted_by
             # original.edited_at = timezone.now()
             original.save()
-            # log_action(request.user, "Approved repair edit", "Repair", obj_id=original.id)
+            log_action(request.user, "Approved repair edit", "Repair", obj_id=original.id)
             messages.success(request, "Repair edit approved successfully.")
         else:
             # CREATE NEW REPAIR
-            Repair.objects.create(
+            repair = Repair.objects.create(
                 product=pending_repair.product,
                 name=pending_repair.name,
                 cost=pending_repair.cost,
@@ -1511,7 +1520,7 @@ def approve_repair_edit(request, pk):
                 edited_at=pending_repair.submitted_at
             )
             messages.success(request, "New repair approved successfully.")
-            # log_action(request.user, "Approved new repair", "Repair")
+            log_action(request.user, "Approved new repair", "Repair", obj_id=repair.id)
         # DELETE the pending record after approval
         pending_repair.delete()
 
@@ -1536,7 +1545,7 @@ def manage_hdd_Options(request):
     form = HDDOptionForm(request.POST or None, instance=instance)
 
     if request.method == 'POST' and form.is_valid():
-        # log_action(request.user, "Managed HDD option", "HDDOption", obj_id=instance.id if instance else None)
+        log_action(request.user, "Managed HDD option", "HDDOption", obj_id=instance.id if instance else None)
         form.save()
         return redirect('manage_hdd_Options')
 
@@ -1565,7 +1574,7 @@ def manage_ram_Options(request):
 
     if request.method == 'POST' and form.is_valid():
         form.save()
-        # log_action(request.user, "Managed RAM option", "RAMOption", obj_id=instance.id if instance else None)
+        log_action(request.user, "Managed RAM option", "RAMOption", obj_id=instance.id if instance else None)
         return redirect('manage_ram_Options')
 
     return render(request, 'rentals/manage_Options.html', {
@@ -1591,7 +1600,7 @@ def manage_cpu_Options(request):
     form = CPUOptionForm(request.POST or None, instance=instance)
 
     if request.method == 'POST' and form.is_valid():
-        # log_action(request.user, "Managed CPU option", "CPUOption", obj_id=instance.id if instance else None)
+        log_action(request.user, "Managed CPU option", "CPUOption", obj_id=instance.id if instance else None)
         form.save()
         return redirect('manage_cpu_Options')
 
@@ -1618,7 +1627,7 @@ def manage_display_size_Options(request):
     form = DisplaySizeOptionForm(request.POST or None, instance=instance)
 
     if request.method == 'POST' and form.is_valid():
-        # log_action(request.user, "Managed Display Size option", "DisplaySizeOption", obj_id=instance.id if instance else None)
+        log_action(request.user, "Managed Display Size option", "DisplaySizeOption", obj_id=instance.id if instance else None)
         form.save()
         return redirect('manage_display_size_Options')
 
@@ -1645,7 +1654,7 @@ def manage_graphics_Options(request):
     form = GraphicsOptionForm(request.POST or None, instance=instance)
 
     if request.method == 'POST' and form.is_valid():
-        # log_action(request.user, "Managed Graphics option", "GraphicsOption", obj_id=instance.id if instance else None)
+        log_action(request.user, "Managed Graphics option", "GraphicsOption", obj_id=instance.id if instance else None)
         form.save()
         return redirect('manage_graphics_Options')
 
@@ -1667,7 +1676,7 @@ def edit_config(request, config_id):
     if request.user.is_superuser:
         form = ProductConfigurationForm(request.POST or None, instance=config)
         if request.method == 'POST' and form.is_valid():
-            # log_action(request.user, "Edited product configuration", "ProductConfiguration", obj_id=config.id)
+            log_action(request.user, "Edited product configuration", "ProductConfiguration", obj_id=config.id)
             form.save()
             return redirect('product_detail', pk=config.asset.pk)
     else:
@@ -1688,7 +1697,7 @@ def edit_config(request, config_id):
                     is_edit=True,
                     original_config=config,
                 )
-                # log_action(request.user, "Submitted product configuration edit for approval", "PendingProductConfiguration", obj_id=pending.id)
+                log_action(request.user, "Submitted product configuration edit for approval", "PendingProductConfiguration", obj_id=pending.id)
                 messages.success(request, "Configuration edit submitted for approval.")
                 pending.save()
                 return redirect('product_detail', pk=config.asset.pk)
@@ -1716,7 +1725,7 @@ def approve_edited_config(request, pk):
     config.power_supply = pending.power_supply
     config.detailed_config = pending.detailed_config
     config.save()
-    # log_action(request.user, "Approved product configuration edit", "ProductConfiguration", obj_id=config.id)
+    log_action(request.user, "Approved product configuration edit", "ProductConfiguration", obj_id=config.id)
 
     pending.delete()
     messages.success(request, "Configuration update approved.")
@@ -1728,7 +1737,7 @@ def approve_edited_config(request, pk):
 def reject_edited_config(request, pk):
     pending = get_object_or_404(PendingProductConfiguration, pk=pk)
     pending.delete()
-    # log_action(request.user, "Rejected product configuration edit", "PendingProductConfiguration", obj_id=pending.id)
+    log_action(request.user, "Rejected product configuration edit", "PendingProductConfiguration", obj_id=pk)
     messages.info(request, "Configuration update rejected.")
     return redirect('approval_dashboard')
 
@@ -1745,7 +1754,7 @@ def approve_edited_repair(request, pk):
     repair.cost = pending.cost
     repair.repair_date = pending.repair_date
     repair.save()
-    # log_action(request.user, "Approved repair edit", "Repair", obj_id=repair.id)
+    log_action(request.user, "Approved repair edit", "Repair", obj_id=repair.id)
 
     pending.delete()
     messages.success(request, "Repair update approved.")
@@ -1757,7 +1766,7 @@ def approve_edited_repair(request, pk):
 def reject_edited_repair(request, pk):
     pending = get_object_or_404(PendingRepair, pk=pk)
     pending.delete()
-    # log_action(request.user, "Rejected repair edit", "PendingRepair", obj_id=pending.id)
+    log_action(request.user, "Rejected repair edit", "PendingRepair", obj_id=pk)
     messages.info(request, "Repair update rejected.")
     return redirect('approval_dashboard')
 
@@ -1765,44 +1774,15 @@ def reject_edited_repair(request, pk):
 
 @login_required
 def check_contracts(request):
-    today = now().date()
-
-    expired_rentals = Rental.objects.filter(
-        contract_validity__isnull=False,
-        contract_validity__lt=today,
-        status="ongoing",
-    )
+    try:
+        sent = send_reminders(kinds=['contract'])
+    except Exception as e:
+        messages.error(request, f"Failed to send reminder: {e}")
+        return redirect("rental_list")
 
-    body_lines = []
-    for rental in expired_rentals:
-        asset_id = rental.asset.asset_id if rental.asset else 'Unknown'
-        customer_name = rental.customer.name if rental.customer else 'Unknown Customer'
-        body_lines.append(f"- Asset: {asset_id} | Customer: {customer_name}")
-
-    body = "Contract Expiry Reminder:\n\n" + "\n".join(body_lines)
-    # for rental in expired_rentals:
-    #     subject = f"Contract Expired for Rental #{rental.id}"
-    #     message = f"""
-    #     """
-
-        # message = f"""
-        # Hello {rental.customer.name},
-
-        # Your rental contract for asset {rental.asset.asset_id} has expired on {rental.contract_validity}.
-
-        # Please return or renew your rental as soon as possible.
-        # """
-    if rental.customer.email:
-            # send_mail(subject, message, settings.DEFAULT_FROM_EMAIL, [rental.customer.email])
-            send_mail(
-            subject="Todays Contract Expiry Reminder",
-            message=body,
-            from_email='aryanpore3056@gmail.com',
-            recipient_list=['accounts@pixelitsolution.com'],
-            fail_silently=False,
-            )
-    # log_action(request.user, "Checked contract expiries", "System Task")
-    messages.success(request, f"Checked {expired_rentals.count()} rentals for contract expiry.")
+    count = len({rental.pk for items in sent.values() for _, _, rental in items})
+    log_action(request.user, "Checked contract expiries", "System Task")
+    messages.success(request, f"Sent contract expiry reminders for {count} rentals.")
     return redirect("rental_list")
 
 
@@ -1814,41 +1794,18 @@ from dal import autocomplete
 
 class AssetAutocomplete(autocomplete.Select2QuerySetView):
     def get_queryset(self):
-        # Only show assets that are working and not currently rented
-        rented_ids = Rental.objects.filter(
-            status__in=['ongoing', 'overdue'],
-            asset__isnull=False
-        ).values_list('asset_id', flat=True)
-        
-        qs = ProductAsset.objects.filter(
-            condition_status='working'
-        ).exclude(id__in=rented_ids)
-        
-        if self.q:
-            qs = qs.filter(
-                Q(asset_id__icontains=self.q) |
-                Q(brand__icontains=self.q) |
-                Q(model_no__icontains=self.q) |
-                Q(serial_no__icontains=self.q)
-            )
-        return qs
-    
+        # Working assets that are not currently rented, from the in-memory index
+        return rentable_assets.suggest(self.q)
+
     def get_result_label(self, item):
-        return f"{item.asset_id} - {item.brand} {item.model_no}"
+        return item.label
 
 class CustomerAutocomplete(autocomplete.Select2QuerySetView):
     def get_queryset(self):
-        qs = Customer.objects.all()
-        if self.q:
-            qs = qs.filter(
-                Q(name__icontains=self.q) |
-                Q(phone_number_primary__icontains=self.q) |
-                Q(email__icontains=self.q)
-            )
-        return qs
-    
+        return customer_suggestions.suggest(self.q)
+
     def get_result_label(self, item):
-        return f"{item.name} - {item.phone_number_primary}"
+        return item.label
     
 
 
@@ -2229,42 +2186,10 @@ def serialize_supplier(s):
 # ----------------------------
 @login_required
 def export_reports_csv(request):
-    """Export all data models to a ZIP of CSVs"""
-    output = BytesIO()
-
-    def write_csv_to_zip(zip_file, filename, queryset):
-        if not queryset.exists():
-            return
-        rows = [safe_serialize(obj) for obj in queryset]
-        csv_buffer = StringIO()
-        writer = csv.DictWriter(csv_buffer, fieldnames=rows[0].keys())
-        writer.writeheader()
-        for row in rows:
-            writer.writerow(row)
-        zip_file.writestr(filename, csv_buffer.getvalue().encode('utf-8'))
-
-    with ZipFile(output, 'w') as zip_file:
-        write_csv_to_zip(zip_file, "customers.csv", Customer.objects.all())
-        write_csv_to_zip(zip_file, "pending_customers.csv", PendingCustomer.objects.all())
-        write_csv_to_zip(zip_file, "suppliers.csv", Supplier.objects.all())
-        write_csv_to_zip(zip_file, "asset_types.csv", AssetType.objects.all())
-        write_csv_to_zip(zip_file, "cpu_options.csv", CPUOption.objects.all())
-        write_csv_to_zip(zip_file, "ram_options.csv", RAMOption.objects.all())
-        write_csv_to_zip(zip_file, "hdd_options.csv", HDDOption.objects.all())
-        write_csv_to_zip(zip_file, "graphics_options.csv", GraphicsOption.objects.all())
-        write_csv_to_zip(zip_file, "display_size_options.csv", DisplaySizeOption.objects.all())
-        write_csv_to_zip(zip_file, "products.csv", ProductAsset.objects.select_related('type_of_asset', 'purchased_from', 'edited_by'))
-        write_csv_to_zip(zip_file, "pending_products.csv", PendingProduct.objects.select_related('type_of_asset', 'purchased_from', 'submitted_by'))
-        write_csv_to_zip(zip_file, "configurations.csv", ProductConfiguration.objects.select_related('asset', 'cpu', 'ram', 'hdd', 'graphics', 'display_size', 'edited_by'))
-        write_csv_to_zip(zip_file, "pending_configurations.csv", PendingProductConfiguration.objects.select_related('asset', 'cpu', 'ram', 'hdd', 'graphics', 'display_size', 'submitted_by'))
-        write_csv_to_zip(zip_file, "rentals.csv", Rental.objects.select_related('customer', 'asset', 'edited_by'))
-        write_csv_to_zip(zip_file, "pending_rentals.csv", PendingRental.objects.select_related('customer', 'asset', 'submitted_by'))
-        write_csv_to_zip(zip_file, "repairs.csv", Repair.objects.select_related('product', 'edited_by'))
-        write_csv_to_zip(zip_file, "pending_repairs.csv", PendingRepair.objects.select_related('product', 'submitted_by'))
-
-    response = HttpResponse(output.getvalue(), content_type='application/zip')
+    """Export all data models to a ZIP of CSVs, streamed as it is built"""
+    response = StreamingHttpResponse(stream_csv_zip(), content_type='application/zip')
     response['Content-Disposition'] = 'attachment; filename="full_report.zip"'
-    # log_action(request.user, "Exported full report as CSV ZIP", "Report Export")
+    log_action(request.user, "Exported full report as CSV ZIP", "Report Export")
     return response
 
 # -------------------------------------------
@@ -2272,139 +2197,55 @@ def export_reports_csv(request):
 # -------------------------------------------
 @login_required
 def export_reports_excel(request):
-    """Export all data models to a single Excel workbook"""
-    output = BytesIO()
-
-    def write_df(writer, sheet_name, queryset):
-        if not queryset.exists():
-            return
-        data = [safe_serialize(obj) for obj in queryset]
-        df = pd.DataFrame(data)
-        df.to_excel(writer, sheet_name=sheet_name[:30], index=False)
-
-    with pd.ExcelWriter(output, engine='openpyxl') as writer:
-        write_df(writer, 'Customers', Customer.objects.all())
-        write_df(writer, 'PendingCustomers', PendingCustomer.objects.all())
-        write_df(writer, 'Suppliers', Supplier.objects.all())
-        write_df(writer, 'AssetTypes', AssetType.objects.all())
-        write_df(writer, 'CPUOptions', CPUOption.objects.all())
-        write_df(writer, 'RAMOptions', RAMOption.objects.all())
-        write_df(writer, 'HDDOptions', HDDOption.objects.all())
-        write_df(writer, 'GraphicsOptions', GraphicsOption.objects.all())
-        write_df(writer, 'DisplaySizeOptions', DisplaySizeOption.objects.all())
-        write_df(writer, 'Products', ProductAsset.objects.select_related('type_of_asset', 'purchased_from', 'edited_by'))
-        write_df(writer, 'PendingProducts', PendingProduct.objects.select_related('type_of_asset', 'purchased_from', 'submitted_by'))
-        write_df(writer, 'Configurations', ProductConfiguration.objects.select_related('asset', 'cpu', 'ram', 'hdd', 'graphics', 'display_size', 'edited_by'))
-        write_df(writer, 'PendingConfigurations', PendingProductConfiguration.objects.select_related('asset', 'cpu', 'ram', 'hdd', 'graphics', 'display_size', 'submitted_by'))
-        write_df(writer, 'Rentals', Rental.objects.select_related('customer', 'asset', 'edited_by'))
-        write_df(writer, 'PendingRentals', PendingRental.objects.select_related('customer', 'asset', 'submitted_by'))
-        write_df(writer, 'Repairs', Repair.objects.select_related('product', 'edited_by'))
-        write_df(writer, 'PendingRepairs', PendingRepair.objects.select_related('product', 'submitted_by'))
-
-    response = HttpResponse(content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
-    response['Content-Disposition'] = 'attachment; filename="full_report.xlsx"'
-    response.write(output.getvalue())
-    # log_action(request.user, "Exported full report as Excel", "Report Export")
-    return response
+    """Queue a multi-sheet Excel export; the worker builds it off the request path"""
+    job = enqueue_export('xlsx', request.user)
+    log_action(request.user, "Queued full report export as Excel", "ExportJob", obj_id=job.pk)
+    messages.success(request, f"Excel export #{job.pk} queued. It will be ready to download here shortly.")
+    return redirect('export_jobs')
+
 # ----------------------------
 # PDF export
 # ----------------------------
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
-from reportlab.lib.pagesizes import A4, landscape
-from reportlab.lib import colors
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.units import inch
-
 @login_required
 def export_reports_pdf(request):
-    """
-    Create a structured, unclipped PDF containing all key datasets.
-    """
-    output = BytesIO()
-    # Use landscape orientation for more horizontal space
-    doc = SimpleDocTemplate(output, pagesize=landscape(A4),
-                            leftMargin=20, rightMargin=20,
-                            topMargin=30, bottomMargin=30)
-    elements = []
-    styles = getSampleStyleSheet()
-
-    title_style = ParagraphStyle(
-        'SectionTitle',
-        parent=styles['Heading2'],
-        spaceAfter=10,
-        textColor=colors.HexColor("#2E3A59")
-    )
+    """Queue a PDF export of all key datasets; the worker builds it off the request path"""
+    job = enqueue_export('pdf', request.user)
+    log_action(request.user, "Queued full report export as PDF", "ExportJob", obj_id=job.pk)
+    messages.success(request, f"PDF export #{job.pk} queued. It will be ready to download here shortly.")
+    return redirect('export_jobs')
 
-    normal_style = ParagraphStyle(
-        'NormalSmall',
-        parent=styles['Normal'],
-        fontSize=8,
-        leading=10,
-    )
 
-    def add_section(title, queryset):
-        """Adds a formatted table for a queryset to the PDF"""
-        elements.append(Paragraph(title, title_style))
-        elements.append(Spacer(1, 4))
-
-        if not queryset.exists():
-            elements.append(Paragraph("No data available", normal_style))
-            elements.append(Spacer(1, 12))
-            return
-
-        # Serialize objects safely
-        data = [safe_serialize(obj) for obj in queryset]
-
-        # Prepare headers + rows
-        headers = list(data[0].keys())
-        table_data = [headers]
-        for row in data:
-            row_values = [Paragraph(str(row.get(h, "")), normal_style) for h in headers]
-            table_data.append(row_values)
-
-        # Adjust column widths dynamically
-        col_count = len(headers)
-        max_table_width = 10.5 * inch  # roughly landscape A4 usable width
-        col_width = max_table_width / max(1, col_count)
-        col_widths = [col_width] * col_count
-
-        table = Table(table_data, colWidths=col_widths, repeatRows=1)
-        table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor("#E0E0E0")),
-            ('GRID', (0, 0), (-1, -1), 0.25, colors.grey),
-            ('FONT', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, -1), 8),
-            ('WORDWRAP', (0, 0), (-1, -1), True),
-            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-            ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-        ]))
-        elements.append(table)
-        elements.append(Spacer(1, 16))
-
-    # ---- Sections ----
-    add_section("Customers", Customer.objects.all())
-    add_section("Pending Customers", PendingCustomer.objects.all())
-    add_section("Suppliers", Supplier.objects.all())
-    add_section("Asset Types", AssetType.objects.all())
-    add_section("CPU Options", CPUOption.objects.all())
-    add_section("RAM Options", RAMOption.objects.all())
-    add_section("HDD Options", HDDOption.objects.all())
-    add_section("Graphics Options", GraphicsOption.objects.all())
-    add_section("Display Size Options", DisplaySizeOption.objects.all())
-    add_section("Products", ProductAsset.objects.select_related('type_of_asset', 'purchased_from', 'edited_by'))
-    add_section("Pending Products", PendingProduct.objects.select_related('type_of_asset', 'purchased_from', 'submitted_by'))
-    add_section("Configurations", ProductConfiguration.objects.select_related('asset', 'cpu', 'ram', 'hdd', 'graphics', 'display_size', 'edited_by'))
-    add_section("Pending Configurations", PendingProductConfiguration.objects.select_related('asset', 'cpu', 'ram', 'hdd', 'graphics', 'display_size', 'submitted_by'))
-    add_section("Rentals", Rental.objects.select_related('customer', 'asset', 'edited_by'))
-    add_section("Pending Rentals", PendingRental.objects.select_related('customer', 'asset', 'submitted_by'))
-    add_section("Repairs", Repair.objects.select_related('product', 'edited_by'))
-    add_section("Pending Repairs", PendingRepair.objects.select_related('product', 'submitted_by'))
-
-    # Build PDF
-    doc.build(elements)
-    response = HttpResponse(content_type='application/pdf')
-    response['Content-Disposition'] = 'attachment; filename="full_report.pdf"'
-    response.write(output.getvalue())
-
-    # log_action(request.user, "Exported full report as PDF", "Report Export")
-    return response
\ No newline at end of file
+@login_required
+def export_jobs(request):
+    jobs = ExportJob.objects.select_related('requested_by')
+    if not request.user.is_superuser:
+        jobs = jobs.filter(requested_by=request.user)
+    jobs = list(jobs[:50])
+    return render(request, 'rentals/export_jobs.html', {
+        'jobs': jobs,
+        'in_progress': any(job.status in ('queued', 'running') for job in jobs),
+    })
+
+
+@login_required
+@user_passes_test(lambda u: u.is_superuser)
+def metrics(request):
+    """Request metrics per URL name (see rentals/metrics.py); a POST clears them."""
+    if request.method == 'POST':
+        metrics_store.reset()
+    return JsonResponse({
+        'enabled': getattr(settings, 'PERF_METRICS_ENABLED', False),
+        'window': metrics_window_size(),
+        'routes': metrics_store.summary(),
+    })
+
+
+@login_required
+def download_export(request, pk):
+    job = get_object_or_404(ExportJob, pk=pk, status='done')
+    if not request.user.is_superuser and job.requested_by_id != request.user.id:
+        raise Http404("Export not found")
+    path = artifact_path(job)
+    if not path or not path.exists():
+        raise Http404("Export file has expired")
+    return FileResponse(open(path, 'rb'), as_attachment=True, filename=ARTIFACT_NAMES[job.format])
@@ -0,0 +1,238 @@
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from itertools import groupby
+
+import pandas as pd
+
+READ_CHUNK_SIZE = 5000
+
+# Strings read_excel turns into NaN by default
+NA_STRINGS = {
+    '', '#N/A', '#N/A N/A', '#NA', '-1.#IND', '-1.#QNAN', '-NaN', '-nan', '1.#IND', '1.#QNAN',
+    '<NA>', 'N/A', 'NA', 'NULL', 'NaN', 'None', 'n/a', 'nan', 'null',
+}
+
+BOOL_TEXT = {'True': True, 'TRUE': True, 'true': True, 'False': False, 'FALSE': False, 'false': False}
+
+
+# -----------------------------
+# Workbook reader
+# -----------------------------
+# Replaces pd.read_excel(path, sheet_name=None), which parses every sheet up
+# front in one process and keeps them all in memory. Sheets are parsed with
+# openpyxl in read-only mode, one sheet per worker process, spilled to temp
+# files in chunks of READ_CHUNK_SIZE rows and handed back in the order the
+# caller asks for them. The importer can write the first sheets while later
+# ones are still being parsed, and only one chunk at a time is held in the
+# parent.
+#
+# Chunks look like the frames read_excel returns: the first row is the
+# header, the index is the row's position in the sheet (so "row N" messages
+# stay the same), and a column whose cells are all numbers or booleans (or
+# text spelling them, as in our own exports) gets that type. Column types
+# are decided over the whole sheet, not per chunk. Columns right of the last
+# header cell are ignored.
+#
+# This module must not import Django: worker processes only parse files.
+
+def _header(values):
+    columns, seen = [], {}
+    for index, value in enumerate(values):
+        name = f"Unnamed: {index}" if value is None else value
+        if name in seen:
+            seen[name] += 1
+            name = f"{name}.{seen[name]}"
+        else:
+            seen[name] = 0
+        columns.append(name)
+    return columns
+
+
+def _cell(value):
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    if isinstance(value, str) and value in NA_STRINGS:
+        return None
+    return value
+
+
+def _is_number(value):
+    if isinstance(value, bool):
+        return False
+    if isinstance(value, (int, float)):
+        return True
+    if isinstance(value, str):
+        try:
+            float(value)
+        except ValueError:
+            return False
+        return True
+    return False
+
+
+class _ColumnTypes:
+    """Which columns of a sheet read_excel would turn into numbers or booleans."""
+
+    def __init__(self):
+        self.columns = []
+        self.numeric = set()
+        self.boolean = set()
+        self.fractional = set()
+        self.present = set()
+
+    def start(self, columns):
+        self.columns = columns
+        self.numeric = set(columns)
+        self.boolean = set(columns)
+
+    def add(self, values):
+        for column, value in zip(self.columns, values):
+            if value is None:
+                self.fractional.add(column)  # NaN makes a numeric column float
+                continue
+            self.present.add(column)
+            if column in self.numeric and not _is_number(value):
+                self.numeric.discard(column)
+            if column in self.boolean and not (isinstance(value, bool) or value in BOOL_TEXT):
+                self.boolean.discard(column)
+            if isinstance(value, float) or (isinstance(value, str) and not value.lstrip('+-').isdigit()):
+                self.fractional.add(column)
+
+    def conversions(self):
+        result = {}
+        for column in self.present:
+            if column in self.boolean:
+                result[column] = 'bool'
+            elif column in self.numeric:
+                result[column] = 'float' if column in self.fractional else 'int'
+        return result
+
+
+def _convert(frame, conversions):
+    for column, kind in conversions.items():
+        if kind == 'bool':
+            frame[column] = frame[column].map(lambda value: BOOL_TEXT.get(value, value))
+        else:
+            frame[column] = pd.to_numeric(frame[column]).astype('float64' if kind == 'float' else 'int64')
+    return frame
+
+
+def _frame(rows, columns, start):
+    frame = pd.DataFrame(rows, columns=columns, dtype=object)
+    frame.index = pd.RangeIndex(start, start + len(rows))
+    return frame
+
+
+def iter_raw_chunks(path, sheet, types, chunk_size=READ_CHUNK_SIZE):
+    """
+    Yield unconverted DataFrames of up to `chunk_size` rows from one sheet
+    of an .xlsx file, recording column types in `types` (a _ColumnTypes)
+    as the rows go by.
+    """
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        worksheet = workbook[sheet]
+        header = list(next(worksheet.iter_rows(max_row=1, values_only=True), None) or [])
+        while header and header[-1] is None:
+            # Formatting often stretches the sheet far past its last real column
+            header.pop()
+        if not header:
+            yield pd.DataFrame()
+            return
+        columns = _header(header)
+        width = len(columns)
+        types.start(columns)
+
+        chunk, blanks, start = [], 0, 0
+        for values in worksheet.iter_rows(min_row=2, max_col=width, values_only=True):
+            values = [_cell(value) for value in values]
+            if all(value is None for value in values):
+                # Trailing blank rows are dropped, blank rows in between kept
+                blanks += 1
+                continue
+            values += [None] * (width - len(values))
+            for row in [[None] * width] * blanks + [values]:
+                chunk.append(row)
+                types.add(row)
+                if len(chunk) >= chunk_size:
+                    yield _frame(chunk, columns, start)
+                    start += len(chunk)
+                    chunk = []
+            blanks = 0
+        if chunk or start == 0:
+            yield _frame(chunk, columns, start)
+    finally:
+        workbook.close()
+
+
+def _spill_sheet(path, sheet, chunk_size, directory):
+    """Parse one sheet into pickled chunk files; return (paths, column conversions)."""
+    types = _ColumnTypes()
+    paths = []
+    for frame in iter_raw_chunks(path, sheet, types, chunk_size):
+        handle, chunk_path = tempfile.mkstemp(suffix='.pkl', dir=directory)
+        os.close(handle)
+        frame.to_pickle(chunk_path)
+        paths.append(chunk_path)
+    return paths, types.conversions()
+
+
+def _load_spilled(spilled):
+    paths, conversions = spilled
+    for chunk_path in paths:
+        frame = pd.read_pickle(chunk_path)
+        os.remove(chunk_path)
+        yield _convert(frame, conversions)
+
+
+def workbook_sheet_names(path):
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(path, read_only=True)
+    try:
+        return list(workbook.sheetnames)
+    finally:
+        workbook.close()
+
+
+def read_workbook(path, sheets=None, chunk_size=READ_CHUNK_SIZE, workers=2):
+    """
+    Yield (sheet name, DataFrame chunk) pairs for `sheets` (every sheet if
+    None) in that order, skipping sheets the file does not have. .csv files
+    are read as a single 'Products' sheet.
+    """
+    if os.path.splitext(path)[1].lower() == '.csv':
+        for frame in pd.read_csv(path, chunksize=chunk_size):
+            yield 'Products', frame
+        return
+
+    available = workbook_sheet_names(path)
+    sheets = [sheet for sheet in (available if sheets is None else sheets) if sheet in available]
+
+    with tempfile.TemporaryDirectory(prefix='import-') as directory:
+        if workers <= 1 or len(sheets) <= 1:
+            for sheet in sheets:
+                for frame in _load_spilled(_spill_sheet(path, sheet, chunk_size, directory)):
+                    yield sheet, frame
+            return
+
+        pool = ProcessPoolExecutor(max_workers=min(workers, len(sheets)))
+        try:
+            # Queued in dependency order, so the first sheets finish first
+            futures = [(sheet, pool.submit(_spill_sheet, path, sheet, chunk_size, directory)) for sheet in sheets]
+            for sheet, future in futures:
+                for frame in _load_spilled(future.result()):
+                    yield sheet, frame
+        finally:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+
+def load_workbook_frames(path, sheets=None, chunk_size=READ_CHUNK_SIZE, workers=2):
+    """{sheet name: DataFrame} like read_excel(sheet_name=None), parsed by read_workbook()."""
+    return {
+        sheet: pd.concat([frame for _, frame in chunks])
+        for sheet, chunks in groupby(read_workbook(path, sheets, chunk_size, workers), key=lambda pair: pair[0])
+    }